@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# _sqlite.py (SQLite 저장소 공통 연결 관리)
+"""
+price_warehouse / k_cache / rebalance_store가 공유하는 SQLite 연결 기반 클래스
+- 연결은 스레드별(threading.local)로 열고 WAL + synchronous=NORMAL 설정
+- 쓰기는 프로세스 내 잠금(_write_lock)으로 직렬화
+- 생성 시 상위 폴더를 만들고 스키마(executescript)를 적용
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Union
+
+
+class SQLiteStore:
+    def __init__(self, path: Union[str, Path], schema: str):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._write_lock:
+            self._conn().executescript(schema)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
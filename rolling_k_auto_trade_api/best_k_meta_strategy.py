@@ -2,8 +2,9 @@
 # best_k_meta_strategy.py (실전 rolling_k, 최적화 전체본)
 """
 실전형 rolling_k 변동성돌파 + 월초/rolling/TopN/보유분/동적K/가중치 최적화 전략
-- KOSDAQ TopN(pykrx+fdr) 유니버스/시총 동적
-- 월/분기/연간 K-grid(고정/ATR동적)
+- KOSDAQ TopN(pykrx+fdr) 유니버스/시총 동적 — 영업일당 1회 스냅샷(universe.py)
+- 월/분기/연간 K-grid(고정/ATR동적) — 종목당 연 구간 배열 1개 + 구간 시작 오프셋으로 세 구간을 한 번에 계산,
+  get_best_k_meta 가중(연 1.0 / 분기 1.5 / 월 2.0)으로 best_k 선정. 종목별 결과는 입력 해시 캐시(k_cache.py)로 재사용
 - 목표가: 전일 변동폭*K + 틱보정
 - best_k/Sharpe/승률/수익률/MDD/거래수 필터 + assign_weights
 - 보유종목 강제포함/비중하한/rolling 통합
@@ -12,22 +13,22 @@
 
 from __future__ import annotations
 
+import bisect
 import logging
 import math
 import os
 from datetime import datetime, timedelta, date
-from typing import Any, Dict, List, Optional, Iterable
+from typing import Any, Callable, Dict, List, Optional, Iterable, Tuple
 
 import numpy as np
 import pandas as pd
-import FinanceDataReader as fdr
-from pykrx.stock import (
-    get_market_cap_by_ticker,
-    get_nearest_business_day_in_a_week,
-)
 
-from trader.rkmax_utils import get_best_k_meta, assign_weights, _enforce_min_weight_for_forced
-from .simulate_with_k_and_get_metrics import simulate_with_k_and_get_metrics
+from trader.rkmax_utils import assign_weights, _enforce_min_weight_for_forced
+from .simulate_with_k_and_get_metrics import simulate_k_grid
+from .best_k_parallel import fetch_horizon_segments, simulate_universe, resolve_workers
+from .k_cache import get_k_cache
+from .price_warehouse import read_prices
+from .universe import get_universe
 from rolling_k_auto_trade_api.adjust_price_to_tick import adjust_price_to_tick
 
 logger = logging.getLogger(__name__)
@@ -50,12 +51,37 @@ REQUIRE_POS_RET = os.getenv("REQUIRE_POS_RET", "true").lower() == "true"
 
 TOP_N = int(os.getenv("TOP_N", "50"))
 
+# best_k 메타 점수에 쓰는 구간(기준일 이전 일수). 월은 필터/목표가 기준이라 항상 포함
+HORIZON_DAYS = {"year": 365, "quarter": 90, "month": 30}
+META_K_HORIZONS = tuple(
+    h for h in HORIZON_DAYS
+    if h == "month" or h in os.getenv("META_K_HORIZONS", "year,quarter,month").replace(" ", "").lower().split(",")
+)
+
+# 병렬 엔진: 데이터 수집 스레드 수 / K 그리드 프로세스 수(0=CPU 수, 1=순차)
+REBALANCE_FETCH_WORKERS = int(os.getenv("REBALANCE_FETCH_WORKERS", "16"))
+REBALANCE_WORKERS = int(os.getenv("REBALANCE_WORKERS", "0"))
+# 종목별 K grid 결과 캐시(입력 해시 키, k_cache.py): 같은 가격 구간/그리드면 재계산 생략
+K_CACHE_ENABLE = os.getenv("K_CACHE_ENABLE", "true").lower() == "true"
+
 ALWAYS_INCLUDE_CODES = {
     c.strip() for c in os.getenv("ALWAYS_INCLUDE_CODES", "").replace(" ", "").split(",") if c.strip()
 }
 KEEP_HELD_BYPASS_FILTERS = os.getenv("KEEP_HELD_BYPASS_FILTERS", "true").lower() == "true"
 HELD_MIN_WEIGHT = float(os.getenv("HELD_MIN_WEIGHT", "0.01"))
 
+
+def strategy_params() -> Dict[str, Any]:
+    """결과에 영향을 주는 전략 파라미터 스냅샷(리밸런싱 결과 저장소의 파라미터 세트 키)."""
+    return {
+        "K_MIN": K_MIN, "K_MAX": K_MAX, "K_STEP": K_STEP, "K_GRID_MODE": K_GRID_MODE,
+        "K_STEP_FINE": K_STEP_FINE, "K_DYNAMIC_STEP_MIN": K_DYNAMIC_STEP_MIN,
+        "K_DYNAMIC_STEP_MAX": K_DYNAMIC_STEP_MAX, "K_DYNAMIC_STEP_MULT": K_DYNAMIC_STEP_MULT,
+        "MIN_TRADES": MIN_TRADES, "MAX_MDD_PCT": MAX_MDD_PCT, "REQUIRE_POS_RET": REQUIRE_POS_RET,
+        "TOP_N": TOP_N, "META_K_HORIZONS": list(META_K_HORIZONS), "ALWAYS_INCLUDE_CODES": sorted(ALWAYS_INCLUDE_CODES),
+        "KEEP_HELD_BYPASS_FILTERS": KEEP_HELD_BYPASS_FILTERS, "HELD_MIN_WEIGHT": HELD_MIN_WEIGHT,
+    }
+
 # -----------------------------
 # 유틸
 # -----------------------------
@@ -71,59 +97,18 @@ def _safe_float(x: Any, default: float = 0.0) -> float:
     except Exception:
         return default
 
-def _find_column(df: pd.DataFrame, keyword: str) -> Optional[str]:
-    kw = keyword.replace(" ", "")
-    for c in df.columns:
-        if kw in str(c).replace(" ", ""):
-            return c
-    return None
-
 # -----------------------------
 # 1) 시가총액 기준 KOSDAQ Top-N
 # -----------------------------
 def get_kosdaq_top_n(date_str: Optional[str] = None, n: int = TOP_N) -> pd.DataFrame:
-    """시가총액 상위 n개 KOSDAQ 종목 반환 (Code, Name, Marcap)."""
+    """시가총액 상위 n개 KOSDAQ 종목 반환 (Code, Name, Marcap). 영업일당 1회 스냅샷(universe.py)에서 제공."""
     try:
-        target_dt = datetime.today() if date_str is None else datetime.strptime(date_str, "%Y-%m-%d")
-        from_date = get_nearest_business_day_in_a_week(target_dt.strftime("%Y%m%d"))
-        logger.info(f"📅 pykrx 시총 조회일 → {from_date}")
-
-        mktcap_df = get_market_cap_by_ticker(from_date, market="KOSDAQ")
-        if mktcap_df is None or len(mktcap_df) == 0:
-            logger.warning("⚠️  pykrx 시총 DF가 비었습니다 → 빈 DF 반환")
-            return pd.DataFrame(columns=["Code", "Name", "Marcap"])
-
-        mktcap_df = mktcap_df.reset_index()
-        capcol = _find_column(mktcap_df, "시가총액")
-        ticcol = _find_column(mktcap_df, "티커") or _find_column(mktcap_df, "코드")
-        if capcol is None or ticcol is None:
-            logger.error("❌  시총/티커 컬럼 탐색 실패 → 빈 DF 반환")
-            return pd.DataFrame(columns=["Code", "Name", "Marcap"])
-
-        mktcap_df = mktcap_df.rename(columns={capcol: "Marcap", ticcol: "Code"})
-        mktcap_df["Code"] = mktcap_df["Code"].astype(str).str.zfill(6)
-
-        fdr_df = fdr.StockListing("KOSDAQ").rename(columns={"Symbol": "Code", "Name": "Name"})
-        fdr_df["Code"] = fdr_df["Code"].astype(str).str.zfill(6)
-
-        merged = pd.merge(
-            fdr_df[["Code", "Name"]],
-            mktcap_df[["Code", "Marcap"]],
-            on="Code",
-            how="inner",
-        )
-        if "Marcap" not in merged.columns:
-            for cand in ("Marcap_x", "Marcap_y", "MarketCap", "MarketCap_x", "MarketCap_y"):
-                if cand in merged.columns:
-                    merged = merged.rename(columns={cand: "Marcap"})
-                    break
-        if "Marcap" not in merged.columns:
-            logger.error("❌  병합 후에도 'Marcap' 없음 → 빈 DF 반환")
-            return pd.DataFrame(columns=["Code", "Name", "Marcap"])
-
-        topn = merged.dropna(subset=["Marcap"]).sort_values("Marcap", ascending=False).head(n)
+        topn = get_universe().top_n(date_str, n=n, market="KOSDAQ")
+        if topn.empty:
+            logger.warning("⚠️  유니버스 스냅샷이 비었습니다 → 빈 DF 반환")
+            return topn
         logger.info(f"✅  시총 Top{n} 추출 완료 → {len(topn)} 종목")
-        return topn[["Code", "Name", "Marcap"]]
+        return topn
     except Exception:
         logger.exception("❌  get_kosdaq_top_n 예외:")
         return pd.DataFrame(columns=["Code", "Name", "Marcap"])
@@ -193,36 +178,25 @@ def simulate_k_range_for(
     price_data: List[Dict[str, Any]],
     k_range: Optional[np.ndarray] = None,
 ) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
     if not price_data:
-        return results
+        return []
     if k_range is None:
         k_range = _build_k_range(code, price_data)
-    for k in k_range:
-        metrics = simulate_with_k_and_get_metrics(code, float(k), price_data)
-        metrics["k"] = float(k)
-        try:
-            mu = float(metrics.get("avg_return_pct", 0)) / 100.0
-            mdd = abs(float(metrics.get("mdd_pct", 0))) / 100.0
-            sharpe = (mu) / (0.01 + mdd)
-            metrics["sharpe"] = round(sharpe, 4)
-        except Exception:
-            metrics["sharpe"] = 0.0
-        results.append(metrics)
-    return results
+    # K 전체를 (K × 일수) 브로드캐스팅 커널로 한 번에 계산 (K별 결과/샤프는 스칼라 구현과 동일)
+    return simulate_k_grid(price_data, [float(k) for k in k_range])
 
 # -----------------------------
 # 3) 가격 데이터 수집 (1년·1분기·1개월)
 # -----------------------------
-def get_price_data_segments(code: str, base_date: date) -> Dict[str, List[Dict[str, Any]]]:
+def get_price_data_horizons(code: str, base_date: date) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
     """
-    base_date를 기준으로 이전 거래일까지의 데이터를 수집하여
-    year/quarter/month 세그먼트로 반환.
+    base_date 이전 거래일까지의 1년 구간 레코드(날짜 오름차순) 1개 +
+    구간 시작 오프셋 {"year": 0, "quarter": i, "month": j} 반환(분기/월은 연 구간의 뒤쪽 구간).
     """
     try:
         start_date = base_date - timedelta(days=400)
         end_date = base_date - timedelta(days=1)
-        df = fdr.DataReader(code, start=start_date, end=end_date)
+        df = read_prices(code, start_date, end_date)  # 로컬 저장소 우선(빠진 구간만 다운로드)
         df = (
             df.dropna(subset=["Open", "High", "Low", "Close", "Volume"])
             .rename(columns={
@@ -238,14 +212,22 @@ def get_price_data_segments(code: str, base_date: date) -> Dict[str, List[Dict[s
                 raise ValueError("DataReader 결과에 Date 컬럼이 없음")
         df["date"] = pd.to_datetime(df["Date"]).dt.date
         df = df[["date", "open", "high", "low", "close", "volume"]].sort_values("date")
-        return {
-            "year": df[df["date"] >= base_date - timedelta(days=365)].to_dict("records"),
-            "quarter": df[df["date"] >= base_date - timedelta(days=90)].to_dict("records"),
-            "month": df[df["date"] >= base_date - timedelta(days=30)].to_dict("records"),
-        }
+        records = df[df["date"] >= base_date - timedelta(days=HORIZON_DAYS["year"])].to_dict("records")
+        dates = [r["date"] for r in records]
+        starts = {h: bisect.bisect_left(dates, base_date - timedelta(days=d)) for h, d in HORIZON_DAYS.items()}
+        return records, starts
     except Exception as e:
         logger.exception(f"[ERROR] ❌ Failed to fetch data for {code}: {e}")
-        return {"year": [], "quarter": [], "month": []}
+        return [], {h: 0 for h in HORIZON_DAYS}
+
+
+def get_price_data_segments(code: str, base_date: date) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    base_date를 기준으로 이전 거래일까지의 데이터를 수집하여
+    year/quarter/month 세그먼트로 반환(get_price_data_horizons 레코드를 오프셋으로 자른 것).
+    """
+    records, starts = get_price_data_horizons(code, base_date)
+    return {h: records[starts[h]:] for h in HORIZON_DAYS}
 
 # -----------------------------
 # 4) K 최적화 & 필터링 (+ 보유분 강제 포함)
@@ -262,9 +244,8 @@ def _parse_force_include_codes(env_codes: Iterable[str]) -> List[str]:
 def _inject_forced_codes(universe_df: pd.DataFrame, forced_codes: List[str]) -> pd.DataFrame:
     if not forced_codes:
         return universe_df
-    fdr_df = fdr.StockListing("KOSDAQ").rename(columns={"Symbol": "Code", "Name": "Name"})
-    fdr_df["Code"] = fdr_df["Code"].astype(str).str.zfill(6)
-    force_df = fdr_df[fdr_df["Code"].isin(forced_codes)][["Code", "Name"]].copy()
+    listing = get_universe().listing(market="KOSDAQ")
+    force_df = listing[listing["Code"].isin(forced_codes)][["Code", "Name"]].copy()
     missing = [c for c in forced_codes if c not in set(force_df["Code"])]
     if missing:
         force_df = pd.concat(
@@ -276,10 +257,140 @@ def _inject_forced_codes(universe_df: pd.DataFrame, forced_codes: List[str]) ->
     uni = uni.drop_duplicates(subset=["Code"], keep="first")
     return uni
 
-def get_best_k_for_kosdaq_50(rebalance_date_str: str) -> List[Dict[str, Any]]:
+def _build_result_row(
+    code: str,
+    name: Optional[str],
+    month_data: List[Dict[str, Any]],
+    sim: Optional[Dict[str, Any]],
+    forced_codes: List[str],
+) -> Optional[Dict[str, Any]]:
+    """
+    종목 1개의 시뮬 결과(simulate_universe) → 리밸런싱 후보 행. 필터 탈락/오류는 None.
+    """
+    try:
+        if not month_data:
+            logger.debug(f"[SKIP] {name}({code}) 전월 데이터 없음")
+            if code in forced_codes and KEEP_HELD_BYPASS_FILTERS:
+                return {
+                    "code": code, "name": name, "best_k": 0.5,
+                    "avg_return_pct": 0.0, "win_rate_pct": 0.0,
+                    "mdd_pct": 0.0, "trades": 0, "cumulative_return_pct": 0.0,
+                    "avg_holding_days": 0.0, "sharpe_m": 0.0,
+                    "목표가": None, "close": None,
+                    "prev_open": None, "prev_high": None, "prev_low": None, "prev_close": None, "prev_volume": None,
+                    "forced_include": True, "filtered_reason": "NO_DATA",
+                    "qty": None, "weight": None, "k_grid_mode": K_GRID_MODE,
+                }
+            return None
+
+        # K grid → best_k 선택 + 성능 지표(월) (simulate_universe 결과)
+        if sim is None or "error" in sim:
+            logger.error(f"[ERR] {name}({code}) 시뮬 실패: {(sim or {}).get('error', 'K grid 없음')}")
+            return None
+        best_k = sim["best_k"]
+        month_perf = sim["month_perf"]
+        avg_return = float(month_perf.get("avg_return_pct", 0.0))
+        win_rate   = float(month_perf.get("win_rate_pct", 0.0))
+        mdd        = float(month_perf.get("mdd_pct", 0.0))
+        trades     = int(month_perf.get("trades", 0))
+        cum_ret    = float(month_perf.get("cumulative_return_pct", avg_return))
+        hold_days  = float(month_perf.get("avg_holding_days", 1))
+
+        # 필터
+        filtered_out = False
+        reason = []
+        if REQUIRE_POS_RET and avg_return <= 0:
+            filtered_out = True; reason.append("NEG_RET")
+        if trades < MIN_TRADES:
+            filtered_out = True; reason.append("LOW_TRADES")
+        if abs(mdd) > MAX_MDD_PCT:
+            filtered_out = True; reason.append("HIGH_MDD")
+
+        # prev_* (전일 값 세팅: month_data[-1]이 base_date-1일, 그 이전이 -2일)
+        prev_open = prev_high = prev_low = prev_close = prev_volume = None
+        try:
+            if len(month_data) >= 1:
+                last = month_data[-1]
+                prev_open   = _safe_float(last.get("open"), None) or None
+                prev_high   = _safe_float(last.get("high"), None) or None
+                prev_low    = _safe_float(last.get("low"), None) or None
+                prev_close  = _safe_float(last.get("close"), None) or None
+                prev_volume = _safe_float(last.get("volume"), None) or None
+        except Exception:
+            pass
+
+        # 목표가: 오늘시가(알 수 없으므로 '전일 종가 근사' 사용) + (전-전일 변동폭)*best_k
+        target_price = None
+        try:
+            if len(month_data) >= 2:
+                y  = month_data[-1]   # 전일
+                yy = month_data[-2]   # 전-전일
+                today_open_proxy = float(y["close"])  # 시초가 미확정 시 전일 종가로 근사
+                rng = float(yy["high"]) - float(yy["low"])
+                target_price = adjust_price_to_tick(round(today_open_proxy + rng * float(best_k), 2))
+        except Exception:
+            target_price = None
+
+        close_price = float(month_data[-1]["close"]) if month_data else None
+
+        # k-range 내 최고 샤프
+        max_sharpe = float(sim.get("max_sharpe", 0.0))
+
+        # 강제 포함 예외 처리
+        if filtered_out and code in forced_codes and KEEP_HELD_BYPASS_FILTERS:
+            logger.info(f"[FORCE-KEEP] {name}({code}) 필터탈락({','.join(reason)})이지만 보유분 포함")
+            filtered_out = False
+
+        if filtered_out:
+            logger.debug(f"[FILTER] {name}({code}) 제외: {','.join(reason)}")
+            return None
+
+        row = {
+            "code": code,
+            "name": name,
+            "best_k": float(best_k),
+            "avg_return_pct": round(avg_return, 2),
+            "win_rate_pct": round(win_rate, 1),
+            "mdd_pct": round(mdd, 1),
+            "trades": trades,
+            "cumulative_return_pct": round(cum_ret, 2),
+            "avg_holding_days": round(hold_days, 1),
+            "sharpe_m": round(max_sharpe, 4),
+            # trader.py가 읽는 필드들
+            "목표가": target_price,                # (동일 키 유지)
+            "target_price": target_price,         # 호환 키 추가
+            "close": close_price,
+            "prev_open": prev_open,
+            "prev_high": prev_high,
+            "prev_low": prev_low,
+            "prev_close": prev_close,
+            "prev_volume": prev_volume,
+            # 메타
+            "forced_include": code in forced_codes,
+            "k_grid_mode": K_GRID_MODE,
+            # 수량은 trader.py가 weight→qty로 변환하므로 기본 None
+            "qty": None,
+            "weight": None,  # assign_weights 후 채워짐
+        }
+
+        logger.info(
+            f"[SIM] {name}({code}) R={avg_return:.1f}% W={win_rate:.1f}% MDD={mdd:.1f}% "
+            f"K={best_k} trades={trades} forced={code in forced_codes}"
+        )
+        return row
+
+    except Exception as e:
+        logger.exception(f"[ERR] {name}({code}) 시뮬 실패: {e}")
+        return None
+
+
+def get_best_k_for_kosdaq_50(
+    rebalance_date_str: str, on_item: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
     """
     리밸런싱 대상 리스트 작성:
     - code/name/best_k/weight(+qty=None) + prev_* + 목표가(close 포함)까지 채움
+    - on_item(row): 필터를 통과한 종목 행을 시뮬 완료 즉시 전달(weight 배정 전, 스트리밍용)
     """
     rebalance_date = datetime.strptime(rebalance_date_str, "%Y-%m-%d").date()
 
@@ -294,129 +405,61 @@ def get_best_k_for_kosdaq_50(rebalance_date_str: str) -> List[Dict[str, Any]]:
 
     results: Dict[str, Dict[str, Any]] = {}
 
-    for _, stock in top_df.iterrows():
-        code, name = str(stock["Code"]).zfill(6), stock.get("Name")
-        try:
-            segments = get_price_data_segments(code, rebalance_date)
-            month_data = segments["month"]
-
-            if not month_data:
-                logger.debug(f"[SKIP] {name}({code}) 전월 데이터 없음")
-                if code in forced_codes and KEEP_HELD_BYPASS_FILTERS:
-                    results[code] = {
-                        "code": code, "name": name, "best_k": 0.5,
-                        "avg_return_pct": 0.0, "win_rate_pct": 0.0,
-                        "mdd_pct": 0.0, "trades": 0, "cumulative_return_pct": 0.0,
-                        "avg_holding_days": 0.0, "sharpe_m": 0.0,
-                        "목표가": None, "close": None,
-                        "prev_open": None, "prev_high": None, "prev_low": None, "prev_close": None, "prev_volume": None,
-                        "forced_include": True, "filtered_reason": "NO_DATA",
-                        "qty": None, "weight": None, "k_grid_mode": K_GRID_MODE,
-                    }
-                continue
-
-            # K grid → best_k 선택
-            k_range = _build_k_range(code, month_data)
-            m_metrics = simulate_k_range_for(code, month_data, k_range=k_range)
-            best_k = get_best_k_meta([], [], m_metrics)
-
-            # 성능 지표(월)
-            month_perf = simulate_with_k_and_get_metrics(code, best_k, month_data)
-            avg_return = float(month_perf.get("avg_return_pct", 0.0))
-            win_rate   = float(month_perf.get("win_rate_pct", 0.0))
-            mdd        = float(month_perf.get("mdd_pct", 0.0))
-            trades     = int(month_perf.get("trades", 0))
-            cum_ret    = float(month_perf.get("cumulative_return_pct", avg_return))
-            hold_days  = float(month_perf.get("avg_holding_days", 1))
-
-            # 필터
-            filtered_out = False
-            reason = []
-            if REQUIRE_POS_RET and avg_return <= 0:
-                filtered_out = True; reason.append("NEG_RET")
-            if trades < MIN_TRADES:
-                filtered_out = True; reason.append("LOW_TRADES")
-            if abs(mdd) > MAX_MDD_PCT:
-                filtered_out = True; reason.append("HIGH_MDD")
-
-            # prev_* (전일 값 세팅: month_data[-1]이 base_date-1일, 그 이전이 -2일)
-            prev_open = prev_high = prev_low = prev_close = prev_volume = None
-            try:
-                if len(month_data) >= 1:
-                    last = month_data[-1]
-                    prev_open   = _safe_float(last.get("open"), None) or None
-                    prev_high   = _safe_float(last.get("high"), None) or None
-                    prev_low    = _safe_float(last.get("low"), None) or None
-                    prev_close  = _safe_float(last.get("close"), None) or None
-                    prev_volume = _safe_float(last.get("volume"), None) or None
-            except Exception:
-                pass
-
-            # 목표가: 오늘시가(알 수 없으므로 '전일 종가 근사' 사용) + (전-전일 변동폭)*best_k
-            target_price = None
+    universe = [(str(stock["Code"]).zfill(6), stock.get("Name")) for _, stock in top_df.iterrows()]
+    universe = list(dict(universe).items())  # 강제포함 중복 제거(순서는 첫 등장 위치, 종목명은 마지막 항목 값)
+
+    # I/O(스레드 풀) → K grid 준비 → CPU(프로세스 풀, 공유메모리) 순으로 분리 실행
+    # 종목당 연 구간 레코드 1개 + 구간 시작 오프셋(분기/월은 뒤쪽 구간) → 세 구간을 한 번에 계산
+    segments = fetch_horizon_segments(
+        [c for c, _ in universe], rebalance_date, get_price_data_horizons, workers=REBALANCE_FETCH_WORKERS
+    )
+    # (META_K_HORIZONS에서 뺀 앞쪽 구간은 잘라서 넘김 → 오프셋도 그만큼 당김)
+    records_by_code: Dict[str, List[Dict[str, Any]]] = {}
+    horizons: Dict[str, Dict[str, int]] = {}
+    month_by_code: Dict[str, List[Dict[str, Any]]] = {}
+    for code, (records, starts) in segments.items():
+        month_by_code[code] = records[starts.get("month", 0):]
+        if records:
+            first = min(starts.get(h, 0) for h in META_K_HORIZONS)
+            records_by_code[code] = records[first:]
+            horizons[code] = {h: starts.get(h, 0) - first for h in META_K_HORIZONS}
+    k_ranges: Dict[str, np.ndarray] = {}
+    for code, name in universe:
+        if month_by_code.get(code):
             try:
-                if len(month_data) >= 2:
-                    y  = month_data[-1]   # 전일
-                    yy = month_data[-2]   # 전-전일
-                    today_open_proxy = float(y["close"])  # 시초가 미확정 시 전일 종가로 근사
-                    rng = float(yy["high"]) - float(yy["low"])
-                    target_price = adjust_price_to_tick(round(today_open_proxy + rng * float(best_k), 2))
-            except Exception:
-                target_price = None
-
-            close_price = float(month_data[-1]["close"]) if month_data else None
-
-            # k-range 내 최고 샤프
-            try:
-                max_sharpe = max((float(m.get("sharpe", 0)) for m in m_metrics), default=0.0)
-            except Exception:
-                max_sharpe = 0.0
-
-            # 강제 포함 예외 처리
-            if filtered_out and code in forced_codes and KEEP_HELD_BYPASS_FILTERS:
-                logger.info(f"[FORCE-KEEP] {name}({code}) 필터탈락({','.join(reason)})이지만 보유분 포함")
-                filtered_out = False
-
-            if filtered_out:
-                logger.debug(f"[FILTER] {name}({code}) 제외: {','.join(reason)}")
-                continue
-
-            results[code] = {
-                "code": code,
-                "name": name,
-                "best_k": float(best_k),
-                "avg_return_pct": round(avg_return, 2),
-                "win_rate_pct": round(win_rate, 1),
-                "mdd_pct": round(mdd, 1),
-                "trades": trades,
-                "cumulative_return_pct": round(cum_ret, 2),
-                "avg_holding_days": round(hold_days, 1),
-                "sharpe_m": round(max_sharpe, 4),
-                # trader.py가 읽는 필드들
-                "목표가": target_price,                # (동일 키 유지)
-                "target_price": target_price,         # 호환 키 추가
-                "close": close_price,
-                "prev_open": prev_open,
-                "prev_high": prev_high,
-                "prev_low": prev_low,
-                "prev_close": prev_close,
-                "prev_volume": prev_volume,
-                # 메타
-                "forced_include": code in forced_codes,
-                "k_grid_mode": K_GRID_MODE,
-                # 수량은 trader.py가 weight→qty로 변환하므로 기본 None
-                "qty": None,
-                "weight": None,  # assign_weights 후 채워짐
-            }
-
-            logger.info(
-                f"[SIM] {name}({code}) R={avg_return:.1f}% W={win_rate:.1f}% MDD={mdd:.1f}% "
-                f"K={best_k} trades={trades} forced={code in forced_codes}"
-            )
-
-        except Exception as e:
-            logger.exception(f"[ERR] {name}({code}) 시뮬 실패: {e}")
-            continue
+                k_ranges[code] = _build_k_range(code, month_by_code[code])
+            except Exception as e:
+                logger.exception(f"[ERR] {name}({code}) K grid 생성 실패: {e}")
+
+    rows: Dict[str, Optional[Dict[str, Any]]] = {}
+    names = dict(universe)
+
+    def _on_sim(code: str, sim: Dict[str, Any]) -> None:
+        # 종목 시뮬이 끝나는 즉시 행 생성 → on_item(스트리밍)으로 바로 전달
+        row = _build_result_row(code, names.get(code), month_by_code.get(code) or [], sim, forced_codes)
+        rows[code] = row
+        if row is not None and on_item is not None:
+            on_item(row)
+
+    simulate_universe(
+        records_by_code,
+        k_ranges,
+        workers=resolve_workers(REBALANCE_WORKERS),
+        on_result=_on_sim,
+        cache=get_k_cache() if K_CACHE_ENABLE else None,
+        horizons=horizons,
+    )
+
+    for code, name in universe:
+        if code not in rows:
+            # 데이터 없음(강제포함 보유분) / K grid 생성 실패 종목
+            row = _build_result_row(code, name, month_by_code.get(code) or [], None, forced_codes)
+            if row is not None and on_item is not None:
+                on_item(row)
+        else:
+            row = rows[code]
+        if row is not None:
+            results[code] = row
 
     logger.info(f"📊 필터/강제포함 반영 종목 = {len(results)}개")
 
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+# best_k_parallel.py (리밸런싱 best-K 병렬 엔진)
+"""
+유니버스 전체 best-K 최적화를 I/O(데이터 수집)와 CPU(K 그리드 시뮬레이션)로 분리해 병렬 실행
+- fetch_horizon_segments(): 종목별 일봉 수집(price_warehouse 경유, 빠진 구간만 다운로드)을 스레드 풀로 동시 실행
+  → {code: (연 구간 레코드 1개, {"year": 0, "quarter": i, "month": j} 시작 오프셋)}
+- pack_ohlc(): 전 종목 OHLC를 하나의 연속 배열(4 × 총일수) + 종목별 [start, end) 오프셋으로 묶음
+- simulate_universe(): 묶음 배열을 공유메모리(multiprocessing.shared_memory)에 올리고 프로세스 풀에서
+  종목 청크별 다구간 K 그리드 커널(simulate_k_grid_horizons_arrays: 연/분기/월을 종목 배열 1개에서 한 번에)
+  → 구간별 K 지표를 get_best_k_meta(연 1.0 / 분기 1.5 / 월 2.0 샤프 가중합)로 best_k 선정, 월 성과 / k-range 최고 샤프 계산
+- 결과는 입력 종목 순서 그대로(dict 삽입 순서) 반환 → 실행마다 동일한 순서
+- on_result(code, result): 종목 결과가 나오는 즉시(순차=종목별, 병렬=청크 완료 순) 호출 → 스트리밍 응답용
+- cache(KGridCache)를 주면 종목별 입력 해시(가격 구간 + K 그리드 + 수수료)로 조회 → 적중 종목은 계산 생략,
+  새로 계산한 종목만 저장(k_cache.py). 적중률은 [BESTK-SIM] 로그에 기록
+
+주의
+- 종목 단위 예외는 {"error": "..."}로 격리(다른 종목/청크 계속), 청크(프로세스) 실패도 해당 종목만 오류 처리
+- 프로세스 풀은 spawn 시작 방식(부모의 스레드/락/HTTP 세션 상태를 fork로 물려받지 않음 — FastAPI 요청 스레드에서 호출됨)
+- workers <= 1 이거나 종목 수가 min_parallel_jobs 미만이면 같은 계산을 현재 프로세스에서 순차 실행(공유메모리/풀 미사용)
+- best_k 선정 규칙은 simulate_with_k_and_get_metrics.get_best_k_meta()입니다. horizons를 주지 않으면 전체 레코드를 월 구간 1개로 봅니다.
+- 월 성과(month_perf) / grid / max_sharpe는 월 구간 기준입니다(필터·목표가는 기존과 같은 월 기준).
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .simulate_with_k_and_get_metrics import get_best_k_meta, simulate_k_grid_arrays, simulate_k_grid_horizons_arrays
+from .k_cache import KGridCache, grid_key
+
+logger = logging.getLogger(__name__)
+
+# 구간 시작 오프셋(종목 배열 기준): (("year", 0), ("quarter", i), ("month", j))
+Horizons = Tuple[Tuple[str, int], ...]
+# 청크 1개 작업 단위: (code, start, end, k_values, horizons)
+_Job = Tuple[str, int, int, List[float], Horizons]
+ResultCallback = Callable[[str, Dict[str, Any]], None]
+
+
+# -----------------------------
+# I/O: 일봉 동시 수집
+# -----------------------------
+def fetch_horizon_segments(
+    codes: Sequence[str],
+    base_date: date,
+    fetch: Callable[[str, date], Tuple[List[Dict[str, Any]], Dict[str, int]]],
+    workers: int = 8,
+) -> Dict[str, Tuple[List[Dict[str, Any]], Dict[str, int]]]:
+    """fetch(code, base_date) → (레코드, 구간 시작 오프셋)를 스레드 풀로 수집. 실패 종목은 ([], {})."""
+    out: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, int]]] = {c: ([], {}) for c in codes}
+    if not codes:
+        return out
+    t0 = time.perf_counter()
+
+    def _one(code: str) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        try:
+            records, starts = fetch(code, base_date)
+            return records or [], dict(starts or {})
+        except Exception as e:
+            logger.warning(f"[BESTK-FETCH-FAIL] {code}: {e}")
+            return [], {}
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="bestk-fetch") as ex:
+        for code, seg in zip(codes, ex.map(_one, codes)):
+            out[code] = seg
+    logger.info(
+        f"[BESTK-FETCH] {len(codes)}종목 수집 {time.perf_counter() - t0:.2f}s "
+        f"(workers={workers}, 데이터 있음={sum(1 for r, _ in out.values() if r)})"
+    )
+    return out
+
+
+# -----------------------------
+# 배열 묶음
+# -----------------------------
+def pack_ohlc(month_by_code: Dict[str, List[Dict[str, Any]]]) -> Tuple[np.ndarray, Dict[str, Tuple[int, int]]]:
+    """{code: 레코드} → (float64[4, 총일수] (open/high/low/close), {code: (start, end)})"""
+    total = sum(len(m) for m in month_by_code.values())
+    arr = np.empty((4, total), dtype=np.float64)
+    offsets: Dict[str, Tuple[int, int]] = {}
+    pos = 0
+    for code, rows in month_by_code.items():
+        n = len(rows)
+        for i, row in enumerate(rows):
+            arr[0, pos + i] = float(row["open"])
+            arr[1, pos + i] = float(row["high"])
+            arr[2, pos + i] = float(row["low"])
+            arr[3, pos + i] = float(row["close"])
+        offsets[code] = (pos, pos + n)
+        pos += n
+    return arr, offsets
+
+
+# -----------------------------
+# CPU: K 그리드 시뮬레이션
+# -----------------------------
+def _metrics_at(raw: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    # raw: 키별 1차원(K) 배열
+    return {
+        "avg_return_pct": round(float(raw["avg_return_pct"][i]), 2),
+        "win_rate_pct": round(float(raw["win_rate_pct"][i]), 2),
+        "mdd_pct": round(float(raw["mdd_pct"][i]), 2),
+        "trades": int(raw["trades"][i]),
+        "cumulative_return_pct": round(float(raw["cumulative_return_pct"][i]), 2),
+        "avg_holding_days": round(float(raw["avg_holding_days"][i]), 1),
+    }
+
+
+def _simulate_one(
+    ohlc: np.ndarray, start: int, end: int, k_values: List[float], fee_rate: float, horizons: Horizons = (("month", 0),)
+) -> Dict[str, Any]:
+    o, h, lo, c = ohlc[0, start:end], ohlc[1, start:end], ohlc[2, start:end], ohlc[3, start:end]
+    # 연/분기/월 구간 K 그리드를 종목 배열 1개에서 한 번에 (구간 × K × 일수)
+    raw = simulate_k_grid_horizons_arrays(o, h, lo, c, k_values, [s for _, s in horizons], fee_rate=fee_rate)
+    grids: Dict[str, List[Dict[str, Any]]] = {}
+    for hi, (name, _) in enumerate(horizons):
+        row = {key: v[hi] for key, v in raw.items()}
+        grid: List[Dict[str, Any]] = []
+        for i, kv in enumerate(k_values):
+            m = _metrics_at(row, i)
+            m["k"] = float(kv)
+            m["sharpe"] = round((m["avg_return_pct"] / 100.0) / (0.01 + abs(m["mdd_pct"]) / 100.0), 4)
+            grid.append(m)
+        grids[name] = grid
+    best_k = get_best_k_meta(grids.get("year", []), grids.get("quarter", []), grids.get("month", []))
+    # best_k가 그리드 밖 값(기본 0.5 등)일 수 있으므로 월 성과는 best_k 단일 K로 다시 계산
+    m0 = dict(horizons).get("month", 0)
+    perf_raw = simulate_k_grid_arrays(o[m0:], h[m0:], lo[m0:], c[m0:], [float(best_k)], fee_rate=fee_rate)
+    month_grid = grids.get("month", [])
+    return {
+        "best_k": float(best_k),
+        "month_perf": _metrics_at(perf_raw, 0),
+        "max_sharpe": max((m["sharpe"] for m in month_grid), default=0.0),
+        "grid": month_grid,
+        "horizon_days": {name: int(end - start - s) for name, s in horizons},
+    }
+
+
+def _simulate_jobs(
+    ohlc: np.ndarray, jobs: Sequence[_Job], fee_rate: float, on_result: Optional[ResultCallback] = None
+) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for code, start, end, k_values, horizons in jobs:
+        try:
+            out[code] = _simulate_one(ohlc, start, end, k_values, fee_rate, horizons)
+        except Exception as e:
+            out[code] = {"error": f"{type(e).__name__}: {e}"}
+        if on_result is not None:
+            _notify(on_result, code, out[code])
+    return out
+
+
+def _notify(on_result: ResultCallback, code: str, result: Dict[str, Any]) -> None:
+    # 콜백 오류가 계산을 멈추지 않도록 격리
+    try:
+        on_result(code, result)
+    except Exception as e:
+        logger.warning(f"[BESTK-CALLBACK-FAIL] {code}: {e}")
+
+
+def _simulate_jobs_shm(shm_name: str, shape: Tuple[int, int], jobs: Sequence[_Job], fee_rate: float) -> Dict[str, Dict[str, Any]]:
+    """프로세스 풀 작업 함수: 공유메모리 배열에 붙어서 청크 계산(복사 없음)."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # 결과는 파이썬 값만 담으므로 반환 전에 뷰를 버려도 됨(close 시 export 오류 방지)
+        return _simulate_jobs(np.ndarray(shape, dtype=np.float64, buffer=shm.buf), jobs, fee_rate)
+    finally:
+        shm.close()
+
+
+def simulate_universe(
+    records_by_code: Dict[str, List[Dict[str, Any]]],
+    k_ranges: Dict[str, Sequence[float]],
+    workers: int = 1,
+    fee_rate: float = 0.0015,
+    chunks_per_worker: int = 4,
+    min_parallel_jobs: int = 64,
+    on_result: Optional[ResultCallback] = None,
+    cache: Optional[KGridCache] = None,
+    horizons: Optional[Dict[str, Dict[str, int]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    k_ranges에 있는 종목만 계산 → {code: {"best_k", "month_perf", "max_sharpe", "grid", "horizon_days"} | {"error"}} (k_ranges 순서)
+    horizons: {code: {"year": 0, "quarter": i, "month": j}} 종목 레코드 기준 구간 시작 오프셋(순서 유지). 없으면 전체 = 월 1구간.
+    on_result가 있으면 종목 결과가 나올 때마다 호출(계산 스레드에서, 완료 순서. 캐시 적중 종목이 먼저).
+    """
+    codes = [c for c in k_ranges if records_by_code.get(c)]
+    if not codes:
+        return {}
+    t0 = time.perf_counter()
+    ohlc, offsets = pack_ohlc({c: records_by_code[c] for c in codes})
+    jobs: List[_Job] = [
+        (c, *offsets[c], [float(k) for k in k_ranges[c]], tuple((horizons or {}).get(c, {"month": 0}).items()))
+        for c in codes
+    ]
+
+    workers = max(1, int(workers))
+    results: Dict[str, Dict[str, Any]] = {}
+    keys: Dict[str, str] = {}
+    if cache is not None:
+        keys = {code: grid_key(ohlc[:, start:end], kv, fee_rate, hz) for code, start, end, kv, hz in jobs}
+        try:
+            cached = cache.get_many(keys.values())
+        except Exception as e:
+            logger.warning(f"[BESTK-CACHE] 조회 실패 → 전 종목 계산: {e}")
+            cached = {}
+        for code, key in keys.items():
+            if key in cached:
+                results[code] = cached[key]
+                if on_result is not None:
+                    _notify(on_result, code, cached[key])
+        jobs = [j for j in jobs if j[0] not in results]
+    n_hits = len(results)
+
+    # 종목당 계산이 ms 단위라 소규모 유니버스는 프로세스 기동 비용이 더 큼 → 순차
+    if not jobs:
+        mode = "cache"
+    elif workers <= 1 or len(jobs) < max(2, int(min_parallel_jobs)):
+        results.update(_simulate_jobs(ohlc, jobs, fee_rate, on_result))
+        mode = "serial"
+    else:
+        n_chunks = min(len(jobs), workers * max(1, int(chunks_per_worker)))
+        chunks = [jobs[i::n_chunks] for i in range(n_chunks)]
+        shm = shared_memory.SharedMemory(create=True, size=max(1, ohlc.nbytes))
+        try:
+            view = np.ndarray(ohlc.shape, dtype=np.float64, buffer=shm.buf)
+            view[:] = ohlc
+            del view
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+                futures = {
+                    ex.submit(_simulate_jobs_shm, shm.name, ohlc.shape, chunk, fee_rate): chunk
+                    for chunk in chunks
+                }
+                for fut in as_completed(futures):
+                    chunk = futures[fut]
+                    try:
+                        part = fut.result()
+                    except Exception as e:
+                        logger.error(f"[BESTK-CHUNK-FAIL] {len(chunk)}종목: {e}")
+                        part = {code: {"error": f"chunk: {e}"} for code, *_ in chunk}
+                    results.update(part)
+                    if on_result is not None:
+                        for code, res in part.items():
+                            _notify(on_result, code, res)
+        finally:
+            shm.close()
+            shm.unlink()
+        mode = f"process×{workers}"
+
+    if cache is not None and jobs:
+        # 오류 종목은 저장하지 않음(다음 실행에서 다시 계산)
+        fresh = [(keys[code], code, results[code]) for code, *_ in jobs if "error" not in results.get(code, {"error": ""})]
+        try:
+            cache.put_many(fresh)
+        except Exception as e:
+            logger.warning(f"[BESTK-CACHE] 저장 실패: {e}")
+
+    cache_note = f", 캐시 적중={n_hits}/{len(codes)} ({100.0 * n_hits / len(codes):.0f}%)" if cache is not None else ""
+    logger.info(
+        f"[BESTK-SIM] {len(codes)}종목 K그리드 {time.perf_counter() - t0:.2f}s ({mode}, "
+        f"계산={len(jobs)}, days={ohlc.shape[1]}, 오류={sum(1 for r in results.values() if 'error' in r)}{cache_note})"
+    )
+    # 입력 순서로 정렬(청크 분배와 무관하게 결정적)
+    return {c: results[c] for c in codes if c in results}
+
+
+def resolve_workers(value: Optional[int]) -> int:
+    """REBALANCE_WORKERS 값 해석: 0/음수/None → CPU 수(최대 8)."""
+    if value is None or int(value) <= 0:
+        return max(1, min(8, os.cpu_count() or 1))
+    return int(value)
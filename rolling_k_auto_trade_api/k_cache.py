@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# k_cache.py (종목별 best-K 결과 내용 주소 캐시)
+"""
+K 그리드 시뮬레이션 결과를 '입력 내용의 해시'로 저장/재사용하는 영구 캐시(SQLite)
+- 키 = sha256(캐시 버전, 수수료, K 그리드 값, 구간(연/분기/월) 시작 오프셋, 가격 배열 OHLC 원본 바이트) → 같은 입력이면 같은 키
+  (K_GRID_MODE/K_MIN/K_MAX/K_STEP 등은 실제 K 그리드 값에 반영되므로 값 자체를 해시)
+- 값 = simulate_universe 종목 결과(best_k / month_perf / max_sharpe / K별 지표 grid) JSON
+- 재시도 · FORCE_WEEKLY_REBALANCE · /rebalance/rolling + /rebalance/run 연속 호출처럼 입력이 같은 경우
+  데이터가 바뀐 종목만 다시 계산
+- stats: 누적 hits / misses / stores, summary(): 저장 건수 + 적중률 (GET /rebalance/k-cache)
+- 정리: python -m rolling_k_auto_trade_api.k_cache --prune (K_CACHE_TTL_DAYS 동안 안 쓰인 항목 삭제)
+
+주의
+- best_k 선정 규칙(get_best_k_meta)이나 시뮬 커널을 바꾸면 CACHE_VERSION을 올려야 합니다(이전 결과 무효화).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from rolling_k_auto_trade_api._sqlite import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = "kgrid-v2"  # v2: 연/분기/월 다구간 메타 점수(get_best_k_meta 1.0/1.5/2.0 가중)
+DEFAULT_CACHE_PATH = Path(os.getenv("K_CACHE_PATH") or (Path(__file__).parent / "data" / "k_cache.sqlite3"))
+K_CACHE_TTL_DAYS = int(os.getenv("K_CACHE_TTL_DAYS", "180"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kgrid (
+    key        TEXT PRIMARY KEY,
+    code       TEXT NOT NULL,
+    payload    TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    used_at    TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def grid_key(
+    ohlc: np.ndarray,
+    k_values: Sequence[float],
+    fee_rate: float,
+    horizons: Sequence[Tuple[str, int]] = (),
+) -> str:
+    """(4 × 일수) OHLC 배열 + K 그리드 + 수수료 + 구간 시작 오프셋((이름, 시작), ...) → 내용 해시 키."""
+    h = hashlib.sha256()
+    h.update(CACHE_VERSION.encode())
+    h.update(np.float64(fee_rate).tobytes())
+    h.update(np.ascontiguousarray(k_values, dtype=np.float64).tobytes())
+    h.update(json.dumps([[str(name), int(start)] for name, start in horizons]).encode())
+    h.update(np.ascontiguousarray(ohlc, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class KGridCache(SQLiteStore):
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH):
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0}
+        super().__init__(path, _SCHEMA)
+
+    def _bump(self, key: str, n: int) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """{key: 결과} (없는 키는 빠짐). 적중 항목은 used_at 갱신."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):  # SQLite 파라미터 수 제한
+            part = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, payload FROM kgrid WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for key, payload in rows:
+                try:
+                    found[key] = json.loads(payload)
+                except ValueError:
+                    continue
+        if found:
+            now = datetime.now().isoformat(timespec="seconds")
+            with self._write_lock, conn:
+                conn.executemany("UPDATE kgrid SET used_at=? WHERE key=?", [(now, k) for k in found])
+        self._bump("hits", len(found))
+        self._bump("misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """(key, code, 결과) 저장 → 저장 건수."""
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(key, code, json.dumps(res, ensure_ascii=False), now, now) for key, code, res in items]
+        if not rows:
+            return 0
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO kgrid(key, code, payload, created_at, used_at) VALUES (?,?,?,?,?)", rows
+            )
+        self._bump("stores", len(rows))
+        return len(rows)
+
+    def prune(self, ttl_days: int = K_CACHE_TTL_DAYS) -> int:
+        """ttl_days 동안 사용되지 않은 항목 삭제 → 삭제 건수."""
+        cutoff = (datetime.now() - timedelta(days=int(ttl_days))).isoformat(timespec="seconds")
+        conn = self._conn()
+        with self._write_lock, conn:
+            n = conn.execute("DELETE FROM kgrid WHERE used_at < ?", (cutoff,)).rowcount
+        return int(n or 0)
+
+    def summary(self) -> Dict[str, Any]:
+        n_entries, n_codes = self._conn().execute("SELECT COUNT(*), COUNT(DISTINCT code) FROM kgrid").fetchone()
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "path": str(self.path),
+            "entries": n_entries,
+            "codes": n_codes,
+            **stats,
+            "hit_rate_pct": round(100.0 * stats["hits"] / lookups, 1) if lookups else None,
+        }
+
+
+_CACHE: Optional[KGridCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_k_cache() -> KGridCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = KGridCache()
+        return _CACHE
+
+
+def _main() -> None:
+    ap = argparse.ArgumentParser(description="종목별 best-K 결과 캐시 상태/정리")
+    ap.add_argument("--prune", action="store_true", help="--ttl-days 동안 안 쓰인 항목 삭제")
+    ap.add_argument("--ttl-days", type=int, default=K_CACHE_TTL_DAYS)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    cache = get_k_cache()
+    if args.prune:
+        logger.info(f"[K-CACHE] 정리 {cache.prune(args.ttl_days)}건 삭제 (ttl={args.ttl_days}일)")
+    logger.info(f"[K-CACHE] {cache.summary()}")
+
+
+if __name__ == "__main__":
+    _main()
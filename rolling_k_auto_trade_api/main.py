@@ -20,6 +20,7 @@ except Exception:
     _rebalance_router = None  # 없으면 아래에서 동일 경로를 직접 구현
 
 from trader.kis_wrapper import KisAPI
+from trader import cache as trader_cache
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,32 @@ def health():
     return {"status": "ok"}
 
 
+# ========== 캐시 통계/덤프 ==========
+# 캐시 영역은 trader 프로세스 안에 있으므로, trader가 주기적으로 저장하는 export 파일(CACHE_STATS_PATH)을 읽는다.
+@app.get("/cache/stats")
+def cache_stats(
+    region: Optional[str] = Query(None, description="영역 이름(없으면 전체)"),
+    limit: int = Query(0, ge=0, le=1000, description="영역별 최근 엔트리 요약 수(0이면 통계만, export 시 저장된 개수까지)"),
+):
+    data = trader_cache.read_exported()
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"trader 캐시 통계 파일 없음: {trader_cache.STATS_PATH}")
+    regions = data.get("regions") or {}
+    if region is not None:
+        regions = {region: regions[region]} if region in regions else {}
+    out: Dict[str, Any] = {}
+    for name, body in regions.items():
+        out[name] = {"stats": body.get("stats", {})}
+        if limit > 0:
+            out[name]["entries"] = (body.get("entries") or [])[:limit]
+    return {
+        "pid": data.get("pid"),
+        "updated_at": data.get("updated_at"),
+        "age_sec": data.get("age_sec"),
+        "regions": out,
+    }
+
+
 # ========== 리밸런싱 라우터 연결(있으면 사용) ==========
 if _rebalance_router is not None:
     try:
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+# price_warehouse.py (로컬 일봉 OHLCV 저장소)
+"""
+FinanceDataReader 일봉 다운로드를 로컬 SQLite 하나로 공유하는 가격 저장소
+- daily(code, date, open, high, low, close, volume): 완성된 일봉만 저장(PRIMARY KEY(code, date))
+- coverage(code, start, end): 종목별로 '이미 받아 둔 구간' 기록 → 상장 전 구간/중간 휴장일은 다시 요청하지 않음
+  (끝은 실제로 저장한 마지막 봉까지만 연장 — 빈 응답/미게시 봉으로 영구 공백이 생기지 않음)
+- read(code, start, end): 구간 중 coverage 밖의 앞/뒤 부분만 내려받아 채운 뒤 로컬에서 읽음
+  (반환 형식은 fdr.DataReader와 같음: DatetimeIndex 'Date', Open/High/Low/Close/Volume)
+- refresh(codes, days): 스레드 풀 일괄 증분 갱신(야간 배치: python -m rolling_k_auto_trade_api.price_warehouse --refresh)
+- PRICE_WAREHOUSE_OFFLINE=1 이면 다운로드 없이 로컬 데이터만 사용(리밸런싱/백테스트 오프라인 실행)
+
+주의
+- 당일 일봉은 장 마감(16:00) 이후에만 저장합니다(장중 미완성 봉이 굳어지는 것 방지).
+- 같은 종목 동시 요청은 종목별 잠금으로 직렬화 → 같은 봉을 두 번 받지 않습니다.
+- 빈 응답 구간(휴장일/미게시)은 coverage에 넣지 않고, 같은 프로세스 안에서만 재요청을 생략합니다.
+- 연결/쓰기 잠금은 _sqlite.SQLiteStore(스레드별 연결, WAL, 프로세스 내 쓰기 잠금).
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from rolling_k_auto_trade_api._sqlite import SQLiteStore
+from trader.pullback_screen import last_completed_day
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(
+    os.getenv("PRICE_WAREHOUSE_PATH") or (Path(__file__).parent / "data" / "price_warehouse.sqlite3")
+)
+PRICE_WAREHOUSE_OFFLINE = os.getenv("PRICE_WAREHOUSE_OFFLINE", "false").lower() in ("1", "true", "yes")
+DEFAULT_HISTORY_START = date(2015, 1, 1)  # start 미지정(전체 이력) 요청의 하한
+
+_COLS = ("Open", "High", "Low", "Close", "Volume")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    code   TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    open   REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (code, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    code       TEXT PRIMARY KEY,
+    start      TEXT NOT NULL,
+    end        TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+DateLike = Union[str, date, datetime, pd.Timestamp, None]
+Fetcher = Callable[[str, date, date], Optional[pd.DataFrame]]
+
+
+def _to_date(v: DateLike) -> Optional[date]:
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return pd.Timestamp(str(v)).date()
+
+
+def _fdr_fetch(code: str, start: date, end: date) -> Optional[pd.DataFrame]:
+    import FinanceDataReader as fdr
+
+    return fdr.DataReader(code, start, end)
+
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=float) for c in _COLS}, index=pd.DatetimeIndex([], name="Date"))
+
+
+class PriceWarehouse(SQLiteStore):
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_DB_PATH,
+        fetch: Optional[Fetcher] = None,
+        offline: Optional[bool] = None,
+    ):
+        self.fetch = fetch or _fdr_fetch
+        self.offline = PRICE_WAREHOUSE_OFFLINE if offline is None else bool(offline)
+        self._locks_guard = threading.Lock()
+        self._code_locks: Dict[str, threading.Lock] = {}
+        self._empty_gaps: set = set()  # (code, start, end): 이번 프로세스에서 빈 응답이었던 구간
+        self.stats: Dict[str, int] = {"reads": 0, "downloads": 0, "bars_downloaded": 0, "download_errors": 0}
+        super().__init__(path, _SCHEMA)
+
+    # ---------- 내부 ----------
+    def _code_lock(self, code: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._code_locks.get(code)
+            if lock is None:
+                lock = self._code_locks[code] = threading.Lock()
+            return lock
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._locks_guard:
+            self.stats[key] += n
+
+    def coverage(self, code: str) -> Optional[Tuple[date, date]]:
+        row = self._conn().execute("SELECT start, end FROM coverage WHERE code=?", (code,)).fetchone()
+        if not row:
+            return None
+        return _to_date(row[0]), _to_date(row[1])
+
+    def _store(self, code: str, df: Optional[pd.DataFrame], start: date, end: date) -> int:
+        """[start, end] 응답 저장. coverage 끝은 저장한 마지막 봉까지만 연장, 저장할 봉이 없으면 coverage 미변경."""
+        rows: List[Tuple[Any, ...]] = []
+        if df is not None and len(df):
+            idx = pd.to_datetime(df.index)
+            cols = {c: pd.to_numeric(df[c], errors="coerce") if c in df.columns else None for c in _COLS}
+            for i, ts in enumerate(idx):
+                d = ts.date()
+                if d < start or d > end:
+                    continue  # 요청 범위 밖(미완성 당일 봉 등)은 저장하지 않음
+                vals = [None if cols[c] is None or pd.isna(cols[c].iloc[i]) else float(cols[c].iloc[i]) for c in _COLS]
+                rows.append((code, d.isoformat(), *vals))
+        if not rows:
+            return 0
+        last_bar = max(date.fromisoformat(r[1]) for r in rows)
+        cov = self.coverage(code)
+        new_start = min(start, cov[0]) if cov else start
+        new_end = max(last_bar, cov[1]) if cov else last_bar
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO daily(code, date, open, high, low, close, volume) VALUES (?,?,?,?,?,?,?)",
+                    rows,
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO coverage(code, start, end, updated_at) VALUES (?,?,?,?)",
+                    (code, new_start.isoformat(), new_end.isoformat(), datetime.now().isoformat(timespec="seconds")),
+                )
+        return len(rows)
+
+    # ---------- 공개 API ----------
+    def ensure(self, code: str, start: DateLike = None, end: DateLike = None) -> int:
+        """[start, end] 중 아직 받지 않은 앞/뒤 구간만 다운로드 → 새로 저장한 봉 수."""
+        code = str(code).zfill(6)
+        last_done = _to_date(last_completed_day())
+        s = _to_date(start) or DEFAULT_HISTORY_START
+        e = min(_to_date(end) or last_done, last_done)
+        if s > e or self.offline:
+            return 0
+        added = 0
+        with self._code_lock(code):
+            cov = self.coverage(code)
+            if cov is None:
+                gaps = [(s, e)]
+            else:
+                gaps = []
+                if s < cov[0]:
+                    gaps.append((s, cov[0] - timedelta(days=1)))
+                if e > cov[1]:
+                    gaps.append((cov[1] + timedelta(days=1), e))
+            for gs, ge in gaps:
+                if (code, gs, ge) in self._empty_gaps:
+                    continue
+                try:
+                    df = self.fetch(code, gs, ge)
+                except Exception as ex:
+                    self._bump("download_errors")
+                    logger.warning(f"[PRICE-WH] {code} {gs}~{ge} 다운로드 실패: {ex}")
+                    continue
+                n = self._store(code, df, gs, ge)
+                if n == 0:
+                    self._empty_gaps.add((code, gs, ge))
+                self._bump("downloads")
+                self._bump("bars_downloaded", n)
+                added += n
+        return added
+
+    def read(self, code: str, start: DateLike = None, end: DateLike = None, ensure: bool = True) -> pd.DataFrame:
+        """fdr.DataReader(code, start, end) 대체: 로컬 우선, 빠진 구간만 다운로드."""
+        code = str(code).zfill(6)
+        if ensure:
+            self.ensure(code, start, end)
+        self._bump("reads")
+        s = _to_date(start) or date.min
+        e = _to_date(end) or date.max
+        rows = self._conn().execute(
+            "SELECT date, open, high, low, close, volume FROM daily WHERE code=? AND date>=? AND date<=? ORDER BY date",
+            (code, s.isoformat(), e.isoformat()),
+        ).fetchall()
+        if not rows:
+            return _empty_frame()
+        df = pd.DataFrame(rows, columns=("Date",) + _COLS)
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date")
+
+    def refresh(self, codes: Iterable[str], days: int = 400, end: DateLike = None, workers: int = 8) -> Dict[str, int]:
+        """종목들을 최근 days일까지 증분 갱신(스레드 풀)."""
+        codes = [str(c).zfill(6) for c in codes]
+        e = _to_date(end) or _to_date(last_completed_day())
+        s = e - timedelta(days=int(days))
+        t0 = time.perf_counter()
+        before = dict(self.stats)
+        with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="price-wh") as ex:
+            list(ex.map(lambda c: self.ensure(c, s, e), codes))
+        out = {k: self.stats[k] - before.get(k, 0) for k in self.stats}
+        out["codes"] = len(codes)
+        logger.info(f"[PRICE-WH] 갱신 {len(codes)}종목 {s}~{e} {time.perf_counter() - t0:.1f}s {out}")
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        conn = self._conn()
+        n_codes, first, last = conn.execute("SELECT COUNT(*), MIN(start), MAX(end) FROM coverage").fetchone()
+        n_bars = conn.execute("SELECT COUNT(*) FROM daily").fetchone()[0]
+        return {"path": str(self.path), "codes": n_codes, "bars": n_bars, "first": first, "last": last}
+
+
+_WAREHOUSE: Optional[PriceWarehouse] = None
+_WAREHOUSE_LOCK = threading.Lock()
+
+
+def get_warehouse() -> PriceWarehouse:
+    global _WAREHOUSE
+    with _WAREHOUSE_LOCK:
+        if _WAREHOUSE is None:
+            _WAREHOUSE = PriceWarehouse()
+        return _WAREHOUSE
+
+
+def read_prices(code: str, start: DateLike = None, end: DateLike = None) -> pd.DataFrame:
+    """공용 저장소 경유 일봉 조회(fdr.DataReader와 같은 형식)."""
+    return get_warehouse().read(code, start, end)
+
+
+def _main() -> None:
+    ap = argparse.ArgumentParser(description="로컬 일봉 저장소 일괄 증분 갱신")
+    ap.add_argument("--refresh", action="store_true", help="종목 일봉을 최근 --days일까지 채움(야간 배치)")
+    ap.add_argument("--codes", default="", help="쉼표 구분 종목코드(미지정 시 --market 전 종목)")
+    ap.add_argument("--market", default="KOSDAQ")
+    ap.add_argument("--days", type=int, default=400)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    wh = get_warehouse()
+    if args.refresh:
+        codes = [c for c in args.codes.split(",") if c.strip()]
+        if not codes:
+            import FinanceDataReader as fdr
+
+            listing = fdr.StockListing(args.market)
+            col = "Code" if "Code" in listing.columns else "Symbol"
+            codes = listing[col].astype(str).str.zfill(6).tolist()
+        wh.refresh(codes, days=args.days, workers=args.workers)
+    logger.info(f"[PRICE-WH] {wh.summary()}")
+
+
+if __name__ == "__main__":
+    _main()
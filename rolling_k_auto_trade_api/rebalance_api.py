@@ -7,13 +7,17 @@ from typing import Any, Dict, List, Optional
 
 import pytz
 from fastapi import APIRouter, Query, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import pandas as pd
 import numpy as np
-from FinanceDataReader import StockListing, DataReader
 
-from rolling_k_auto_trade_api.best_k_meta_strategy import get_best_k_for_kosdaq_50
+from rolling_k_auto_trade_api.best_k_meta_strategy import get_best_k_for_kosdaq_50, strategy_params
 from rolling_k_auto_trade_api.logging_config import configure_logging
+from rolling_k_auto_trade_api.price_warehouse import read_prices
+from rolling_k_auto_trade_api.rebalance_jobs import Job, get_job_manager, publish
+from rolling_k_auto_trade_api.k_cache import get_k_cache
+from rolling_k_auto_trade_api.rebalance_store import StoredResult, get_rebalance_store, params_hash
+from rolling_k_auto_trade_api.walk_forward import load_panel, monthly_windows, top_n_universe, walk_forward
 
 configure_logging()
 logger = logging.getLogger(__name__)
@@ -28,6 +32,7 @@ MIN_CUMRET = float(os.getenv("MIN_CUMRET", "2"))
 TOP_K_LIMIT = int(os.getenv("TOP_K_LIMIT", "20"))
 REBALANCE_OUT_DIR = os.getenv("REBALANCE_OUT_DIR", "rebalance_results")
 REBALANCE_STORE = os.getenv("REBALANCE_STORE", "./data/selected_stocks.json")
+REBALANCE_STREAM_HEARTBEAT_SEC = float(os.getenv("REBALANCE_STREAM_HEARTBEAT_SEC", "15"))
 
 KST = pytz.timezone("Asia/Seoul")
 MARKET_OPEN: dtime = dtime(9, 0)
@@ -65,15 +70,54 @@ def _assign_weights(selected: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
-@rebalance_router.post("/rebalance/run/{date}", tags=["Rebalance"])
-async def run_rebalance(date: str):
+def _rebalance_params() -> Dict[str, Any]:
+    """저장소 키용 파라미터 세트: 전략(K grid/필터/유니버스) + API 선정 필터."""
+    return {
+        **strategy_params(),
+        "MIN_WINRATE": MIN_WINRATE, "MAX_MDD": MAX_MDD, "MIN_CUMRET": MIN_CUMRET, "TOP_K_LIMIT": TOP_K_LIMIT,
+    }
+
+def _persist(date: str, result: Dict[str, Any]) -> None:
+    # 저장 실패는 응답을 막지 않음(다음 요청에서 재계산)
+    try:
+        get_rebalance_store().put(date, _rebalance_params(), result)
+    except Exception as e:
+        logger.warning(f"[REBAL-STORE] 저장 실패 date={date}: {e}")
+
+def _conditional_json(request: Optional[Request], stored: StoredResult, content: Any) -> Response:
+    """ETag/Last-Modified 헤더 부착, If-None-Match/If-Modified-Since 일치 시 304."""
+    headers = stored.http_headers()
+    if request is not None and stored.not_modified(
+        request.headers.get("if-none-match"), request.headers.get("if-modified-since")
+    ):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+def _passes_filter(info: Dict[str, Any]) -> bool:
+    cumret = float(info.get("cumulative_return_pct", info.get("수익률(%)", 0)))
+    win = float(info.get("win_rate_pct", info.get("승률(%)", 0)))
+    mdd = float(info.get("mdd_pct", info.get("MDD(%)", 0)))
+    return cumret > MIN_CUMRET and win > MIN_WINRATE and mdd <= MAX_MDD
+
+def _publish_stock(date: str, seq: List[int], row: Dict[str, Any]) -> None:
+    """종목 결과 1건을 작업 이벤트로 발행(스트리밍). qualified는 필터 통과 여부(최종 선정은 final 이벤트 기준)."""
+    try:
+        qualified = _passes_filter(row)
+    except Exception:
+        qualified = False
+    seq[0] += 1
+    publish({"event": "stock", "date": date, "seq": seq[0], "qualified": qualified, "item": dict(row)})
+
+def compute_rebalance(date: str) -> Dict[str, Any]:
+    """리밸런싱 계산 본체(블로킹). 작업 관리자 워커 스레드에서 실행된다."""
     logger.info(f"[RUN] run_rebalance 호출: date={date}")
 
+    seq = [0]
     try:
-        raw_results = get_best_k_for_kosdaq_50(date)
+        raw_results = get_best_k_for_kosdaq_50(date, on_item=lambda row: _publish_stock(date, seq, row))
     except Exception as e:
         logger.exception(f"[ERROR] Best K 계산 실패: {e}")
-        raise HTTPException(status_code=500, detail="Best K 계산 실패")
+        raise RuntimeError("Best K 계산 실패") from e
 
     results_map: Dict[str, Dict[str, Any]] = {}
     if isinstance(raw_results, dict):
@@ -95,17 +139,11 @@ async def run_rebalance(date: str):
         info = dict(info0)
         candidates.append(info)
         try:
-            cumret = float(info.get("cumulative_return_pct", info.get("수익률(%)", 0)))
-            win = float(info.get("win_rate_pct", info.get("승률(%)", 0)))
-            mdd = float(info.get("mdd_pct", info.get("MDD(%)", 0)))
+            qualified = _passes_filter(info)
         except Exception as e:
             logger.warning(f"[WARN] 수치 변환 실패: {code}: {e}")
             continue
-        if (
-            cumret > MIN_CUMRET and
-            win > MIN_WINRATE and
-            mdd <= MAX_MDD
-        ):
+        if qualified:
             selected.append(info)
     # 거래량 내림차순 정렬
     candidates_with_vol = sorted(candidates, key=lambda x: x.get("prev_volume", 0), reverse=True)
@@ -139,18 +177,24 @@ async def run_rebalance(date: str):
 
     if len(selected) == 0:
         latest_rebalance_result.update({"date": date, "selected_stocks": []})
-        return {
+        skipped = {
             "status": "skipped",
             "reason": "no_qualified_candidates",
             "candidates": candidates,
             "selected": [],
         }
+        if candidates:
+            # 후보가 전혀 없으면(데이터 미수신 등) 저장하지 않고 다음 요청에서 다시 계산
+            _persist(date, skipped)
+        return skipped
 
     has_weight = any("weight" in s for s in selected)
     if not has_weight:
         selected = _assign_weights(selected)
 
     enriched: List[Dict[str, Any]] = []
+    # 전일 = 리밸런싱 기준일 직전 완성 일봉(로컬 저장소, 최근 3주만 조회)
+    rebal_day = pd.Timestamp(date)
     for info in selected:
         code = info.get("stock_code") or info.get("code")
         name = info.get("name") or info.get("stock_name")
@@ -158,9 +202,9 @@ async def run_rebalance(date: str):
         row.setdefault("code", code)
         row.setdefault("name", name)
         try:
-            df = DataReader(code)
-            if df is not None and len(df) >= 2:
-                prev = df.iloc[-2]
+            df = read_prices(code, rebal_day - pd.Timedelta(days=21), rebal_day - pd.Timedelta(days=1))
+            if df is not None and len(df) >= 1:
+                prev = df.iloc[-1]
                 row["prev_open"] = float(prev.get("Open", 0))
                 row["prev_high"] = float(prev.get("High", 0))
                 row["prev_low"] = float(prev.get("Low", 0))
@@ -180,13 +224,13 @@ async def run_rebalance(date: str):
         logger.info(f"[SAVE] {fp} 저장 (count={len(enriched)})")
     except Exception as e:
         logger.exception(f"[SAVE_FAIL] JSON 저장 오류: {e}")
-        raise HTTPException(status_code=500, detail="리밸런스 결과 저장 실패")
+        raise RuntimeError("리밸런스 결과 저장 실패") from e
 
     os.makedirs(os.path.dirname(REBALANCE_STORE), exist_ok=True)
     with open(REBALANCE_STORE, "w", encoding="utf-8") as f:
         json.dump({"date": date, "selected_stocks": enriched}, f, ensure_ascii=False, indent=2)
 
-    return {
+    result = {
         "status": "saved",
         "selected_count": len(enriched),
         "selected_stocks": enriched,
@@ -194,10 +238,107 @@ async def run_rebalance(date: str):
         "out_file": fp,
         "total_capital_hint": TOTAL_CAPITAL,
     }
+    _persist(date, result)
+    return result
+
+def _ndjson_response(job: Job, head: Dict[str, Any]) -> StreamingResponse:
+    async def _lines():
+        yield json.dumps(head, ensure_ascii=False, default=str) + "\n"
+        async for event in get_job_manager().events(job, heartbeat_sec=REBALANCE_STREAM_HEARTBEAT_SEC):
+            yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+def _stored_run_response(stored: StoredResult, stream: bool) -> Response:
+    """저장된 결과 즉시 응답(스트림 모드는 final 1줄)."""
+    headers = {**stored.http_headers(), "X-Rebalance-Source": "store"}
+    if stream:
+        line = {"event": "final", "status": "done", "source": "store", "result": stored.body}
+        return Response(
+            content=json.dumps(line, ensure_ascii=False, default=str) + "\n",
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+    return JSONResponse(content=stored.body, headers=headers)
+
+@rebalance_router.post("/rebalance/run/{date}", tags=["Rebalance"])
+async def run_rebalance(
+    date: str,
+    wait: bool = Query(True, description="False면 작업만 제출하고 202 + job_id 즉시 반환"),
+    stream: bool = Query(False, description="True면 NDJSON 스트림(job → 종목별 stock → final/error)"),
+    recompute: bool = Query(False, description="True면 저장된 결과를 무시하고 다시 계산"),
+):
+    """
+    계산은 작업 관리자 워커에서 실행(이벤트 루프 비차단). 같은 날짜 요청이 진행 중이면 그 작업을 공유한다.
+    wait=True(기본): 완료까지 비동기로 기다려 기존과 같은 결과 반환 / wait=False: 202 {job_id, status}.
+    stream=True: 한 줄에 JSON 1개 — {"event":"job"} 다음 종목 계산 즉시 {"event":"stock"},
+    마지막에 가중치가 포함된 결과 {"event":"final","result":{...}} (실패 시 {"event":"error"}).
+    같은 (기준일, 파라미터 세트) 결과가 저장돼 있으면 recompute=False일 때 계산 없이 즉시 반환(ETag/Last-Modified).
+    """
+    store = get_rebalance_store()
+    phash = params_hash(_rebalance_params())
+    if not recompute:
+        stored = store.get(date, phash)
+        if stored is not None:
+            logger.info(f"[RUN] 저장된 결과 반환: date={date} params={phash} etag={stored.etag}")
+            latest_rebalance_result.update({"date": date, "selected_stocks": stored.body.get("selected_stocks", [])})
+            return _stored_run_response(stored, stream)
+    job, created = get_job_manager().submit(date, compute_rebalance, date)
+    if stream:
+        return _ndjson_response(job, {"event": "job", **job.to_dict(), "deduplicated": not created})
+    if not wait:
+        return JSONResponse(status_code=202, content={**job.to_dict(), "deduplicated": not created})
+    try:
+        result = await get_job_manager().wait(job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e) or "리밸런싱 실패")
+    stored = store.get(date, phash)
+    headers = {**(stored.http_headers() if stored is not None else {}), "X-Rebalance-Source": "computed"}
+    return JSONResponse(content=json.loads(json.dumps(result, default=str)), headers=headers)
+
+@rebalance_router.post("/rebalance/jobs/{date}", tags=["Rebalance"], status_code=202)
+def submit_rebalance_job(date: str):
+    job, created = get_job_manager().submit(date, compute_rebalance, date)
+    return {**job.to_dict(), "deduplicated": not created}
+
+@rebalance_router.get("/rebalance/jobs/{job_id}", tags=["Rebalance"])
+def get_rebalance_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job.to_dict()
+
+@rebalance_router.get("/rebalance/jobs/{job_id}/events", tags=["Rebalance"])
+def stream_rebalance_job(job_id: str):
+    """작업 이벤트 NDJSON 스트림(처음부터 재생 → 종료까지)."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return _ndjson_response(job, {"event": "job", **job.to_dict()})
+
+@rebalance_router.get("/rebalance/jobs/{job_id}/result", tags=["Rebalance"])
+def get_rebalance_job_result(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    if job.status == "failed":
+        return JSONResponse(status_code=500, content=job.to_dict())
+    if job.active:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    return job.result
+
+@rebalance_router.get("/rebalance/k-cache", tags=["Rebalance"])
+def get_k_cache_stats():
+    """종목별 best-K 결과 캐시: 저장 건수 + 프로세스 기동 이후 누적 적중률."""
+    return get_k_cache().summary()
 
 @rebalance_router.get("/rebalance/latest", tags=["Rebalance"])
-def get_latest_rebalance():
-    return latest_rebalance_result
+def get_latest_rebalance(request: Request):
+    stored = get_rebalance_store().latest()
+    if stored is None:
+        return latest_rebalance_result
+    return _conditional_json(
+        request, stored, {"date": stored.date, "selected_stocks": stored.body.get("selected_stocks", [])}
+    )
 
 @rebalance_router.get(
     "/rebalance/backtest-monthly",
@@ -223,55 +364,38 @@ def rebalance_backtest_monthly(
         return JSONResponse(content={"error": "날짜 형식 오류: YYYY-MM-DD"})
 
     try:
-        top50_df = StockListing("KOSDAQ").sort_values("Marcap", ascending=False).head(50)
-        tickers = list(zip(top50_df["Code"], top50_df["Name"]))
         periods = pd.date_range(start=start_date, end=end_date, freq="MS")
 
         if len(periods) < 2:
             return JSONResponse(content={"error": "최소 두 개 월 이상 지정 필요"})
 
+        # 종목별 전체 구간 1회 로드 → 월 구간 인덱스 슬라이스 + K 그리드 벡터 평가(walk_forward 엔진)
+        windows = monthly_windows(periods[1:])
+        codes, names = top_n_universe(50)
+        panel = load_panel(codes, windows[0].start_train, windows[-1].end_test, names=names)
+        wf = walk_forward(panel, windows)
+        rows_by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for row in wf.rows:
+            rows_by_month.setdefault(row["start_test"], []).append(row)
+
         all_results = []
-        for i in range(len(periods) - 1):
-            rebalance_dt = periods[i + 1]
-            start_train = (rebalance_dt - pd.DateOffset(months=1)).strftime("%Y-%m-%d")
-            end_train   = (rebalance_dt - pd.DateOffset(days=1)).strftime("%Y-%m-%d")
-            start_test  = rebalance_dt.strftime("%Y-%m-%d")
-            end_test    = (rebalance_dt + pd.DateOffset(months=1) - pd.DateOffset(days=1)).strftime("%Y-%m-%d")
-
-            selected = []
-            for code, name in tickers:
-                try:
-                    df = DataReader(code, start_train, end_test)
-                    if df.empty:
-                        continue
-                    df.index = pd.to_datetime(df.index)
-                    train = df.loc[start_train:end_train].copy()
-                    test  = df.loc[start_test:end_test].copy()
-                    if len(train) < 15 or len(test) < 5:
-                        continue
-
-                    try:
-                        start_price = test["Open"].iloc[0]
-                        end_price = test["Close"].iloc[-1]
-                        rtn_pct = (end_price / start_price - 1) * 100
-                    except Exception as e:
-                        logger.warning(f"[WARN] {name}({code}) 수익률 계산 실패: {e}")
-                        continue
-
-                    selected.append({
-                        "code": code,
-                        "name": name,
-                        "수익률(%)": round(rtn_pct, 2),
-                        "시작일": start_test,
-                        "종료일": end_test,
-                        "종가": int(end_price),
-                    })
-                except Exception as e:
-                    logger.exception(f"[ERROR] {name}({code}) 백테스트 중 예외: {e}")
-                    continue
+        for w in windows:
+            selected = [
+                {
+                    "code": row["code"],
+                    "name": row["name"],
+                    "수익률(%)": round(row["hold_return_pct"], 2),
+                    "시작일": row["start_test"],
+                    "종료일": row["end_test"],
+                    "종가": int(row["close"]),
+                    "최적k": round(row["best_k"], 2),
+                    "전략수익률(%)": round(row["return_pct"], 2),
+                }
+                for row in rows_by_month.get(w.start_test.strftime("%Y-%m-%d"), [])
+            ]
 
             if not selected:
-                logger.warning(f"[SKIP] {rebalance_dt.strftime('%Y-%m')} : 조건 만족 종목 없음")
+                logger.warning(f"[SKIP] {w.rebalance.strftime('%Y-%m')} : 조건 만족 종목 없음")
                 continue
 
             df = pd.DataFrame(selected)
@@ -312,14 +436,14 @@ def rebalance_backtest_monthly(
     tags=["Rebalance"],
     response_class=JSONResponse,
 )
-def get_selected_stocks(date: str):
-    if latest_rebalance_result.get("date") == date:
-        selected = latest_rebalance_result.get("selected_stocks", [])
-        return {
+def get_selected_stocks(date: str, request: Request):
+    stored = get_rebalance_store().latest_for_date(date, params_hash(_rebalance_params()))
+    if stored is not None:
+        return _conditional_json(request, stored, {
             "status": "ready",
             "rebalance_date": date,
-            "selected": selected
-        }
+            "selected": stored.body.get("selected_stocks", []),
+        })
     else:
         return {
             "status": "not_ready",
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# rebalance_jobs.py (리밸런싱 백그라운드 작업 관리자)
+"""
+무거운 리밸런싱 계산을 이벤트 루프 밖 워커 풀에서 '작업(job)'으로 실행
+- submit(key, fn): 작업 ID 발급 후 스레드 풀에서 실행. 같은 key(예: 날짜)의 작업이 대기/실행 중이면 그 작업을 그대로 반환(중복 제거)
+- get(job_id) / status: queued → running → done | failed, 제출/시작/종료 시각, 소요시간, 오류
+- wait(job): asyncio 대기(이벤트 루프 비차단) — 동기 응답이 필요한 기존 /rebalance/run 계약 유지용
+- publish(event): 작업 함수가 중간 결과(종목별 결과 등)를 작업 이벤트 로그에 추가(작업 스레드 밖에서는 무시)
+- events(job): 이벤트 로그를 처음부터 재생 후 실시간 구독하는 async 이터레이터(스트리밍 응답용)
+  마지막 이벤트는 {"event": "final", ..., "result"} 또는 {"event": "error", ...}
+- 완료 작업은 최근 history개만 보관
+
+주의
+- 풀은 스레드 풀입니다(계산 내부의 CPU 병렬화는 best_k_parallel 프로세스 풀 담당). 워커 수 REBALANCE_JOB_WORKERS.
+- 작업 결과는 프로세스 메모리에만 있습니다(재시작 시 사라짐).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REBALANCE_JOB_WORKERS = int(os.getenv("REBALANCE_JOB_WORKERS", "2"))
+REBALANCE_JOB_HISTORY = int(os.getenv("REBALANCE_JOB_HISTORY", "100"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_CURRENT = threading.local()  # 작업 스레드에서 실행 중인 Job(publish 대상)
+
+
+class Job:
+    __slots__ = (
+        "id", "key", "status", "submitted_at", "started_at", "finished_at", "result", "error", "future",
+        "events", "_closed", "_subs", "_lock",
+    )
+
+    def __init__(self, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.events: List[Dict[str, Any]] = []
+        self._closed = False
+        self._subs: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.events.append(event)
+            subs = list(self._subs)
+        for loop, q in subs:
+            loop.call_soon_threadsafe(q.put_nowait, event)
+
+    def _close(self) -> None:
+        with self._lock:
+            self._closed = True
+            subs, self._subs = self._subs, []
+        for loop, q in subs:
+            loop.call_soon_threadsafe(q.put_nowait, None)
+
+    def _subscribe(self, loop: asyncio.AbstractEventLoop, q: asyncio.Queue) -> Tuple[List[Dict[str, Any]], bool]:
+        """(지금까지의 이벤트, 이후 실시간 수신 여부) — 같은 잠금 안에서 복사/등록해 누락·중복 없음."""
+        with self._lock:
+            backlog = list(self.events)
+            if self._closed:
+                return backlog, False
+            self._subs.append((loop, q))
+            return backlog, True
+
+    def _unsubscribe(self, q: asyncio.Queue) -> None:
+        with self._lock:
+            self._subs = [(lp, sq) for lp, sq in self._subs if sq is not q]
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "key": self.key,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_sec": round(end - (self.started_at or self.submitted_at), 3),
+            "error": self.error,
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers: int = REBALANCE_JOB_WORKERS, history: int = REBALANCE_JOB_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="rebalance-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active_by_key: Dict[str, Job] = {}
+        self._history = max(1, int(history))
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Job, bool]:
+        """(작업, 새로 만들었는지). 같은 key 작업이 진행 중이면 (기존 작업, False)."""
+        with self._lock:
+            cur = self._active_by_key.get(key)
+            if cur is not None and cur.active:
+                logger.info(f"[REBAL-JOB] {key} 진행 중 작업 재사용 job={cur.id}")
+                return cur, False
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+            self._trim()
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"[REBAL-JOB] 제출 key={key} job={job.id}")
+        return job, True
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        job.status = RUNNING
+        job.started_at = time.time()
+        _CURRENT.job = job
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = DONE
+            return job.result
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+            logger.exception(f"[REBAL-JOB] 실패 key={job.key} job={job.id}: {e}")
+            raise
+        finally:
+            _CURRENT.job = None
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+            if job.status == DONE:
+                job.publish({"event": "final", **job.to_dict(), "result": job.result})
+            else:
+                job.publish({"event": "error", **job.to_dict()})
+            job._close()
+            logger.info(f"[REBAL-JOB] 종료 key={job.key} job={job.id} status={job.status} {job.to_dict()['elapsed_sec']}s")
+
+    def _trim(self) -> None:
+        # 완료된 오래된 작업부터 제거(진행 중 작업은 유지)
+        while len(self._jobs) > self._history:
+            for jid, j in self._jobs.items():
+                if not j.active:
+                    del self._jobs[jid]
+                    break
+            else:
+                return
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    async def wait(self, job: Job) -> Any:
+        """작업 완료까지 이벤트 루프를 막지 않고 대기 → 결과(실패 시 예외 전파)."""
+        assert job.future is not None
+        return await asyncio.wrap_future(job.future)
+
+    async def events(self, job: Job, heartbeat_sec: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        작업 이벤트를 처음부터 재생 → 종료(final/error)까지 실시간으로 내보냄(이벤트 루프 비차단).
+        heartbeat_sec 동안 새 이벤트가 없으면 {"event": "heartbeat"}를 내보냄(긴 수집 단계 중 클라이언트 읽기 타임아웃 방지).
+        """
+        q: asyncio.Queue = asyncio.Queue()
+        backlog, live = job._subscribe(asyncio.get_running_loop(), q)
+        try:
+            for event in backlog:
+                yield event
+            while live:
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=heartbeat_sec)
+                except asyncio.TimeoutError:
+                    yield {"event": "heartbeat", "job_id": job.id, "status": job.status}
+                    continue
+                if event is None:
+                    break
+                yield event
+        finally:
+            job._unsubscribe(q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts: Dict[str, int] = {}
+        for j in jobs:
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {"jobs": len(jobs), "by_status": counts, "active_keys": sorted(self._active_by_key)}
+
+
+def publish(event: Dict[str, Any]) -> None:
+    """현재 작업 스레드의 Job 이벤트 로그에 추가. 작업 밖(직접 호출/테스트)에서는 아무것도 안 함."""
+    job = getattr(_CURRENT, "job", None)
+    if job is not None:
+        job.publish(event)
+
+
+_MANAGER: Optional[JobManager] = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            _MANAGER = JobManager()
+        return _MANAGER
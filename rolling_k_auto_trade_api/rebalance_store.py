@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# rebalance_store.py (리밸런싱 결과 영구 저장소)
+"""
+리밸런싱 결과를 (기준일, 파라미터 세트) 단위로 저장/재사용하는 색인 저장소(SQLite)
+- result(date, params_hash, params, body, etag, created_at): PRIMARY KEY(date, params_hash), created_at 색인
+- params_hash = sha256(파라미터 dict의 정렬된 JSON) → 필터/그리드 설정이 바뀌면 다른 항목
+- put(): 결과 본문 JSON + 강한 ETag(본문 sha256) + 저장 시각(UTC, Last-Modified) 기록
+- get(date, params_hash) / latest_for_date(date) / latest(): API 재시작 후에도 즉시 재응답
+- http_headers(): ETag / Last-Modified 응답 헤더, not_modified(): If-None-Match / If-Modified-Since 판정
+
+주의
+- 같은 (date, params_hash)는 덮어씁니다(recompute). 이전 본문은 남기지 않습니다.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union
+
+from rolling_k_auto_trade_api._sqlite import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = Path(
+    os.getenv("REBALANCE_DB_PATH") or (Path(__file__).parent / "data" / "rebalance_results.sqlite3")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result (
+    date        TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    body        TEXT NOT NULL,
+    etag        TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    PRIMARY KEY (date, params_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS result_created ON result(created_at);
+"""
+
+
+def params_hash(params: Mapping[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class StoredResult:
+    date: str
+    params_hash: str
+    body: Dict[str, Any]
+    etag: str
+    created_at: datetime  # UTC
+
+    def http_headers(self) -> Dict[str, str]:
+        return {"ETag": self.etag, "Last-Modified": format_datetime(self.created_at, usegmt=True)}
+
+    def not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """조건부 요청 판정(If-None-Match 우선, 없으면 If-Modified-Since 초 단위 비교)."""
+        if if_none_match:
+            tags = {t.strip() for t in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:  # "-0000" 존은 naive로 파싱됨 → UTC로 간주
+                since = since.replace(tzinfo=timezone.utc)
+            try:
+                return self.created_at.replace(microsecond=0) <= since
+            except TypeError:
+                return False
+        return False
+
+
+class RebalanceStore(SQLiteStore):
+    def __init__(self, path: Union[str, Path] = DEFAULT_STORE_PATH):
+        super().__init__(path, _SCHEMA)
+
+    @staticmethod
+    def _row(row) -> Optional[StoredResult]:
+        if not row:
+            return None
+        date, phash, body, etag, created_at = row
+        return StoredResult(date, phash, json.loads(body), etag, datetime.fromisoformat(created_at))
+
+    def put(self, date: str, params: Mapping[str, Any], body: Dict[str, Any]) -> StoredResult:
+        text = json.dumps(body, ensure_ascii=False, default=str)
+        etag = '"' + hashlib.sha256(text.encode()).hexdigest()[:32] + '"'
+        created = datetime.now(timezone.utc)
+        phash = params_hash(params)
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO result(date, params_hash, params, body, etag, created_at) VALUES (?,?,?,?,?,?)",
+                (date, phash, json.dumps(params, sort_keys=True, default=str), text, etag, created.isoformat()),
+            )
+        logger.info(f"[REBAL-STORE] 저장 date={date} params={phash} etag={etag}")
+        return StoredResult(date, phash, json.loads(text), etag, created)
+
+    def get(self, date: str, phash: str) -> Optional[StoredResult]:
+        return self._row(self._conn().execute(
+            "SELECT date, params_hash, body, etag, created_at FROM result WHERE date=? AND params_hash=?",
+            (date, phash),
+        ).fetchone())
+
+    def latest_for_date(self, date: str, phash: Optional[str] = None) -> Optional[StoredResult]:
+        """해당 기준일 결과(phash 우선, 없으면 가장 최근 저장분)."""
+        if phash:
+            hit = self.get(date, phash)
+            if hit is not None:
+                return hit
+        return self._row(self._conn().execute(
+            "SELECT date, params_hash, body, etag, created_at FROM result WHERE date=? ORDER BY created_at DESC LIMIT 1",
+            (date,),
+        ).fetchone())
+
+    def latest(self) -> Optional[StoredResult]:
+        return self._row(self._conn().execute(
+            "SELECT date, params_hash, body, etag, created_at FROM result ORDER BY created_at DESC LIMIT 1"
+        ).fetchone())
+
+
+_STORE: Optional[RebalanceStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_rebalance_store() -> RebalanceStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = RebalanceStore()
+        return _STORE
@@ -6,7 +6,7 @@ from datetime import datetime
 from rolling_k_auto_trade_api.simulate_with_k_and_get_metrics import (
     simulate_with_k_and_get_metrics,
 )
-from FinanceDataReader import DataReader
+from rolling_k_auto_trade_api.price_warehouse import read_prices
 
 report_router = APIRouter()
 
@@ -32,7 +32,7 @@ def run_monthly_report(month: str):
         name = stock["name"]
         k = stock["best_k"]
         try:
-            df = DataReader(code, start=f"{month}-01", end=end_date).dropna()
+            df = read_prices(code, f"{month}-01", end_date).dropna()
             df = df.rename(
                 columns={"Open": "open", "High": "high", "Low": "low", "Close": "close"}
             )
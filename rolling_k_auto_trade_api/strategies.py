@@ -1,9 +1,9 @@
 # rolling_k_auto_trade_api/strategies.py
-import FinanceDataReader as fdr
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from rolling_k_auto_trade_api.orders import log_order, TRADE_STATE
+from rolling_k_auto_trade_api.walk_forward import load_panel, monthly_windows, top_n_universe, walk_forward
 
 import logging
 
@@ -21,86 +21,39 @@ k_values = np.arange(0.1, 1.01, 0.05)
 
 
 def run_rebalance_for_date(date_input):
-    from calendar import monthrange
-    from datetime import datetime
+    """
+    기준일 직전 1개월 학습 → 당월(말일까지) 검증 walk-forward 1구간(walk_forward 엔진).
+    종목별 일봉은 1회만 읽고, K 그리드는 전 종목 한 번에 벡터 평가.
+    """
+    window = monthly_windows([date_input], test_to_month_end=True)[0]
+    codes, names = top_n_universe(50)
+    panel = load_panel(codes, window.start_train, window.end_test, names=names)
 
-    rebalance_date = pd.to_datetime(date_input)
-    start_train = (rebalance_date - pd.DateOffset(months=1)).strftime("%Y-%m-%d")
-    end_train = (rebalance_date - pd.DateOffset(days=1)).strftime("%Y-%m-%d")
-    start_test = rebalance_date.strftime("%Y-%m-%d")
-    end_test = datetime(rebalance_date.year, rebalance_date.month, monthrange(rebalance_date.year, rebalance_date.month)[1]).strftime("%Y-%m-%d")
-
-    kosdaq = fdr.StockListing("KOSDAQ")
-    top50 = kosdaq.sort_values(by="Marcap", ascending=False).head(50)
-    tickers = list(zip(top50["Code"], top50["Name"]))
-
-    k_values = [round(x, 1) for x in np.arange(0.1, 1.1, 0.1)]
-    fee = 0.0015  # 수수료 가정
+    k_grid = [round(x, 1) for x in np.arange(0.1, 1.1, 0.1)]
+    wf = walk_forward(panel, [window], k_values=k_grid, fee=fee)
 
     selected = []
     candidates = []
-
-    for code, name in tickers:
-        try:
-            df = fdr.DataReader(code, start_train, end_test)
-            df.index = pd.to_datetime(df.index)
-            train = df[(df.index >= start_train) & (df.index <= end_train)].copy()
-            test = df[(df.index >= start_test) & (df.index <= end_test)].copy()
-            if len(train) < 15 or len(test) < 5:
-                continue
-
-            best_k, best_ret = 0, -np.inf
-            for k in k_values:
-                temp = train.copy()
-                temp["range"] = temp["High"].shift(1) - temp["Low"].shift(1)
-                temp["target"] = temp["Open"] + temp["range"] * k
-                temp["buy_signal"] = temp["High"] > temp["target"]
-                temp["buy_price"] = np.where(temp["buy_signal"], temp["target"], np.nan)
-                temp["sell_price"] = temp["Close"]
-                temp["strategy_return"] = np.where(temp["buy_signal"], (temp["sell_price"] - temp["buy_price"]) / temp["buy_price"] - fee, 0)
-                temp["cumulative_return"] = (1 + temp["strategy_return"].fillna(0)).cumprod() - 1
-                final_ret = temp["cumulative_return"].iloc[-1]
-                if final_ret > best_ret:
-                    best_ret = final_ret
-                    best_k = k
-
-            test["range"] = test["High"].shift(1) - test["Low"].shift(1)
-            test["target"] = test["Open"] + test["range"] * best_k
-            test["buy_signal"] = test["High"] > test["target"]
-            test["buy_price"] = np.where(test["buy_signal"], test["target"], np.nan)
-            test["sell_price"] = test["Close"]
-            test["strategy_return"] = np.where(test["buy_signal"], (test["sell_price"] - test["buy_price"]) / test["buy_price"] - fee, 0)
-            test["cumulative"] = (1 + test["strategy_return"].fillna(0)).cumprod()
-
-            mdd = ((test["cumulative"] - test["cumulative"].cummax()) / test["cumulative"].cummax()).min() * 100
-            wins = (test["strategy_return"] > 0).sum()
-            total = test["strategy_return"].notnull().sum()
-            win_rate = wins / total if total > 0 else 0
-            final_ret = (test["cumulative"].iloc[-1] - 1) * 100
-
-            info = {
-                "rebalance_date": start_test,
-                "code": code,
-                "name": name,
-                "best_k": best_k,
-                "cumulative_return_pct": round(final_ret, 2),
-                "win_rate_pct": round(win_rate * 100, 2),
-                "mdd_pct": round(mdd, 2),
-                "목표가": round(test["target"].iloc[-1], 2),
-                "close": round(test["Close"].iloc[-1], 2),
-            }
-            candidates.append(info)
-
-            if (
-    info["cumulative_return_pct"] > 1.0 and
-    info["win_rate_pct"] > 50.0 and
-    info["mdd_pct"] <= 15.0
-):
-                selected.append(info)
-
-        except Exception as e:
-            print(f"[ERROR] {code} - {name} 분석 실패: {str(e)}")
-            continue
+    for row in wf.rows:
+        info = {
+            "rebalance_date": row["start_test"],
+            "code": row["code"],
+            "name": row["name"],
+            "best_k": row["best_k"],
+            "cumulative_return_pct": round(row["return_pct"], 2),
+            "win_rate_pct": round(row["win_rate_pct"], 2),
+            "mdd_pct": round(row["mdd_pct"], 2),
+            "목표가": round(row["target"], 2),
+            "close": round(row["close"], 2),
+        }
+        candidates.append(info)
+
+        if (
+            info["cumulative_return_pct"] > 1.0 and
+            info["win_rate_pct"] > 50.0 and
+            info["mdd_pct"] <= 15.0
+        ):
+            selected.append(info)
 
     if not selected:
         return {
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# universe.py (유니버스 스냅샷 서비스)
+"""
+상장 종목 목록 + 시가총액을 영업일당 1회 스냅샷으로 저장하고 메모리에서 제공하는 유니버스 서비스
+- 스냅샷 1개 = (시장, 기준일) → codes / names / marcap 열 배열을 .npz 하나로 저장(시총 내림차순)
+  (pykrx get_market_cap_by_ticker + fdr.StockListing 병합은 스냅샷을 처음 만들 때 1회만)
+- top_n(date, n): get_kosdaq_top_n과 같은 형식의 DataFrame(Code, Name, Marcap)
+- listing(): 전 상장 종목(Code, Name) — 강제 포함 종목 이름 조회(_inject_forced_codes)용
+- name_of(code): 코드 → 종목명 dict 조회
+- 과거 기준일도 같은 방식으로 스냅샷(백테스트). 메모리 캐시 → 디스크 → (허용 시) 다운로드 순
+  (다운로드 실패로 이전 스냅샷을 대신 쓴 날은 캐시하지 않아 다음 호출에서 다시 시도)
+- allow_fetch=False면 pykrx/FDR을 import하지도 호출하지도 않고 기준일 이전의 가장 최근 스냅샷을 사용(장중 trader)
+
+주의
+- 시총 기준일은 pykrx 최근 영업일(get_nearest_business_day_in_a_week)입니다. 주말 요청은 직전 금요일 키로 저장합니다.
+- 종목명은 현재 상장 목록 기준이라, 과거 기준일의 상장폐지 종목은 Top-N에서 빠집니다(기존 get_kosdaq_top_n과 동일).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNIVERSE_DIR = Path(os.getenv("UNIVERSE_DIR") or (Path(__file__).parent / "data" / "universe"))
+_EMPTY_COLUMNS = ["Code", "Name", "Marcap"]
+
+
+def _find_column(df: pd.DataFrame, keyword: str) -> Optional[str]:
+    kw = keyword.replace(" ", "")
+    for c in df.columns:
+        if kw in str(c).replace(" ", ""):
+            return c
+    return None
+
+
+def _weekday_key(date_str: Optional[str]) -> str:
+    """YYYY-MM-DD / YYYYMMDD / None(오늘) → 주말이면 직전 금요일 YYYYMMDD."""
+    d = datetime.today() if not date_str else pd.Timestamp(str(date_str)).to_pydatetime()
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d.strftime("%Y%m%d")
+
+
+@dataclass
+class UniverseSnapshot:
+    market: str
+    date: str                  # 요청 키(YYYYMMDD, 평일)
+    asof: str                  # 실제 시총 기준 영업일
+    codes: np.ndarray          # U6, 시총 내림차순(시총 없는 상장 종목은 뒤쪽)
+    names: np.ndarray          # U, 없으면 ""
+    marcap: np.ndarray         # float64, 없으면 NaN
+    _name_map: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    def top_n(self, n: int) -> pd.DataFrame:
+        ok = ~np.isnan(self.marcap) & (self.names != "")
+        idx = np.flatnonzero(ok)[: max(0, int(n))]
+        return pd.DataFrame(
+            {"Code": self.codes[idx].astype(str), "Name": self.names[idx].astype(str), "Marcap": self.marcap[idx]}
+        )
+
+    def listing(self) -> pd.DataFrame:
+        ok = self.names != ""
+        return pd.DataFrame({"Code": self.codes[ok].astype(str), "Name": self.names[ok].astype(str)})
+
+    def name_of(self, code: str) -> Optional[str]:
+        if not self._name_map:
+            self._name_map = {str(c): str(n) for c, n in zip(self.codes, self.names) if n}
+        return self._name_map.get(str(code).zfill(6))
+
+    # ---------- 저장 ----------
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(
+            tmp, market=np.array(self.market), date=np.array(self.date), asof=np.array(self.asof),
+            codes=self.codes, names=self.names, marcap=self.marcap,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["UniverseSnapshot"]:
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                return cls(str(z["market"]), str(z["date"]), str(z["asof"]), z["codes"], z["names"], z["marcap"])
+        except Exception as e:
+            logger.warning(f"[UNIVERSE] 스냅샷 로드 실패({path}): {e}")
+            return None
+
+
+def _download_snapshot(market: str, key: str) -> Optional[UniverseSnapshot]:
+    """pykrx 시총 + FDR 상장목록 → 스냅샷(병합은 outer, 이름/시총 없는 칸은 빈 값)."""
+    import FinanceDataReader as fdr
+    from pykrx.stock import get_market_cap_by_ticker, get_nearest_business_day_in_a_week
+
+    asof = get_nearest_business_day_in_a_week(key)
+    logger.info(f"📅 pykrx 시총 조회일 → {asof}")
+    cap = get_market_cap_by_ticker(asof, market=market)
+    if cap is None or len(cap) == 0:
+        logger.warning("⚠️  pykrx 시총 DF가 비었습니다")
+        return None
+    cap = cap.reset_index()
+    capcol = _find_column(cap, "시가총액")
+    ticcol = _find_column(cap, "티커") or _find_column(cap, "코드")
+    if capcol is None or ticcol is None:
+        logger.error("❌  시총/티커 컬럼 탐색 실패")
+        return None
+    cap = cap.rename(columns={capcol: "Marcap", ticcol: "Code"})
+    cap["Code"] = cap["Code"].astype(str).str.zfill(6)
+
+    lst = fdr.StockListing(market).rename(columns={"Symbol": "Code"})
+    lst["Code"] = lst["Code"].astype(str).str.zfill(6)
+    merged = pd.merge(lst[["Code", "Name"]], cap[["Code", "Marcap"]], on="Code", how="outer")
+    merged = merged.drop_duplicates(subset=["Code"], keep="first")
+    merged["Marcap"] = pd.to_numeric(merged["Marcap"], errors="coerce")
+    merged = merged.sort_values("Marcap", ascending=False, na_position="last", kind="stable")
+    return UniverseSnapshot(
+        market=market,
+        date=key,
+        asof=str(asof),
+        codes=merged["Code"].to_numpy(dtype="U6"),
+        names=merged["Name"].fillna("").astype(str).to_numpy(dtype=str),
+        marcap=merged["Marcap"].to_numpy(dtype=np.float64),
+    )
+
+
+class UniverseService:
+    def __init__(self, root: Path = DEFAULT_UNIVERSE_DIR, download=_download_snapshot):
+        self.root = Path(root)
+        self.download = download
+        self._mem: Dict[Tuple[str, str], UniverseSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, market: str, key: str) -> Path:
+        return self.root / f"{market.lower()}_{key}.npz"
+
+    def _latest_on_disk(self, market: str, key: str) -> Optional[Path]:
+        prefix = f"{market.lower()}_"
+        cands: List[str] = sorted(
+            p.stem[len(prefix):] for p in self.root.glob(f"{prefix}*.npz") if not p.stem.endswith(".tmp")
+        )
+        older = [k for k in cands if k <= key]
+        return self._path(market, older[-1]) if older else None
+
+    def snapshot(
+        self, date_str: Optional[str] = None, market: str = "KOSDAQ", allow_fetch: bool = True
+    ) -> Optional[UniverseSnapshot]:
+        key = _weekday_key(date_str)
+        with self._lock:
+            snap = self._mem.get((market, key))
+            if snap is not None:
+                return snap
+            path = self._path(market, key)
+            snap = UniverseSnapshot.load(path) if path.exists() else None
+            if snap is None and allow_fetch:
+                try:
+                    snap = self.download(market, key)
+                except Exception as e:
+                    logger.exception(f"❌  유니버스 스냅샷 생성 실패({market} {key}): {e}")
+                    snap = None
+                if snap is not None:
+                    snap.save(path)
+                    logger.info(f"[UNIVERSE] 스냅샷 저장 {path.name} ({len(snap.codes)}종목, asof={snap.asof})")
+            if snap is not None:
+                self._mem[(market, key)] = snap
+                return snap
+            # 다운로드 불가/실패 → 기준일 이전 가장 최근 스냅샷
+            # (그 스냅샷 자신의 키로만 캐시: 기준일 키는 비워 두어 다음 호출에서 다시 시도)
+            prev = self._latest_on_disk(market, key)
+            if prev is None:
+                return None
+            prev_key = prev.stem[len(market) + 1:]
+            snap = self._mem.get((market, prev_key))
+            if snap is None:
+                snap = UniverseSnapshot.load(prev)
+                if snap is not None:
+                    self._mem[(market, prev_key)] = snap
+                    logger.warning(f"[UNIVERSE] {market} {key} 스냅샷 없음 → {snap.date} 스냅샷 사용")
+            return snap
+
+    def top_n(
+        self, date_str: Optional[str] = None, n: int = 50, market: str = "KOSDAQ", allow_fetch: bool = True
+    ) -> pd.DataFrame:
+        snap = self.snapshot(date_str, market, allow_fetch)
+        if snap is None:
+            return pd.DataFrame(columns=_EMPTY_COLUMNS)
+        return snap.top_n(n)
+
+    def listing(self, date_str: Optional[str] = None, market: str = "KOSDAQ", allow_fetch: bool = True) -> pd.DataFrame:
+        snap = self.snapshot(date_str, market, allow_fetch)
+        if snap is None:
+            return pd.DataFrame(columns=["Code", "Name"])
+        return snap.listing()
+
+    def name_of(self, code: str, date_str: Optional[str] = None, market: str = "KOSDAQ", allow_fetch: bool = True) -> Optional[str]:
+        snap = self.snapshot(date_str, market, allow_fetch)
+        return snap.name_of(code) if snap is not None else None
+
+
+_UNIVERSE: Optional[UniverseService] = None
+
+
+def get_universe() -> UniverseService:
+    global _UNIVERSE
+    if _UNIVERSE is None:
+        _UNIVERSE = UniverseService()
+    return _UNIVERSE
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+# walk_forward.py (월 단위 walk-forward 백테스트 엔진)
+"""
+변동성 돌파(목표가 = 시가 + 전일 변동폭 × K) 월 단위 walk-forward 백테스트 엔진
+- load_panel(): 종목별 전체 구간 일봉을 '종목당 1회'만 읽어(price_warehouse, 스레드 풀) 배열 패널로 묶음
+  (종목별 날짜/OHLC를 이어 붙인 연속 배열 + 종목별 [start, end) 오프셋)
+- monthly_windows(): 리밸런싱일마다 학습(직전 1개월) / 검증(당월) 구간 계산
+- walk_forward(): 구간은 날짜 인덱스(searchsorted)로 잘라 (종목 × 일수) 패딩 배열을 만들고
+  K 그리드 전체를 (K × 종목 × 일수) 브로드캐스트 한 번으로 평가 → 학습 누적수익 최대 K로 검증 구간 성과 계산
+- 결과 행: code/name/best_k/학습·검증 수익률/MDD/승률/보유수익률(시가→종가)/마지막 목표가·종가/일수
+
+주의
+- 계산 규칙은 기존 pandas 루프(rebalance_backtest_monthly / debug_backtest_monthly / run_rebalance_for_date)와 같습니다.
+  전일 변동폭은 '구간 안의 직전 거래일' 기준(구간 첫날은 진입 없음), 비진입일 수익 0, 동률이면 작은 K.
+- 선정 필터/정렬(Top N)은 호출부가 결과 행으로 수행합니다.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .price_warehouse import read_prices
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEE = 0.0015
+DEFAULT_K_VALUES = np.arange(0.1, 1.01, 0.05)
+
+
+@dataclass
+class PricePanel:
+    codes: List[str]
+    names: Dict[str, str]
+    dates: np.ndarray                    # datetime64[D], 종목별 구간을 이어 붙임
+    ohlc: np.ndarray                     # float64[4, 총일수] (open/high/low/close)
+    offsets: Dict[str, Tuple[int, int]]  # code → [start, end)
+
+    def window(self, start: pd.Timestamp, end: pd.Timestamp) -> Tuple[np.ndarray, np.ndarray]:
+        """[start, end] (양끝 포함) 구간 → (float64[4, 종목, 최대일수] NaN 패딩, 종목별 일수)."""
+        s = np.datetime64(pd.Timestamp(start).date(), "D")
+        e = np.datetime64(pd.Timestamp(end).date(), "D")
+        spans = []
+        for code in self.codes:
+            a, b = self.offsets[code]
+            d = self.dates[a:b]
+            spans.append((a + int(np.searchsorted(d, s, "left")), a + int(np.searchsorted(d, e, "right"))))
+        lengths = np.array([j - i for i, j in spans], dtype=np.int64)
+        out = np.full((4, len(self.codes), int(lengths.max(initial=0))), np.nan)
+        for n, (i, j) in enumerate(spans):
+            out[:, n, : j - i] = self.ohlc[:, i:j]
+        return out, lengths
+
+
+def load_panel(
+    codes: Sequence[str],
+    start: Any,
+    end: Any,
+    names: Optional[Dict[str, str]] = None,
+    read: Callable[..., pd.DataFrame] = read_prices,
+    workers: int = 8,
+) -> PricePanel:
+    """종목별 [start, end] 일봉을 1회씩 읽어 패널 구성(읽기 실패/빈 종목은 0일)."""
+    codes = [str(c).zfill(6) for c in codes]
+    t0 = time.perf_counter()
+
+    def _one(code: str) -> Optional[pd.DataFrame]:
+        try:
+            return read(code, start, end)
+        except Exception as e:
+            logger.warning(f"[WALK-FWD] {code} 일봉 조회 실패: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="walk-fwd") as ex:
+        frames = list(ex.map(_one, codes))
+
+    date_parts: List[np.ndarray] = []
+    ohlc_parts: List[np.ndarray] = []
+    offsets: Dict[str, Tuple[int, int]] = {}
+    pos = 0
+    for code, df in zip(codes, frames):
+        n = 0
+        if df is not None and len(df):
+            df = df.sort_index()
+            date_parts.append(pd.to_datetime(df.index).values.astype("datetime64[D]"))
+            ohlc_parts.append(df[["Open", "High", "Low", "Close"]].to_numpy(dtype=np.float64).T)
+            n = len(df)
+        offsets[code] = (pos, pos + n)
+        pos += n
+    dates = np.concatenate(date_parts) if date_parts else np.empty(0, dtype="datetime64[D]")
+    ohlc = np.concatenate(ohlc_parts, axis=1) if ohlc_parts else np.empty((4, 0))
+    logger.info(f"[WALK-FWD] 패널 {len(codes)}종목 × 총 {pos}일 로드 {time.perf_counter() - t0:.2f}s")
+    return PricePanel(codes, dict(names or {}), dates, ohlc, offsets)
+
+
+@dataclass(frozen=True)
+class Window:
+    rebalance: pd.Timestamp
+    start_train: pd.Timestamp
+    end_train: pd.Timestamp
+    start_test: pd.Timestamp
+    end_test: pd.Timestamp
+
+
+def monthly_windows(rebalance_dates: Sequence[Any], test_to_month_end: bool = False) -> List[Window]:
+    """
+    학습 = [리밸런싱일 - 1개월, 리밸런싱일 - 1일], 검증 = [리밸런싱일, 리밸런싱일 + 1개월 - 1일]
+    (test_to_month_end=True면 검증 종료 = 리밸런싱일이 속한 달의 말일)
+    """
+    out: List[Window] = []
+    for r in rebalance_dates:
+        r = pd.Timestamp(r).normalize()
+        end_test = r + pd.offsets.MonthEnd(0) if test_to_month_end else r + pd.DateOffset(months=1) - pd.DateOffset(days=1)
+        out.append(Window(r, r - pd.DateOffset(months=1), r - pd.DateOffset(days=1), r, pd.Timestamp(end_test)))
+    return out
+
+
+def _strategy_returns(win: np.ndarray, k: np.ndarray, fee: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    win: [4, N, T], k: (N,) 또는 (K, 1, 1) → (일별 수익률, 목표가) — 비진입/패딩일 수익 0.
+    진입했는데 종가가 없는 날은 NaN(누적에서는 0, 승률 분모에서는 제외 — pandas fillna/notnull과 동일).
+    """
+    o, h, lo, c = win
+    rng = np.full_like(h, np.nan)
+    rng[:, 1:] = h[:, :-1] - lo[:, :-1]
+    target = o + rng * k
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buy = h > target
+        ret = np.where(buy, (c - target) / target - fee, 0.0)
+    return ret, target
+
+
+@dataclass
+class WalkForwardResult:
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    insufficient: List[Tuple[Window, str, str]] = field(default_factory=list)  # (window, code, name)
+
+
+def walk_forward(
+    panel: PricePanel,
+    windows: Sequence[Window],
+    k_values: Sequence[float] = DEFAULT_K_VALUES,
+    fee: float = DEFAULT_FEE,
+    min_train_days: int = 15,
+    min_test_days: int = 5,
+) -> WalkForwardResult:
+    """구간마다 전 종목 K 그리드 1회 브로드캐스트 평가 → 종목별 검증 성과 행."""
+    t0 = time.perf_counter()
+    result = WalkForwardResult()
+    k_arr = np.asarray(k_values, dtype=np.float64)
+    if not panel.codes or not len(k_arr):
+        return result
+    for w in windows:
+        train, train_len = panel.window(w.start_train, w.end_train)
+        test, test_len = panel.window(w.start_test, w.end_test)
+        ok = (train_len >= min_train_days) & (test_len >= min_test_days)
+        for n in np.flatnonzero(~ok):
+            code = panel.codes[n]
+            result.insufficient.append((w, code, panel.names.get(code, "")))
+        idx = np.flatnonzero(ok)
+        if not len(idx):
+            continue
+        train, test = train[:, idx], test[:, idx]
+        test_len = test_len[idx]
+
+        # 학습: (K, N, T) 누적수익 → 종목별 최대 K(동률이면 먼저 나온 K)
+        train_ret, _ = _strategy_returns(train, k_arr[:, None, None], fee)
+        train_final = np.cumprod(1.0 + np.nan_to_num(train_ret), axis=2)[:, :, -1] - 1.0
+        best = np.argmax(train_final, axis=0)
+        best_k = k_arr[best]
+
+        # 검증: 종목별 best_k 1개
+        ret, target = _strategy_returns(test, best_k[:, None], fee)
+        days = test_len - np.isnan(ret).sum(axis=1)
+        cum = np.cumprod(1.0 + np.nan_to_num(ret), axis=1)
+        peak = np.maximum.accumulate(cum, axis=1)
+        mdd = ((cum - peak) / peak).min(axis=1) * 100.0
+        wins = (ret > 0).sum(axis=1)
+        last = test_len - 1
+        cols = np.arange(len(idx))
+        last_close = test[3, cols, last]
+        last_target = target[cols, last]
+        hold = (last_close / test[0, :, 0] - 1.0) * 100.0
+        final = (cum[:, -1] - 1.0) * 100.0
+
+        for j, n in enumerate(idx):
+            code = panel.codes[n]
+            result.rows.append({
+                "rebalance_date": w.start_test.strftime("%Y-%m-%d"),
+                "start_test": w.start_test.strftime("%Y-%m-%d"),
+                "end_test": w.end_test.strftime("%Y-%m-%d"),
+                "code": code,
+                "name": panel.names.get(code, ""),
+                "best_k": float(best_k[j]),
+                "train_return_pct": float(train_final[best[j], j] * 100.0),
+                "return_pct": float(final[j]),
+                "mdd_pct": float(mdd[j]),
+                "win_rate_pct": float(wins[j] / days[j] * 100.0) if days[j] > 0 else 0.0,
+                "hold_return_pct": float(hold[j]),
+                "close": float(last_close[j]),
+                "target": float(last_target[j]),
+                "train_days": int(train_len[n]),
+                "test_days": int(test_len[j]),
+            })
+    logger.info(
+        f"[WALK-FWD] {len(windows)}개 구간 × {len(panel.codes)}종목 × K {len(k_arr)}개 "
+        f"{time.perf_counter() - t0:.2f}s (행 {len(result.rows)}, 데이터 부족 {len(result.insufficient)})"
+    )
+    return result
+
+
+def top_n_universe(n: int = 50) -> Tuple[List[str], Dict[str, str]]:
+    """현재 코스닥 시총 상위 n(유니버스 스냅샷) → (codes, {code: name})."""
+    from .universe import get_universe
+
+    df = get_universe().top_n(n=n)
+    codes = df["Code"].astype(str).tolist()
+    return codes, dict(zip(codes, df["Name"].astype(str)))
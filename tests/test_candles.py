@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+CandleSeries(trader/candles.py) ↔ 기존 list-of-dict 구현 비교
+- 기준 구현(_legacy_*)은 CandleSeries 도입 전 trader.py / kis_wrapper.py 코드를 그대로 옮긴 것
+- 입력은 고정 시드 난수 일봉 + 눌림목 셋업이 성립하는 수작업 일봉
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from trader.candles import CandleSeries
+
+
+def _make_candles(n: int, seed: int) -> List[Dict[str, Any]]:
+    rs = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rs.normal(0, 0.02, n)))
+    open_ = close * (1 + rs.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rs.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rs.normal(0, 0.01, n)))
+    d0 = date(2024, 1, 1)
+    return [
+        {
+            "date": (d0 + timedelta(days=i)).strftime("%Y%m%d"),
+            "open": round(float(open_[i])), "high": round(float(high[i])),
+            "low": round(float(low[i])), "close": round(float(close[i])), "volume": 1000 + i,
+        }
+        for i in range(n)
+    ]
+
+
+def _pullback_candles() -> List[Dict[str, Any]]:
+    # 상승 → 신고가 → 3일 연속 하락 → 당일(미완성) 캔들
+    closes = [100, 102, 104, 106, 108, 110, 115, 112, 109, 105, 107]
+    d0 = date(2024, 3, 1)
+    return [
+        {
+            "date": (d0 + timedelta(days=i)).strftime("%Y%m%d"),
+            "open": c - 1, "high": c + 2, "low": c - 2, "close": c,
+        }
+        for i, c in enumerate(closes)
+    ]
+
+
+CASES = [_make_candles(n, seed) for n, seed in [(5, 1), (21, 2), (25, 3), (60, 4), (120, 5), (250, 6)]]
+CASES.append(_pullback_candles())
+
+
+# ---------- 기준 구현 ----------
+def _legacy_atr(candles: List[Dict[str, Any]], window: int = 14):
+    if len(candles) < window + 1:
+        return None
+    trs: List[float] = []
+    for i in range(1, len(candles)):
+        h = candles[i]["high"]
+        l = candles[i]["low"]
+        c_prev = candles[i - 1]["close"]
+        trs.append(max(h - l, abs(h - c_prev), abs(l - c_prev)))
+    if not trs:
+        return None
+    return sum(trs[-window:]) / float(window)
+
+
+def _legacy_down_streak(completed: List[Dict[str, Any]]) -> int:
+    down_streak = 0
+    for idx in range(len(completed) - 1, 0, -1):
+        cur = float(completed[idx].get("close") or 0.0)
+        prev = float(completed[idx - 1].get("close") or 0.0)
+        if cur <= 0 or prev <= 0:
+            break
+        if cur < prev:
+            down_streak += 1
+        else:
+            break
+    return down_streak
+
+
+def _legacy_pullback_setup(candles, today, lookback, pullback_days, buffer_pct):
+    if len(candles) < pullback_days + 2:
+        return {"setup": False, "reason": "not_enough_candles"}
+    completed = list(candles)
+    if completed and str(completed[-1].get("date")) == today:
+        completed = completed[:-1]
+    if len(completed) < pullback_days + 2:
+        return {"setup": False, "reason": "insufficient_history_after_trim"}
+    window = completed[-lookback:]
+    highs = [float(c.get("high") or 0.0) for c in window]
+    if not highs:
+        return {"setup": False, "reason": "no_high_data"}
+    peak_price = max(highs)
+    peak_idx = max(i for i, c in enumerate(window) if float(c.get("high") or 0.0) == peak_price)
+    down_streak_len = 0
+    last_idx = len(window) - 1
+    while last_idx > peak_idx:
+        cur_close = float(window[last_idx].get("close") or 0.0)
+        prev_close = float(window[last_idx - 1].get("close") or 0.0)
+        if cur_close <= 0 or prev_close <= 0:
+            break
+        if cur_close < prev_close:
+            down_streak_len += 1
+            last_idx -= 1
+            continue
+        break
+    if down_streak_len < pullback_days:
+        return {"setup": False, "peak_price": peak_price, "reason": "not_enough_consecutive_down"}
+    last_down = window[len(window) - 1]
+    reversal_line = max(float(last_down.get("high") or 0.0), float(last_down.get("close") or 0.0))
+    reversal_price = reversal_line * (1.0 + buffer_pct / 100.0)
+    return {
+        "setup": True,
+        "reversal_price": float(reversal_price) if reversal_price > 0 else None,
+        "peak_price": float(peak_price),
+        "peak_date": window[peak_idx].get("date"),
+        "last_down_date": last_down.get("date"),
+    }
+
+
+# ---------- 비교 ----------
+@pytest.mark.parametrize("candles", CASES)
+@pytest.mark.parametrize("window", [5, 14, 20])
+def test_atr_matches_legacy(candles, window):
+    expected = _legacy_atr(candles, window)
+    got = CandleSeries.from_rows(candles).atr(window)
+    if expected is None:
+        assert got is None
+    else:
+        assert got == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("candles", CASES)
+def test_moving_averages_match_legacy(candles):
+    series = CandleSeries.from_rows(candles)
+    closes = [float(c["close"]) for c in candles]
+    for w in (5, 10, 20):
+        if len(closes) >= w:
+            assert series.ma_last(w) == pytest.approx(sum(closes[-w:]) / w, rel=1e-12)
+        else:
+            assert series.ma_last(w) is None
+    if len(closes) >= 21:
+        assert series.ma_last(20, offset=1) == pytest.approx(sum(closes[-21:-1]) / 20.0, rel=1e-12)
+
+
+@pytest.mark.parametrize("candles", CASES)
+def test_peak_and_down_streak_match_legacy(candles):
+    series = CandleSeries.from_rows(candles)
+    highs = [float(c["high"]) for c in candles]
+    for w in (20, 60):
+        pk, idx = series.peak(w)
+        win = highs[-w:]
+        assert pk == max(win)
+        assert idx == len(highs) - len(win) + max(i for i, h in enumerate(win) if h == max(win))
+    assert series.down_streak() == _legacy_down_streak(candles)
+
+
+@pytest.mark.parametrize("candles", CASES)
+def test_completed_drops_today_only(candles):
+    series = CandleSeries.from_rows(candles)
+    today = candles[-1]["date"]
+    assert len(series.completed(today)) == len(candles) - 1
+    assert len(series.completed("19990101")) == len(candles)
+    assert series.completed(today) is series.completed(today)  # 캐싱
+
+
+@pytest.mark.parametrize("candles", CASES)
+@pytest.mark.parametrize("lookback,pullback_days", [(60, 3), (20, 2), (10, 3)])
+def test_pullback_setup_matches_legacy(candles, lookback, pullback_days):
+    from trader.trader import _pullback_setup_from_series
+
+    for today in (candles[-1]["date"], "29991231"):
+        expected = _legacy_pullback_setup(candles, today, lookback, pullback_days, 0.2)
+        got = _pullback_setup_from_series(CandleSeries.from_rows(candles), today, lookback, pullback_days, 0.2)
+        assert got == expected
+
+
+def test_pullback_fixture_has_setup():
+    from trader.trader import _pullback_setup_from_series
+
+    candles = _pullback_candles()
+    got = _pullback_setup_from_series(CandleSeries.from_rows(candles), candles[-1]["date"], 60, 3, 0.2)
+    assert got["setup"] is True
+    assert got["peak_price"] == 117.0
+    assert got["last_down_date"] == candles[-2]["date"]
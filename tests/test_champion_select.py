@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+champion_select.select_champions() ↔ 기존 dict 루프 구현 비교
+- 기준 구현(_legacy_*)은 champion_select 도입 전 trader.main()의 필터/등급/종합점수 코드를 그대로 옮긴 것
+- 입력은 고정 시드 난수 후보(dict / Target) + 경계값을 모은 수작업 후보
+"""
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+import pytest
+
+from trader.champion_select import percentile_rank, select_champions
+from trader.records import Target
+from trader.trader import _to_float, _to_int
+
+A_RULES = {
+    "min_trades": 30,
+    "min_cumret_pct": 40.0,
+    "max_mdd_pct": 25.0,
+    "min_win_pct": 50.0,
+    "min_sharpe": 1.2,
+    "min_turnover": 3_000_000_000,
+}
+# (min_trades, min_winrate, max_mdd, min_sharpe): 기본 설정 + 샤프 하한이 있는 설정
+MIN_RULES = [(5, 45.0, 30.0, 0.0), (10, 50.0, 20.0, 0.5)]
+
+
+# ---------- 기준 구현 ----------
+def _legacy_percentile_rank(values: List[float], value: float, higher_is_better: bool = True) -> float:
+    if not values:
+        return 0.0
+    vals = [float(v) for v in values if v is not None]
+    if not vals:
+        return 0.0
+    if higher_is_better:
+        count = sum(1 for v in vals if v <= value)
+    else:
+        count = sum(1 for v in vals if v >= value)
+    return (count / len(vals)) * 100.0
+
+
+def _legacy_grade(info, min_trades, min_winrate, max_mdd, min_sharpe) -> str:
+    trades = _to_int(info.get("trades"), 0)
+    win = _to_float(info.get("win_rate_pct"), 0.0)
+    mdd = abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0)
+    sharpe = _to_float(info.get("sharpe_m") or info.get("sharpe"), 0.0)
+    cumret = _to_float(info.get("cumulative_return_pct") or info.get("avg_return_pct"), 0.0)
+    turnover = _to_float(info.get("prev_turnover") or info.get("avg_turnover") or info.get("turnover"), 0.0)
+    turnover_ok = turnover <= 0 or turnover >= A_RULES["min_turnover"]
+    if (
+        trades >= A_RULES["min_trades"]
+        and cumret >= A_RULES["min_cumret_pct"]
+        and mdd <= A_RULES["max_mdd_pct"]
+        and win >= A_RULES["min_win_pct"]
+        and sharpe >= A_RULES["min_sharpe"]
+        and turnover_ok
+    ):
+        return "A"
+    if trades >= min_trades and win >= min_winrate and mdd <= max_mdd and sharpe >= min_sharpe:
+        return "B"
+    return "C"
+
+
+def _legacy_select(targets: Mapping[str, Mapping[str, Any]], min_trades, min_winrate, max_mdd, min_sharpe):
+    filtered: Dict[str, Any] = {}
+    skipped: List[str] = []
+    for code, info in targets.items():
+        trades = _to_int(info.get("trades"), 0)
+        win_rate = _to_float(info.get("win_rate_pct"), 0.0)
+        mdd = abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0)
+        sharpe = _to_float(info.get("sharpe_m"), 0.0)
+        if trades < min_trades or win_rate < min_winrate or mdd > max_mdd or sharpe < min_sharpe:
+            skipped.append(code)
+            continue
+        filtered[code] = info
+
+    grades = {code: _legacy_grade(info, min_trades, min_winrate, max_mdd, min_sharpe) for code, info in filtered.items()}
+    a_targets = {code: info for code, info in filtered.items() if grades[code] == "A"}
+
+    scores: Dict[str, float] = {}
+    if a_targets:
+        cumrets = [_to_float(i.get("cumulative_return_pct"), 0.0) or 0.0 for i in a_targets.values()]
+        win_rates = [_to_float(i.get("win_rate_pct"), 0.0) or 0.0 for i in a_targets.values()]
+        sharpes = [_to_float(i.get("sharpe_m"), 0.0) or 0.0 for i in a_targets.values()]
+        mdds = [abs(_to_float(i.get("mdd_pct"), 0.0) or 0.0) for i in a_targets.values()]
+        for code, info in a_targets.items():
+            score = (
+                _legacy_percentile_rank(cumrets, _to_float(info.get("cumulative_return_pct"), 0.0) or 0.0) * 0.35
+                + _legacy_percentile_rank(win_rates, _to_float(info.get("win_rate_pct"), 0.0) or 0.0) * 0.25
+                + _legacy_percentile_rank(sharpes, _to_float(info.get("sharpe_m"), 0.0) or 0.0) * 0.25
+                + _legacy_percentile_rank(mdds, abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0), higher_is_better=False) * 0.15
+            )
+            scores[code] = round(score, 4)
+    return skipped, grades, scores
+
+
+# ---------- 입력 ----------
+def _random_targets(n: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    rs = np.random.default_rng(seed)
+    out: Dict[str, Dict[str, Any]] = {}
+    for i in range(n):
+        info: Dict[str, Any] = {
+            "trades": int(rs.integers(0, 80)),
+            "win_rate_pct": round(float(rs.uniform(20, 90)), 1),
+            "mdd_pct": round(float(rs.uniform(-45, 0)), 1),
+            "sharpe_m": round(float(rs.uniform(-1, 3)), 1),
+            "cumulative_return_pct": round(float(rs.uniform(-30, 150)), 0),
+            "avg_return_pct": round(float(rs.uniform(-5, 60)), 1),
+        }
+        if rs.random() < 0.3:
+            info["prev_turnover"] = float(rs.choice([0, 1e9, 5e9]))
+        if rs.random() < 0.1:
+            info["cumulative_return_pct"] = 0.0  # 등급은 평균수익으로 대체
+        out[f"{i:06d}"] = info
+    return out
+
+
+def _edge_targets() -> Dict[str, Dict[str, Any]]:
+    base = {"trades": 40, "win_rate_pct": 60.0, "mdd_pct": -10.0, "sharpe_m": 2.0, "cumulative_return_pct": 50.0}
+    return {
+        "A00001": dict(base),
+        "A00002": dict(base),                                            # 전 지표 동률
+        "A00003": {**base, "cumulative_return_pct": None, "avg_return_pct": 45.0},
+        "A00004": {**base, "sharpe_m": None, "sharpe": 1.5},             # 샤프는 등급에서만 sharpe로 대체
+        "A00005": {**base, "sharpe_m": "1.3", "trades": "35.9"},        # 문자열 숫자
+        "A00006": {**base, "mdd_pct": 25.0, "win_rate_pct": 50.0, "trades": 30, "sharpe_m": 1.2,
+                   "cumulative_return_pct": 40.0},                       # A 경계값 정확히
+        "A00007": {**base, "prev_turnover": 2_999_999_999},               # 거래대금 미달 → B
+        "A00008": {**base, "avg_turnover": 3_000_000_000},
+        "B00001": {**base, "trades": 29},
+        "C00001": {**base, "trades": "abc", "win_rate_pct": None},     # 변환 실패 → 0 → 필터 탈락
+        "C00002": {**base, "mdd_pct": -30.1},
+    }
+
+
+CASES = [
+    {},
+    _random_targets(1, 1),
+    _random_targets(50, 2),
+    _random_targets(300, 3),
+    _edge_targets(),
+]
+
+
+def _as_records(targets: Mapping[str, Mapping[str, Any]]) -> Dict[str, Target]:
+    return {code: Target.from_raw({"code": code, **info}) for code, info in targets.items()}
+
+
+# ---------- 비교 ----------
+@pytest.mark.parametrize("targets", CASES)
+@pytest.mark.parametrize("rules", MIN_RULES)
+@pytest.mark.parametrize("as_records", [False, True])
+def test_select_champions_matches_legacy(targets, rules, as_records):
+    legacy_in = _as_records(targets) if as_records else {c: dict(i) for c, i in targets.items()}
+    new_in = _as_records(targets) if as_records else {c: dict(i) for c, i in targets.items()}
+    skipped, grades, scores = _legacy_select(legacy_in, *rules)
+
+    sel = select_champions(new_in, A_RULES, *rules)
+
+    assert sel.skipped == skipped
+    assert [c for c in sel.table.index if sel.table.loc[c, "keep"]] == list(grades)
+    assert {c: new_in[c]["champion_grade"] for c in grades} == grades
+    assert list(sel.targets) == [c for c, g in grades.items() if g == "A"]  # 원래 순서 유지
+    assert {c: sel.targets[c]["composite_score"] for c in sel.targets} == scores
+    assert sel.non_a == [c for c, g in grades.items() if g != "A"]
+    assert sel.grade_counts == {g: sum(1 for v in grades.values() if v == g) for g in ("A", "B", "C")}
+
+
+def test_edge_grades():
+    sel = select_champions(_edge_targets(), A_RULES, *MIN_RULES[0])
+    g = {c: i["champion_grade"] for c, i in sel.targets.items()}
+    assert set(g) == {"A00001", "A00002", "A00003", "A00004", "A00005", "A00006", "A00008"}
+    # sharpe_m 없음: 등급은 sharpe(1.5)로 A, 종합점수 샤프 항목은 sharpe_m(0) 기준
+    assert sel.table.loc["A00004", "grade_sharpe"] == 1.5 and sel.table.loc["A00004", "sharpe"] == 0.0
+    assert sel.targets["A00004"]["composite_score"] < sel.targets["A00001"]["composite_score"]
+    assert sel.table.loc["A00007", "grade"] == "B"
+    assert sel.table.loc["B00001", "grade"] == "B"
+    assert sel.skipped == ["C00001", "C00002"]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("higher", [True, False])
+def test_percentile_rank_matches_legacy(seed, higher):
+    rs = np.random.default_rng(seed)
+    vals = list(np.round(rs.normal(0, 1, 200), 1))  # 반올림으로 동률 다수
+    got = percentile_rank(np.array(vals), higher_is_better=higher)
+    expected = [_legacy_percentile_rank(vals, v, higher_is_better=higher) for v in vals]
+    assert list(got) == expected
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+simulate_k_grid(브로드캐스팅 커널) ↔ 스칼라 기준 구현 비교
+- 기준: simulate_with_k_and_get_metrics를 K마다 호출하고 샤프를 붙이던 기존 simulate_k_range_for 루프(_legacy_k_range)
+- 다구간: simulate_k_grid_horizons_arrays(starts) ↔ 구간별로 배열을 잘라 따로 계산한 값(비트 단위 일치)
+- 입력은 고정 시드 난수 일봉(정수/실수 가격) + 돌파가 없는 평탄 구간
+"""
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from rolling_k_auto_trade_api.simulate_with_k_and_get_metrics import (
+    ohlc_arrays,
+    simulate_k_grid,
+    simulate_k_grid_arrays,
+    simulate_k_grid_horizons_arrays,
+    simulate_with_k_and_get_metrics,
+)
+
+K_GRID = [round(float(k), 2) for k in np.arange(0.1, 1.0, 0.05)]
+
+
+def _make_prices(n: int, seed: int, integer: bool = True) -> List[Dict[str, Any]]:
+    rs = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rs.normal(0, 0.02, n)))
+    open_ = close * (1 + rs.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rs.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rs.normal(0, 0.01, n)))
+    conv = (lambda x: int(round(float(x)))) if integer else float
+    return [
+        {"date": f"D{i:04d}", "open": conv(o), "high": conv(h), "low": conv(lo), "close": conv(c)}
+        for i, (o, h, lo, c) in enumerate(zip(open_, high, low, close))
+    ]
+
+
+def _flat_prices(n: int) -> List[Dict[str, Any]]:
+    return [{"date": f"D{i:04d}", "open": 1000, "high": 1000, "low": 1000, "close": 1000} for i in range(n)]
+
+
+CASES = [_make_prices(n, seed) for n, seed in [(0, 0), (1, 1), (2, 2), (3, 3), (5, 4), (22, 5), (63, 6), (250, 7)]]
+CASES += [_make_prices(n, seed, integer=False) for n, seed in [(22, 8), (250, 9)]]
+CASES.append(_flat_prices(30))
+
+
+# ---------- 기준 구현 ----------
+def _legacy_k_range(code: str, price_data, k_range) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for k in k_range:
+        metrics = simulate_with_k_and_get_metrics(code, float(k), price_data)
+        metrics["k"] = float(k)
+        try:
+            mu = float(metrics.get("avg_return_pct", 0)) / 100.0
+            mdd = abs(float(metrics.get("mdd_pct", 0))) / 100.0
+            metrics["sharpe"] = round(mu / (0.01 + mdd), 4)
+        except Exception:
+            metrics["sharpe"] = 0.0
+        results.append(metrics)
+    return results
+
+
+# ---------- 비교 ----------
+@pytest.mark.parametrize("prices", CASES)
+def test_k_grid_matches_scalar(prices):
+    assert simulate_k_grid(prices, K_GRID) == _legacy_k_range("TEST", prices, K_GRID)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_k_grid_matches_scalar_random_lengths(seed):
+    rs = np.random.default_rng(100 + seed)
+    prices = _make_prices(int(rs.integers(3, 300)), seed=1000 + seed)
+    ks = sorted({round(float(k), 2) for k in rs.uniform(0.0, 1.5, 25)})
+    assert simulate_k_grid(prices, ks) == _legacy_k_range("TEST", prices, ks)
+
+
+def test_k_grid_empty_k():
+    assert simulate_k_grid(_make_prices(30, 1), []) == []
+
+
+@pytest.mark.parametrize("prices", [c for c in CASES if len(c) >= 3])
+def test_horizons_match_sliced_kernel(prices):
+    arrays = ohlc_arrays(prices)
+    n = len(prices)
+    starts = sorted({0, max(0, n - 63), max(0, n - 21), max(0, n - 3), max(0, n - 2)})
+    raw = simulate_k_grid_horizons_arrays(*arrays, K_GRID, starts)
+    for hi, s in enumerate(starts):
+        sliced = simulate_k_grid_arrays(*(a[s:] for a in arrays), K_GRID)
+        for key, mat in raw.items():
+            assert np.array_equal(mat[hi], sliced[key]), (key, s)
+
+
+@pytest.mark.parametrize("prices", [CASES[-4], CASES[-2]])
+def test_horizons_match_scalar_after_rounding(prices):
+    arrays = ohlc_arrays(prices)
+    n = len(prices)
+    starts = [0, n - 63, n - 21]
+    raw = simulate_k_grid_horizons_arrays(*arrays, K_GRID, starts)
+    for hi, s in enumerate(starts):
+        for ki, k in enumerate(K_GRID):
+            ref = simulate_with_k_and_get_metrics("TEST", k, prices[s:])
+            assert int(raw["trades"][hi, ki]) == ref["trades"]
+            for key in ("avg_return_pct", "win_rate_pct", "mdd_pct", "cumulative_return_pct"):
+                assert round(float(raw[key][hi, ki]), 2) == ref[key], (key, s, k)
+            assert round(float(raw["avg_holding_days"][hi, ki]), 1) == ref["avg_holding_days"]
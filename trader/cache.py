@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+cache.py — 이름 있는 캐시 영역(region) 관리자: TTL / LRU 상한 / stale-while-revalidate / 통계
+
+역할
+- region(name, ttl_sec, max_size, stale_sec)으로 영역을 생성·재사용(프로세스 전역 레지스트리)
+- ttl_sec: 신선(fresh) 판정 기본 나이(초). get(..., max_age=)로 호출부에서 덮어쓸 수 있음
+- stale_sec: ttl 이후 추가로 보관하는 시간. 이 구간 값은 get_stale()/get_or_load() 폴백으로만 제공
+             (None이면 TTL과 무관하게 LRU로 밀려날 때까지 보관)
+- max_size: 초과 시 가장 오래 사용하지 않은 키부터 제거(LRU)
+- hits / misses / stale_hits / evictions / expirations 카운터 → stats(), dump(), log_stats()
+- get(..., accept=fn): 당일 여부 등 호출부 유효성 검사에 떨어진 값은 히트가 아니라 미스로 집계
+- export_stats(): 영역 통계(+최근 엔트리 요약)를 JSON 파일로 원자적 저장 → 다른 프로세스(API)가 read_exported()로 조회
+
+주의
+- 영역 크기는 환경변수 CACHE_MAX_<NAME>, TTL은 CACHE_TTL_<NAME> 으로 덮어쓸 수 있습니다.
+  (NAME은 영역 이름을 대문자로: 예) CACHE_MAX_PRICE=5000)
+- 스레드 안전(RLock). 값 객체 자체의 불변성은 호출부 책임입니다.
+- 영역은 프로세스 전역입니다. trader 프로세스 통계는 export 파일(CACHE_STATS_PATH)로만 밖에서 볼 수 있습니다.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+STATS_PATH = Path(os.getenv("CACHE_STATS_PATH") or (Path(__file__).parent / "logs" / "cache_stats.json"))
+_TLS = threading.local()  # 스레드별 hit/miss 누계(loop_profiler 단계별 집계용)
+
+
+def _env_num(key: str, default: Optional[float], cast=float) -> Optional[float]:
+    v = os.getenv(key)
+    if v is None or v == "":
+        return default
+    try:
+        return cast(v)
+    except Exception:
+        return default
+
+
+class CacheRegion:
+    """단일 캐시 영역. 값은 (value, stored_at) 로 보관."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_sec: Optional[float] = None,
+        max_size: Optional[int] = None,
+        stale_sec: Optional[float] = None,
+    ):
+        self.name = name
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self.stale_sec = stale_sec
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sets = 0
+        self.load_errors = 0
+
+    # ---------- 내부 ----------
+    def _retention(self) -> Optional[float]:
+        if self.ttl_sec is None or self.stale_sec is None:
+            return None
+        return float(self.ttl_sec) + float(self.stale_sec)
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[Tuple[Any, float]]:
+        ent = self._data.get(key)
+        if ent is None:
+            return None
+        retention = self._retention()
+        if retention is not None and now - ent[1] > retention:
+            del self._data[key]
+            self.expirations += 1
+            return None
+        return ent
+
+    # ---------- 조회 ----------
+    def get(
+        self,
+        key: Hashable,
+        default: Any = None,
+        max_age: Optional[float] = _MISSING,  # type: ignore[assignment]
+        accept: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        신선한 값만 반환(히트 시 LRU 갱신). max_age=None이면 나이 무관.
+        accept(value)가 False면(예: 전 거래일 값) 미스로 집계하고 default 반환(엔트리는 유지).
+        """
+        age_limit = self.ttl_sec if max_age is _MISSING else max_age
+        now = time.time()
+        with self._lock:
+            ent = self._lookup(key, now)
+            if (
+                ent is not None
+                and (age_limit is None or now - ent[1] <= age_limit)
+                and (accept is None or accept(ent[0]))
+            ):
+                self._data.move_to_end(key)
+                self.hits += 1
+                _TLS.hits = getattr(_TLS, "hits", 0) + 1
+                return ent[0]
+            self.misses += 1
+            _TLS.misses = getattr(_TLS, "misses", 0) + 1
+            return default
+
+    def get_stale(self, key: Hashable, max_age: Optional[float] = None, default: Any = None) -> Any:
+        """신선도와 무관하게 보관 중인 값을 반환(max_age 이내). 폴백 전용 → stale_hits 집계."""
+        now = time.time()
+        with self._lock:
+            ent = self._lookup(key, now)
+            if ent is not None and (max_age is None or now - ent[1] <= max_age):
+                self.stale_hits += 1
+                return ent[0]
+            return default
+
+    def age(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            ent = self._data.get(key)
+            return None if ent is None else time.time() - ent[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """통계/LRU 순서에 영향 없이 값 확인."""
+        with self._lock:
+            ent = self._data.get(key)
+            return default if ent is None else ent[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    # ---------- 갱신 ----------
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            self.sets += 1
+            if self.max_size is not None:
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            ent = self._data.pop(key, None)
+            return default if ent is None else ent[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        max_age: Optional[float] = _MISSING,  # type: ignore[assignment]
+        stale_ok_sec: Optional[float] = None,
+    ) -> Any:
+        """
+        stale-while-revalidate:
+        - 신선하면 캐시값
+        - 아니면 loader() 호출 → 유효값(None 아님)이면 저장 후 반환
+        - loader 실패/None이면 stale_ok_sec 이내 보관값으로 폴백(없으면 None)
+        """
+        val = self.get(key, _MISSING, max_age=max_age)
+        if val is not _MISSING:
+            return val
+        try:
+            fresh = loader()
+        except Exception as e:
+            self.load_errors += 1
+            logger.debug(f"[CACHE] load fail region={self.name} key={key} ex={e}")
+            fresh = None
+        if fresh is not None:
+            self.set(key, fresh)
+            return fresh
+        window = self.stale_sec if stale_ok_sec is None else stale_ok_sec
+        return self.get_stale(key, max_age=None if window is None else (self.ttl_sec or 0) + window)
+
+    # ---------- 통계 ----------
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_sec": self.ttl_sec,
+            "stale_sec": self.stale_sec,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "sets": self.sets,
+            "load_errors": self.load_errors,
+        }
+
+    def dump(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """최근 사용 순(최신 먼저)으로 키/나이/값 요약."""
+        now = time.time()
+        out: List[Dict[str, Any]] = []
+        with self._lock:
+            items = list(self._data.items())
+        for key, (value, ts) in reversed(items[-max(0, int(limit)):]):
+            out.append({"key": str(key), "age_sec": round(now - ts, 3), "value": _summarize(value)})
+        return out
+
+
+def _summarize(value: Any) -> Any:
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(k): _summarize(v) for k, v in list(value.items())[:10]}
+    if isinstance(value, (list, tuple)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+_REGIONS: Dict[str, CacheRegion] = {}
+_REGIONS_LOCK = threading.Lock()
+
+
+def region(
+    name: str,
+    ttl_sec: Optional[float] = None,
+    max_size: Optional[int] = None,
+    stale_sec: Optional[float] = None,
+) -> CacheRegion:
+    """이름으로 영역을 가져오거나 생성(최초 생성 시 인자/환경변수 적용)."""
+    r = _REGIONS.get(name)
+    if r is not None:
+        return r
+    with _REGIONS_LOCK:
+        r = _REGIONS.get(name)
+        if r is None:
+            env_name = name.upper().replace("-", "_").replace(".", "_")
+            max_size = _env_num(f"CACHE_MAX_{env_name}", max_size, int)  # type: ignore[assignment]
+            ttl_sec = _env_num(f"CACHE_TTL_{env_name}", ttl_sec, float)
+            r = CacheRegion(name, ttl_sec=ttl_sec, max_size=max_size, stale_sec=stale_sec)
+            _REGIONS[name] = r
+    return r
+
+
+def thread_counters() -> Tuple[int, int]:
+    """현재 스레드의 (hits, misses) 누계 — 모든 영역 합산."""
+    return getattr(_TLS, "hits", 0), getattr(_TLS, "misses", 0)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: r.stats() for name, r in sorted(_REGIONS.items())}
+
+
+def dump(name: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    if name is not None:
+        r = _REGIONS.get(name)
+        if r is None:
+            return {}
+        return {name: {"stats": r.stats(), "entries": r.dump(limit)}}
+    return {n: {"stats": r.stats(), "entries": r.dump(limit)} for n, r in sorted(_REGIONS.items())}
+
+
+def export_stats(path: Optional[Path] = None, dump_limit: int = 20) -> Optional[Path]:
+    """
+    전체 영역 통계 + 영역별 최근 dump_limit개 엔트리 요약을 JSON으로 저장(임시 파일 → rename).
+    실패해도 예외를 올리지 않음(반환 None).
+    """
+    target = Path(path or STATS_PATH)
+    payload = {
+        "pid": os.getpid(),
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        "updated_ts": time.time(),
+        "regions": dump(limit=dump_limit),
+    }
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(tmp, target)
+        return target
+    except Exception as e:
+        logger.warning(f"[CACHE] stats export 실패 path={target}: {e}")
+        return None
+
+
+def read_exported(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """export_stats() 파일 읽기(없거나 손상 시 None). age_sec(저장 후 경과 초) 추가."""
+    target = Path(path or STATS_PATH)
+    try:
+        data = json.loads(target.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    data["age_sec"] = round(time.time() - float(data.get("updated_ts") or 0.0), 1)
+    data["path"] = str(target)
+    return data
+
+
+def log_stats(log: Optional[logging.Logger] = None) -> None:
+    lg = log or logger
+    for name, st in stats().items():
+        lg.info(
+            f"[CACHE-STATS] {name}: size={st['size']}/{st['max_size']} hit_rate={st['hit_rate']} "
+            f"hits={st['hits']} misses={st['misses']} stale={st['stale_hits']} "
+            f"evict={st['evictions']} expire={st['expirations']}"
+        )
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+candles.py — 일봉 컬럼형(NumPy) 시계열 + 파생지표 캐시
+
+역할
+- KIS 일봉(List[Dict]: date/open/high/low/close[/volume])을 연속 배열 6개로 보관
+- 이동평균(MA5/10/20 등), True Range/ATR, 롤링 고가(peak), 연속하락 길이를 벡터 연산으로 1회 계산 후 캐싱
+- 당일(미완성) 캔들을 제외한 completed() 시리즈도 캐싱 → 지표가 코드·거래일당 1회만 계산됨
+
+주의
+- 시리즈는 생성 후 불변(immutable)으로 취급합니다. 배열을 직접 수정하지 마세요.
+- 결측 값은 NaN(가격) / 0.0(거래량)으로 채워집니다.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_FIELDS = ("open", "high", "low", "close")
+
+
+class CandleSeries:
+    __slots__ = ("code", "date", "open", "high", "low", "close", "volume", "_cache")
+
+    def __init__(
+        self,
+        date: np.ndarray,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: Optional[np.ndarray] = None,
+        code: str = "",
+    ):
+        self.code = code
+        self.date = date
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume if volume is not None else np.zeros(len(close), dtype=np.float64)
+        self._cache: Dict[Any, Any] = {}
+
+    # ---------- 생성 ----------
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], code: str = "") -> "CandleSeries":
+        rows = [r for r in (rows or []) if r is not None]
+        rows.sort(key=lambda r: str(r.get("date") or ""))
+        n = len(rows)
+        date = np.array([str(r.get("date") or "") for r in rows], dtype="U8")
+        cols: Dict[str, np.ndarray] = {}
+        for f in _FIELDS:
+            arr = np.full(n, np.nan, dtype=np.float64)
+            for i, r in enumerate(rows):
+                v = r.get(f)
+                if v is not None and v != "":
+                    try:
+                        arr[i] = float(v)
+                    except (TypeError, ValueError):
+                        pass
+            cols[f] = arr
+        vol = np.zeros(n, dtype=np.float64)
+        for i, r in enumerate(rows):
+            v = r.get("volume")
+            if v:
+                try:
+                    vol[i] = float(v)
+                except (TypeError, ValueError):
+                    pass
+        return cls(date, cols["open"], cols["high"], cols["low"], cols["close"], vol, code=code)
+
+    @classmethod
+    def empty(cls, code: str = "") -> "CandleSeries":
+        return cls.from_rows([], code=code)
+
+    def __len__(self) -> int:
+        return int(self.close.shape[0])
+
+    def _slice(self, sl: slice) -> "CandleSeries":
+        return CandleSeries(
+            self.date[sl], self.open[sl], self.high[sl], self.low[sl],
+            self.close[sl], self.volume[sl], code=self.code,
+        )
+
+    def completed(self, today: str) -> "CandleSeries":
+        """마지막 캔들이 today(YYYYMMDD)이면 제외한 시리즈(캐싱)."""
+        key = ("completed", today)
+        out = self._cache.get(key)
+        if out is None:
+            if len(self) and str(self.date[-1]) == today:
+                out = self._slice(slice(0, len(self) - 1))
+            else:
+                out = self
+            self._cache[key] = out
+        return out
+
+    def tail(self, n: int) -> "CandleSeries":
+        if n >= len(self):
+            return self
+        return self._slice(slice(len(self) - n, len(self)))
+
+    def has_missing_close(self) -> bool:
+        key = "missing_close"
+        if key not in self._cache:
+            self._cache[key] = bool(np.isnan(self.close).any())
+        return self._cache[key]
+
+    # ---------- 파생지표 (캐싱) ----------
+    def sma(self, window: int) -> np.ndarray:
+        """종가 단순이동평균. 앞쪽 window-1개는 NaN."""
+        key = ("sma", int(window))
+        out = self._cache.get(key)
+        if out is None:
+            n = len(self)
+            out = np.full(n, np.nan, dtype=np.float64)
+            if window > 0 and n >= window:
+                out[window - 1:] = np.lib.stride_tricks.sliding_window_view(self.close, window).mean(axis=1)
+            self._cache[key] = out
+        return out
+
+    def ma_last(self, window: int, offset: int = 0) -> Optional[float]:
+        """끝에서 offset번째 위치의 MA 값(offset=1이면 전일 MA)."""
+        arr = self.sma(window)
+        idx = len(arr) - 1 - int(offset)
+        if idx < 0 or np.isnan(arr[idx]):
+            return None
+        return float(arr[idx])
+
+    def true_range(self) -> np.ndarray:
+        """TR[i] = max(H-L, |H-C[i-1]|, |L-C[i-1]|), i>=1 (길이 n-1)."""
+        out = self._cache.get("tr")
+        if out is None:
+            if len(self) < 2:
+                out = np.empty(0, dtype=np.float64)
+            else:
+                h = self.high[1:]
+                l = self.low[1:]
+                pc = self.close[:-1]
+                out = np.maximum.reduce([h - l, np.abs(h - pc), np.abs(l - pc)])
+            self._cache["tr"] = out
+        return out
+
+    def atr(self, window: int = 14) -> Optional[float]:
+        """최근 window개 TR의 단순평균(KisAPI.get_atr와 동일 정의)."""
+        key = ("atr", int(window))
+        if key in self._cache:
+            return self._cache[key]
+        val: Optional[float] = None
+        if window > 0 and len(self) >= window + 1:
+            trs = self.true_range()[-window:]
+            if trs.size and not np.isnan(trs).any():
+                val = float(trs.sum() / float(window))
+        self._cache[key] = val
+        return val
+
+    def rolling_peak(self, window: int = 60) -> np.ndarray:
+        """고가의 롤링 최대(앞쪽은 가용 구간 최대)."""
+        key = ("peak", int(window))
+        out = self._cache.get(key)
+        if out is None:
+            n = len(self)
+            out = np.full(n, np.nan, dtype=np.float64)
+            if n:
+                h = np.nan_to_num(self.high, nan=-np.inf)
+                head = min(window, n)
+                out[:head] = np.maximum.accumulate(h[:head])
+                if n > window:
+                    out[window - 1:] = np.lib.stride_tricks.sliding_window_view(h, window).max(axis=1)
+            self._cache[key] = out
+        return out
+
+    def peak(self, window: int) -> Tuple[Optional[float], int]:
+        """최근 window개 고가 최대값과 그 (마지막 발생) 인덱스(전체 시리즈 기준)."""
+        key = ("peak_at", int(window))
+        if key in self._cache:
+            return self._cache[key]
+        n = len(self)
+        res: Tuple[Optional[float], int] = (None, -1)
+        if n:
+            start = max(0, n - window)
+            h = np.nan_to_num(self.high[start:], nan=0.0)
+            if h.size:
+                pk = float(h.max())
+                idx = start + int(h.size - 1 - np.argmax(h[::-1] == pk))
+                res = (pk, idx)
+        self._cache[key] = res
+        return res
+
+    def down_streaks(self) -> np.ndarray:
+        """각 위치에서 끝나는 종가 연속하락 길이(0/음수 종가는 연속 끊김)."""
+        out = self._cache.get("down_streak")
+        if out is None:
+            n = len(self)
+            c = self.close
+            dec = np.zeros(n, dtype=bool)
+            if n >= 2:
+                cur, prev = c[1:], c[:-1]
+                with np.errstate(invalid="ignore"):
+                    dec[1:] = (cur < prev) & (cur > 0) & (prev > 0)
+            idx = np.arange(n)
+            last_reset = np.maximum.accumulate(np.where(dec, 0, idx)) if n else idx
+            out = idx - last_reset
+            self._cache["down_streak"] = out
+        return out
+
+    def down_streak(self) -> int:
+        s = self.down_streaks()
+        return int(s[-1]) if s.size else 0
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "date": str(self.date[i]),
+                "open": float(self.open[i]),
+                "high": float(self.high[i]),
+                "low": float(self.low[i]),
+                "close": float(self.close[i]),
+            }
+            for i in range(len(self))
+        ]
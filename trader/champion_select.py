@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+champion_select.py — 챔피언 후보 필터/등급/종합점수를 한 번에 계산하는 벡터화 단계
+
+역할
+- build_candidate_table(): 리밸런싱 후보 dict → 타입이 고정된 DataFrame(code 인덱스, float/int 컬럼)
+- filter_mask(): CHAMPION_MIN_* 최소 조건(거래수/승률/MDD/샤프) 충족 여부
+- grade(): A(엄격 규칙) / B(최소 조건) / C 등급
+- percentile_rank(): 정렬 + searchsorted로 O(n log n) 백분위(동률 포함, 0~100)
+- composite_score(): 누적수익 35% / 승률 25% / 샤프 25% / MDD(낮을수록 좋음) 15% 가중 백분위 합
+- select_champions(): 위 단계를 묶어 A급만 champion_grade/composite_score를 채워 원래 순서로 반환
+
+주의
+- 기존 dict 루프(_classify_champion_grade/_percentile_rank)와 같은 값·순서·등급을 내도록 규칙을 그대로 옮겼습니다.
+- trader.py 설정에 의존하지 않는 순수 함수입니다(규칙/임계값은 인자로 주입).
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# (컬럼, 가중치, 높을수록 좋은가)
+SCORE_WEIGHTS: Tuple[Tuple[str, float, bool], ...] = (
+    ("cumret", 0.35, True),
+    ("win_rate", 0.25, True),
+    ("sharpe", 0.25, True),
+    ("mdd", 0.15, False),
+)
+
+_TABLE_COLUMNS = ("trades", "win_rate", "mdd", "sharpe", "grade_sharpe", "cumret", "grade_cumret", "turnover")
+
+
+def _num(values: Sequence[Any]) -> np.ndarray:
+    """float 변환 실패/None → 0.0 (trader._to_float(x, 0.0)과 동일)."""
+    return pd.to_numeric(pd.Series(list(values), dtype=object), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+
+def build_candidate_table(targets: Mapping[str, Mapping[str, Any]]) -> pd.DataFrame:
+    codes = list(targets.keys())
+    infos = list(targets.values())
+    if not codes:
+        return pd.DataFrame({c: pd.Series(dtype=float) for c in _TABLE_COLUMNS}, index=pd.Index([], name="code"))
+
+    cumret = _num([i.get("cumulative_return_pct") for i in infos])
+    avg_ret = _num([i.get("avg_return_pct") for i in infos])
+    turnover = _num([i.get("prev_turnover") or i.get("avg_turnover") or i.get("turnover") for i in infos])
+    table = pd.DataFrame(
+        {
+            "trades": np.trunc(_num([i.get("trades") for i in infos])).astype(np.int64),
+            "win_rate": _num([i.get("win_rate_pct") for i in infos]),
+            "mdd": np.abs(_num([i.get("mdd_pct") for i in infos])),
+            "sharpe": _num([i.get("sharpe_m") for i in infos]),
+            # 등급 판정만 sharpe_m이 0/없음이면 sharpe로 대체(기존 규칙: 필터/종합점수는 sharpe_m만)
+            "grade_sharpe": _num([i.get("sharpe_m") or i.get("sharpe") for i in infos]),
+            "cumret": cumret,
+            # 등급 판정은 누적수익이 0/없음이면 평균수익으로 대체(기존 규칙)
+            "grade_cumret": np.where(cumret != 0.0, cumret, avg_ret),
+            "turnover": turnover,
+        },
+        index=pd.Index(codes, name="code"),
+    )
+    return table
+
+
+def percentile_rank(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """
+    각 원소의 백분위(0~100): higher_is_better면 '값 이하' 개수, 아니면 '값 이상' 개수 / n.
+    """
+    x = np.asarray(values, dtype=float)
+    n = x.size
+    if n == 0:
+        return np.zeros(0)
+    s = np.sort(x)
+    if higher_is_better:
+        cnt = np.searchsorted(s, x, side="right")
+    else:
+        cnt = n - np.searchsorted(s, x, side="left")
+    return cnt / n * 100.0
+
+
+def filter_mask(
+    table: pd.DataFrame,
+    min_trades: int,
+    min_winrate: float,
+    max_mdd: float,
+    min_sharpe: float,
+) -> pd.Series:
+    skip = (
+        (table["trades"] < min_trades)
+        | (table["win_rate"] < min_winrate)
+        | (table["mdd"] > max_mdd)
+        | (table["sharpe"] < min_sharpe)
+    )
+    return ~skip
+
+
+def grade(
+    table: pd.DataFrame,
+    a_rules: Mapping[str, float],
+    min_trades: int,
+    min_winrate: float,
+    max_mdd: float,
+    min_sharpe: float,
+) -> pd.Series:
+    turnover_ok = (table["turnover"] <= 0) | (table["turnover"] >= a_rules["min_turnover"])
+    is_a = (
+        (table["trades"] >= a_rules["min_trades"])
+        & (table["grade_cumret"] >= a_rules["min_cumret_pct"])
+        & (table["mdd"] <= a_rules["max_mdd_pct"])
+        & (table["win_rate"] >= a_rules["min_win_pct"])
+        & (table["grade_sharpe"] >= a_rules["min_sharpe"])
+        & turnover_ok
+    )
+    is_b = (
+        (table["trades"] >= min_trades)
+        & (table["win_rate"] >= min_winrate)
+        & (table["mdd"] <= max_mdd)
+        & (table["grade_sharpe"] >= min_sharpe)
+    )
+    return pd.Series(np.where(is_a, "A", np.where(is_b, "B", "C")), index=table.index, name="grade")
+
+
+def composite_score(table: pd.DataFrame) -> pd.Series:
+    score = np.zeros(len(table))
+    for col, weight, higher in SCORE_WEIGHTS:
+        score += percentile_rank(table[col].to_numpy(), higher_is_better=higher) * weight
+    return pd.Series(np.round(score, 4), index=table.index, name="composite_score")
+
+
+@dataclass
+class ChampionSelection:
+    table: pd.DataFrame                      # 전체 후보(keep / grade / composite_score 포함)
+    targets: Dict[str, Dict[str, Any]]       # A급만(원래 순서), champion_grade/composite_score 채움
+    skipped: List[str] = field(default_factory=list)
+    non_a: List[str] = field(default_factory=list)
+    grade_counts: Dict[str, int] = field(default_factory=lambda: {"A": 0, "B": 0, "C": 0})
+
+
+def select_champions(
+    targets: Mapping[str, Dict[str, Any]],
+    a_rules: Mapping[str, float],
+    min_trades: int,
+    min_winrate: float,
+    max_mdd: float,
+    min_sharpe: float,
+) -> ChampionSelection:
+    """최소 조건 필터 → 등급 → A급 안에서 종합점수. 입력 dict의 info는 제자리 갱신됩니다."""
+    table = build_candidate_table(targets)
+    keep = filter_mask(table, min_trades, min_winrate, max_mdd, min_sharpe)
+    table["keep"] = keep
+    kept = table[keep]
+    grades = grade(kept, a_rules, min_trades, min_winrate, max_mdd, min_sharpe)
+    table["grade"] = grades.reindex(table.index)
+
+    a_codes = grades.index[grades.to_numpy() == "A"]
+    scores = composite_score(kept.loc[a_codes])
+    table["composite_score"] = scores.reindex(table.index)
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for code, g in grades.items():
+        info = targets[code]
+        info["champion_grade"] = g
+        if g == "A":
+            info["composite_score"] = float(scores[code])
+            out[code] = info
+
+    counts = {"A": 0, "B": 0, "C": 0}
+    for g, n in grades.value_counts().items():
+        counts[str(g)] = int(n)
+    return ChampionSelection(
+        table=table,
+        targets=out,
+        skipped=[str(c) for c in table.index[~keep.to_numpy()]],
+        non_a=[str(c) for c, g in grades.items() if g != "A"],
+        grade_counts=counts,
+    )
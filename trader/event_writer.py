@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+event_writer.py — 거래로그(JSONL)/체결(CSV) 비동기 기록기
+
+역할
+- 싱크(sink)별 1개의 백그라운드 writer 스레드 + 크기 제한 큐(bounded queue)
+- 큐에 쌓인 이벤트를 배치로 모아 한 번에 write/flush (파일 핸들은 경로별로 열어둔 채 재사용)
+- fsync 정책: never | batch | always | interval (EVENT_FSYNC_POLICY)
+- 백프레셔: 큐가 가득 차면 자리가 날 때까지 호출 스레드가 대기(유실·순서 뒤바뀜 없음).
+  writer 스레드가 이미 종료됐으면 남은 큐를 먼저 비운 뒤 호출 스레드에서 동기 기록
+- 종료 시(atexit 또는 shutdown()) 큐를 끝까지 비우고 flush/fsync 후 핸들 정리
+
+주의
+- 주문/청산 경로는 submit_*()만 호출하고 파일 I/O는 하지 않습니다.
+- 같은 싱크에 제출된 작업은 제출 순서대로 처리됩니다(행 추가 → 이름 보정 순서 보장).
+"""
+from __future__ import annotations
+import os
+import csv
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+ENV = lambda k, d=None: os.getenv(k, d)
+
+EVENT_QUEUE_MAX = int(ENV("EVENT_QUEUE_MAX", "10000"))
+EVENT_BATCH_MAX = int(ENV("EVENT_BATCH_MAX", "256"))
+EVENT_FLUSH_SEC = float(ENV("EVENT_FLUSH_SEC", "0.5"))
+EVENT_PUT_TIMEOUT_SEC = float(ENV("EVENT_PUT_TIMEOUT_SEC", "0.05"))
+EVENT_FSYNC_POLICY = str(ENV("EVENT_FSYNC_POLICY", "batch")).strip().lower()  # never|batch|always|interval
+EVENT_FSYNC_INTERVAL_SEC = float(ENV("EVENT_FSYNC_INTERVAL_SEC", "5.0"))
+EVENT_SHUTDOWN_TIMEOUT_SEC = float(ENV("EVENT_SHUTDOWN_TIMEOUT_SEC", "10.0"))
+
+FILL_HEADER = ["ts", "side", "code", "name", "qty", "price", "ODNO", "note"]
+
+_KIND_JSONL = "jsonl"
+_KIND_CSV = "csv"
+_KIND_CALL = "call"
+_STOP = object()
+
+
+class _Sink:
+    """단일 writer 스레드가 소유하는 싱크. 경로별 파일 핸들을 열어두고 배치 기록."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, EVENT_QUEUE_MAX))
+        self._handles: Dict[str, Any] = {}
+        # writer 스레드와 동기 폴백(호출 스레드)이 동시에 파일을 만지지 않도록 보호
+        self._io_lock = threading.RLock()
+        self._last_fsync = time.monotonic()
+        self.stats: Dict[str, float] = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "full_waits": 0,
+            "errors": 0,
+            "max_depth": 0,
+            "fsyncs": 0,
+            "last_batch_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name=f"event-writer-{name}", daemon=True)
+        self._thread.start()
+
+    # ---------- 호출 스레드 ----------
+    def submit(self, item: tuple) -> None:
+        self.stats["enqueued"] += 1
+        warned = False
+        while True:
+            try:
+                self.q.put(item, timeout=EVENT_PUT_TIMEOUT_SEC)
+                break
+            except queue.Full:
+                if self._thread.is_alive():
+                    # 백프레셔: 큐보다 먼저 쓰면 싱크 내 순서가 깨짐 → 자리가 날 때까지 대기
+                    if not warned:
+                        self.stats["full_waits"] += 1
+                        logger.warning(f"[EVENT-WRITER] queue full sink={self.name} depth={self.q.qsize()} → wait")
+                        warned = True
+                    continue
+                # writer 종료(셧다운 이후 등): 남은 큐를 순서대로 비우고 이어서 동기 기록
+                logger.warning(f"[EVENT-WRITER] writer stopped sink={self.name} → sync write")
+                with self._io_lock:
+                    self._drain_rest()
+                    self._apply([item])
+                    self._flush(force_fsync=False)
+                return
+        depth = self.q.qsize()
+        if depth > self.stats["max_depth"]:
+            self.stats["max_depth"] = depth
+
+    def stop(self, timeout: float) -> None:
+        try:
+            self.q.put(_STOP, timeout=max(0.1, timeout))
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+
+    # ---------- writer 스레드 ----------
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self.q.get(timeout=EVENT_FLUSH_SEC)
+            except queue.Empty:
+                self._maybe_interval_fsync()
+                continue
+            batch = [first]
+            # always: 레코드마다 fsync → 배치 크기 1
+            batch_max = 1 if EVENT_FSYNC_POLICY == "always" else max(1, EVENT_BATCH_MAX)
+            while len(batch) < batch_max:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(it is _STOP for it in batch)
+            items = [it for it in batch if it is not _STOP]
+            t0 = time.perf_counter()
+            with self._io_lock:
+                if items:
+                    self._apply(items)
+                    self._flush(force_fsync=stopping)
+                if stopping:
+                    self._drain_rest()
+                    self._close_all()
+            self.stats["last_batch_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+            self.stats["batches"] += 1
+            if stopping:
+                return
+            self._maybe_interval_fsync()
+
+    def _drain_rest(self) -> None:
+        rest: List[tuple] = []
+        while True:
+            try:
+                it = self.q.get_nowait()
+            except queue.Empty:
+                break
+            if it is not _STOP:
+                rest.append(it)
+        if rest:
+            self._apply(rest)
+        self._flush(force_fsync=True)
+
+    def _handle(self, path: str, header: Optional[Sequence[str]]):
+        fh = self._handles.get(path)
+        if fh is not None:
+            return fh
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        fh = open(path, "a", newline="", encoding="utf-8")
+        if header and new:
+            csv.writer(fh).writerow(list(header))
+        self._handles[path] = fh
+        return fh
+
+    def _apply(self, items: List[tuple]) -> None:
+        for item in items:
+            kind = item[0]
+            try:
+                if kind == _KIND_JSONL:
+                    _, path, record = item
+                    self._handle(path, None).write(json.dumps(record, ensure_ascii=False) + "\n")
+                elif kind == _KIND_CSV:
+                    _, path, header, row = item
+                    csv.writer(self._handle(path, header)).writerow(row)
+                elif kind == _KIND_CALL:
+                    # 파일을 다시 쓰는 작업일 수 있으므로 열린 핸들을 먼저 정리
+                    _, fn = item
+                    self._close_all()
+                    fn()
+                self.stats["written"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"[EVENT-WRITER] write fail sink={self.name} kind={kind} ex={e}")
+
+    def _flush(self, force_fsync: bool) -> None:
+        do_fsync = force_fsync or EVENT_FSYNC_POLICY in ("batch", "always")
+        for path, fh in list(self._handles.items()):
+            try:
+                fh.flush()
+                if do_fsync:
+                    os.fsync(fh.fileno())
+                    self.stats["fsyncs"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"[EVENT-WRITER] flush fail path={path} ex={e}")
+        if do_fsync:
+            self._last_fsync = time.monotonic()
+
+    def _maybe_interval_fsync(self) -> None:
+        if EVENT_FSYNC_POLICY != "interval" or not self._handles:
+            return
+        if time.monotonic() - self._last_fsync < EVENT_FSYNC_INTERVAL_SEC:
+            return
+        with self._io_lock:
+            self._flush(force_fsync=True)
+
+    def _close_all(self) -> None:
+        for path, fh in list(self._handles.items()):
+            try:
+                fh.flush()
+                fh.close()
+            except Exception:
+                pass
+        self._handles.clear()
+
+
+_SINKS: Dict[str, _Sink] = {}
+_SINKS_LOCK = threading.Lock()
+_CLOSED = False
+
+
+def _sink(name: str) -> Optional[_Sink]:
+    if _CLOSED:
+        return None
+    s = _SINKS.get(name)
+    if s is not None:
+        return s
+    with _SINKS_LOCK:
+        s = _SINKS.get(name)
+        if s is None:
+            s = _Sink(name)
+            _SINKS[name] = s
+    return s
+
+
+def _write_now(item: tuple) -> None:
+    """종료 이후 제출분은 호출 스레드에서 즉시 기록."""
+    tmp = _Sink.__new__(_Sink)
+    tmp.name = "sync"
+    tmp._handles = {}
+    tmp.stats = {"written": 0, "errors": 0, "fsyncs": 0}
+    tmp._last_fsync = time.monotonic()
+    tmp._apply([item])
+    tmp._flush(force_fsync=EVENT_FSYNC_POLICY != "never")
+    tmp._close_all()
+
+
+def submit_jsonl(sink: str, path: str, record: Dict[str, Any]) -> None:
+    item = (_KIND_JSONL, str(path), record)
+    s = _sink(sink)
+    if s is None:
+        _write_now(item)
+    else:
+        s.submit(item)
+
+
+def submit_csv(sink: str, path: str, row: Sequence[Any], header: Optional[Sequence[str]] = None) -> None:
+    item = (_KIND_CSV, str(path), header, list(row))
+    s = _sink(sink)
+    if s is None:
+        _write_now(item)
+    else:
+        s.submit(item)
+
+
+def submit_call(sink: str, fn: Callable[[], None]) -> None:
+    """싱크 스레드에서 fn()을 순서대로 실행(예: 체결 CSV 이름 보정)."""
+    item = (_KIND_CALL, fn)
+    s = _sink(sink)
+    if s is None:
+        _write_now(item)
+    else:
+        s.submit(item)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, s in list(_SINKS.items()):
+        d = dict(s.stats)
+        d["depth"] = s.q.qsize()
+        d["capacity"] = s.q.maxsize
+        out[name] = d
+    return out
+
+
+def shutdown(timeout: Optional[float] = None) -> None:
+    """큐를 모두 비우고 flush/fsync 후 writer 스레드 종료. 여러 번 호출해도 안전."""
+    global _CLOSED
+    if _CLOSED:
+        return
+    _CLOSED = True
+    t = EVENT_SHUTDOWN_TIMEOUT_SEC if timeout is None else float(timeout)
+    for name, s in list(_SINKS.items()):
+        try:
+            s.stop(t)
+        except Exception as e:
+            logger.warning(f"[EVENT-WRITER] shutdown fail sink={name} ex={e}")
+    if _SINKS:
+        logger.info(f"[EVENT-WRITER] shutdown stats={stats()}")
+
+
+atexit.register(shutdown)
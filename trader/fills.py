@@ -1,9 +1,10 @@
 from datetime import datetime
-import csv, os
+
+from .event_writer import submit_csv, FILL_HEADER
 
 def append_fill(side, code, name, qty, price, odno, note=""):
     """
-    체결 기록을 CSV로 저장
+    체결 기록을 CSV로 저장 (event_writer 'fills' 싱크로 비동기 기록)
     side: "BUY" or "SELL"
     code: 종목 코드
     name: 종목 이름
@@ -12,9 +13,7 @@ def append_fill(side, code, name, qty, price, odno, note=""):
     odno: 주문번호
     note: 추가 메모
     """
-    os.makedirs("fills", exist_ok=True)
     path = f"fills/fills_{datetime.now().strftime('%Y%m%d')}.csv"
-    header = ["ts", "side", "code", "name", "qty", "price", "ODNO", "note"]
     row = [
         datetime.now().isoformat(),
         side,
@@ -25,9 +24,4 @@ def append_fill(side, code, name, qty, price, odno, note=""):
         str(odno),
         note,
     ]
-    new = not os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if new:
-            w.writerow(header)
-        w.writerow(row)
+    submit_csv("fills", path, row, header=FILL_HEADER)
@@ -9,6 +9,8 @@
 # - ✅ 시세 0원 방지(J↔U, A접두/무접두 교차, 지수 백오프 재시도)
 # - ✅ 잔고 페이징(ctx_area_*) , empty 순간응답 디바운스
 # - ✅ [NEW] 세션 리셋/지수형 백오프를 포함한 안전요청(_safe_request), 체결 후 잔고 동기화(refresh_after_order)
+# - ✅ 주문별 체결조회(inquire_daily_ccld), 정정/취소(revise_cancel_order) — order_manager.py 추격 주문용
+# - ✅ 계정 공용 토큰버킷(KIS_MAX_RPS, set_rate_limit) — 멀티스레드 호출 시 초당 호출 상한
 
 import os
 import json
@@ -16,7 +18,6 @@ import time
 import random
 import logging
 import threading
-import csv
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 
@@ -26,6 +27,9 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from settings import APP_KEY, APP_SECRET, API_BASE_URL, CANO, ACNT_PRDT_CD, KIS_ENV
+from .event_writer import submit_csv, FILL_HEADER
+from .candles import CandleSeries
+from . import cache
 
 logger = logging.getLogger(__name__)
 
@@ -89,10 +93,9 @@ def _json_dumps(body: dict) -> str:
 
 
 def append_fill(side: str, code: str, name: str, qty: int, price: float, odno: str, note: str = ""):
+    """체결 기록을 CSV 싱크 큐에 제출(파일 I/O는 event_writer 스레드에서 수행)."""
     try:
-        os.makedirs("fills", exist_ok=True)
         path = f"fills/fills_{datetime.now().strftime('%Y%m%d')}.csv"
-        header = ["ts", "side", "code", "name", "qty", "price", "ODNO", "note"]
         row = [
             datetime.now().isoformat(),
             side,
@@ -103,18 +106,15 @@ def append_fill(side: str, code: str, name: str, qty: int, price: float, odno: s
             str(odno) if odno is not None else "",
             note or "",
         ]
-        new = not os.path.exists(path)
-        with open(path, "a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            if new:
-                w.writerow(header)
-            w.writerow(row)
+        submit_csv("fills", path, row, header=FILL_HEADER)
         logger.info(f"[APPEND_FILL] {side} {code} qty={qty} price={price} odno={odno}")
     except Exception as e:
         logger.warning(f"[APPEND_FILL_FAIL] side={side} code={code} ex={e}")
 
 
 class _RateLimiter:
+    """키(엔드포인트 그룹)별 최소 간격. 다음 슬롯만 잠금 안에서 예약하고 대기는 잠금 밖에서 → 다른 키를 막지 않음."""
+
     def __init__(self, min_interval_sec: float = 0.20):
         self.min_interval = float(min_interval_sec)
         self.last_at: Dict[str, float] = {}
@@ -123,11 +123,59 @@ class _RateLimiter:
     def wait(self, key: str):
         with self._lock:
             now = time.time()
-            last = self.last_at.get(key, 0.0)
-            delta = now - last
-            if delta < self.min_interval:
-                time.sleep(self.min_interval - delta + random.uniform(0, 0.03))
-            self.last_at[key] = time.time()
+            slot = max(now, self.last_at.get(key, 0.0) + self.min_interval)
+            self.last_at[key] = slot
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay + random.uniform(0, 0.03))
+
+
+class _TokenBucket:
+    """
+    계정 전체 초당 호출 상한(KIS 유량 제한). 여러 스레드(async 런타임의 작업들)가 공유.
+    rate<=0 이면 비활성.
+    """
+
+    def __init__(self, rate_per_sec: float, burst: Optional[float] = None):
+        self._lock = threading.Lock()
+        self.configure(rate_per_sec, burst)
+
+    def configure(self, rate_per_sec: float, burst: Optional[float] = None) -> None:
+        with self._lock:
+            self.rate = max(0.0, float(rate_per_sec))
+            self.capacity = max(1.0, float(burst if burst is not None else self.rate or 1.0))
+            self.tokens = self.capacity
+            self.updated = time.monotonic()
+
+    def acquire(self) -> float:
+        """토큰 1개 확보(부족하면 예약 후 잠금 밖에서 대기). 대기한 초 반환."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.0
+            delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+_KIS_BUCKET = _TokenBucket(float(os.getenv("KIS_MAX_RPS", "15") or 0))
+
+
+def set_rate_limit(rps: float, burst: Optional[float] = None) -> None:
+    """계정 전체 초당 호출 상한 변경(0 이하 → 비활성)."""
+    _KIS_BUCKET.configure(rps, burst)
+
+
+_CALL_TLS = threading.local()
+
+
+def request_count() -> int:
+    """현재 스레드가 지금까지 보낸 KIS 요청 수(loop_profiler 단계별 호출 수 집계용)."""
+    return getattr(_CALL_TLS, "n", 0)
 
 
 TR_MAP = {
@@ -139,6 +187,8 @@ TR_MAP = {
         "ORDERBOOK": [os.getenv("KIS_TR_ID_ORDERBOOK", "FHKST01010200")],
         "DAILY_CHART": [os.getenv("KIS_TR_ID_DAILY_CHART", "FHKST03010100")],
         "INTRADAY_CHART": [os.getenv("KIS_TR_ID_INTRADAY_CHART", "FHKST03010200")],
+        "ORDER_RVSECNCL": [os.getenv("KIS_TR_ID_ORDER_RVSECNCL", "VTTC0013U"), "VTTC0803U"],
+        "DAILY_CCLD": [os.getenv("KIS_TR_ID_DAILY_CCLD", "VTTC0081R"), "VTTC8001R"],
         "TOKEN": "/oauth2/tokenP",
     },
     "real": {
@@ -149,6 +199,8 @@ TR_MAP = {
         "ORDERBOOK": [os.getenv("KIS_TR_ID_ORDERBOOK_REAL", "FHKST01010200")],
         "DAILY_CHART": [os.getenv("KIS_TR_ID_DAILY_CHART_REAL", "FHKST03010100")],
         "INTRADAY_CHART": [os.getenv("KIS_TR_ID_INTRADAY_CHART_REAL", "FHKST03010200")],
+        "ORDER_RVSECNCL": [os.getenv("KIS_TR_ID_ORDER_RVSECNCL_REAL", "TTTC0013U"), "TTTC0803U"],
+        "DAILY_CCLD": [os.getenv("KIS_TR_ID_DAILY_CCLD_REAL", "TTTC0081R"), "TTTC8001R"],
         "TOKEN": "/oauth2/token",
     },
 }
@@ -182,17 +234,25 @@ class KisAPI:
         self._safe_backoff_base = 0.2
 
         self._limiter = _RateLimiter(min_interval_sec=0.20)
+        if not os.getenv("KIS_MAX_RPS"):
+            # 모의투자는 실전보다 유량 제한이 훨씬 낮음
+            set_rate_limit(4.0 if self.env == "practice" else 15.0)
         self._recent_sells: Dict[str, float] = {}
         self._recent_sells_lock = threading.Lock()
         self._recent_sells_cooldown = 60.0
 
-        self._last_cash: Optional[int] = None  # ✅ 예수금 캐시(네트워크 실패/0원 응답 대응)
+        # ✅ 예수금 캐시(네트워크 실패/0원 응답 대응) — "last" -> int
+        self._cash_cache = cache.region("kis_cash", max_size=1)
 
         self.token = self.get_valid_token()
         logger.info(f"[생성자 체크] CANO={repr(self.CANO)}, ACNT_PRDT_CD={repr(self.ACNT_PRDT_CD)}, ENV={self.env}")
 
-        self._today_open_cache: Dict[str, Tuple[float, float]] = {}  # code -> (open_price, ts)
         self._today_open_ttl = 60 * 60 * 9  # 9시간 TTL (당일만 유효)
+        self._today_open_cache = cache.region(
+            "kis_today_open", ttl_sec=self._today_open_ttl, max_size=2000, stale_sec=0
+        )  # code -> open_price
+        # 시세 조회에 성공한 (시장구분, 코드포맷) 조합 — J/U × 'A'접두 교차 시도를 줄이기 위함
+        self._code_fmt_cache = cache.region("kis_code_fmt", max_size=3000)  # code -> (market_div, code_fmt)
 
     # ===== [NEW] 안전요청 & 세션리셋 =====
     def _reset_session(self):
@@ -212,9 +272,12 @@ class KisAPI:
         공통 안전요청 래퍼:
         - SSLError/일시 오류 시 지수형 백오프 + 세션 리셋 후 재시도
         - 기본 시도 self._safe_attempts
+        - 모든 시도는 계정 공용 토큰버킷(KIS_MAX_RPS)을 통과 → 여러 스레드에서 동시에 호출해도 유량 제한 준수
         """
         attempts = self._safe_attempts
+        _CALL_TLS.n = getattr(_CALL_TLS, "n", 0) + 1
         for i in range(1, attempts + 1):
+            _KIS_BUCKET.acquire()
             try:
                 return self.session.request(
                     method,
@@ -324,6 +387,37 @@ class KisAPI:
         except Exception as e:
             logger.error(f"[토큰 재발급 실패] {e}")
 
+    def token_remaining_sec(self) -> float:
+        try:
+            return float(self._token_cache.get("expires_at") or 0) - time.time()
+        except Exception:
+            return 0.0
+
+    def ensure_token_fresh(self, min_valid_sec: float) -> bool:
+        """토큰 잔여 유효시간이 min_valid_sec 미만이면 재발급(장중 만료 방지). 성공 여부 반환."""
+        try:
+            self.get_valid_token()
+            if self.token_remaining_sec() < float(min_valid_sec):
+                logger.info(
+                    f"[토큰] 잔여 {self.token_remaining_sec():.0f}s < {min_valid_sec:.0f}s → 사전 재발급"
+                )
+                self.refresh_token()
+            return self.token_remaining_sec() > 0
+        except Exception as e:
+            logger.warning(f"[토큰] 사전 점검 실패: {e}")
+            return False
+
+    def warm_connections(self, n: int = 2) -> int:
+        """KIS 호스트로 keep-alive 연결을 미리 맺어 TLS 핸드셰이크 비용을 장 시작 전에 지불."""
+        ok = 0
+        for _ in range(max(1, int(n))):
+            try:
+                self.session.get(API_BASE_URL, timeout=(3.0, 3.0))
+                ok += 1
+            except Exception as e:
+                logger.debug(f"[WARM_CONN] fail: {e}")
+        return ok
+
     # HashKey
     def _create_hashkey(self, body_dict: dict) -> str:
         url = f"{API_BASE_URL}/uapi/hashkey"
@@ -361,7 +455,7 @@ class KisAPI:
             return cash
         except Exception as e:
             logger.error(f"[CASH_QUERY_FAIL] 예수금 조회 실패: {e}")
-            return int(self._last_cash or 0)
+            return int(self._last_cash() or 0)
 
     def _estimate_buy_cost(self, price: float, qty: int,
                            fee_pct: float = 0.00015, tax_pct: float = 0.0) -> int:
@@ -444,20 +538,42 @@ class KisAPI:
         - 0원/실패 시 지수 백오프 후 재시도
         """
         c = safe_strip(code)
-        code_variants = [c, f"A{c}"] if not c.startswith("A") else [c, c[1:]]
-        markets = ("J", "U")
+        combos = self._price_combos(c)
         tr_list = _pick_tr(self.env, "PRICE")
         for round_i in range(attempts):
             for tr in tr_list:
-                for m in markets:
-                    for cf in code_variants:
-                        px = self._inquire_price_once(tr, m, cf)
-                        if px and px > 0:
-                            return px
+                for m, cf in combos:
+                    px = self._inquire_price_once(tr, m, cf)
+                    if px and px > 0:
+                        self._code_fmt_cache.set(c, (m, cf))
+                        return px
             # 백오프 후 재시도
             time.sleep(0.6 * (1.5 ** round_i) + random.uniform(0, 0.2))
         raise RuntimeError(f"invalid last price 0 for {code}")
 
+    def _price_combos(self, c: str) -> List[Tuple[str, str]]:
+        """(시장구분, 코드포맷) 시도 순서. 사전 확인된 조합이 있으면 맨 앞."""
+        code_variants = [c, f"A{c}"] if not c.startswith("A") else [c, c[1:]]
+        combos = [(m, cf) for m in ("J", "U") for cf in code_variants]
+        known = self._code_fmt_cache.get(c, max_age=None)
+        if known and tuple(known) in combos:
+            combos.remove(tuple(known))
+            combos.insert(0, tuple(known))
+        return combos
+
+    def resolve_code_format(self, code: str) -> Optional[Tuple[str, str]]:
+        """현재가 조회로 유효한 (시장구분, 코드포맷)을 확인해 캐싱(장 시작 전 워밍업용)."""
+        c = safe_strip(code)
+        known = self._code_fmt_cache.get(c, max_age=None)
+        if known:
+            return tuple(known)
+        try:
+            self.get_last_price(c, attempts=1)
+        except Exception as e:
+            logger.debug(f"[CODE_FMT] resolve fail {c}: {e}")
+        known = self._code_fmt_cache.get(c, max_age=None)
+        return tuple(known) if known else None
+
     def get_current_price(self, code: str) -> float:
         """기존 경량 버전(호환용). 내부적으로 get_last_price 사용."""
         return self.get_last_price(code)
@@ -465,8 +581,8 @@ class KisAPI:
     # --- 시초가 캐시 ---
     def _get_cached_today_open(self, code: str) -> Optional[float]:
         try:
-            op, ts = self._today_open_cache.get(code, (None, 0.0))
-            if op and (time.time() - ts) < self._today_open_ttl:
+            op = self._today_open_cache.get(code)
+            if op:
                 return op
         except Exception:
             pass
@@ -475,7 +591,7 @@ class KisAPI:
     def _set_cached_today_open(self, code: str, price: float):
         try:
             if price and price > 0:
-                self._today_open_cache[code] = (float(price), time.time())
+                self._today_open_cache.set(code, float(price))
         except Exception:
             pass
 
@@ -492,30 +608,27 @@ class KisAPI:
         self._limiter.wait("quotes-open")
         for tr in _pick_tr(self.env, "PRICE"):
             headers = self._headers(tr)
-            markets = ["J", "U"]
             c = safe_strip(code)
-            codes = [c, f"A{c}"] if not c.startswith("A") else [c, c[1:]]
-            for market_div in markets:
-                for code_fmt in codes:
-                    params = {"fid_cond_mrkt_div_code": market_div, "fid_input_iscd": code_fmt}
+            for market_div, code_fmt in self._price_combos(c):
+                params = {"fid_cond_mrkt_div_code": market_div, "fid_input_iscd": code_fmt}
+                try:
+                    # [CHG] 안전요청 사용
+                    resp = self._safe_request("GET", url, headers=headers, params=params, timeout=(3.0, 5.0))
+                    data = resp.json()
+                except Exception:
+                    continue
+                if "초당 거래건수" in (data.get("msg1") or ""):
+                    time.sleep(0.35 + random.uniform(0, 0.15))
+                    continue
+                if resp.status_code == 200 and data.get("rt_cd") == "0" and data.get("output"):
+                    op_str = data["output"].get("stck_oprc")
                     try:
-                        # [CHG] 안전요청 사용
-                        resp = self._safe_request("GET", url, headers=headers, params=params, timeout=(3.0, 5.0))
-                        data = resp.json()
+                        op = float(op_str) if op_str is not None else 0.0
+                        if op > 0:
+                            self._set_cached_today_open(code, op)
+                            return op
                     except Exception:
-                        continue
-                    if "초당 거래건수" in (data.get("msg1") or ""):
-                        time.sleep(0.35 + random.uniform(0, 0.15))
-                        continue
-                    if resp.status_code == 200 and data.get("rt_cd") == "0" and data.get("output"):
-                        op_str = data["output"].get("stck_oprc")
-                        try:
-                            op = float(op_str) if op_str is not None else 0.0
-                            if op > 0:
-                                self._set_cached_today_open(code, op)
-                                return op
-                        except Exception:
-                            pass
+                        pass
         return None
 
     def get_orderbook_strength(self, code: str) -> Optional[float]:
@@ -677,16 +790,7 @@ class KisAPI:
             candles = self.get_daily_candles(code, count=window + 2)
             if len(candles) < window + 1:
                 return None
-            trs: List[float] = []
-            for i in range(1, len(candles)):
-                h = candles[i]["high"]
-                l = candles[i]["low"]
-                c_prev = candles[i - 1]["close"]
-                tr = max(h - l, abs(h - c_prev), abs(l - c_prev))
-                trs.append(tr)
-            if not trs:
-                return None
-            return sum(trs[-window:]) / float(window)
+            return CandleSeries.from_rows(candles, code=code).atr(window)
         except Exception as e:
             logger.warning(f"[ATR] 계산 실패 code={code}: {e}")
             return None
@@ -695,7 +799,8 @@ class KisAPI:
         """KIS 주식당일분봉조회 (FHKST03010200 / inquire-time-itemchartprice)
         - FID_COND_MRKT_DIV_CODE: 'J'
         - FID_INPUT_ISCD: 6자리 종목코드('A' 제거)
-        - FID_INPUT_HOUR_1: 시작 시간(HHMMSS), 예: '090000'
+        - FID_INPUT_HOUR_1: 기준 시간(HHMMSS), 예: '090000'
+          (응답은 기준 시간 이전 최대 30개 분봉 → 장중 전체는 minute_bars.MinuteBarStore가 역방향 페이징)
         - FID_PW_DATA_INCU_YN: 'Y'
         - FID_ETC_CLS_CODE: ''
         """
@@ -763,11 +868,17 @@ class KisAPI:
                             price = r.get("stck_prpr")
                             vol = r.get("cntg_vol")
                             if hhmmss and price is not None and vol is not None:
-                                rows.append({
+                                row = {
                                     "time": str(hhmmss),
                                     "price": float(price),
                                     "volume": float(vol),
-                                })
+                                }
+                                # 분봉 OHLC(있으면) — minute_bars 저장소에서 사용
+                                for src, dst in (("stck_oprc", "open"), ("stck_hgpr", "high"), ("stck_lwpr", "low")):
+                                    v = r.get(src)
+                                    if v not in (None, ""):
+                                        row[dst] = float(v)
+                                rows.append(row)
                         except Exception as e:
                             logger.debug("[INTRADAY_ROW_SKIP] %s rec=%s err=%s", iscd, r, e)
 
@@ -1034,28 +1145,33 @@ class KisAPI:
 
         return {"output1": all_rows, "output2": out2_last, "ctx_area_fk100": fk, "ctx_area_nk100": nk}
 
+    def _last_cash(self) -> Optional[int]:
+        return self._cash_cache.get_stale("last")
+
     def get_cash_balance(self) -> int:
         """
         ✅ 예수금: output2.ord_psbl_cash 우선.
-        실패/0원 시 최근 캐시(self._last_cash) 폴백.
+        실패/0원 시 최근 캐시(self._last_cash()) 폴백.
         """
         try:
             j = self.inquire_balance_all()
             out2 = j.get("output2")
             cash = self._parse_cash_from_output2(out2)
             if cash > 0:
-                self._last_cash = cash
+                self._cash_cache.set("last", cash)
                 logger.info("[CASH_BALANCE_OK] ord_psbl_cash≈%s원", f"{cash:,}")
                 return cash
             # 0원이면 캐시 폴백
-            if self._last_cash is not None and self._last_cash > 0:
-                logger.warning("[CASH_FALLBACK] live=0 → use last=%s", f"{self._last_cash:,}")
-                return self._last_cash
+            last = self._last_cash()
+            if last is not None and last > 0:
+                logger.warning("[CASH_FALLBACK] live=0 → use last=%s", f"{last:,}")
+                return last
         except Exception as e:
             logger.error(f"[CASH_BALANCE_FAIL] {e}")
-            if self._last_cash is not None and self._last_cash > 0:
-                logger.warning("[CASH_FALLBACK] netfail → use last=%s", f"{self._last_cash:,}")
-                return self._last_cash
+            last = self._last_cash()
+            if last is not None and last > 0:
+                logger.warning("[CASH_FALLBACK] netfail → use last=%s", f"{last:,}")
+                return last
         return 0
 
     def get_positions(self) -> List[Dict]:
@@ -1526,3 +1642,126 @@ class KisAPI:
             return bool(order_resp and isinstance(order_resp, dict) and order_resp.get("rt_cd") == "0")
         except Exception:
             return False
+
+    # ===== 주문별 체결조회 / 정정·취소 (order_manager.py 사용) =====
+    def inquire_daily_ccld(self, odno: Optional[str] = None, pdno: str = "") -> Dict[str, Dict[str, Any]]:
+        """
+        당일 주문체결 조회 → {ODNO: {odno, orgn_odno, orgno, pdno, side, ord_qty, ccld_qty, rmn_qty, avg_price, ord_price, cancelled}}
+        - odno 지정 시 해당 주문만 조회
+        - 조회 실패 시 예외(상위에서 다음 주기에 재시도)
+        """
+        url = f"{API_BASE_URL}/uapi/domestic-stock/v1/trading/inquire-daily-ccld"
+        tr_list = _pick_tr(self.env, "DAILY_CCLD")
+        if not tr_list:
+            raise RuntimeError("DAILY_CCLD TR 미구성")
+        today = datetime.now(pytz.timezone("Asia/Seoul")).strftime("%Y%m%d")
+        out: Dict[str, Dict[str, Any]] = {}
+        last_err: Any = None
+        for tr_id in tr_list:
+            fk, nk = "", ""
+            ok = False
+            for _ in range(10):  # 페이지 상한
+                params = {
+                    "CANO": self.CANO,
+                    "ACNT_PRDT_CD": self.ACNT_PRDT_CD,
+                    "INQR_STRT_DT": today,
+                    "INQR_END_DT": today,
+                    "SLL_BUY_DVSN_CD": "00",
+                    "INQR_DVSN": "00",
+                    "PDNO": safe_strip(pdno),
+                    "CCLD_DVSN": "00",
+                    "ORD_GNO_BRNO": "",
+                    "ODNO": safe_strip(odno) if odno else "",
+                    "INQR_DVSN_3": "00",
+                    "INQR_DVSN_1": "",
+                    "EXCG_ID_DVSN_CD": "KRX",
+                    "CTX_AREA_FK100": fk,
+                    "CTX_AREA_NK100": nk,
+                }
+                self._limiter.wait("ccld")
+                headers = self._headers(tr_id)
+                if fk or nk:
+                    headers["tr_cont"] = "N"
+                try:
+                    resp = self._safe_request("GET", url, headers=headers, params=params, timeout=(3.0, 7.0))
+                    data = resp.json()
+                except Exception as e:
+                    last_err = e
+                    break
+                if resp.status_code != 200 or data.get("rt_cd") != "0":
+                    last_err = data
+                    break
+                ok = True
+                for r in data.get("output1") or []:
+                    no = safe_strip(r.get("odno"))
+                    if not no:
+                        continue
+                    out[no] = {
+                        "odno": no,
+                        "orgn_odno": safe_strip(r.get("orgn_odno")),
+                        "orgno": safe_strip(r.get("ord_gno_brno")),
+                        "pdno": safe_strip(r.get("pdno")),
+                        "side": "SELL" if safe_strip(r.get("sll_buy_dvsn_cd")) == "01" else "BUY",
+                        "ord_qty": int(float(r.get("ord_qty") or 0)),
+                        "ccld_qty": int(float(r.get("tot_ccld_qty") or 0)),
+                        "rmn_qty": int(float(r.get("rmn_qty") or 0)),
+                        "avg_price": float(r.get("avg_prvs") or 0.0),
+                        "ord_price": float(r.get("ord_unpr") or 0.0),
+                        "cancelled": safe_strip(r.get("cncl_yn")) == "Y",
+                    }
+                fk = safe_strip(data.get("ctx_area_fk100"))
+                nk = safe_strip(data.get("ctx_area_nk100"))
+                if resp.headers.get("tr_cont") not in ("F", "M") or not nk:
+                    break
+            if ok:
+                return out
+        raise Exception(f"체결조회 실패: {last_err}")
+
+    def revise_cancel_order(
+        self,
+        orgn_odno: str,
+        krx_fwdg_ord_orgno: str,
+        qty: int,
+        price: int = 0,
+        *,
+        cancel: bool = False,
+    ) -> Optional[dict]:
+        """
+        지정가 주문 정정(가격 변경) 또는 취소.
+        - cancel=False: RVSE_CNCL_DVSN_CD=01, qty/price로 잔량 정정 → 응답 output.ODNO가 새 주문번호
+        - cancel=True : RVSE_CNCL_DVSN_CD=02, 잔량 전부 취소(QTY_ALL_ORD_YN=Y)
+        """
+        body = {
+            "CANO": self.CANO,
+            "ACNT_PRDT_CD": self.ACNT_PRDT_CD,
+            "KRX_FWDG_ORD_ORGNO": safe_strip(krx_fwdg_ord_orgno),
+            "ORGN_ODNO": safe_strip(orgn_odno),
+            "ORD_DVSN": "00",
+            "RVSE_CNCL_DVSN_CD": "02" if cancel else "01",
+            "ORD_QTY": "0" if cancel else str(int(qty)),
+            "ORD_UNPR": "0" if cancel else str(int(price)),
+            "QTY_ALL_ORD_YN": "Y",
+            "EXCG_ID_DVSN_CD": "KRX",
+        }
+        tr_list = _pick_tr(self.env, "ORDER_RVSECNCL")
+        if not tr_list:
+            raise Exception("ORDER_RVSECNCL TR 미구성")
+        url = f"{API_BASE_URL}/uapi/domestic-stock/v1/trading/order-rvsecncl"
+        hk = self._create_hashkey(body)
+        last: Any = None
+        for tr_id in tr_list:
+            self._limiter.wait("orders")
+            headers = self._headers(tr_id, hk)
+            resp = self._safe_request(
+                "POST", url, headers=headers, data=_json_dumps(body).encode("utf-8"), timeout=(3.0, 7.0)
+            )
+            data = resp.json()
+            if resp.status_code == 200 and data.get("rt_cd") == "0":
+                logger.info(
+                    f"[ORDER_{'CANCEL' if cancel else 'REVISE'}_OK] orgn={orgn_odno} qty={qty} price={price} "
+                    f"output={data.get('output')}"
+                )
+                return data
+            last = data
+        logger.error(f"[ORDER_{'CANCEL' if cancel else 'REVISE'}_FAIL] orgn={orgn_odno} resp={last}")
+        return None
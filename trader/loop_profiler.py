@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+loop_profiler.py — 메인 루프 단계별(phase)·종목별 소요시간 계측 + 느린 패스 샘플링 프로파일러
+
+역할
+- begin()/end()로 루프 1패스를 감싸고, phase(name) 컨텍스트로 단계별 벽시계 시간 / KIS 호출 수 / 캐시 hit·miss 기록
+- symbol(code): 단계 안에서 현재 처리 중인 종목 표시 → 종목별 소요시간(상위 top_symbols개만 보관)
+- 패스 기록은 링버퍼(ring_size)와 일자별 JSONL(event_writer 비동기 기록)로 남김
+- summary_sec마다 [LOOP-TIMING] 요약(패스 p50/p95/max, 단계별 평균 ms·KIS 호출), slow_sec 초과 패스는 즉시 상세 로그
+- sample_mode
+    off      : 계측만
+    sample   : 패스 동안 sys._current_frames()로 호출 스택을 주기 샘플링 → 느린 패스만 .folded(flamegraph.pl 입력) 저장
+    cprofile : 패스마다 cProfile → 느린 패스만 .prof 저장
+
+주의
+- 패스(begin/end)는 호출 스레드 기준입니다. async 런타임처럼 패스가 없는 스레드의 phase는 단계 누계에만 반영됩니다.
+- KIS 호출 수/캐시 통계는 스레드별 누계의 차이로 계산합니다(다른 스레드의 호출은 섞이지 않음).
+"""
+from __future__ import annotations
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from . import cache
+from . import event_writer
+
+logger = logging.getLogger(__name__)
+
+
+def _no_calls() -> int:
+    return 0
+
+
+class _PhaseAgg:
+    __slots__ = ("count", "total", "max", "kis", "hits", "misses")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.kis = 0
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, sec: float, kis: int, hits: int, misses: int) -> None:
+        self.count += 1
+        self.total += sec
+        self.max = max(self.max, sec)
+        self.kis += kis
+        self.hits += hits
+        self.misses += misses
+
+
+class _StackSampler:
+    """대상 스레드의 호출 스택을 interval_sec마다 채집 → folded 스택 카운터."""
+
+    def __init__(self, interval_sec: float = 0.01, max_depth: int = 64):
+        self.interval = max(0.001, float(interval_sec))
+        self.max_depth = int(max_depth)
+        self._target: Optional[int] = None
+        self._stacks: Counter = Counter()
+        self._active = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="loop-sampler", daemon=True)
+        self._thread.start()
+
+    def start(self, ident: int) -> None:
+        with self._lock:
+            self._target = ident
+            self._stacks = Counter()
+        self._active.set()
+
+    def stop(self) -> Counter:
+        self._active.clear()
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+        return stacks
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            self._active.wait()
+            frame = sys._current_frames().get(self._target) if self._target != me else None
+            if frame is not None:
+                parts: List[str] = []
+                f = frame
+                while f is not None and len(parts) < self.max_depth:
+                    code = f.f_code
+                    parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    f = f.f_back
+                folded = ";".join(reversed(parts))
+                with self._lock:
+                    self._stacks[folded] += 1
+            time.sleep(self.interval)
+
+
+class _Iteration:
+    __slots__ = ("started", "t0", "c0", "phases", "symbols", "profiler")
+
+    def __init__(self, c0: Tuple[float, int, int, int]):
+        self.started = time.time()
+        self.t0 = c0[0]
+        self.c0 = c0
+        self.phases: Dict[str, List[float]] = {}       # name -> [ms, kis, hits, misses]
+        self.symbols: List[Tuple[float, str, str, int]] = []  # (ms, phase, code, kis)
+        self.profiler: Any = None
+
+
+class LoopProfiler:
+    def __init__(
+        self,
+        ring_size: int = 300,
+        out_dir: Optional[Path] = None,
+        slow_sec: float = 5.0,
+        summary_sec: float = 60.0,
+        sample_mode: str = "off",
+        sample_interval_ms: float = 10.0,
+        top_symbols: int = 5,
+        write_file: bool = True,
+        call_counter: Optional[Callable[[], int]] = None,
+    ):
+        self.ring: Deque[Dict[str, Any]] = deque(maxlen=max(1, int(ring_size)))
+        self.out_dir = Path(out_dir) if out_dir is not None else None
+        self.slow_sec = float(slow_sec)
+        self.summary_sec = float(summary_sec)
+        self.sample_mode = (sample_mode or "off").lower()
+        self.top_symbols = int(top_symbols)
+        self.write_file = bool(write_file) and self.out_dir is not None
+        self._calls = call_counter or _no_calls
+        self._tls = threading.local()
+        self._agg: Dict[str, _PhaseAgg] = {}
+        self._agg_lock = threading.Lock()
+        self._last_summary = time.time()
+        self._sampler: Optional[_StackSampler] = None
+        if self.sample_mode == "sample":
+            self._sampler = _StackSampler(sample_interval_ms / 1000.0)
+        self.stats: Dict[str, int] = {"iterations": 0, "slow": 0, "dumps": 0}
+
+    # ---------- 내부 ----------
+    def _counters(self) -> Tuple[float, int, int, int]:
+        hits, misses = cache.thread_counters()
+        return time.perf_counter(), self._calls(), hits, misses
+
+    def _close_symbol(self, now: Optional[Tuple[float, int, int, int]] = None) -> None:
+        cur = getattr(self._tls, "sym", None)
+        it = getattr(self._tls, "it", None)
+        if cur is None:
+            return
+        self._tls.sym = None
+        if it is None:
+            return
+        now = now or self._counters()
+        phase, code, c0 = cur
+        it.symbols.append(((now[0] - c0[0]) * 1000.0, phase, code, now[1] - c0[1]))
+
+    # ---------- 패스 ----------
+    def begin(self) -> None:
+        """새 패스 시작(끝나지 않은 이전 패스는 버림 — 장 마감 대기 등)."""
+        old = getattr(self._tls, "it", None)
+        if old is not None and old.profiler is not None:
+            old.profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+        it = _Iteration(self._counters())
+        if self.sample_mode == "cprofile":
+            try:
+                import cProfile
+                it.profiler = cProfile.Profile()
+                it.profiler.enable()
+            except Exception as e:
+                logger.debug(f"[LOOP-PROFILE] cProfile 시작 실패: {e}")
+        elif self._sampler is not None:
+            self._sampler.start(threading.get_ident())
+        self._tls.it = it
+        self._tls.sym = None
+
+    def end(self) -> Optional[Dict[str, Any]]:
+        it: Optional[_Iteration] = getattr(self._tls, "it", None)
+        if it is None:
+            return None
+        now = self._counters()
+        self._close_symbol(now)
+        self._tls.it = None
+        stacks = self._sampler.stop() if self._sampler is not None else None
+        if it.profiler is not None:
+            it.profiler.disable()
+
+        total_ms = (now[0] - it.t0) * 1000.0
+        top = sorted(it.symbols, reverse=True)[: self.top_symbols]
+        rec = {
+            "ts": datetime.fromtimestamp(it.started).strftime("%H:%M:%S"),
+            "ms": round(total_ms, 1),
+            "kis": now[1] - it.c0[1],
+            "hits": now[2] - it.c0[2],
+            "misses": now[3] - it.c0[3],
+            "phases": {k: [round(v[0], 1), int(v[1]), int(v[2]), int(v[3])] for k, v in it.phases.items()},
+            "top": [[p, c, round(ms, 1), k] for ms, p, c, k in top],
+        }
+        self.ring.append(rec)
+        self.stats["iterations"] += 1
+        if self.write_file:
+            path = self.out_dir / f"loop_timing_{datetime.now().strftime('%Y%m%d')}.jsonl"
+            event_writer.submit_jsonl("loop_timing", str(path), rec)
+
+        if total_ms >= self.slow_sec * 1000.0:
+            self.stats["slow"] += 1
+            phases_txt = " ".join(f"{k}={v[0]:.0f}ms/{v[1]}kis" for k, v in rec["phases"].items())
+            top_txt = ", ".join(f"{p}:{c} {ms:.0f}ms" for p, c, ms, _ in rec["top"])
+            logger.warning(
+                f"[LOOP-TIMING][SLOW] {total_ms / 1000.0:.2f}s kis={rec['kis']} | {phases_txt} | top: {top_txt}"
+            )
+            self._dump_profile(rec, it, stacks)
+        self.maybe_log_summary()
+        return rec
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        c0 = self._counters()
+        prev_phase = getattr(self._tls, "phase", None)
+        prev_sym = getattr(self._tls, "sym", None)  # 중첩 단계(예: 긴급 청산 선점) 후 바깥 종목 구간 복원
+        self._tls.phase = name
+        self._tls.sym = None
+        try:
+            yield
+        finally:
+            c1 = self._counters()
+            self._close_symbol(c1)
+            self._tls.phase = prev_phase
+            self._tls.sym = prev_sym
+            sec = c1[0] - c0[0]
+            kis, hits, misses = c1[1] - c0[1], c1[2] - c0[2], c1[3] - c0[3]
+            with self._agg_lock:
+                agg = self._agg.get(name)
+                if agg is None:
+                    agg = self._agg[name] = _PhaseAgg()
+                agg.add(sec, kis, hits, misses)
+            it = getattr(self._tls, "it", None)
+            if it is not None:
+                slot = it.phases.setdefault(name, [0.0, 0, 0, 0])
+                slot[0] += sec * 1000.0
+                slot[1] += kis
+                slot[2] += hits
+                slot[3] += misses
+
+    def symbol(self, code: str) -> None:
+        """현재 단계에서 처리 중인 종목 표시(이전 종목 구간은 여기서 마감)."""
+        if getattr(self._tls, "it", None) is None:
+            return
+        now = self._counters()
+        self._close_symbol(now)
+        self._tls.sym = (getattr(self._tls, "phase", None) or "-", str(code), now)
+
+    # ---------- 출력 ----------
+    def _dump_profile(self, rec: Dict[str, Any], it: _Iteration, stacks: Optional[Counter]) -> None:
+        if self.out_dir is None or (it.profiler is None and not stacks):
+            return
+        try:
+            pdir = self.out_dir / "profiles"
+            pdir.mkdir(parents=True, exist_ok=True)
+            stem = f"loop_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{int(rec['ms'])}ms"
+            if it.profiler is not None:
+                it.profiler.dump_stats(str(pdir / f"{stem}.prof"))
+            if stacks:
+                with open(pdir / f"{stem}.folded", "w", encoding="utf-8") as f:
+                    for stack, n in stacks.most_common():
+                        f.write(f"{stack} {n}\n")
+            self.stats["dumps"] += 1
+            logger.info(f"[LOOP-PROFILE] 느린 패스 프로파일 저장: {pdir / stem}")
+        except Exception as e:
+            logger.warning(f"[LOOP-PROFILE] 저장 실패: {e}")
+
+    def recent(self, n: int = 20) -> List[Dict[str, Any]]:
+        return list(self.ring)[-max(0, int(n)):]
+
+    def summary(self) -> Dict[str, Any]:
+        ms = sorted(r["ms"] for r in self.ring)
+        out: Dict[str, Any] = {"iterations": len(ms)}
+        if ms:
+            out["p50_ms"] = ms[len(ms) // 2]
+            out["p95_ms"] = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+            out["max_ms"] = ms[-1]
+        with self._agg_lock:
+            out["phases"] = {
+                name: {
+                    "count": a.count,
+                    "avg_ms": round(a.total / a.count * 1000.0, 1) if a.count else 0.0,
+                    "max_ms": round(a.max * 1000.0, 1),
+                    "kis_per_run": round(a.kis / a.count, 2) if a.count else 0.0,
+                    "hit_rate": round(a.hits / (a.hits + a.misses), 3) if (a.hits + a.misses) else None,
+                }
+                for name, a in self._agg.items()
+            }
+        return out
+
+    def maybe_log_summary(self, force: bool = False) -> None:
+        if not force and (self.summary_sec <= 0 or time.time() - self._last_summary < self.summary_sec):
+            return
+        self._last_summary = time.time()
+        s = self.summary()
+        head = (
+            f"iters={s['iterations']} p50={s.get('p50_ms', 0):.0f}ms "
+            f"p95={s.get('p95_ms', 0):.0f}ms max={s.get('max_ms', 0):.0f}ms"
+        )
+        body = " | ".join(
+            f"{name} {p['avg_ms']:.0f}ms(max {p['max_ms']:.0f}) kis/run={p['kis_per_run']} hit={p['hit_rate']}"
+            for name, p in s["phases"].items()
+        )
+        logger.info(f"[LOOP-TIMING] {head} || {body}")
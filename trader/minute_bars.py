@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+minute_bars.py — 종목별 당일 1분봉(OHLCV) 저장소
+
+역할
+- KisAPI.get_intraday_candles_today(기준시각 이전 최대 30개 분봉) 응답을 역방향 페이징해 09:00부터 채움
+- 이후 갱신은 최신 페이지만 조회해 병합(같은 분 봉은 수정, 누락 구간은 추가 페이지로 보충)
+- 실시간 체결 틱(ingest_tick)으로 진행 중 봉을 갱신하는 경로 제공(틱 소스는 상위에서 연결)
+- 종목별 MomentumAccumulator(momentum.py)를 함께 갱신 → VWAP/모멘텀 조회는 I/O 없음
+- get_bars(code, n): 최근 n개 봉 [{time, open, high, low, close, volume}, ...]
+
+주의
+- 갱신 주기(refresh_sec) 내 재호출은 API를 두드리지 않습니다.
+- 시간 키는 'HHMMSS' 문자열(분 단위로 정규화: 초=00)입니다.
+"""
+from __future__ import annotations
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from . import cache
+from .momentum import MomentumAccumulator
+
+logger = logging.getLogger(__name__)
+
+SESSION_OPEN_HHMMSS = "090000"
+
+
+def _minute_key(t: Any) -> Optional[str]:
+    """'HHMMSS' / 'HHMM' / datetime → 분 단위 'HHMM00'."""
+    if t is None:
+        return None
+    if isinstance(t, datetime):
+        return t.strftime("%H%M00")
+    s = "".join(ch for ch in str(t) if ch.isdigit())
+    if len(s) >= 12:      # YYYYMMDDHHMM[SS]
+        s = s[8:]
+    if len(s) == 4:
+        s += "00"
+    if len(s) < 6:
+        s = s.zfill(6)
+    return s[:4] + "00"
+
+
+def _prev_minute(key: str) -> str:
+    dt = datetime.strptime(key, "%H%M%S") - timedelta(minutes=1)
+    return dt.strftime("%H%M%S")
+
+
+class _CodeBars:
+    __slots__ = ("code", "keys", "bars", "acc", "fetched_at", "lock")
+
+    def __init__(self, code: str, acc: MomentumAccumulator):
+        self.code = code
+        self.keys: List[str] = []
+        self.bars: List[Dict[str, Any]] = []
+        self.acc = acc
+        self.fetched_at = 0.0
+        self.lock = threading.RLock()
+
+
+class MinuteBarStore:
+    def __init__(
+        self,
+        refresh_sec: float = 20.0,
+        max_bars: int = 400,
+        max_codes: int = 1000,
+        max_pages: int = 14,
+        acc_factory: Optional[Callable[[str], MomentumAccumulator]] = None,
+    ):
+        self.refresh_sec = float(refresh_sec)
+        self.max_bars = int(max_bars)
+        self.max_pages = int(max_pages)
+        self._acc_factory = acc_factory or (lambda code: MomentumAccumulator(code))
+        self._codes = cache.region("minute_bars", max_size=max_codes)
+        self.stats: Dict[str, int] = {"fetches": 0, "pages": 0, "bars_added": 0, "bars_revised": 0, "ticks": 0}
+
+    # ---------- 내부 ----------
+    def _entry(self, code: str) -> _CodeBars:
+        ent = self._codes.get(code, max_age=None)
+        if ent is None:
+            ent = _CodeBars(code, self._acc_factory(code))
+            self._codes.set(code, ent)
+        return ent
+
+    def _merge(self, ent: _CodeBars, rows: List[Dict[str, Any]]) -> int:
+        """rows(시간 무관)를 분 키 기준으로 병합. 과거 구간 삽입이 생기면 누산기를 재구성."""
+        changed = 0
+        rebuild = False
+        with ent.lock:
+            for r in sorted(rows, key=lambda x: _minute_key(x.get("time")) or ""):
+                key = _minute_key(r.get("time"))
+                close = r.get("close") if r.get("close") is not None else r.get("price")
+                try:
+                    c = float(close or 0.0)
+                except (TypeError, ValueError):
+                    continue
+                if not key or c <= 0:
+                    continue
+                bar = {
+                    "time": key,
+                    "open": float(r.get("open") or c),
+                    "high": float(r.get("high") or c),
+                    "low": float(r.get("low") or c),
+                    "close": c,
+                    "volume": float(r.get("volume") or 0.0),
+                }
+                i = bisect.bisect_left(ent.keys, key)
+                if i < len(ent.keys) and ent.keys[i] == key:
+                    if ent.bars[i] != bar:
+                        ent.bars[i] = bar
+                        self.stats["bars_revised"] += 1
+                        changed += 1
+                        if i < len(ent.keys) - 1:
+                            rebuild = True
+                        else:
+                            ent.acc.ingest_bar(key, c, bar["volume"], bar["high"], bar["low"])
+                    continue
+                ent.keys.insert(i, key)
+                ent.bars.insert(i, bar)
+                self.stats["bars_added"] += 1
+                changed += 1
+                if i < len(ent.keys) - 1:
+                    rebuild = True
+                elif not rebuild:
+                    ent.acc.ingest_bar(key, c, bar["volume"], bar["high"], bar["low"])
+            if len(ent.bars) > self.max_bars:
+                cut = len(ent.bars) - self.max_bars
+                del ent.keys[:cut]
+                del ent.bars[:cut]
+            if rebuild:
+                ent.acc.reset()
+                for b in ent.bars:
+                    ent.acc.ingest_bar(b["time"], b["close"], b["volume"], b["high"], b["low"])
+        return changed
+
+    # ---------- 공개 API ----------
+    def refresh(self, kis: Any, code: str, force: bool = False, now: Optional[datetime] = None) -> int:
+        """
+        refresh_sec 경과 시에만 최신 페이지 조회 → 병합.
+        비어 있거나 마지막 봉 이후 공백이 30분을 넘으면 09:00까지(또는 보유 구간까지) 역방향 페이징.
+        반환: 변경(추가/수정)된 봉 수
+        """
+        ent = self._entry(code)
+        t = time.time()
+        if not force and ent.fetched_at and t - ent.fetched_at < self.refresh_sec:
+            return 0
+        ent.fetched_at = t
+        if not hasattr(kis, "get_intraday_candles_today"):
+            return 0
+
+        end_key = _minute_key(now or datetime.now()) or "153000"
+        stop_key = ent.keys[-1] if ent.keys else SESSION_OPEN_HHMMSS
+        collected: List[Dict[str, Any]] = []
+        cursor = end_key
+        self.stats["fetches"] += 1
+        for _ in range(max(1, self.max_pages)):
+            try:
+                page = kis.get_intraday_candles_today(code, start_hhmm=cursor)
+            except Exception as e:
+                logger.debug(f"[MINUTE_BARS] fetch fail {code}@{cursor}: {e}")
+                break
+            self.stats["pages"] += 1
+            if not page:
+                break
+            collected.extend(page)
+            earliest = min((_minute_key(r.get("time")) or cursor) for r in page)
+            if earliest <= stop_key or earliest <= SESSION_OPEN_HHMMSS:
+                break
+            nxt = _prev_minute(earliest)
+            if nxt >= cursor:
+                break
+            cursor = nxt
+        if not collected:
+            return 0
+        return self._merge(ent, collected)
+
+    def ingest_rows(self, code: str, rows: List[Dict[str, Any]]) -> int:
+        return self._merge(self._entry(code), rows)
+
+    def ingest_tick(self, code: str, ts: Any, price: float, qty: float) -> None:
+        """실시간 체결 1건을 해당 분 봉에 반영(OHLC 갱신, 거래량 누적)."""
+        key = _minute_key(ts)
+        try:
+            p = float(price or 0.0)
+            q = max(0.0, float(qty or 0.0))
+        except (TypeError, ValueError):
+            return
+        if not key or p <= 0:
+            return
+        ent = self._entry(code)
+        with ent.lock:
+            self.stats["ticks"] += 1
+            if ent.keys and ent.keys[-1] == key:
+                b = ent.bars[-1]
+                b["high"] = max(b["high"], p)
+                b["low"] = min(b["low"], p)
+                b["close"] = p
+                b["volume"] += q
+                ent.acc.ingest_tick(key, p, q)
+                return
+        self._merge(ent, [{"time": key, "open": p, "high": p, "low": p, "close": p, "volume": q}])
+
+    def get_bars(self, code: str, n: int = 60) -> List[Dict[str, Any]]:
+        ent = self._codes.peek(code)
+        if ent is None:
+            return []
+        with ent.lock:
+            return [dict(b) for b in ent.bars[-max(0, int(n)):]]
+
+    def accumulator(self, code: str) -> MomentumAccumulator:
+        return self._entry(code).acc
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+momentum.py — 종목별 1분봉 스트리밍 누산기(VWAP / fast·slow MA / 박스·거래량 링버퍼)
+
+역할
+- 새 1분봉(또는 틱) 1개당 O(1)로 갱신: 누적 가격×거래량, 누적 거래량, fast/slow 종가 링버퍼 합
+- 같은 분(minute key)의 봉이 다시 들어오면 '진행 중 봉'으로 보고 기여분을 교체(수정)
+- 조회(vwap / momentum_pct / snapshot)는 I/O 없이 상수 시간(박스/체류비중은 keep 길이 상한)
+
+주의
+- 입력 봉은 시간 순서로 넣어야 합니다(과거 분 키는 무시).
+- close<=0 봉은 무시, volume<=0 봉은 VWAP 기여 0 (기존 _compute_vwap_from_1min 규칙과 동일).
+- 누산기 보관/갱신 주기는 상위(trader.py / minute_bars.py)가 담당합니다.
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class _RingSum:
+    """고정 길이 링버퍼 + 누적합. 마지막 원소 교체(revise)도 O(1)."""
+
+    __slots__ = ("buf", "total")
+
+    def __init__(self, size: int):
+        self.buf: Deque[float] = deque(maxlen=max(1, int(size)))
+        self.total = 0.0
+
+    def push(self, x: float) -> None:
+        if len(self.buf) == self.buf.maxlen:
+            self.total -= self.buf[0]
+        self.buf.append(x)
+        self.total += x
+
+    def revise_last(self, x: float) -> None:
+        if not self.buf:
+            self.push(x)
+            return
+        self.total += x - self.buf[-1]
+        self.buf[-1] = x
+
+    def __len__(self) -> int:
+        return len(self.buf)
+
+    def mean(self) -> Optional[float]:
+        n = len(self.buf)
+        return self.total / n if n else None
+
+
+class MomentumAccumulator:
+    __slots__ = (
+        "code", "fast", "slow", "keep",
+        "cum_pv", "cum_vol", "n_bars",
+        "last_key", "last_close", "last_high", "last_low", "last_vol",
+        "_fast", "_slow", "_closes", "_highs", "_lows", "_vols",
+        "updated_at",
+    )
+
+    def __init__(self, code: str = "", fast: int = 5, slow: int = 20, keep: int = 120):
+        self.code = code
+        self.fast = int(fast)
+        self.slow = int(slow)
+        self.keep = max(int(keep), self.fast, self.slow)
+        self.reset()
+
+    def reset(self) -> None:
+        self.cum_pv = 0.0
+        self.cum_vol = 0.0
+        self.n_bars = 0
+        self.last_key: Optional[str] = None
+        self.last_close = 0.0
+        self.last_high = 0.0
+        self.last_low = 0.0
+        self.last_vol = 0.0
+        self._fast = _RingSum(self.fast)
+        self._slow = _RingSum(self.slow)
+        self._closes: Deque[float] = deque(maxlen=self.keep)
+        self._highs: Deque[float] = deque(maxlen=self.keep)
+        self._lows: Deque[float] = deque(maxlen=self.keep)
+        self._vols = _RingSum(self.keep)
+        self.updated_at = 0.0
+
+    # ---------- 입력 ----------
+    def ingest_bar(
+        self,
+        key: str,
+        close: float,
+        volume: float,
+        high: Optional[float] = None,
+        low: Optional[float] = None,
+    ) -> bool:
+        """1분봉 1개 반영. key가 마지막 봉과 같으면 진행 중 봉 수정. 반영 여부 반환."""
+        try:
+            c = float(close or 0.0)
+            v = max(0.0, float(volume or 0.0))
+        except (TypeError, ValueError):
+            return False
+        if c <= 0:
+            return False
+        h = float(high) if high else c
+        l = float(low) if low else c
+        key = str(key)
+
+        if self.last_key is not None and key < self.last_key:
+            return False  # 과거 봉 무시
+
+        if self.last_key is not None and key == self.last_key and self.n_bars:
+            # 진행 중 봉 교체: 이전 기여분 제거 후 새 값 반영
+            self.cum_pv += c * v - self.last_close * self.last_vol
+            self.cum_vol += v - self.last_vol
+            self._fast.revise_last(c)
+            self._slow.revise_last(c)
+            self._closes[-1] = c
+            self._highs[-1] = h
+            self._lows[-1] = l
+            self._vols.revise_last(v)
+        else:
+            self.cum_pv += c * v
+            self.cum_vol += v
+            self._fast.push(c)
+            self._slow.push(c)
+            self._closes.append(c)
+            self._highs.append(h)
+            self._lows.append(l)
+            self._vols.push(v)
+            self.n_bars += 1
+            self.last_key = key
+
+        self.last_close, self.last_high, self.last_low, self.last_vol = c, h, l, v
+        return True
+
+    def ingest_tick(self, minute_key: str, price: float, qty: float) -> bool:
+        """체결 틱을 해당 분의 진행 중 봉에 합산(OHLC 갱신, 거래량 누적)."""
+        try:
+            p = float(price or 0.0)
+            q = max(0.0, float(qty or 0.0))
+        except (TypeError, ValueError):
+            return False
+        if p <= 0:
+            return False
+        if self.last_key is not None and str(minute_key) == self.last_key and self.n_bars:
+            return self.ingest_bar(
+                minute_key, p, self.last_vol + q,
+                high=max(self.last_high, p), low=min(self.last_low, p),
+            )
+        return self.ingest_bar(minute_key, p, q, high=p, low=p)
+
+    # ---------- 조회 ----------
+    @property
+    def vwap(self) -> Optional[float]:
+        if self.cum_vol <= 0:
+            return None
+        return self.cum_pv / self.cum_vol
+
+    @property
+    def momentum_pct(self) -> float:
+        """(fastMA - slowMA) / slowMA × 100. 봉 수가 max(fast, slow) 미만이면 0."""
+        if self.n_bars < max(self.fast, self.slow):
+            return 0.0
+        f = self._fast.mean()
+        s = self._slow.mean()
+        if not f or not s or s <= 0:
+            return 0.0
+        return (f - s) / s * 100.0
+
+    def is_strong(self, th_pct: float) -> bool:
+        vw = self.vwap
+        if not self.n_bars or vw is None or vw <= 0 or self.last_close <= 0:
+            return False
+        return self.last_close > vw and self.momentum_pct >= th_pct
+
+    def snapshot(self, box: int = 20, recent: int = 5) -> Dict[str, Any]:
+        """진입 판단용 요약(최근 keep개 봉 기준 박스/거래량/ VWAP 하회 비중 포함)."""
+        if not self.n_bars:
+            return {}
+        vw = self.vwap
+        n = len(self._closes)
+        highs = list(self._highs)[-box:]
+        lows = list(self._lows)[-box:]
+        out: Dict[str, Any] = {
+            "vwap": vw,
+            "last_close": self.last_close,
+            "last_high": self.last_high,
+            "last_low": self.last_low,
+            "bars": self.n_bars,
+            "box_high": max(highs) if highs else None,
+            "box_low": min(lows) if lows else None,
+            "momentum_pct": self.momentum_pct,
+        }
+        if len(self._vols) >= 10:
+            vols = self._vols.buf
+            recent_sum = sum(list(vols)[-recent:])
+            base_n = max(1, len(vols) - recent)
+            out["recent_vol"] = recent_sum / float(recent)
+            out["base_vol"] = (self._vols.total - recent_sum) / base_n
+        if vw:
+            below = sum(1 for c in self._closes if c < vw)
+            out["below_vwap_ratio"] = below / n if n else None
+        return out
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+order_manager.py — 지정가 주문 상태머신 + 백그라운드 체결 폴링/추격(정정) 워커
+
+역할
+- 주문 1건(의도, intent)을 ManagedOrder로 추적: submitted → partial → filled
+                                              ↘ replaced(정정 추격) ↘ cancelled / failed
+- 메인 루프는 submit_buy()로 최초 지정가 주문만 넣고 즉시 반환(대기/sleep 없음)
+- 워커 스레드가 poll_sec마다 당일 체결조회(inquire_daily_ccld) 1회로 모든 활성 주문을 갱신
+- chase_after_sec 동안 미체결 잔량이 남으면 최우선 매도호가 방향으로 chase_ticks 틱씩 정정
+  (기준가 대비 max_slippage_pct 상한, 최대 max_chase_steps회) → 상한/만료 시 잔량 취소
+- 종료된 주문은 drain_final()로 메인 루프에 전달 → 보유수량/거래로그 반영은 메인 스레드에서
+
+주의
+- KisAPI 호출(체결조회/정정/취소)은 워커 스레드에서만 수행합니다. 메인 루프는 상태만 읽습니다.
+- 체결조회가 계속 불가(모의투자 미지원 등)하면 unverified_after_sec 후 잔량 취소를 먼저 요청하고,
+  다음 폴링에서 unverified 상태로 종료합니다(체결수량 미상 — 체결로 간주하지 않고 실제 수량은 잔고 동기화가 확정).
+- qty는 가드 축소가 반영된 실제 주문수량, req_qty는 호출측이 요청(선반영)한 수량입니다.
+- 호가단위 함수(tick_size / round_to_tick)는 trader.py의 KRX 호가 유틸을 주입받습니다.
+"""
+from __future__ import annotations
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_SUBMITTED = "submitted"
+STATE_PARTIAL = "partial"
+STATE_FILLED = "filled"
+STATE_CANCELLED = "cancelled"
+STATE_REPLACED = "replaced"
+STATE_FAILED = "failed"
+STATE_UNVERIFIED = "unverified"  # 체결조회 불가로 종료(체결수량 미상)
+
+_FINAL_STATES = (STATE_FILLED, STATE_CANCELLED, STATE_FAILED, STATE_UNVERIFIED)
+
+
+def _odno_of(resp: Any) -> str:
+    if not isinstance(resp, dict):
+        return ""
+    out = resp.get("output") or {}
+    return str(out.get("ODNO") or out.get("ord_no") or out.get("order_no") or "").strip()
+
+
+def _orgno_of(resp: Any) -> str:
+    if not isinstance(resp, dict):
+        return ""
+    out = resp.get("output") or {}
+    return str(out.get("KRX_FWDG_ORD_ORGNO") or out.get("krx_fwdg_ord_orgno") or "").strip()
+
+
+class ManagedOrder:
+    __slots__ = (
+        "order_id", "code", "side", "qty", "req_qty", "base_price", "price",
+        "odno", "orgno", "legs", "filled_qty", "avg_price", "state",
+        "chase_steps", "errors", "cancel_requested", "cancel_at", "market",
+        "created_at", "priced_at", "updated_at", "verified", "tag", "note",
+        "history", "response",
+    )
+
+    def __init__(self, order_id: str, code: str, side: str, qty: int, price: int, resp: Dict[str, Any], tag: str = ""):
+        now = time.time()
+        self.order_id = order_id
+        self.code = code
+        self.side = side
+        self.qty = int(qty)
+        self.req_qty = int(qty)
+        self.base_price = int(price)
+        self.price = int(price)
+        self.odno = _odno_of(resp)
+        self.orgno = _orgno_of(resp)
+        self.legs: List[str] = [self.odno] if self.odno else []
+        self.filled_qty = 0
+        self.avg_price: Optional[float] = None
+        self.state = STATE_SUBMITTED
+        self.chase_steps = 0
+        self.errors = 0
+        self.cancel_requested = False
+        self.cancel_at = 0.0
+        self.market = False
+        self.created_at = now
+        self.priced_at = now
+        self.updated_at = now
+        self.verified = False
+        self.tag = tag
+        self.note = ""
+        self.history: List[tuple] = [(now, STATE_SUBMITTED, self.price)]
+        self.response = resp
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.qty - self.filled_qty)
+
+    @property
+    def is_final(self) -> bool:
+        return self.state in _FINAL_STATES
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            self.history.append((time.time(), state, self.price))
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "order_id": self.order_id,
+            "code": self.code,
+            "side": self.side,
+            "state": self.state,
+            "qty": self.qty,
+            "req_qty": self.req_qty,
+            "filled_qty": self.filled_qty,
+            "remaining": self.remaining,
+            "avg_price": self.avg_price,
+            "base_price": self.base_price,
+            "price": self.price,
+            "odno": self.odno,
+            "legs": list(self.legs),
+            "chase_steps": self.chase_steps,
+            "market": self.market,
+            "verified": self.verified,
+            "tag": self.tag,
+            "note": self.note,
+            "age_sec": round(time.time() - self.created_at, 1),
+            "history": [(round(t, 3), s, p) for t, s, p in self.history],
+            "response": self.response,
+        }
+
+
+class OrderManager:
+    def __init__(
+        self,
+        kis: Any,
+        tick_size: Callable[[float], int],
+        round_to_tick: Callable[..., int],
+        poll_sec: float = 1.0,
+        chase_after_sec: float = 3.0,
+        chase_ticks: int = 1,
+        max_slippage_pct: float = 0.5,
+        max_chase_steps: int = 5,
+        max_age_sec: float = 60.0,
+        market_fallback: bool = False,
+        unverified_after_sec: float = 30.0,
+    ):
+        self.kis = kis
+        self._tick = tick_size
+        self._round = round_to_tick
+        self.poll_sec = max(0.2, float(poll_sec))
+        self.chase_after_sec = float(chase_after_sec)
+        self.chase_ticks = max(1, int(chase_ticks))
+        self.max_slippage_pct = float(max_slippage_pct)
+        self.max_chase_steps = int(max_chase_steps)
+        self.max_age_sec = float(max_age_sec)
+        self.market_fallback = bool(market_fallback)
+        self.unverified_after_sec = float(unverified_after_sec)
+        self._orders: Dict[str, ManagedOrder] = {}
+        self._final_queue: List[Dict[str, Any]] = []
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {
+            "submitted": 0, "filled": 0, "partial_final": 0, "cancelled": 0, "failed": 0, "unverified": 0,
+            "replaces": 0, "cancels": 0, "market_fallbacks": 0, "polls": 0, "poll_errors": 0,
+        }
+
+    # ---------- 메인 스레드 ----------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-manager", daemon=True)
+        self._thread.start()
+
+    def submit_buy(self, code: str, qty: int, limit_price: int, tag: str = "") -> tuple:
+        """
+        가드형 지정가 매수 1회 제출 후 즉시 반환(체결 대기 없음).
+        반환: (ManagedOrder 또는 None, 주문 응답)
+        """
+        if hasattr(self.kis, "buy_stock_limit_guarded"):
+            resp = self.kis.buy_stock_limit_guarded(code, int(qty), int(limit_price))
+        else:
+            resp = self.kis.buy_stock_limit(code, int(qty), int(limit_price))
+        if not (isinstance(resp, dict) and resp.get("rt_cd") == "0"):
+            return None, resp
+        with self._lock:
+            self._seq += 1
+            oid = f"{code}-{int(time.time())}-{self._seq}"
+            order = ManagedOrder(oid, code, "BUY", int(qty), int(limit_price), resp, tag=tag)
+            self._orders[oid] = order
+            self.stats["submitted"] += 1
+        logger.info(f"[ORDER-MGR] submit {oid} {code} qty={qty} limit={limit_price} odno={order.odno}")
+        self.start()
+        self._wake.set()
+        return order, resp
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            o = self._orders.get(order_id)
+            return o.to_dict() if o else None
+
+    def active_codes(self) -> List[str]:
+        with self._lock:
+            return sorted({o.code for o in self._orders.values() if not o.is_final})
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [o.to_dict() for o in self._orders.values()]
+
+    def drain_final(self) -> List[Dict[str, Any]]:
+        """종료(filled/cancelled/failed)된 주문을 1회만 반환."""
+        with self._lock:
+            out, self._final_queue = self._final_queue, []
+        return out
+
+    def shutdown(self, cancel_open: bool = True, timeout: float = 10.0) -> None:
+        """워커 종료 → 미체결 잔량 취소(선택) → 호출 스레드에서 마지막 폴링으로 상태 확정."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(5.0, self.poll_sec * 2))
+        if cancel_open:
+            with self._lock:
+                active = [o for o in self._orders.values() if not o.is_final]
+            for o in active:
+                self._request_cancel(o, reason="shutdown")
+        deadline = time.time() + max(0.0, float(timeout))
+        while time.time() < deadline:
+            with self._lock:
+                pending = [o for o in self._orders.values() if not o.is_final]
+            if not pending:
+                break
+            self._poll_once(chase=False)
+            if any(not o.is_final for o in pending):
+                time.sleep(self.poll_sec)
+        with self._lock:
+            left = [o for o in self._orders.values() if not o.is_final]
+        for o in left:
+            if not o.verified:
+                self._finalize(o, STATE_UNVERIFIED, note="shutdown_unconfirmed")
+                continue
+            self._finalize(o, STATE_CANCELLED if o.filled_qty <= 0 else STATE_PARTIAL, note="shutdown_unconfirmed")
+        logger.info(f"[ORDER-MGR] shutdown stats={self.stats}")
+
+    # ---------- 워커 스레드 ----------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_sec)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._poll_once()
+            except Exception as e:
+                self.stats["poll_errors"] += 1
+                logger.warning(f"[ORDER-MGR] poll loop ex={e}")
+
+    def _poll_once(self, chase: bool = True) -> None:
+        with self._lock:
+            active = [o for o in self._orders.values() if not o.is_final]
+        if not active:
+            return
+        self.stats["polls"] += 1
+        book: Optional[Dict[str, Dict[str, Any]]] = None
+        if hasattr(self.kis, "inquire_daily_ccld"):
+            try:
+                book = self.kis.inquire_daily_ccld()
+            except Exception as e:
+                self.stats["poll_errors"] += 1
+                logger.debug(f"[ORDER-MGR] ccld fail: {e}")
+        for o in active:
+            try:
+                self._apply_book(o, book)
+                if chase and not o.is_final:
+                    self._maybe_chase(o)
+            except Exception as e:
+                o.errors += 1
+                logger.warning(f"[ORDER-MGR] update fail {o.order_id} ex={e}")
+
+    def _apply_book(self, o: ManagedOrder, book: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        now = time.time()
+        rows = [book[no] for no in o.legs if book and no in book]
+        if not rows:
+            if not o.verified and now - o.created_at >= self.unverified_after_sec:
+                # 체결조회 불가 → 살아있을 수 있는 지정가 잔량을 먼저 취소 요청하고 추적 유지
+                if not o.cancel_requested and o.odno and not o.market:
+                    self._request_cancel(o, reason="unverified")
+                    return
+                # 취소 요청 이후(성공/실패 무관) → 체결수량 미상으로 종료, 실제 보유는 잔고 동기화가 확정
+                self._finalize(o, STATE_UNVERIFIED, note="unverified")
+            return
+
+        with self._lock:
+            o.verified = True
+            first = book.get(o.legs[0]) if book else None
+            if first and first.get("ord_qty") and len(o.legs) == 1 and not o.market:
+                o.qty = int(first["ord_qty"])  # 가드에 의해 축소된 실제 주문수량
+            filled = sum(int(r.get("ccld_qty") or 0) for r in rows)
+            value = sum(int(r.get("ccld_qty") or 0) * float(r.get("avg_price") or 0.0) for r in rows)
+            o.filled_qty = min(filled, o.qty) if o.qty else filled
+            o.avg_price = (value / filled) if filled > 0 and value > 0 else o.avg_price
+            cur = book.get(o.odno) if (book and o.odno) else None
+
+        if o.filled_qty >= o.qty > 0:
+            self._finalize(o, STATE_FILLED)
+            return
+        leg_closed = bool(cur) and (cur.get("cancelled") or int(cur.get("rmn_qty") or 0) <= 0)
+        if o.cancel_requested and leg_closed:
+            if self.market_fallback and o.remaining > 0 and not o.market and o.note != "shutdown":
+                self._market_fallback(o)
+                return
+            self._finalize(o, STATE_CANCELLED if o.filled_qty <= 0 else STATE_PARTIAL)
+            return
+        if cur and cur.get("cancelled") and not o.cancel_requested:
+            # 외부(HTS 등)에서 취소된 주문
+            self._finalize(o, STATE_CANCELLED if o.filled_qty <= 0 else STATE_PARTIAL, note="external_cancel")
+            return
+        with self._lock:
+            o._set_state(STATE_PARTIAL if o.filled_qty > 0 else STATE_SUBMITTED)
+
+    def _maybe_chase(self, o: ManagedOrder) -> None:
+        now = time.time()
+        if o.market:
+            return
+        if o.cancel_requested:
+            if now - o.cancel_at >= max(5.0, self.poll_sec * 5):
+                self._request_cancel(o, reason="retry")
+            return
+        if now - o.priced_at < self.chase_after_sec:
+            return
+        if now - o.created_at >= self.max_age_sec or o.chase_steps >= self.max_chase_steps:
+            self._request_cancel(o, reason="expired" if o.chase_steps < self.max_chase_steps else "max_steps")
+            return
+
+        best = None
+        try:
+            best = self.kis.get_best_ask(o.code)
+        except Exception:
+            best = None
+        if best and best <= o.price:
+            # 이미 최우선 매도호가 이상 → 체결 대기
+            o.priced_at = now
+            return
+        step = self._round(o.price + self._tick(o.price) * self.chase_ticks, mode="up")
+        cap = self._round(o.base_price * (1.0 + self.max_slippage_pct / 100.0), mode="down")
+        new_price = min(step, cap)
+        if best:
+            new_price = min(new_price, self._round(best, mode="up"))
+        if new_price <= o.price:
+            self._request_cancel(o, reason="slippage_cap")
+            return
+
+        resp = None
+        try:
+            resp = self.kis.revise_cancel_order(o.odno, o.orgno, o.remaining, int(new_price), cancel=False)
+        except Exception as e:
+            logger.warning(f"[ORDER-MGR] revise ex {o.order_id}: {e}")
+        o.priced_at = now
+        if not (isinstance(resp, dict) and resp.get("rt_cd") == "0"):
+            o.errors += 1
+            if o.errors >= 3:
+                self._request_cancel(o, reason="revise_fail")
+            return
+        new_odno = _odno_of(resp)
+        with self._lock:
+            prev = o.price
+            o.price = int(new_price)
+            o.chase_steps += 1
+            if new_odno:
+                o.odno = new_odno
+                if new_odno not in o.legs:
+                    o.legs.append(new_odno)
+            o.orgno = _orgno_of(resp) or o.orgno
+            o._set_state(STATE_REPLACED)
+            self.stats["replaces"] += 1
+        logger.info(
+            f"[ORDER-MGR] chase {o.order_id} {o.code} {prev}→{o.price} "
+            f"step={o.chase_steps}/{self.max_chase_steps} remain={o.remaining} best_ask={best}"
+        )
+
+    def _request_cancel(self, o: ManagedOrder, reason: str) -> None:
+        if o.is_final or o.market or not o.odno:
+            return
+        resp = None
+        try:
+            resp = self.kis.revise_cancel_order(o.odno, o.orgno, o.remaining, 0, cancel=True)
+        except Exception as e:
+            logger.warning(f"[ORDER-MGR] cancel ex {o.order_id}: {e}")
+        with self._lock:
+            o.cancel_requested = True
+            o.cancel_at = time.time()
+            if reason == "shutdown":
+                o.note = "shutdown"
+            if isinstance(resp, dict) and resp.get("rt_cd") == "0":
+                self.stats["cancels"] += 1
+        logger.info(f"[ORDER-MGR] cancel {o.order_id} {o.code} reason={reason} remain={o.remaining} ok={bool(resp)}")
+
+    def _market_fallback(self, o: ManagedOrder) -> None:
+        qty = o.remaining
+        resp = None
+        try:
+            if hasattr(self.kis, "buy_stock_market_guarded"):
+                resp = self.kis.buy_stock_market_guarded(o.code, qty)
+            else:
+                resp = self.kis.buy_stock_market(o.code, qty)
+        except Exception as e:
+            logger.warning(f"[ORDER-MGR] market fallback ex {o.order_id}: {e}")
+        if not (isinstance(resp, dict) and resp.get("rt_cd") == "0"):
+            self._finalize(o, STATE_CANCELLED if o.filled_qty <= 0 else STATE_PARTIAL, note="market_fallback_fail")
+            return
+        with self._lock:
+            o.market = True
+            o.odno = _odno_of(resp)
+            if o.odno:
+                o.legs.append(o.odno)
+            o.priced_at = time.time()
+            o._set_state(STATE_REPLACED)
+            self.stats["market_fallbacks"] += 1
+        logger.info(f"[ORDER-MGR] market fallback {o.order_id} {o.code} qty={qty} odno={o.odno}")
+
+    def _finalize(self, o: ManagedOrder, state: str, note: str = "") -> None:
+        with self._lock:
+            if o.is_final:
+                return
+            if note:
+                o.note = note
+            # 부분체결 후 종료는 cancelled 상태(filled_qty>0)로 보고
+            final_state = STATE_CANCELLED if state == STATE_PARTIAL else state
+            o._set_state(final_state)
+            if final_state == STATE_FILLED:
+                self.stats["filled"] += 1
+            elif final_state == STATE_UNVERIFIED:
+                self.stats["unverified"] += 1
+            elif o.filled_qty > 0:
+                self.stats["partial_final"] += 1
+            elif final_state == STATE_CANCELLED:
+                self.stats["cancelled"] += 1
+            else:
+                self.stats["failed"] += 1
+            self._final_queue.append(o.to_dict())
+        logger.info(
+            f"[ORDER-MGR] final {o.order_id} {o.code} state={o.state} filled={o.filled_qty}/{o.qty} "
+            f"avg={o.avg_price} price={o.base_price}→{o.price} steps={o.chase_steps} note={o.note}"
+        )
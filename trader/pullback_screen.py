@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+pullback_screen.py — 코스닥 전 종목 눌림목 셋업 스크리너(로컬 일봉 패널 + 벡터화 스캔)
+
+역할
+- DailyPanel: 종목 × 거래일 2차원 배열(시/고/저/종가·거래량·거래대금)을 .npz 하나로 보관
+- refresh_panel(): pykrx 일자별 전 종목 시세(get_market_ohlcv_by_ticker, 1일 = 호출 1회)로 빠진 거래일만 채움
+  → 1,700종목 × 80일도 KIS 호출 없이 수십 회 호출로 갱신(야간 배치/장 시작 전 별도 단계: python -m trader.pullback_screen --refresh)
+- ensure_panel(allow_refresh=False): 장중/웜업 중 trader는 다운로드 없이 저장된 패널만 사용
+- scan_setups(): 신고가(lookback) → 연속 하락(pullback_days) 셋업을 패널 전체에 한 번에 판정
+  (trader._pullback_setup_from_series와 같은 규칙: 신고가 마지막 발생 위치, 신고가 이후로 한정한 연속 하락 길이,
+   반등 확인선 = max(마지막 고가, 종가) × (1+buffer))
+- 유동성 사전 필터(최근 liq_days 평균 거래대금, 최소 가격, 최근 거래정지 제외) 후 거래대금 순 shortlist
+- 스캔 시간/패널 메모리/스캔 중 최대 할당량을 stats로 보고 → 장중에는 shortlist만 실시간 시세 감시
+
+주의
+- 패널은 '완성된' 일봉만 담습니다(장중 실행 시 당일은 제외). 상장 이전 구간은 NaN입니다.
+- 거래일 판정은 실행 환경 시간대와 무관하게 Asia/Seoul 기준입니다.
+- 가격 0(거래정지 등)은 NaN으로 저장합니다. 거래량/거래대금은 0 그대로 둡니다.
+"""
+from __future__ import annotations
+import os
+import time
+import logging
+import argparse
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+KST = ZoneInfo("Asia/Seoul")
+DEFAULT_PANEL_PATH = Path(os.getenv("PULLBACK_PANEL_PATH") or (Path(__file__).parent / "data" / "kosdaq_daily_panel.npz"))
+_PRICE_FIELDS = ("open", "high", "low", "close")
+_ALL_FIELDS = _PRICE_FIELDS + ("volume", "value")
+_PYKRX_COLS = {"시가": "open", "고가": "high", "저가": "low", "종가": "close", "거래량": "volume", "거래대금": "value"}
+_SESSION_DONE_HHMM = "1600"  # 이 시각 이후면 당일 일봉을 완성으로 간주
+
+
+class DailyPanel:
+    __slots__ = ("codes", "dates", "open", "high", "low", "close", "volume", "value")
+
+    def __init__(self, codes: np.ndarray, dates: np.ndarray, arrays: Dict[str, np.ndarray]):
+        self.codes = codes
+        self.dates = dates
+        for f in _ALL_FIELDS:
+            setattr(self, f, arrays[f])
+
+    # ---------- 생성/저장 ----------
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> "DailyPanel":
+        """{YYYYMMDD: DataFrame(index=code, columns=open..value)} → 패널(날짜 오름차순)."""
+        dates = sorted(frames)
+        codes = sorted(set().union(*(frames[d].index for d in dates))) if dates else []
+        arrays: Dict[str, np.ndarray] = {}
+        for f in _ALL_FIELDS:
+            mat = pd.concat(
+                [frames[d][f].rename(d) for d in dates], axis=1
+            ).reindex(index=codes, columns=dates) if dates else pd.DataFrame()
+            arr = mat.to_numpy(dtype=np.float64) if dates else np.zeros((0, 0))
+            if f in _PRICE_FIELDS:
+                arr = np.where(arr > 0, arr, np.nan).astype(np.float32)
+            else:
+                arr = np.nan_to_num(arr, nan=0.0)
+            arrays[f] = arr
+        return cls(np.array(codes, dtype="U6"), np.array(dates, dtype="U8"), arrays)
+
+    def to_frames(self) -> Dict[str, pd.DataFrame]:
+        out: Dict[str, pd.DataFrame] = {}
+        for j, d in enumerate(self.dates):
+            df = pd.DataFrame({f: getattr(self, f)[:, j] for f in _ALL_FIELDS}, index=self.codes.astype(str))
+            out[str(d)] = df[df["close"].notna() | (df["volume"] > 0)]
+        return out
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["DailyPanel"]:
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                return cls(z["codes"], z["dates"], {f: z[f] for f in _ALL_FIELDS})
+        except Exception as e:
+            logger.warning(f"[PULLBACK-PANEL] 로드 실패({path}): {e}")
+            return None
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(tmp, codes=self.codes, dates=self.dates, **{f: getattr(self, f) for f in _ALL_FIELDS})
+        os.replace(tmp, path)
+
+    # ---------- 조회 ----------
+    @property
+    def shape(self) -> tuple:
+        return self.close.shape
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(getattr(self, f).nbytes for f in _ALL_FIELDS) + self.codes.nbytes + self.dates.nbytes)
+
+    @property
+    def last_date(self) -> Optional[str]:
+        return str(self.dates[-1]) if self.dates.size else None
+
+    def completed(self, today: str) -> "DailyPanel":
+        """마지막 열이 today면 제외(미완성 일봉)."""
+        if self.dates.size and str(self.dates[-1]) >= today:
+            keep = self.dates < today
+            return DailyPanel(self.codes, self.dates[keep], {f: getattr(self, f)[:, keep] for f in _ALL_FIELDS})
+        return self
+
+
+# ---------- 갱신 ----------
+def _fetch_kosdaq_day(date_str: str) -> Optional[pd.DataFrame]:
+    """pykrx 일자별 코스닥 전 종목 OHLCV(+거래대금). 휴장일이면 None."""
+    from pykrx.stock import get_market_ohlcv_by_ticker
+
+    df = get_market_ohlcv_by_ticker(date_str, market="KOSDAQ")
+    if df is None or len(df) == 0:
+        return None
+    df = df.rename(columns=_PYKRX_COLS)
+    if "close" not in df.columns or float(pd.to_numeric(df["close"], errors="coerce").fillna(0).sum()) <= 0:
+        return None  # 휴장일은 전 종목 0으로 내려오는 경우가 있음
+    df.index = df.index.astype(str).str.zfill(6)
+    for f in _ALL_FIELDS:
+        if f not in df.columns:
+            df[f] = 0.0
+    return df[list(_ALL_FIELDS)].apply(pd.to_numeric, errors="coerce")
+
+
+def last_completed_day(now: Optional[datetime] = None) -> str:
+    """완성 일봉 기준 마지막 평일(장 마감 후면 오늘, 아니면 직전 평일, KST). 공휴일은 갱신 시 건너뜀."""
+    now = now or datetime.now(KST)
+    if now.tzinfo is not None:
+        now = now.astimezone(KST)  # naive면 KST 시각으로 간주
+    d = now if now.strftime("%H%M") >= _SESSION_DONE_HHMM else now - timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d.strftime("%Y%m%d")
+
+
+def refresh_panel(
+    path: Path = DEFAULT_PANEL_PATH,
+    days: int = 80,
+    end_date: Optional[str] = None,
+    fetch: Optional[Callable[[str], Optional[pd.DataFrame]]] = None,
+    max_probe_days: Optional[int] = None,
+    sleep_sec: float = 0.2,
+) -> DailyPanel:
+    """
+    end_date(기본: 마지막 완성 거래일)부터 거꾸로 거래일 days개를 채움. 이미 저장된 날짜는 재조회하지 않음.
+    """
+    fetch = fetch or _fetch_kosdaq_day
+    end_date = end_date or last_completed_day()
+    old = DailyPanel.load(path)
+    frames = old.to_frames() if old is not None else {}
+    frames = {d: df for d, df in frames.items() if d <= end_date}
+
+    t0 = time.time()
+    fetched = 0
+    have = 0
+    probe = max_probe_days or int(days * 1.6) + 10
+    d = datetime.strptime(end_date, "%Y%m%d")
+    for _ in range(probe):
+        if have >= days:
+            break
+        ds = d.strftime("%Y%m%d")
+        d -= timedelta(days=1)
+        if datetime.strptime(ds, "%Y%m%d").weekday() >= 5:
+            continue
+        if ds in frames:
+            have += 1
+            continue
+        try:
+            df = fetch(ds)
+        except Exception as e:
+            logger.warning(f"[PULLBACK-PANEL] {ds} 조회 실패: {e}")
+            df = None
+        fetched += 1
+        if df is not None:
+            frames[ds] = df
+            have += 1
+        if sleep_sec > 0:
+            time.sleep(sleep_sec)
+
+    keep = sorted(frames)[-days:]
+    panel = DailyPanel.from_frames({k: frames[k] for k in keep})
+    panel.save(path)
+    logger.info(
+        f"[PULLBACK-PANEL] 갱신: {panel.shape[0]}종목 × {panel.shape[1]}일 (신규 조회 {fetched}일) "
+        f"{panel.nbytes / 1e6:.1f}MB {time.time() - t0:.1f}s → {path}"
+    )
+    return panel
+
+
+def ensure_panel(
+    path: Path = DEFAULT_PANEL_PATH,
+    days: int = 80,
+    now: Optional[datetime] = None,
+    allow_refresh: bool = True,
+) -> DailyPanel:
+    """
+    저장된 패널이 마지막 완성 거래일을 포함하지 않으면 빠진 날짜만 갱신.
+    allow_refresh=False(장중/웜업): 다운로드 없이 저장된 패널을 그대로 반환, 패널이 없으면 RuntimeError.
+    """
+    panel = DailyPanel.load(path)
+    want = last_completed_day(now)
+    if panel is not None and panel.last_date and panel.last_date >= want and panel.shape[1] >= days:
+        return panel
+    if not allow_refresh:
+        if panel is None:
+            raise RuntimeError(f"패널 없음({path}) — 장 시작 전 --refresh 단계 필요")
+        logger.warning(
+            f"[PULLBACK-PANEL] 갱신 금지 시간대 → 저장된 패널 사용(~{panel.last_date}, 필요 {want}, {panel.shape[1]}일)"
+        )
+        return panel
+    # 공휴일이면 want가 실제로 없을 수 있음 → 당일 1회만 재시도하도록 mtime으로 제한
+    if panel is not None and panel.shape[1] >= days:
+        try:
+            today = (now.astimezone(KST) if (now and now.tzinfo) else (now or datetime.now(KST))).strftime("%Y%m%d")
+            if datetime.fromtimestamp(Path(path).stat().st_mtime, KST).strftime("%Y%m%d") >= today:
+                return panel
+        except OSError:
+            pass
+    return refresh_panel(path, days=days, end_date=want)
+
+
+# ---------- 스캔 ----------
+@dataclass
+class ScreenResult:
+    shortlist: List[Dict[str, Any]]
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+def _trailing_true(mask: np.ndarray) -> np.ndarray:
+    """행별 끝에서부터 연속 True 개수."""
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+    rev = mask[:, ::-1]
+    first_false = np.argmin(rev, axis=1)
+    return np.where(rev.all(axis=1), mask.shape[1], first_false)
+
+
+def scan_setups(
+    panel: DailyPanel,
+    today: str,
+    lookback: int = 60,
+    pullback_days: int = 3,
+    buffer_pct: float = 0.2,
+    min_turnover: float = 1_000_000_000,
+    min_price: float = 1_000,
+    liq_days: int = 20,
+    halt_days: int = 5,
+    max_shortlist: int = 60,
+) -> ScreenResult:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    p = panel.completed(today)
+    n, t = p.shape
+    if n == 0 or t < pullback_days + 2:
+        tracemalloc.stop()
+        return ScreenResult([], {"codes": n, "days": t, "reason": "not_enough_days"})
+
+    close = p.close.astype(np.float64)
+    high = p.high.astype(np.float64)
+    valid_n = np.isfinite(close).sum(axis=1)
+
+    # lookback 구간 신고가와 마지막 발생 위치
+    w = min(lookback, t)
+    start = t - w
+    h = np.nan_to_num(high[:, start:], nan=0.0)
+    peak = h.max(axis=1)
+    peak_idx = start + (w - 1 - np.argmax(h[:, ::-1] == peak[:, None], axis=1))
+
+    # 마지막 일자에서 끝나는 종가 연속 하락 길이(신고가 이후로 한정)
+    cur, prev = close[:, 1:], close[:, :-1]
+    with np.errstate(invalid="ignore"):
+        dec = (cur < prev) & (cur > 0) & (prev > 0)
+    streak = np.minimum(_trailing_true(dec), (t - 1) - peak_idx)
+
+    last_hi = np.nan_to_num(high[:, -1], nan=0.0)
+    last_cl = np.nan_to_num(close[:, -1], nan=0.0)
+    reversal = np.maximum(last_hi, last_cl) * (1.0 + buffer_pct / 100.0)
+    setup = (valid_n >= pullback_days + 2) & (peak > 0) & (streak >= pullback_days) & (reversal > 0)
+
+    # 유동성: 최근 평균 거래대금 / 최소 가격 / 최근 거래정지(거래량 0) 제외
+    lw = min(liq_days, t)
+    turnover = p.value[:, -lw:].mean(axis=1)
+    halted = (p.volume[:, -min(halt_days, t):] <= 0).any(axis=1)
+    liquid = (turnover >= min_turnover) & (last_cl >= min_price) & ~halted
+
+    picked = np.flatnonzero(setup & liquid)
+    picked = picked[np.argsort(-turnover[picked], kind="stable")][: max(0, int(max_shortlist))]
+    scan_ms = (time.perf_counter() - t0) * 1000.0
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    shortlist = [
+        {
+            "code": str(p.codes[i]),
+            "reversal_price": float(reversal[i]),
+            "peak_price": float(peak[i]),
+            "peak_date": str(p.dates[peak_idx[i]]),
+            "last_down_date": str(p.dates[-1]),
+            "down_days": int(streak[i]),
+            "turnover": float(turnover[i]),
+        }
+        for i in picked
+    ]
+    stats = {
+        "codes": int(n),
+        "days": int(t),
+        "last_date": str(p.dates[-1]),
+        "liquid": int(liquid.sum()),
+        "setup": int(setup.sum()),
+        "setup_liquid": int((setup & liquid).sum()),
+        "shortlist": len(shortlist),
+        "scan_ms": round(scan_ms, 1),
+        "panel_mb": round(p.nbytes / 1e6, 2),
+        "scan_peak_mb": round(peak_alloc / 1e6, 2),
+    }
+    return ScreenResult(shortlist, stats)
+
+
+def _main() -> None:
+    ap = argparse.ArgumentParser(description="코스닥 전 종목 일봉 패널 갱신 / 눌림목 셋업 스캔")
+    ap.add_argument("--refresh", action="store_true", help="빠진 거래일 일봉을 pykrx로 채움(야간 배치)")
+    ap.add_argument("--days", type=int, default=int(os.getenv("PULLBACK_PANEL_DAYS", "80")))
+    ap.add_argument("--path", default=str(DEFAULT_PANEL_PATH))
+    ap.add_argument("--scan", action="store_true", help="셋업 스캔 결과 출력")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    path = Path(args.path)
+    panel = refresh_panel(path, days=args.days) if args.refresh else DailyPanel.load(path)
+    if panel is None:
+        logger.error(f"[PULLBACK-PANEL] 패널 없음: {path} (--refresh 먼저 실행)")
+        return
+    if args.scan:
+        res = scan_setups(panel, today=datetime.now(KST).strftime("%Y%m%d"))
+        logger.info(f"[PULLBACK-SCREEN] {res.stats}")
+        for row in res.shortlist:
+            logger.info(f"  {row}")
+
+
+if __name__ == "__main__":
+    _main()
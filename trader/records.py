@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+records.py — 보유 포지션(Position) / 매매 대상(Target) 고정 필드 레코드
+
+역할
+- Position: holding[code] 상태(수량/평단/TP/부분익절 플래그/눌림목 단계 수량 등) — __slots__ dataclass
+- Target: 리밸런싱 대상 1종목(코드/이름/K/목표가/수량/백테스트 지표/전일 OHLCV/챔피언 등급 등)
+- Target.from_raw(): 리밸런싱 API 응답의 한/영 별칭 키(종목명/name, 목표가/target_price, 매수수량/qty, K/k/best_k …)를
+  적재 시점에 1회만 정규 필드로 해석 → 장중 루프에서는 속성으로 바로 접근
+- to_dict() / from_dict() / json_default(): 상태 파일(trader_state.json) 직렬화/복원
+
+주의
+- 기존 호출부 호환을 위해 dict 스타일 접근(rec["qty"], rec.get("k_value"), rec["매수수량"] = n)을 지원합니다.
+  정의되지 않은 키는 extra dict에 보관되어 저장/복원 시 그대로 유지됩니다.
+- get()은 정규 필드 값이 None이면 '키 없음'과 같이 default를 돌려줍니다(기존 dict에서 키 미설정과 동일 동작).
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field, fields
+from typing import Any, ClassVar, Dict, FrozenSet, Mapping, Optional, Tuple
+
+
+class _DictCompat:
+    """정규 필드 + extra dict 위에 얹은 최소 dict 인터페이스."""
+
+    __slots__ = ()
+    _FIELDS: ClassVar[Tuple[str, ...]] = ()
+    _FIELD_SET: ClassVar[FrozenSet[str]] = frozenset()
+    _ALIASES: ClassVar[Dict[str, str]] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        k = self._ALIASES.get(key, key)
+        if k in self._FIELD_SET:
+            return getattr(self, k)
+        return self.extra[k]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        k = self._ALIASES.get(key, key)
+        if k in self._FIELD_SET:
+            setattr(self, k, value)
+        else:
+            self.extra[k] = value
+
+    def __contains__(self, key: object) -> bool:
+        k = self._ALIASES.get(key, key)  # type: ignore[arg-type]
+        return k in self._FIELD_SET or k in self.extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        k = self._ALIASES.get(key, key)
+        if k in self._FIELD_SET:
+            v = getattr(self, k)
+            return default if v is None else v
+        return self.extra.get(k, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {k: getattr(self, k) for k in self._FIELDS}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]):
+        kwargs: Dict[str, Any] = {}
+        extra: Dict[str, Any] = {}
+        for key, value in data.items():
+            k = cls._ALIASES.get(key, key)
+            if k in cls._FIELD_SET:
+                kwargs.setdefault(k, value)
+            else:
+                extra[k] = value
+        return cls(**kwargs, extra=extra)
+
+
+def _bind_fields(cls):
+    names = tuple(f.name for f in fields(cls) if f.name != "extra")
+    cls._FIELDS = names
+    cls._FIELD_SET = frozenset(names)
+    return cls
+
+
+@_bind_fields
+@dataclass(slots=True, eq=False)
+class Position(_DictCompat):
+    qty: int = 0
+    buy_price: float = 0.0
+    entry_time: Optional[str] = None
+    high: float = 0.0
+    tp1: float = 0.0
+    tp2: float = 0.0
+    sold_p1: bool = False
+    sold_p2: bool = False
+    trail_pct: Optional[float] = None
+    atr: Optional[float] = None
+    stop_abs: Optional[float] = None
+    k_value: Any = None
+    target_price_src: Optional[float] = None
+    bear_s1_done: bool = False
+    bear_s2_done: bool = False
+    # 눌림목 3단계 진입
+    entry_stage: int = 1
+    max_price_after_entry: Optional[float] = None
+    planned_total_qty: int = 0
+    stage1_qty: int = 0
+    stage2_qty: int = 0
+    stage3_qty: int = 0
+    pullback_peak_price: Optional[float] = None
+    pullback_reversal_price: Optional[float] = None
+    name: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+@_bind_fields
+@dataclass(slots=True, eq=False)
+class Target(_DictCompat):
+    _ALIASES: ClassVar[Dict[str, str]] = {
+        "stock_code": "code",
+        "종목명": "name",
+        "K": "best_k",
+        "k": "best_k",
+        "목표가": "target_price",
+        "매수수량": "qty",
+    }
+
+    code: str = ""
+    name: Optional[str] = None
+    best_k: Any = None
+    target_price: Optional[float] = None
+    qty: int = 0
+    strategy: str = "전월 rolling K 최적화"
+    avg_return_pct: float = 0.0
+    win_rate_pct: float = 0.0
+    mdd_pct: float = 0.0
+    trades: int = 0
+    sharpe_m: float = 0.0
+    cumulative_return_pct: float = 0.0
+    prev_open: Any = None
+    prev_high: Any = None
+    prev_low: Any = None
+    prev_close: Any = None
+    prev_volume: Any = None
+    # 챔피언 선정/레짐 배분 단계에서 채움
+    champion_grade: Optional[str] = None
+    composite_score: Optional[float] = None
+    regime_weight: Optional[float] = None
+    capital_active: Optional[int] = None
+    target_notional: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_raw(cls, t: Mapping[str, Any]) -> Optional["Target"]:
+        """
+        리밸런싱 API 항목 1건 → Target (별칭 키 해석은 여기서 1회만). 코드가 없으면 None.
+        weight→qty 환산처럼 시세가 필요한 후처리는 호출부 책임입니다.
+        """
+        code = t.get("stock_code") or t.get("code")
+        if not code:
+            return None
+        return cls(
+            code=str(code),
+            name=t.get("name") or t.get("종목명"),
+            best_k=t.get("best_k") or t.get("K") or t.get("k"),
+            target_price=_to_float(t.get("목표가") or t.get("target_price"), None),
+            qty=_to_int(t.get("매수수량") or t.get("qty")),
+            strategy=t.get("strategy") or "전월 rolling K 최적화",
+            avg_return_pct=_to_float(t.get("avg_return_pct") or t.get("수익률(%)"), 0.0),
+            win_rate_pct=_to_float(t.get("win_rate_pct") or t.get("승률(%)"), 0.0),
+            mdd_pct=_to_float(t.get("mdd_pct") or t.get("MDD(%)"), 0.0),
+            trades=_to_int(t.get("trades")),
+            sharpe_m=_to_float(t.get("sharpe_m"), 0.0),
+            cumulative_return_pct=_to_float(t.get("cumulative_return_pct") or t.get("수익률(%)"), 0.0),
+            prev_open=t.get("prev_open"),
+            prev_high=t.get("prev_high"),
+            prev_low=t.get("prev_low"),
+            prev_close=t.get("prev_close"),
+            prev_volume=t.get("prev_volume"),
+        )
+
+
+def json_default(obj: Any) -> Any:
+    """json.dumps(default=...) 훅: 레코드 → dict."""
+    if isinstance(obj, _DictCompat):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _to_int(val: Any, default: int = 0) -> int:
+    try:
+        return int(float(val))
+    except Exception:
+        return default
+
+
+def _to_float(val: Any, default: Optional[float]) -> Optional[float]:
+    try:
+        return float(val)
+    except Exception:
+        return default
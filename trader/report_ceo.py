@@ -29,7 +29,7 @@ LOG_DIR.mkdir(exist_ok=True)
 class TradeRow:
     dt: datetime
     code: str
-    side: str                 # BUY / SELL
+    side: str                 # BUY / SELL / BUY_FILL(주문관리자 최종 체결 보정)
     qty: int
     price: Optional[float]    # 'price' or 'fill_price'
     order_price: Optional[float]
@@ -138,7 +138,7 @@ def _collect_trade_rows(start_dt_kst: datetime, end_dt_kst: datetime) -> List[Tr
                             continue
 
                         side = str(rec.get("side") or "").upper()
-                        if side not in ("BUY", "SELL"):
+                        if side not in ("BUY", "SELL", "BUY_FILL"):
                             continue
 
                         code = str(rec.get("code") or "").strip()
@@ -175,17 +175,22 @@ def _aggregate(rows: List[TradeRow]) -> Tuple[SummaryAgg, Dict[str, CodeAgg]]:
     pnl_pct_count = 0
 
     for r in rows:
+        ca = by_code.get(r.code)
+        if ca is None:
+            ca = CodeAgg(code=r.code, name=r.name)
+            by_code[r.code] = ca
+
+        # BUY_FILL: 제출 시점 BUY 로그에 대한 수량 보정 레코드 → 건수에는 넣지 않는다
+        if r.side == "BUY_FILL":
+            ca.buy_qty = max(0, ca.buy_qty + _to_int((r.raw or {}).get("qty_delta")))
+            continue
+
         summ.n_trades += 1
         if r.side == "BUY":
             summ.n_buy += 1
         elif r.side == "SELL":
             summ.n_sell += 1
 
-        ca = by_code.get(r.code)
-        if ca is None:
-            ca = CodeAgg(code=r.code, name=r.name)
-            by_code[r.code] = ca
-
         if r.side == "BUY":
             ca.buy_qty += max(0, r.qty)
         else:
@@ -346,7 +351,8 @@ def ceo_report(base_dt_kst: Optional[datetime] = None, period: str = "daily") ->
     md_lines.append("## 거래 상세 (최근 순)")
     if rows:
         rows_d = [["시간", "코드", "종목명", "Side", "수량", "체결가", "손익(원)", "사유"]]
-        for r in reversed(rows[-200:]):  # 너무 길어지는 걸 방지: 최근 200건만
+        trade_rows = [r for r in rows if r.side != "BUY_FILL"]
+        for r in reversed(trade_rows[-200:]):  # 너무 길어지는 걸 방지: 최근 200건만
             rows_d.append([
                 r.dt.strftime("%Y-%m-%d %H:%M:%S"),
                 r.code,
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+runtime_async.py — 장중 세션을 작업(task)별 독립 주기로 동시에 돌리는 asyncio 런타임
+
+역할
+- TaskSpec(name, fn, interval_sec, gate)마다 asyncio 태스크 1개: gate() 통과 시 fn 실행 → interval_sec 대기 반복
+  (예: 청산 1초 / 챔피언 진입 1초 / 눌림목 10초 / 잔고 15초 → 느린 스캔이 청산을 막지 않음)
+- fn은 블로킹(KisAPI 동기 호출)이므로 공용 ThreadPoolExecutor에서 실행(run_in_executor)
+- stop_at()이 True가 되면 CutoffReached로 TaskGroup 전체를 취소 → stop_event 설정 → 실행 중 작업 완료까지 대기
+- 작업별 실행 횟수/오류/소요시간(평균·최대)을 log_sec 주기로 [TASK-TIMING] 로그
+- on_run(name, elapsed_sec): 작업 1회 완료마다 호출(지연 워치독 연동)
+
+주의
+- 작업 하나의 예외는 로그만 남기고 다음 주기에 재시도합니다(세션 전체를 멈추지 않음).
+- 같은 종목 동시 주문 방지(claim/release), KIS 유량 제한(kis_wrapper 토큰버킷)은 호출부/래퍼 책임입니다.
+- 취소는 '다음 대기 지점'에서 일어납니다. 이미 스레드에서 실행 중인 fn은 stop_event를 보고 스스로 빠져나와야 합니다.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CutoffReached(Exception):
+    """stop_at() 조건 도달 → 세션 종료 신호."""
+
+
+class TaskSpec:
+    __slots__ = ("name", "fn", "interval_sec", "gate")
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval_sec: float,
+        gate: Optional[Callable[[], bool]] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval_sec = max(0.05, float(interval_sec))
+        self.gate = gate
+
+
+class TaskStats:
+    __slots__ = ("runs", "errors", "skipped", "total_sec", "max_sec", "last_sec")
+
+    def __init__(self):
+        self.runs = 0
+        self.errors = 0
+        self.skipped = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+        self.last_sec = 0.0
+
+    def record(self, elapsed: float) -> None:
+        self.runs += 1
+        self.total_sec += elapsed
+        self.last_sec = elapsed
+        if elapsed > self.max_sec:
+            self.max_sec = elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "avg_ms": round(self.total_sec / self.runs * 1000.0, 1) if self.runs else 0.0,
+            "max_ms": round(self.max_sec * 1000.0, 1),
+            "last_ms": round(self.last_sec * 1000.0, 1),
+        }
+
+
+class AsyncRuntime:
+    def __init__(
+        self,
+        specs: List[TaskSpec],
+        stop_at: Callable[[], bool],
+        stop_event: Optional[threading.Event] = None,
+        max_workers: int = 4,
+        log_sec: float = 60.0,
+        check_sec: float = 1.0,
+        on_run: Optional[Callable[[str, float], Any]] = None,
+    ):
+        self.specs = list(specs)
+        self.stop_at = stop_at
+        self.stop_event = stop_event or threading.Event()
+        self.max_workers = max(1, int(max_workers))
+        self.log_sec = float(log_sec)
+        self.check_sec = max(0.05, float(check_sec))
+        self.on_run = on_run
+        self.stats: Dict[str, TaskStats] = {s.name: TaskStats() for s in self.specs}
+        self.cutoff = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ---------- 실행 ----------
+    def run(self) -> bool:
+        """세션 실행(블로킹). stop_at() 도달로 끝났으면 True."""
+        asyncio.run(self._main())
+        return self.cutoff
+
+    async def _main(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="trader-task")
+        logger.info(
+            f"[ASYNC] 세션 시작: tasks={[s.name for s in self.specs]} workers={self.max_workers}"
+        )
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for spec in self.specs:
+                    tg.create_task(self._run_task(spec), name=spec.name)
+                tg.create_task(self._watch_stop(), name="stop-watch")
+                if self.log_sec > 0:
+                    tg.create_task(self._log_loop(), name="timing-log")
+        except* CutoffReached:
+            self.cutoff = True
+            logger.info("[ASYNC] 종료 조건 도달 → 모든 작업 취소")
+        finally:
+            self.stop_event.set()
+            # 실행 중인 fn(스레드)은 취소되지 않으므로 끝날 때까지 대기
+            self._executor.shutdown(wait=True)
+            self.log_timing()
+
+    async def _run_task(self, spec: TaskSpec) -> None:
+        loop = asyncio.get_running_loop()
+        st = self.stats[spec.name]
+        while not self.stop_event.is_set():
+            if spec.gate is None or spec.gate():
+                t0 = time.perf_counter()
+                try:
+                    await loop.run_in_executor(self._executor, spec.fn)
+                except Exception as e:
+                    st.errors += 1
+                    logger.error(f"[TASK-FAIL] {spec.name}: {e}")
+                elapsed = time.perf_counter() - t0
+                st.record(elapsed)
+                if self.on_run is not None:
+                    try:
+                        self.on_run(spec.name, elapsed)
+                    except Exception as e:
+                        logger.debug(f"[ASYNC] on_run 콜백 실패: {e}")
+            else:
+                st.skipped += 1
+            await asyncio.sleep(spec.interval_sec)
+
+    async def _watch_stop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                done = await loop.run_in_executor(None, self.stop_at)
+            except Exception as e:
+                logger.warning(f"[ASYNC] 종료 조건 확인 실패: {e}")
+                done = False
+            if done or self.stop_event.is_set():
+                raise CutoffReached()
+            await asyncio.sleep(self.check_sec)
+
+    async def _log_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.log_sec)
+            self.log_timing()
+
+    # ---------- 통계 ----------
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: st.to_dict() for name, st in self.stats.items()}
+
+    def log_timing(self) -> None:
+        for name, st in self.snapshot().items():
+            logger.info(
+                f"[TASK-TIMING] {name}: runs={st['runs']} avg={st['avg_ms']}ms max={st['max_ms']}ms "
+                f"last={st['last_ms']}ms err={st['errors']} skip={st['skipped']}"
+            )
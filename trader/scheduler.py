@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+scheduler.py — 메인 루프 작업별 주기(cadence) 스케줄러
+
+역할
+- 작업(task)마다 실행 주기를 따로 둔다: 예) 잔고 동기화 15초, 눌림목 스캔 10초, 레짐 10초
+- 키 단위 주기(due_key/done_key): 보유 종목별 청산 평가를 '근접=매 틱 / 일반=N초'로 분리
+- trigger(name): 주문 직후 잔고 동기화처럼 다음 패스에서 즉시 실행되도록 표시
+- urgent_due(): 긴급(청산 근접) 작업이 밀려 있는지 → 일반 작업 루프 중간에 선점 처리용
+- sleep(): 고정 대기 대신 '다음 작업 도래 시각'까지만 대기(긴급 작업이 있으면 tick_sec)
+
+주의
+- 작업 실행은 호출부 책임인 순수 시간 관리 객체입니다. 내부 상태는 RLock으로 보호되어
+  async 런타임(runtime_async.py)의 여러 작업 스레드에서 동시에 호출해도 됩니다.
+- 시각은 time.monotonic() 기준입니다.
+"""
+from __future__ import annotations
+import time
+import logging
+import threading
+from typing import Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Task:
+    __slots__ = ("name", "interval", "urgent", "last_run", "forced", "runs")
+
+    def __init__(self, name: str, interval: float, urgent: bool = False):
+        self.name = name
+        self.interval = float(interval)
+        self.urgent = bool(urgent)
+        self.last_run = 0.0
+        self.forced = True  # 최초 패스에서는 즉시 실행
+        self.runs = 0
+
+
+class LoopScheduler:
+    def __init__(self, tick_sec: float = 1.0, idle_sec: float = 2.5):
+        self.tick_sec = max(0.05, float(tick_sec))
+        self.idle_sec = max(self.tick_sec, float(idle_sec))
+        self._tasks: Dict[str, _Task] = {}
+        self._keys: Dict[Tuple[str, Hashable], Tuple[float, float]] = {}  # (task,key) -> (last_run, interval)
+        self._urgent_keys: Dict[Tuple[str, Hashable], bool] = {}
+        self._wake = threading.Event()
+        self._lock = threading.RLock()
+        self.stats: Dict[str, int] = {"sleeps": 0, "woken": 0, "preempts": 0}
+
+    # ---------- 등록/설정 ----------
+    def add(self, name: str, interval_sec: float, urgent: bool = False) -> None:
+        with self._lock:
+            t = self._tasks.get(name)
+            if t is None:
+                self._tasks[name] = _Task(name, interval_sec, urgent)
+            else:
+                t.interval = float(interval_sec)
+                t.urgent = bool(urgent)
+
+    def set_interval(self, name: str, interval_sec: float) -> None:
+        with self._lock:
+            t = self._tasks.get(name)
+            if t is not None:
+                t.interval = float(interval_sec)
+
+    def interval(self, name: str) -> Optional[float]:
+        with self._lock:
+            t = self._tasks.get(name)
+            return None if t is None else t.interval
+
+    # ---------- 작업 단위 ----------
+    def due(self, name: str, now: Optional[float] = None) -> bool:
+        with self._lock:
+            t = self._tasks.get(name)
+            if t is None:
+                return True
+            if t.forced:
+                return True
+            now = time.monotonic() if now is None else now
+            return now - t.last_run >= t.interval
+
+    def done(self, name: str, now: Optional[float] = None) -> None:
+        with self._lock:
+            t = self._tasks.get(name)
+            if t is None:
+                return
+            t.last_run = time.monotonic() if now is None else now
+            t.forced = False
+            t.runs += 1
+
+    def trigger(self, name: str) -> None:
+        """다음 확인 시 즉시 due가 되도록 표시(대기 중이면 깨움)."""
+        with self._lock:
+            t = self._tasks.get(name)
+            if t is not None:
+                t.forced = True
+            self._wake.set()
+
+    # ---------- 키 단위(종목별) ----------
+    def due_key(self, name: str, key: Hashable, interval_sec: float, urgent: bool = False) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            k = (name, key)
+            last, _ = self._keys.get(k, (0.0, interval_sec))
+            self._keys[k] = (last, float(interval_sec))
+            if urgent:
+                self._urgent_keys[k] = True
+            else:
+                self._urgent_keys.pop(k, None)
+            return now - last >= interval_sec
+
+    def done_key(self, name: str, key: Hashable) -> None:
+        with self._lock:
+            k = (name, key)
+            _, interval = self._keys.get(k, (0.0, self.idle_sec))
+            self._keys[k] = (time.monotonic(), interval)
+
+    def forget_key(self, name: str, key: Hashable) -> None:
+        with self._lock:
+            self._keys.pop((name, key), None)
+            self._urgent_keys.pop((name, key), None)
+
+    def urgent_due(self) -> bool:
+        """긴급 키(청산 근접 종목 등) 중 주기가 도래한 것이 있으면 True."""
+        with self._lock:
+            now = time.monotonic()
+            for k in self._urgent_keys:
+                last, interval = self._keys.get(k, (0.0, self.tick_sec))
+                if now - last >= interval:
+                    self.stats["preempts"] += 1
+                    return True
+            return False
+
+    # ---------- 대기 ----------
+    def next_wait(self) -> float:
+        """가장 먼저 도래하는 작업/키까지 남은 시간(tick_sec ~ idle_sec로 제한)."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self.idle_sec
+            for t in self._tasks.values():
+                if t.forced:
+                    return self.tick_sec
+                wait = min(wait, t.last_run + t.interval - now)
+            for last, interval in self._keys.values():
+                wait = min(wait, last + interval - now)
+            return max(self.tick_sec, min(self.idle_sec, wait))
+
+    def sleep(self, max_sec: Optional[float] = None) -> float:
+        wait = self.next_wait()
+        if max_sec is not None:
+            wait = min(wait, max(0.0, float(max_sec)))
+        self.stats["sleeps"] += 1
+        if self._wake.wait(wait):
+            self.stats["woken"] += 1
+        self._wake.clear()
+        return wait
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                name: {
+                    "interval": t.interval,
+                    "urgent": t.urgent,
+                    "runs": t.runs,
+                    "age": round(now - t.last_run, 2) if t.last_run else None,
+                }
+                for name, t in self._tasks.items()
+            }
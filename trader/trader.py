@@ -3,7 +3,7 @@
 
 import logging
 import requests
-from .kis_wrapper import KisAPI, append_fill
+from .kis_wrapper import KisAPI, append_fill, request_count
 from datetime import datetime, time as dtime, timedelta
 from zoneinfo import ZoneInfo
 import json
@@ -11,11 +11,26 @@ from pathlib import Path
 import time
 import os
 import random
-from typing import Optional, Dict, Any, Tuple, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple, List, Callable
 import csv
 from .report_ceo import ceo_report
 from .metrics import vwap_guard   # 🔸 VWAP 가드 함수
-from rolling_k_auto_trade_api.best_k_meta_strategy import get_kosdaq_top_n
+from . import event_writer       # 🔸 거래로그/체결 비동기 기록기
+from .candles import CandleSeries  # 🔸 일봉 컬럼형 시계열(지표 캐시)
+from . import cache              # 🔸 이름 있는 캐시 영역(TTL/LRU/통계)
+from .momentum import MomentumAccumulator  # 🔸 1분봉 스트리밍 VWAP/모멘텀 누산기
+from .minute_bars import MinuteBarStore    # 🔸 종목별 당일 1분봉 저장소
+from .order_manager import OrderManager    # 🔸 지정가 주문 상태머신/추격 워커
+from .scheduler import LoopScheduler       # 🔸 작업별 주기 스케줄러(청산 근접 종목 우선)
+from .runtime_async import AsyncRuntime, TaskSpec  # 🔸 작업별 독립 태스크 런타임(TRADER_RUNTIME=async)
+from .loop_profiler import LoopProfiler    # 🔸 단계별/종목별 소요시간 계측 + 느린 패스 프로파일
+from .watchdog import LatencyWatchdog, LEVEL_WIDEN_TTL  # 🔸 루프 지연 예산 감시 + 단계적 부하 차단
+from .champion_select import select_champions  # 🔸 챔피언 필터/등급/종합점수 벡터화 단계
+from . import pullback_screen               # 🔸 코스닥 전 종목 눌림목 셋업 스크리너(로컬 일봉 패널)
+from .records import Position, Target, json_default  # 🔸 포지션/대상 고정 필드 레코드(__slots__)
+from rolling_k_auto_trade_api.universe import get_universe  # 🔸 영업일 유니버스 스냅샷(Top-N/종목명, 장중 다운로드 없음)
 
 # =========================
 # [CONFIG] .env 없이도 동작
@@ -67,6 +82,13 @@ CONFIG = {
     "PULLBACK_REVERSAL_BUFFER_PCT": "0.2", # 되돌림 확인 여유(%): 직전 하락일 고가 대비 여유율
     "PULLBACK_TOPN": "50",                 # 눌림목 스캔용 코스닥 시총 상위 종목 수
     "PULLBACK_UNIT_WEIGHT": "0.03",        # 눌림목 매수 1건당 자본 배분(활성 자본 비율)
+    # 눌림목 유니버스: kosdaq=전 종목 로컬 일봉 패널 스크리닝 후 shortlist만 감시 / topn=시총 상위 PULLBACK_TOPN
+    "PULLBACK_UNIVERSE": "kosdaq",
+    "PULLBACK_PANEL_DAYS": "80",           # 로컬 일봉 패널 보관 거래일 수(lookback + 여유)
+    "PULLBACK_MIN_TURNOVER": "1000000000", # 최근 20일 평균 거래대금 하한(원)
+    "PULLBACK_MIN_PRICE": "1000",
+    "PULLBACK_SHORTLIST_MAX": "60",        # 장중 실시간 감시 종목 수 상한(거래대금 순)
+    "PULLBACK_SETUP_RETRY_MAX": "3",       # 일봉 조회 실패로 셋업 미평가인 종목의 평가 시도 상한(사전 평가 포함, 초과 시 당일 제외)
     # 챔피언 후보 필터
     "CHAMPION_MIN_TRADES": "5",            # 최소 거래수
     "CHAMPION_MIN_WINRATE": "45.0",        # 최소 승률(%)
@@ -79,6 +101,65 @@ CONFIG = {
     "MOM_FAST": "5",        # 1분봉 fast MA 길이
     "MOM_SLOW": "20",       # 1분봉 slow MA 길이
     "MOM_TH_PCT": "0.5",    # fast/slow 괴리 임계값(%) – 0.5% 이상이면 강세로 본다
+    "MOM_REFRESH_SEC": "20", # 종목별 1분봉 누산기 갱신 최소 간격(초) — 사이 구간은 I/O 없이 누산기만 조회
+    # 캐시 통계 로그 주기(초) — [CACHE-STATS]
+    "CACHE_STATS_LOG_SEC": "300",
+    # 캐시 통계 export 주기(초) — API /cache/stats가 읽는 JSON(CACHE_STATS_PATH, 기본 trader/logs/cache_stats.json)
+    "CACHE_STATS_EXPORT_SEC": "30",
+    # 장 시작 전 워밍업(토큰/연결/일봉·ATR/코드포맷 사전 준비) 구간
+    "WARMUP_ENABLE": "true",
+    "WARMUP_START": "08:30",
+    "WARMUP_END": "08:59",
+    "MARKET_OPEN_TIME": "09:00",
+    # 지정가 매수 주문관리(백그라운드 체결 폴링 + 정정 추격) — false면 기존 동기식(2초 대기) 경로
+    "ORDER_MANAGER_ENABLE": "true",
+    "ORDER_POLL_SEC": "1.0",            # 체결조회 주기(초)
+    "ORDER_CHASE_AFTER_SEC": "3.0",     # 가격 유지 후 미체결이면 정정
+    "ORDER_CHASE_TICKS": "1",           # 정정 1회당 상향 틱 수(최우선 매도호가 초과 금지)
+    "ORDER_MAX_SLIPPAGE_PCT": "0.5",    # 최초 지정가 대비 정정 상한(%)
+    "ORDER_CHASE_MAX_STEPS": "5",
+    "ORDER_MAX_AGE_SEC": "60",          # 초과 시 잔량 취소
+    "ORDER_MARKET_FALLBACK": "false",   # 잔량 취소 후 시장가 재주문 여부
+    # 메인 루프 작업별 주기(초) — 고정 2.5초 대기 대신 다음 도래 작업까지만 대기
+    "SCHED_TICK_SEC": "1.0",            # 최소 대기/청산 근접 종목 평가 주기
+    "SCHED_IDLE_SEC": "2.5",            # 최대 대기
+    "EXIT_CHECK_SEC": "5",              # 손절/트레일링 선에서 먼 보유 종목 평가 주기
+    "EXIT_NEAR_PCT": "1.0",             # 손절/익절/스톱 선까지 이 거리(%p) 이내면 '근접' → 매 틱 평가
+    "ENTRY_CHECK_SEC": "2.5",           # 미체결 챔피언 진입 평가 주기
+    "PULLBACK_SCAN_SEC": "10",          # 눌림목 스캔 주기
+    "BALANCE_SYNC_SEC": "15",           # 잔고 동기화 주기(주문 직후에는 즉시)
+    "REGIME_CHECK_SEC": "10",           # 레짐 스냅샷 주기(지수 가격 변동 시에만 재판정)
+    "CLOSED_MAX_SLEEP_SEC": "1800",     # 장 마감(장후/주말) 대기 상한
+    # 장중 런타임: sync=단일 루프(기본) / async=작업별 독립 태스크(runtime_async.py)
+    "TRADER_RUNTIME": "sync",
+    "ASYNC_MAX_WORKERS": "4",           # 작업 실행 스레드 수(KIS 호출 동시성 상한)
+    "ASYNC_TIMING_LOG_SEC": "60",       # [TASK-TIMING] 로그 주기
+    # 루프 계측: 단계별 소요시간/KIS 호출/캐시 hit → [LOOP-TIMING], logs/loop_timing_YYYYMMDD.jsonl
+    "LOOP_TIMING_LOG_SEC": "60",        # 요약 로그 주기(0이면 요약 생략)
+    "LOOP_TIMING_RING": "300",          # 메모리 보관 패스 수
+    "LOOP_TIMING_FILE": "true",
+    "LOOP_SLOW_SEC": "5",               # 이 시간 이상 걸린 패스는 상세 로그(+프로파일 저장)
+    "LOOP_PROFILE": "off",              # off | sample(스택 샘플링 → .folded) | cprofile(.prof)
+    "LOOP_PROFILE_SAMPLE_MS": "10",
+    # 지연 예산 워치독: 예산 초과 지속 시 눌림목 스캔 → 추가매수 평가 → 분봉 갱신 순으로 단계적 차단(청산은 항상 수행)
+    "WATCHDOG_ENABLE": "true",
+    "LOOP_BUDGET_SEC": "5",             # 패스(async: 청산 작업 1회) 지연 예산
+    "SHED_ESCALATE_PASSES": "2",        # 연속 초과 N회 → 차단 단계 +1
+    "SHED_RECOVER_PASSES": "5",         # 예산×SHED_RECOVER_RATIO 이하 연속 N회 → 단계 -1
+    "SHED_RECOVER_RATIO": "0.7",
+    "SHED_SCALE_IN_SEC": "30",          # 2단계 이상: 종목별 추가매수 평가 최소 간격
+    "SHED_TTL_MULT": "3",               # 3단계: 분봉/모멘텀 갱신 간격 배수
+    # 리밸런싱 API: 작업 제출(wait=false) → 상태 폴링 → 결과 조회(HTTP 요청마다 타임아웃)
+    "REBALANCE_API_BASE": "http://localhost:8000",
+    "REBALANCE_HTTP_TIMEOUT_SEC": "10",
+    "REBALANCE_POLL_SEC": "2",
+    "REBALANCE_WAIT_MAX_SEC": "1800",
+    # NDJSON 스트리밍 수신: 종목 결과가 도착하는 즉시 후보 일봉/지표 캐시 선적재(전체 결과 대기와 병행)
+    "REBALANCE_STREAM": "true",
+    "REBALANCE_STREAM_IDLE_SEC": "60",   # 스트림 무수신 허용 시간(서버 heartbeat 15초)
+    "REBALANCE_PREFETCH_WORKERS": "2",
+    # 서버에 같은 기준일/파라미터 결과가 저장돼 있으면 즉시 재사용(재시작 시 재계산 없음). true면 강제 재계산
+    "REBALANCE_RECOMPUTE": "false",
 }
 
 def _cfg(key: str) -> str:
@@ -140,9 +221,6 @@ MARKET_MAP: Dict[str, str] = {
 def get_market(code: str) -> str:
     return MARKET_MAP.get(code, "J")  # 데이터 없음
 
-# 데이터 없음 1차 감지 상태 저장(연속 DATA_EMPTY 확인용)
-EXCLUDE_STATE: Dict[str, Dict[str, bool]] = {}
-
 KST = ZoneInfo("Asia/Seoul")
 
 # ===== 매개변수(.env 없이도 CONFIG 기본을 사용) =====
@@ -174,6 +252,50 @@ MOMENTUM_OVERRIDES_FORCE_SELL = _cfg("MOMENTUM_OVERRIDES_FORCE_SELL").lower() ==
 MOM_FAST = int(_cfg("MOM_FAST") or "5")
 MOM_SLOW = int(_cfg("MOM_SLOW") or "20")
 MOM_TH_PCT = float(_cfg("MOM_TH_PCT") or "0.5")
+MOM_REFRESH_SEC = float(_cfg("MOM_REFRESH_SEC") or "20")
+CACHE_STATS_LOG_SEC = float(_cfg("CACHE_STATS_LOG_SEC") or "300")
+CACHE_STATS_EXPORT_SEC = float(_cfg("CACHE_STATS_EXPORT_SEC") or "30")
+ORDER_MANAGER_ENABLE = _cfg("ORDER_MANAGER_ENABLE").lower() != "false"
+ORDER_POLL_SEC = float(_cfg("ORDER_POLL_SEC") or "1.0")
+ORDER_CHASE_AFTER_SEC = float(_cfg("ORDER_CHASE_AFTER_SEC") or "3.0")
+ORDER_CHASE_TICKS = int(_cfg("ORDER_CHASE_TICKS") or "1")
+ORDER_MAX_SLIPPAGE_PCT = float(_cfg("ORDER_MAX_SLIPPAGE_PCT") or "0.5")
+ORDER_CHASE_MAX_STEPS = int(_cfg("ORDER_CHASE_MAX_STEPS") or "5")
+ORDER_MAX_AGE_SEC = float(_cfg("ORDER_MAX_AGE_SEC") or "60")
+ORDER_MARKET_FALLBACK = _cfg("ORDER_MARKET_FALLBACK").lower() == "true"
+SCHED_TICK_SEC = float(_cfg("SCHED_TICK_SEC") or "1.0")
+SCHED_IDLE_SEC = float(_cfg("SCHED_IDLE_SEC") or "2.5")
+EXIT_CHECK_SEC = float(_cfg("EXIT_CHECK_SEC") or "5")
+EXIT_NEAR_PCT = float(_cfg("EXIT_NEAR_PCT") or "1.0")
+ENTRY_CHECK_SEC = float(_cfg("ENTRY_CHECK_SEC") or "2.5")
+PULLBACK_SCAN_SEC = float(_cfg("PULLBACK_SCAN_SEC") or "10")
+BALANCE_SYNC_SEC = float(_cfg("BALANCE_SYNC_SEC") or "15")
+REGIME_CHECK_SEC = float(_cfg("REGIME_CHECK_SEC") or "10")
+CLOSED_MAX_SLEEP_SEC = float(_cfg("CLOSED_MAX_SLEEP_SEC") or "1800")
+TRADER_RUNTIME = (_cfg("TRADER_RUNTIME") or "sync").lower()
+ASYNC_MAX_WORKERS = int(_cfg("ASYNC_MAX_WORKERS") or "4")
+ASYNC_TIMING_LOG_SEC = float(_cfg("ASYNC_TIMING_LOG_SEC") or "60")
+LOOP_TIMING_LOG_SEC = float(_cfg("LOOP_TIMING_LOG_SEC") or "60")
+LOOP_TIMING_RING = int(_cfg("LOOP_TIMING_RING") or "300")
+LOOP_TIMING_FILE = _cfg("LOOP_TIMING_FILE").lower() != "false"
+LOOP_SLOW_SEC = float(_cfg("LOOP_SLOW_SEC") or "5")
+LOOP_PROFILE = (_cfg("LOOP_PROFILE") or "off").lower()
+LOOP_PROFILE_SAMPLE_MS = float(_cfg("LOOP_PROFILE_SAMPLE_MS") or "10")
+WATCHDOG_ENABLE = _cfg("WATCHDOG_ENABLE").lower() != "false"
+LOOP_BUDGET_SEC = float(_cfg("LOOP_BUDGET_SEC") or "5")
+SHED_ESCALATE_PASSES = int(_cfg("SHED_ESCALATE_PASSES") or "2")
+SHED_RECOVER_PASSES = int(_cfg("SHED_RECOVER_PASSES") or "5")
+SHED_RECOVER_RATIO = float(_cfg("SHED_RECOVER_RATIO") or "0.7")
+SHED_SCALE_IN_SEC = float(_cfg("SHED_SCALE_IN_SEC") or "30")
+SHED_TTL_MULT = float(_cfg("SHED_TTL_MULT") or "3")
+REBALANCE_API_BASE = (_cfg("REBALANCE_API_BASE") or "http://localhost:8000").rstrip("/")
+REBALANCE_HTTP_TIMEOUT_SEC = float(_cfg("REBALANCE_HTTP_TIMEOUT_SEC") or "10")
+REBALANCE_POLL_SEC = float(_cfg("REBALANCE_POLL_SEC") or "2")
+REBALANCE_WAIT_MAX_SEC = float(_cfg("REBALANCE_WAIT_MAX_SEC") or "1800")
+REBALANCE_STREAM = (_cfg("REBALANCE_STREAM") or "true").lower() != "false"
+REBALANCE_STREAM_IDLE_SEC = float(_cfg("REBALANCE_STREAM_IDLE_SEC") or "60")
+REBALANCE_PREFETCH_WORKERS = int(_cfg("REBALANCE_PREFETCH_WORKERS") or "2")
+REBALANCE_RECOMPUTE = (_cfg("REBALANCE_RECOMPUTE") or "false").lower() == "true"
 # 신고가 → 3일 눌림 → 반등 확인 후 매수 파라미터
 USE_PULLBACK_ENTRY = _cfg("USE_PULLBACK_ENTRY").lower() != "false"
 PULLBACK_LOOKBACK = int(_cfg("PULLBACK_LOOKBACK") or "60")
@@ -181,6 +303,12 @@ PULLBACK_DAYS = int(_cfg("PULLBACK_DAYS") or "3")
 PULLBACK_REVERSAL_BUFFER_PCT = float(_cfg("PULLBACK_REVERSAL_BUFFER_PCT") or "0.2")
 PULLBACK_TOPN = int(_cfg("PULLBACK_TOPN") or "50")
 PULLBACK_UNIT_WEIGHT = float(_cfg("PULLBACK_UNIT_WEIGHT") or "0.03")
+PULLBACK_UNIVERSE = (_cfg("PULLBACK_UNIVERSE") or "kosdaq").lower()
+PULLBACK_PANEL_DAYS = int(_cfg("PULLBACK_PANEL_DAYS") or "80")
+PULLBACK_MIN_TURNOVER = float(_cfg("PULLBACK_MIN_TURNOVER") or "1000000000")
+PULLBACK_MIN_PRICE = float(_cfg("PULLBACK_MIN_PRICE") or "1000")
+PULLBACK_SHORTLIST_MAX = int(_cfg("PULLBACK_SHORTLIST_MAX") or "60")
+PULLBACK_SETUP_RETRY_MAX = int(_cfg("PULLBACK_SETUP_RETRY_MAX") or "3")
 CHAMPION_MIN_TRADES = int(_cfg("CHAMPION_MIN_TRADES") or "5")
 CHAMPION_MIN_WINRATE = float(_cfg("CHAMPION_MIN_WINRATE") or "45.0")
 CHAMPION_MAX_MDD = float(_cfg("CHAMPION_MAX_MDD") or "30.0")
@@ -215,6 +343,10 @@ def _parse_hhmm(hhmm: str) -> dtime:
         return dtime(hour=14, minute=40)
 
 SELL_FORCE_TIME = _parse_hhmm(SELL_FORCE_TIME_STR)
+WARMUP_ENABLE = _cfg("WARMUP_ENABLE").lower() != "false"
+WARMUP_START = _parse_hhmm(_cfg("WARMUP_START") or "08:30")
+WARMUP_END = _parse_hhmm(_cfg("WARMUP_END") or "08:59")
+MARKET_OPEN_TIME = _parse_hhmm(_cfg("MARKET_OPEN_TIME") or "09:00")
 TIME_STOP_TIME = _parse_hhmm(TIME_STOP_HHMM)
 ALLOW_WHEN_CLOSED = _cfg("MARKET_DATA_WHEN_CLOSED").lower() == "true"
 
@@ -290,39 +422,147 @@ def get_rebalance_anchor_date(now: Optional[datetime] = None) -> str:
     # monthly
     return today.replace(day=1).strftime("%Y-%m-%d")
 
-def fetch_rebalancing_targets(date: str) -> List[Dict[str, Any]]:
-    REBALANCE_API_URL = f"http://localhost:8000/rebalance/run/{date}?force_order=true"
-    response = requests.post(REBALANCE_API_URL)
-    logger.info(f"[🛰️ 리밸런싱 API 전체 응답]: {response.text}")
-    if response.status_code == 200:
-        data = response.json()
-        selected = data.get("selected") or data.get("selected_stocks") or []
-        logger.info(f"[🎯 리밸런싱 종목]: {selected}")
-        # 챔피언 & 레짐 상세 로그
-        try:
-            champion = selected[0] if selected else None
-            log_champion_and_regime(logger, champion, REGIME_STATE, context="rebalance_api")
-        except Exception as e:
-            logger.exception(f"[VWAP_CHAMPION_LOG_ERROR] {e}")
-        return selected
-    else:
-        raise Exception(f"리밸런싱 API 호출 실패: {response.text}")
+def _await_rebalance_job(job: Dict[str, Any]) -> requests.Response:
+    """작업 상태를 REBALANCE_POLL_SEC 주기로 폴링 → 완료 시 결과 응답(실패/시간초과는 예외)."""
+    job_id = job.get("job_id")
+    deadline = time.time() + REBALANCE_WAIT_MAX_SEC
+    logger.info(f"[REBALANCE] 작업 대기 job={job_id} (dedup={job.get('deduplicated')})")
+    while time.time() < deadline:
+        st = requests.get(f"{REBALANCE_API_BASE}/rebalance/jobs/{job_id}", timeout=REBALANCE_HTTP_TIMEOUT_SEC)
+        if st.status_code == 200:
+            status = st.json().get("status")
+            if status == "failed":
+                raise Exception(f"리밸런싱 작업 실패: {st.text}")
+            if status == "done":
+                return requests.get(
+                    f"{REBALANCE_API_BASE}/rebalance/jobs/{job_id}/result", timeout=REBALANCE_HTTP_TIMEOUT_SEC
+                )
+        elif st.status_code == 404:
+            raise Exception(f"리밸런싱 작업 없음(서버 재시작?): job={job_id}")
+        time.sleep(REBALANCE_POLL_SEC)
+    raise Exception(f"리밸런싱 작업 대기 시간 초과({REBALANCE_WAIT_MAX_SEC:.0f}s): job={job_id}")
+
+def _consume_rebalance_stream(
+    response: requests.Response, on_candidate: Optional[Callable[[Dict[str, Any]], None]]
+) -> Dict[str, Any]:
+    """
+    NDJSON 스트림(job → stock* → final/error)을 한 줄씩 소비 → final 결과 dict.
+    - stock(qualified=True) 도착 즉시 on_candidate(item) 호출
+    - 스트림이 끊기면(job_id를 받은 뒤) 작업 상태 폴링으로 전환
+    """
+    job_id: Optional[str] = None
+    n_stock = n_qualified = 0
+    deadline = time.time() + REBALANCE_WAIT_MAX_SEC
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            kind = event.get("event")
+            if kind == "job":
+                job_id = event.get("job_id")
+                logger.info(f"[REBALANCE-STREAM] 작업 수신 job={job_id} (dedup={event.get('deduplicated')})")
+            elif kind == "stock":
+                n_stock += 1
+                if event.get("qualified"):
+                    n_qualified += 1
+                    if on_candidate is not None:
+                        try:
+                            on_candidate(event.get("item") or {})
+                        except Exception as e:
+                            logger.warning(f"[REBALANCE-STREAM] 후보 선처리 실패: {e}")
+            elif kind == "final":
+                logger.info(
+                    f"[REBALANCE-STREAM] 완료 source={event.get('source', 'computed')} "
+                    f"stock={n_stock} qualified={n_qualified} job={job_id}"
+                )
+                return event.get("result") or {}
+            elif kind == "error":
+                raise Exception(f"리밸런싱 작업 실패: {event.get('error')}")
+            if time.time() > deadline:
+                raise Exception(f"리밸런싱 스트림 대기 시간 초과({REBALANCE_WAIT_MAX_SEC:.0f}s): job={job_id}")
+    except (requests.RequestException, ValueError) as e:
+        if job_id is None:
+            raise
+        logger.warning(f"[REBALANCE-STREAM] 스트림 끊김 → 작업 폴링 전환 job={job_id}: {e}")
+    if job_id is None:
+        raise Exception("리밸런싱 스트림이 결과 없이 종료됨")
+    polled = _await_rebalance_job({"job_id": job_id})
+    if polled.status_code != 200:
+        raise Exception(f"리밸런싱 API 호출 실패: {polled.text}")
+    return polled.json()
+
+def fetch_rebalancing_targets(
+    date: str, on_candidate: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    리밸런싱 API 호출 → 선정 종목 리스트(서버에 저장된 결과가 있으면 계산 없이 즉시 응답).
+    REBALANCE_STREAM이면 NDJSON 스트림으로 받아 필터 통과 종목을 도착 즉시 on_candidate로 넘기고,
+    아니면(또는 스트림 미지원 서버) 작업 제출(wait=false) → 폴링 / 동기 200 응답을 그대로 사용.
+    """
+    mode = "stream=true" if REBALANCE_STREAM else "wait=false"
+    if REBALANCE_RECOMPUTE:
+        mode += "&recompute=true"
+    REBALANCE_API_URL = f"{REBALANCE_API_BASE}/rebalance/run/{date}?force_order=true&{mode}"
+    with requests.post(
+        REBALANCE_API_URL, stream=True, timeout=(REBALANCE_HTTP_TIMEOUT_SEC, REBALANCE_STREAM_IDLE_SEC)
+    ) as response:
+        if response.status_code == 200 and "ndjson" in response.headers.get("content-type", ""):
+            data = _consume_rebalance_stream(response, on_candidate)
+        else:
+            if response.status_code == 202:
+                # 작업형 API: 계산은 서버 워커에서 진행 → 상태 폴링 후 결과 조회
+                response = _await_rebalance_job(response.json())
+            logger.info(f"[🛰️ 리밸런싱 API 전체 응답]: {response.text}")
+            if response.status_code != 200:
+                raise Exception(f"리밸런싱 API 호출 실패: {response.text}")
+            data = response.json()
+
+    selected = data.get("selected") or data.get("selected_stocks") or []
+    logger.info(f"[🎯 리밸런싱 종목]: {selected}")
+    # 챔피언 & 레짐 상세 로그
+    try:
+        champion = selected[0] if selected else None
+        log_champion_and_regime(logger, champion, REGIME_STATE, context="rebalance_api")
+    except Exception as e:
+        logger.exception(f"[VWAP_CHAMPION_LOG_ERROR] {e}")
+    return selected
 
 def log_trade(trade: dict) -> None:
+    # 파일 I/O는 event_writer 'trades' 싱크 스레드에서 배치 기록
     today = datetime.now(KST).strftime("%Y-%m-%d")
     logfile = LOG_DIR / f"trades_{today}.json"
-    with open(logfile, "a", encoding="utf-8") as f:
-        f.write(json.dumps(trade, ensure_ascii=False) + "\n")
+    event_writer.submit_jsonl("trades", str(logfile), dict(trade))
+
+_STATE_LOCK = threading.Lock()
 
 def save_state(holding: Dict[str, Any], traded: Dict[str, Any]) -> None:
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump({"holding": holding, "traded": traded}, f, ensure_ascii=False, indent=2)
+    # async 런타임에서는 다른 작업 스레드가 dict를 갱신하는 중일 수 있음 → 직렬화 실패 시 재시도
+    with _STATE_LOCK:
+        for _ in range(3):
+            try:
+                payload = json.dumps(
+                    {"holding": holding, "traded": traded}, ensure_ascii=False, indent=2, default=json_default
+                )
+                break
+            except RuntimeError:
+                time.sleep(0.01)
+        else:
+            logger.warning("[STATE] 상태 직렬화 실패(동시 갱신) → 이번 저장 생략")
+            return
+        with open(STATE_FILE, "w", encoding="utf-8") as f:
+            f.write(payload)
 
-def load_state() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+def load_state() -> Tuple[Dict[str, Position], Dict[str, Any]]:
     if STATE_FILE.exists():
         with open(STATE_FILE, "r", encoding="utf-8") as f:
             state = json.load(f)
-        return state.get("holding", {}), state.get("traded", {})
+        holding = {
+            code: Position.from_dict(pos)
+            for code, pos in (state.get("holding") or {}).items()
+            if isinstance(pos, dict)
+        }
+        return holding, state.get("traded", {})
     return {}, {}
 
 def _with_retry(func, *args, max_retries=5, base_delay=0.6, **kwargs):
@@ -372,32 +612,33 @@ def _log_realized_pnl(
         logger.warning(f"[P&L_LOG_FAIL] {code} err={e}")
 
 # === [ANCHOR: PRICE_CACHE] 현재가 캐시 & 서킷브레이커 ===
-_LAST_PRICE_CACHE: Dict[str, Dict[str, float]] = {}  # code -> {"px": float, "ts": epoch}
-_PRICE_CB: Dict[str, Dict[str, float]] = {}          # code -> {"fail": int, "until": epoch}
+# - 현재가: 기본 TTL 5초, 만료 후에도 LRU 상한 내에서 보관(장마감/장애 시 stale 폴백)
+_LAST_PRICE_CACHE = cache.region("price", ttl_sec=5, max_size=2000)   # code -> px
+_PRICE_CB = cache.region("price_cb", max_size=2000)                    # code -> {"fail": int, "until": epoch}
 
 # === [ANCHOR: BALANCE_CACHE] 잔고 캐싱 (루프 15초 단일 호출) ===
-_BALANCE_CACHE: Dict[str, Any] = {"ts": 0.0, "balances": []}
+_BALANCE_CACHE = cache.region("balance", ttl_sec=15, max_size=4)       # "positions" -> List[Dict]
 
 def _safe_get_price(kis: KisAPI, code: str, ttl_sec: int = 5, stale_ok_sec: int = 30) -> Optional[float]:
     import time as _t
     now = _t.time()
 
     # 0) 서킷브레이커: 최근 실패 누적이면 잠시 건너뛴다
-    cb = _PRICE_CB.get(code, {"fail": 0, "until": 0})
+    cb = _PRICE_CB.get(code, {"fail": 0, "until": 0}, max_age=None)
     primary_allowed = now >= cb.get("until", 0)
 
     # 장마감이면 캐시/종가로 대체
     try:
         if not kis.is_market_open() and not ALLOW_WHEN_CLOSED:
-            ent = _LAST_PRICE_CACHE.get(code)
-            if ent:
-                return float(ent["px"])
+            px = _LAST_PRICE_CACHE.get_stale(code)
+            if px:
+                return float(px)
             if hasattr(kis, "get_close_price"):
                 try:
                     close_px = kis.get_close_price(code)
                     if close_px and float(close_px) > 0:
                         val = float(close_px)
-                        _LAST_PRICE_CACHE[code] = {"px": val, "ts": now}
+                        _LAST_PRICE_CACHE.set(code, val)
                         return val
                 except Exception:
                     pass
@@ -406,9 +647,9 @@ def _safe_get_price(kis: KisAPI, code: str, ttl_sec: int = 5, stale_ok_sec: int
         pass
 
     # 1) 캐시 최신이면 반환
-    ent = _LAST_PRICE_CACHE.get(code)
-    if ent and (now - ent["ts"] <= ttl_sec):
-        return float(ent["px"])
+    px = _LAST_PRICE_CACHE.get(code, max_age=ttl_sec)
+    if px is not None:
+        return float(px)
 
     # 2) 1차 소스
     if primary_allowed:
@@ -416,15 +657,15 @@ def _safe_get_price(kis: KisAPI, code: str, ttl_sec: int = 5, stale_ok_sec: int
             px = _with_retry(kis.get_current_price, code)
             if px is not None and float(px) > 0:
                 val = float(px)
-                _LAST_PRICE_CACHE[code] = {"px": val, "ts": now}
-                _PRICE_CB[code] = {"fail": 0, "until": 0}
+                _LAST_PRICE_CACHE.set(code, val)
+                _PRICE_CB.set(code, {"fail": 0, "until": 0})
                 return val
             else:
                 logger.warning(f"[PRICE_GUARD] {code} 현재가 무효값({px})")
         except Exception as e:
             fail = int(cb.get("fail", 0)) + 1
             cool = min(60, 3 * fail)
-            _PRICE_CB[code] = {"fail": fail, "until": now + cool}
+            _PRICE_CB.set(code, {"fail": fail, "until": now + cool})
             logger.error(f"[NET/API 장애] {code} 현재가 1차조회 실패({e}) → cool {cool}s")
 
     # 3) 보조 소스
@@ -438,7 +679,7 @@ def _safe_get_price(kis: KisAPI, code: str, ttl_sec: int = 5, stale_ok_sec: int
                     if v and float(v) > 0:
                         cand = float(v); break
             if cand and cand > 0:
-                _LAST_PRICE_CACHE[code] = {"px": cand, "ts": now}
+                _LAST_PRICE_CACHE.set(code, cand)
                 return cand
 
         if hasattr(kis, "get_best_ask") and hasattr(kis, "get_best_bid"):
@@ -446,15 +687,15 @@ def _safe_get_price(kis: KisAPI, code: str, ttl_sec: int = 5, stale_ok_sec: int
             bid = kis.get_best_bid(code)
             if ask and bid and float(ask) > 0 and float(bid) > 0:
                 mid = (float(ask) + float(bid)) / 2.0
-                _LAST_PRICE_CACHE[code] = {"px": mid, "ts": now}
+                _LAST_PRICE_CACHE.set(code, mid)
                 return mid
     except Exception as e:
         logger.warning(f"[PRICE_FALLBACK_FAIL] {code} 보조소스 실패: {e}")
 
     # 4) 최후: 캐시가 있으면 stale_ok_sec 내 제공  (BUGFIX: px 반환)
-    ent = _LAST_PRICE_CACHE.get(code)
-    if ent and (now - ent["ts"] <= stale_ok_sec):
-        return float(ent["px"])
+    px = _LAST_PRICE_CACHE.get_stale(code, max_age=stale_ok_sec)
+    if px is not None:
+        return float(px)
     return None
 
 def _fetch_balances(kis: KisAPI, ttl_sec: int = 15) -> List[Dict[str, Any]]:
@@ -462,10 +703,10 @@ def _fetch_balances(kis: KisAPI, ttl_sec: int = 15) -> List[Dict[str, Any]]:
     get_balance / get_balance_all 호출을 15초 캐시.
     초당 루프를 돌려도 실제 API는 15초에 1번만 두드리도록 한다.
     """
-    now = time.time()
     try:
-        if _BALANCE_CACHE["balances"] and (now - float(_BALANCE_CACHE["ts"])) <= ttl_sec:
-            return list(_BALANCE_CACHE["balances"])
+        cached = _BALANCE_CACHE.get("positions", max_age=ttl_sec)
+        if cached:
+            return list(cached)
     except Exception:
         pass
 
@@ -485,8 +726,7 @@ def _fetch_balances(kis: KisAPI, ttl_sec: int = 15) -> List[Dict[str, Any]]:
         logger.error(f"[BAL_STD_FAIL] 지원하지 않는 반환 타입: {type(res)}")
         positions = []
 
-    _BALANCE_CACHE["ts"] = now
-    _BALANCE_CACHE["balances"] = list(positions)
+    _BALANCE_CACHE.set("positions", list(positions))
     return positions
 
 
@@ -520,10 +760,8 @@ def _get_effective_ord_cash(kis: KisAPI) -> int:
 
 
 # === [ANCHOR: DAILY_CANDLE_CACHE] 일봉 완전 캐싱 ===
-    
-
-# === [ANCHOR: DAILY_CANDLE_CACHE] 일봉 완전 캐싱 ===
-_DAILY_CANDLE_CACHE: Dict[str, Dict[str, Any]] = {}
+# code -> {"date": 거래일, "candles": List[Dict], "series": CandleSeries}
+_DAILY_CANDLE_CACHE = cache.region("daily_candles", max_size=1500)
 
 def _get_daily_candles_cached(kis: KisAPI, code: str, count: int) -> List[Dict[str, Any]]:
     """
@@ -532,84 +770,101 @@ def _get_daily_candles_cached(kis: KisAPI, code: str, count: int) -> List[Dict[s
     - 이후 더 긴 count가 들어오면 한 번 더 호출해서 캐시 갱신
     """
     today = datetime.now(KST).date()
-    entry = _DAILY_CANDLE_CACHE.get(code)
-    if entry and entry.get("date") == today and len(entry.get("candles") or []) >= count:
+    entry = _DAILY_CANDLE_CACHE.get(
+        code, max_age=None,
+        accept=lambda e: e.get("date") == today and len(e.get("candles") or []) >= count,
+    )
+    if entry:
         return entry["candles"]
 
     candles = kis.get_daily_candles(code, count=count)
     if candles:
-        _DAILY_CANDLE_CACHE[code] = {"date": today, "candles": candles}
+        _DAILY_CANDLE_CACHE.set(code, {"date": today, "candles": candles})
     return candles or []
 
 
-def _detect_pullback_reversal(
+def _get_daily_series_cached(kis: KisAPI, code: str, count: int) -> CandleSeries:
+    """
+    _get_daily_candles_cached와 같은 캐시 엔트리에서 CandleSeries를 1회 생성해 재사용.
+    - MA/ATR/peak/down-streak 등 파생지표는 시리즈 내부에 캐싱 → 코드·거래일당 1회 계산
+    """
+    candles = _get_daily_candles_cached(kis, code, count)
+    entry = _DAILY_CANDLE_CACHE.peek(code)
+    if entry is None or entry.get("candles") is not candles:
+        return CandleSeries.from_rows(candles, code=code)
+    series = entry.get("series")
+    if series is None:
+        series = CandleSeries.from_rows(candles, code=code)
+        entry["series"] = series
+    return series
+
+
+# 완성 일봉만으로 결정되는 눌림목 셋업(신고가 → N일 연속 하락)은 당일 고정 → 코드별 1회만 계산
+_PULLBACK_SETUP_CACHE = cache.region("pullback_setup", max_size=2000)
+
+
+def _evaluate_pullback_setup(
     kis: KisAPI,
     code: str,
-    current_price: Optional[float] = None,
     lookback: int = PULLBACK_LOOKBACK,
     pullback_days: int = PULLBACK_DAYS,
     buffer_pct: float = PULLBACK_REVERSAL_BUFFER_PCT,
 ) -> Dict[str, Any]:
     """
-    신고가 달성 이후 3일 연속 하락 후 반등 여부를 판정한다.
+    신고가 달성 이후 N일 연속 하락 셋업을 완성 일봉만으로 판정한다(현재가 불필요).
 
     반환 예시
     {
-        "setup": True/False,        # 신고가 이후 3일 연속 하락 패턴 충족 여부
-        "reversing": True/False,    # 현재가가 되돌림 확인선 위로 돌아섰는지
+        "setup": True/False,        # 신고가 이후 N일 연속 하락 패턴 충족 여부
         "reversal_price": float,    # 되돌림 확인선(직전 하락일 고가 × (1+buffer))
         "peak_price": float,        # 신고가(lookback 내 최고가)
         "peak_date": "YYYYMMDD",  # 신고가 발생일
-        "last_down_date": "YYYYMMDD",  # 3번째 하락일
+        "last_down_date": "YYYYMMDD",  # 마지막 하락일
         "reason": str               # setup=False일 때 스킵 사유
     }
+    - 정상 판정 결과는 거래일 단위로 캐싱(일봉 조회 실패는 캐싱하지 않아 다음 패스에 재시도)
     """
+    today = datetime.now(KST).strftime("%Y%m%d")
+    key = (code, int(lookback), int(pullback_days), float(buffer_pct))
+    cached = _PULLBACK_SETUP_CACHE.get(key, max_age=None, accept=lambda v: v.get("_day") == today)
+    if cached:
+        return cached
+
     try:
-        candles = _get_daily_candles_cached(
+        series = _get_daily_series_cached(
             kis, code, count=max(lookback, pullback_days + 5)
         )
     except Exception as e:
         return {"setup": False, "reason": f"daily_fetch_fail:{e}"}
 
-    if len(candles) < pullback_days + 2:
+    result = _pullback_setup_from_series(series, today, lookback, pullback_days, buffer_pct)
+    result["_day"] = today
+    _PULLBACK_SETUP_CACHE.set(key, result)
+    return result
+
+
+def _pullback_setup_from_series(
+    series: CandleSeries,
+    today: str,
+    lookback: int,
+    pullback_days: int,
+    buffer_pct: float,
+) -> Dict[str, Any]:
+    if len(series) < pullback_days + 2:
         return {"setup": False, "reason": "not_enough_candles"}
 
-    today = datetime.now(KST).strftime("%Y%m%d")
-    completed = list(candles)
-    if completed and str(completed[-1].get("date")) == today:
-        completed = completed[:-1]
+    completed = series.completed(today)
     if len(completed) < pullback_days + 2:
         return {"setup": False, "reason": "insufficient_history_after_trim"}
 
-    window = completed[-lookback:]
-    highs = [float(c.get("high") or 0.0) for c in window]
-    if not highs:
+    # lookback 구간 신고가(마지막 발생 위치)
+    peak_price, peak_idx = completed.peak(lookback)
+    if peak_price is None or peak_idx < 0:
         return {"setup": False, "reason": "no_high_data"}
 
-    peak_price = max(highs)
-    try:
-        peak_idx = max(
-            i for i, c in enumerate(window) if float(c.get("high") or 0.0) == peak_price
-        )
-    except Exception:
-        return {"setup": False, "reason": "peak_index_error"}
-
-    # 직전 일자까지 연속 하락 구간 길이를 계산(어제까지 n일 연속 하락인지)
-    down_streak_len = 0
-    last_idx = len(window) - 1
-    while last_idx > peak_idx:
-        try:
-            cur_close = float(window[last_idx].get("close") or 0.0)
-            prev_close = float(window[last_idx - 1].get("close") or 0.0)
-        except Exception:
-            break
-        if cur_close <= 0 or prev_close <= 0:
-            break
-        if cur_close < prev_close:
-            down_streak_len += 1
-            last_idx -= 1
-            continue
-        break
+    # 직전 일자까지 연속 하락 구간 길이(신고가 이후 구간으로 한정)
+    last_idx = len(completed) - 1
+    down_streak_len = min(completed.down_streak(), last_idx - peak_idx)
 
     if down_streak_len < pullback_days:
         return {
@@ -618,71 +873,152 @@ def _detect_pullback_reversal(
             "reason": "not_enough_consecutive_down",
         }
 
-    if last_idx < peak_idx:
-        return {
-            "setup": False,
-            "peak_price": peak_price,
-            "reason": "down_streak_not_after_peak",
-        }
-
-    last_down = window[len(window) - 1]
-    try:
-        reversal_line = max(
-            float(last_down.get("high") or 0.0), float(last_down.get("close") or 0.0)
-        )
-    except Exception:
-        reversal_line = 0.0
+    hi = float(completed.high[last_idx])
+    cl = float(completed.close[last_idx])
+    reversal_line = max(hi if hi == hi else 0.0, cl if cl == cl else 0.0)
 
     reversal_price = reversal_line * (1.0 + buffer_pct / 100.0)
-    reversing = (
-        current_price is not None
-        and reversal_price > 0
-        and float(current_price) >= float(reversal_price)
-    )
-
     return {
         "setup": True,
-        "reversing": bool(reversing),
         "reversal_price": float(reversal_price) if reversal_price > 0 else None,
         "peak_price": float(peak_price),
-        "peak_date": window[peak_idx].get("date"),
-        "last_down_date": last_down.get("date"),
+        "peak_date": str(completed.date[peak_idx]),
+        "last_down_date": str(completed.date[last_idx]),
+    }
+
+
+def _is_pullback_reversing(reversal_price: Optional[float], current_price: Optional[float]) -> bool:
+    return (
+        current_price is not None
+        and reversal_price is not None
+        and float(reversal_price) > 0
+        and float(current_price) >= float(reversal_price)
+    )
+
+
+def _detect_pullback_reversal(
+    kis: KisAPI,
+    code: str,
+    current_price: Optional[float] = None,
+    lookback: int = PULLBACK_LOOKBACK,
+    pullback_days: int = PULLBACK_DAYS,
+    buffer_pct: float = PULLBACK_REVERSAL_BUFFER_PCT,
+) -> Dict[str, Any]:
+    """
+    신고가 달성 이후 3일 연속 하락 후 반등 여부를 판정한다.
+
+    반환 예시
+    {
+        "setup": True/False,        # 신고가 이후 3일 연속 하락 패턴 충족 여부
+        "reversing": True/False,    # 현재가가 되돌림 확인선 위로 돌아섰는지
+        "reversal_price": float,    # 되돌림 확인선(직전 하락일 고가 × (1+buffer))
+        "peak_price": float,        # 신고가(lookback 내 최고가)
+        "peak_date": "YYYYMMDD",  # 신고가 발생일
+        "last_down_date": "YYYYMMDD",  # 3번째 하락일
+        "reason": str               # setup=False일 때 스킵 사유
     }
+    - 셋업 판정은 _evaluate_pullback_setup(당일 캐시)을 재사용하고, 현재가 비교만 매번 수행
+    """
+    setup = _evaluate_pullback_setup(kis, code, lookback, pullback_days, buffer_pct)
+    out = {k: v for k, v in setup.items() if k != "_day"}
+    if out.get("setup"):
+        out["reversing"] = _is_pullback_reversing(out.get("reversal_price"), current_price)
+    return out
+
+
+def _precompute_pullback_setups(kis: KisAPI, watch: Dict[str, Dict[str, Any]]) -> int:
+    """
+    장 시작 전 눌림목 감시 종목 전체의 셋업을 1회 평가해 watch[code]에 기록한다.
+    - pb_setup: True/False (None이면 조회 실패 → 장중 재평가, PULLBACK_SETUP_RETRY_MAX회 실패 시 False)
+    - pb_reversal_price / pb_peak_price: 셋업 충족 종목의 반등 확인선/신고가
+    반환: 셋업 충족 종목 수
+    """
+    t0 = time.time()
+    ready = 0
+    for code, info in watch.items():
+        try:
+            res = _evaluate_pullback_setup(kis, code)
+        except Exception as e:
+            res = {"setup": False, "reason": f"daily_fetch_fail:{e}"}
+        _apply_pullback_setup(info, res)
+        if info.get("pb_setup"):
+            ready += 1
+    logger.info(
+        f"[PULLBACK-PRECOMPUTE] {len(watch)}종목 셋업 평가 → 충족 {ready}종목 "
+        f"(실패 {sum(1 for v in watch.values() if v.get('pb_setup') is None)}) "
+        f"{time.time() - t0:.1f}s"
+    )
+    return ready
+
+
+def _universe_fetch_allowed(now: Optional[datetime] = None) -> bool:
+    """장중(웜업 시작 ~ 15:30 평일)에는 pykrx/FDR 다운로드 금지 → 저장된 유니버스 스냅샷만 사용."""
+    now = now or datetime.now(KST)
+    if now.weekday() >= 5:
+        return True
+    start = WARMUP_START if WARMUP_ENABLE else MARKET_OPEN_TIME
+    return not (start <= now.time() < dtime(15, 30))
 
 
-def _classify_champion_grade(info: Dict[str, Any]) -> str:
-    trades = _to_int(info.get("trades"), 0)
-    win = _to_float(info.get("win_rate_pct"), 0.0)
-    mdd = abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0)
-    sharpe = _to_float(info.get("sharpe_m") or info.get("sharpe"), 0.0)
-    cumret = _to_float(
-        info.get("cumulative_return_pct") or info.get("avg_return_pct"), 0.0
+def _screen_pullback_universe(base_notional: int) -> Dict[str, Dict[str, Any]]:
+    """
+    코스닥 전 종목 로컬 일봉 패널(pullback_screen.py)에서 셋업 + 유동성 충족 종목만 골라 감시 목록 생성.
+    셋업은 패널에서 이미 판정되므로 KIS 일봉 조회 없이 pb_setup이 채워진 상태로 반환한다.
+    장중/웜업 중에는 pykrx 다운로드 없이 저장된 패널만 사용(갱신은 장 시작 전 별도 단계: --refresh).
+    """
+    panel = pullback_screen.ensure_panel(days=PULLBACK_PANEL_DAYS, allow_refresh=_universe_fetch_allowed())
+    res = pullback_screen.scan_setups(
+        panel,
+        today=datetime.now(KST).strftime("%Y%m%d"),
+        lookback=PULLBACK_LOOKBACK,
+        pullback_days=PULLBACK_DAYS,
+        buffer_pct=PULLBACK_REVERSAL_BUFFER_PCT,
+        min_turnover=PULLBACK_MIN_TURNOVER,
+        min_price=PULLBACK_MIN_PRICE,
+        max_shortlist=PULLBACK_SHORTLIST_MAX,
     )
-    turnover = _to_float(
-        info.get("prev_turnover") or info.get("avg_turnover") or info.get("turnover"),
-        0.0,
+    st = res.stats
+    logger.info(
+        f"[PULLBACK-SCREEN] {st.get('codes')}종목×{st.get('days')}일(~{st.get('last_date')}) "
+        f"유동성 {st.get('liquid')} / 셋업 {st.get('setup')} / 교집합 {st.get('setup_liquid')} → 감시 {st.get('shortlist')} "
+        f"scan={st.get('scan_ms')}ms panel={st.get('panel_mb')}MB peak={st.get('scan_peak_mb')}MB"
     )
+    watch: Dict[str, Dict[str, Any]] = {}
+    for row in res.shortlist:
+        code = row["code"]
+        info = {"code": code, "name": None, "notional": base_notional}
+        _apply_pullback_setup(info, {"setup": True, **row})
+        watch[code] = info
+    if watch:
+        try:
+            universe = get_universe()
+            allow_fetch = _universe_fetch_allowed()
+            for code, info in watch.items():
+                info["name"] = universe.name_of(code, allow_fetch=allow_fetch)
+        except Exception as e:
+            logger.debug(f"[PULLBACK-SCREEN] 종목명 조회 실패: {e}")
+    return watch
 
-    turnover_ok = turnover <= 0 or turnover >= CHAMPION_A_RULES["min_turnover"]
-    if (
-        trades >= CHAMPION_A_RULES["min_trades"]
-        and cumret >= CHAMPION_A_RULES["min_cumret_pct"]
-        and mdd <= CHAMPION_A_RULES["max_mdd_pct"]
-        and win >= CHAMPION_A_RULES["min_win_pct"]
-        and sharpe >= CHAMPION_A_RULES["min_sharpe"]
-        and turnover_ok
-    ):
-        return "A"
 
-    if (
-        trades >= CHAMPION_MIN_TRADES
-        and win >= CHAMPION_MIN_WINRATE
-        and mdd <= CHAMPION_MAX_MDD
-        and sharpe >= CHAMPION_MIN_SHARPE
-    ):
-        return "B"
+def _mark_pullback_setup_fail(info: Dict[str, Any], reason: str) -> None:
+    # 평가 실패: 시도 상한 전까지는 None(장중 재평가), 상한 도달 시 False(당일 제외)
+    info["pb_retries"] = int(info.get("pb_retries") or 0) + 1
+    if info["pb_retries"] >= max(1, PULLBACK_SETUP_RETRY_MAX):
+        info["pb_setup"] = False
+        info["pb_reason"] = f"{reason} ({info['pb_retries']}회 실패 → 당일 제외)"
+    else:
+        info["pb_setup"] = None
 
-    return "C"
+
+def _apply_pullback_setup(info: Dict[str, Any], res: Dict[str, Any]) -> None:
+    reason = str(res.get("reason") or "")
+    if reason.startswith("daily_fetch_fail"):
+        _mark_pullback_setup_fail(info, reason)
+        return
+    info["pb_setup"] = bool(res.get("setup"))
+    info["pb_reason"] = res.get("reason")
+    info["pb_reversal_price"] = res.get("reversal_price")
+    info["pb_peak_price"] = res.get("peak_price")
 
 
 def _compute_daily_entry_context(
@@ -690,48 +1026,32 @@ def _compute_daily_entry_context(
 ) -> Dict[str, Any]:
     ctx: Dict[str, Any] = {"current_price": current_price}
     try:
-        candles = _get_daily_candles_cached(kis, code, count=max(PULLBACK_LOOKBACK, 60))
+        series = _get_daily_series_cached(kis, code, count=max(PULLBACK_LOOKBACK, 60))
     except Exception:
         return ctx
 
     today = datetime.now(KST).strftime("%Y%m%d")
-    completed = list(candles)
-    if completed and str(completed[-1].get("date")) == today:
-        completed = completed[:-1]
+    completed = series.completed(today)
 
-    if not completed:
+    if not len(completed):
         return ctx
 
-    closes = [float(c.get("close") or 0.0) for c in completed if c.get("close")]
-    highs = [float(c.get("high") or 0.0) for c in completed if c.get("high")]
-    lows = [float(c.get("low") or 0.0) for c in completed if c.get("low")]
-
-    if len(closes) >= 20:
-        ma20 = sum(closes[-20:]) / 20.0
+    ma20 = completed.ma_last(20)
+    if ma20:
         ctx["ma20"] = ma20
         if current_price:
             ctx["ma20_ratio"] = current_price / ma20
             ctx["ma20_risk"] = max(0.0, current_price - ma20)
 
-    if highs:
-        window_60 = highs[-60:] if len(highs) >= 60 else highs
-        peak_price = max(window_60)
-        ctx["peak_price"] = peak_price
-        if current_price and peak_price > 0:
-            ctx["distance_to_peak"] = current_price / peak_price
-            ctx["pullback_depth_pct"] = (peak_price - current_price) / peak_price * 100.0
+    peak_60, _ = completed.peak(60)
+    if peak_60:
+        ctx["peak_price"] = peak_60
+        if current_price and peak_60 > 0:
+            ctx["distance_to_peak"] = current_price / peak_60
+            ctx["pullback_depth_pct"] = (peak_60 - current_price) / peak_60 * 100.0
 
     # 연속 하락 일수 체크 (신고가 이후 눌림 판단)
-    down_streak = 0
-    for idx in range(len(completed) - 1, 0, -1):
-        cur = float(completed[idx].get("close") or 0.0)
-        prev = float(completed[idx - 1].get("close") or 0.0)
-        if cur <= 0 or prev <= 0:
-            break
-        if cur < prev:
-            down_streak += 1
-        else:
-            break
+    down_streak = completed.down_streak()
     ctx["down_streak"] = down_streak
 
     try:
@@ -741,15 +1061,15 @@ def _compute_daily_entry_context(
     except Exception:
         pass
 
-    if closes and highs:
-        recent_high = max(highs[-20:])
+    recent_high, _ = completed.peak(20)
+    if recent_high and peak_60:
         ctx["recent_high_20"] = recent_high
         ctx["setup_ok"] = bool(
             down_streak >= 2
             and ctx.get("pullback_depth_pct") is not None
             and ctx.get("pullback_depth_pct") >= GOOD_ENTRY_PULLBACK_RANGE[0]
             and (ctx.get("ma20_ratio") or 0) >= GOOD_ENTRY_MA20_RANGE[0]
-            and recent_high >= max(highs[-60:]) * 0.95
+            and recent_high >= peak_60 * 0.95
         )
 
     return ctx
@@ -759,16 +1079,16 @@ def _compute_intraday_entry_context(
     kis: KisAPI, code: str, prev_high: Optional[float] = None
 ) -> Dict[str, Any]:
     ctx: Dict[str, Any] = {}
-    candles = _get_intraday_1min(kis, code, count=120)
-    if not candles:
+    acc = _refresh_intraday_momentum(kis, code)
+    snap = acc.snapshot(box=20, recent=5) if acc is not None else {}
+    if not snap:
         return ctx
 
-    vwap_val = _compute_vwap_from_1min(candles)
+    vwap_val = snap.get("vwap")
     ctx["vwap"] = vwap_val
-    last = candles[-1]
-    last_close = _to_float(last.get("close"), None)
-    last_high = _to_float(last.get("high") or last.get("close"), None)
-    last_low = _to_float(last.get("low") or last.get("close"), None)
+    last_close = snap.get("last_close")
+    last_high = snap.get("last_high")
+    last_low = snap.get("last_low")
     ctx["last_close"] = last_close
     ctx["last_high"] = last_high
     ctx["last_low"] = last_low
@@ -776,35 +1096,19 @@ def _compute_intraday_entry_context(
     if vwap_val and last_close:
         ctx["vwap_reclaim"] = last_close >= vwap_val
 
-    highs = [
-        float(c.get("high") or c.get("close") or 0.0)
-        for c in candles
-        if c.get("high") or c.get("close")
-    ]
-    lows = [
-        float(c.get("low") or c.get("close") or 0.0)
-        for c in candles
-        if c.get("low") or c.get("close")
-    ]
-    vols = [float(c.get("volume") or 0.0) for c in candles]
-
-    if highs:
-        box_high = max(highs[-20:])
-        box_low = min(lows[-20:]) if lows else None
-        if last_high is not None and box_high:
-            ctx["range_break"] = last_high >= box_high * 0.999
-        if last_low is not None and box_low:
-            ctx["box_floor"] = box_low
-
-    if vols and len(vols) >= 10:
-        recent_vol = sum(vols[-5:]) / 5.0
-        base_vol = sum(vols[:-5]) / max(1, len(vols) - 5)
-        if base_vol > 0:
-            ctx["volume_spike"] = recent_vol >= base_vol * 1.5
-
-    if vwap_val:
-        below = sum(1 for c in candles if _to_float(c.get("close"), 0.0) < vwap_val)
-        ctx["below_vwap_ratio"] = below / len(candles)
+    box_high = snap.get("box_high")
+    box_low = snap.get("box_low")
+    if last_high is not None and box_high:
+        ctx["range_break"] = last_high >= box_high * 0.999
+    if last_low is not None and box_low:
+        ctx["box_floor"] = box_low
+
+    base_vol = snap.get("base_vol")
+    if base_vol is not None and base_vol > 0:
+        ctx["volume_spike"] = snap["recent_vol"] >= base_vol * 1.5
+
+    if snap.get("below_vwap_ratio") is not None:
+        ctx["below_vwap_ratio"] = snap["below_vwap_ratio"]
 
     if prev_high and last_high:
         ctx["prev_high_retest"] = last_high >= float(prev_high) * 0.999
@@ -891,10 +1195,14 @@ from .kis_wrapper import NetTemporaryError, DataEmptyError, DataShortError
 # === [ANCHOR: INTRADAY_MOMENTUM] 1분봉 VWAP + 단기 모멘텀 ===
 def _get_intraday_1min(kis: KisAPI, code: str, count: int = 60) -> List[Dict[str, Any]]:
     """
-    KisAPI에 1분봉 메서드가 있으면 사용하고, 없으면 호환 메서드로 fallback.
-    반환은 최소한 'close'와 'volume' 정보를 가진 dict 리스트라고 가정한다.
+    공유 1분봉 저장소(MINUTE_BARS)에서 최근 count개 OHLCV 봉을 반환.
+    - 저장소는 MOM_REFRESH_SEC 간격으로만 KisAPI.get_intraday_candles_today를 (역방향 페이징) 조회
+    - KisAPI에 당일 분봉 메서드가 없으면 구버전 호환 메서드로 fallback
     """
     try:
+        if hasattr(kis, "get_intraday_candles_today"):
+            MINUTE_BARS.refresh(kis, code, now=datetime.now(KST))
+            return MINUTE_BARS.get_bars(code, count)
         if hasattr(kis, "get_intraday_1min"):
             return kis.get_intraday_1min(code, count=count)
         if hasattr(kis, "get_minute_candles"):
@@ -941,6 +1249,90 @@ def _compute_intraday_momentum(candles: List[Dict[str, Any]], fast: int = MOM_FA
         return 0.0
     return (fast_ma - slow_ma) / slow_ma * 100.0
 
+# 종목별 1분봉 저장소 + 스트리밍 누산기(당일 세션 VWAP, fast/slow MA 링버퍼)
+MINUTE_BARS = MinuteBarStore(
+    refresh_sec=MOM_REFRESH_SEC,
+    acc_factory=lambda code: MomentumAccumulator(
+        code, fast=MOM_FAST, slow=MOM_SLOW, keep=max(120, MOM_SLOW * 3)
+    ),
+)
+# 저장소 미지원(구버전 호환 메서드) 소스용 누산기
+_MOMENTUM_ACC = cache.region("intraday_momentum", max_size=1000)
+
+
+def _bar_key(c: Dict[str, Any]) -> Optional[str]:
+    for k in ("time", "datetime", "ts", "stck_cntg_hour"):
+        v = c.get(k)
+        if v:
+            return str(v)
+    return None
+
+
+def _get_momentum_acc(code: str) -> MomentumAccumulator:
+    acc = _MOMENTUM_ACC.get(code, max_age=None)
+    if acc is None:
+        acc = MomentumAccumulator(code, fast=MOM_FAST, slow=MOM_SLOW, keep=max(120, MOM_SLOW * 3))
+        _MOMENTUM_ACC.set(code, acc)
+    return acc
+
+
+def _ingest_1min_bars(acc: MomentumAccumulator, candles: List[Dict[str, Any]]) -> int:
+    """새로 도착한 봉만 누산기에 반영(같은 분 키는 진행 중 봉 수정). 반영 개수 반환."""
+    keys = [_bar_key(c) for c in candles]
+    if any(k is None for k in keys):
+        # 시간 키가 없는 소스 → 누산기를 재구성(순서 인덱스를 키로 사용)
+        acc.reset()
+        keys = [f"{i:06d}" for i in range(len(candles))]
+    n = 0
+    for key, c in zip(keys, candles):
+        if acc.last_key is not None and key < acc.last_key:
+            continue
+        px = c.get("close") or c.get("trade_price") or c.get("price")
+        vol = c.get("volume") or c.get("trade_volume") or 0.0
+        if acc.ingest_bar(key, px, vol, high=c.get("high"), low=c.get("low")):
+            n += 1
+    return n
+
+
+def _refresh_intraday_momentum(kis: KisAPI, code: str, force: bool = False) -> Optional[MomentumAccumulator]:
+    """
+    MOM_REFRESH_SEC 간격으로만 1분봉 소스를 조회해 누산기를 갱신.
+    간격 내 호출은 I/O 없이 누산기 상태를 그대로 반환한다.
+    - 기본 경로: MINUTE_BARS 저장소가 봉 병합과 동시에 누산기를 갱신
+    """
+    if hasattr(kis, "get_intraday_candles_today"):
+        try:
+            MINUTE_BARS.refresh(kis, code, force=force, now=datetime.now(KST))
+        except Exception as e:
+            logger.warning(f"[INTRADAY_1M_FAIL] {code}: {e}")
+        return MINUTE_BARS.accumulator(code)
+
+    acc = _get_momentum_acc(code)
+    now = time.time()
+    if not force and acc.updated_at and now - acc.updated_at < MINUTE_BARS.refresh_sec:
+        return acc
+    acc.updated_at = now
+    try:
+        candles = _get_intraday_1min(kis, code, count=max(MOM_SLOW * 3, 120))
+    except Exception as e:
+        logger.warning(f"[INTRADAY_1M_FAIL] {code}: {e}")
+        candles = []
+    if candles:
+        _ingest_1min_bars(acc, candles)
+    return acc
+
+
+def _get_vwap_for_guard(kis: KisAPI, code: str) -> Optional[float]:
+    """VWAP 가드용 값: 누산기 세션 VWAP 우선, 없으면 KisAPI 당일 분봉 VWAP."""
+    try:
+        acc = _refresh_intraday_momentum(kis, code)
+        if acc is not None and acc.vwap:
+            return float(acc.vwap)
+    except Exception:
+        pass
+    return kis.get_vwap_today(code)
+
+
 def is_strong_momentum_vwap(kis: KisAPI, code: str) -> bool:
     """
     1분봉 VWAP + 단기 모멘텀 기반 모멘텀 강세 판정.
@@ -953,23 +1345,16 @@ def is_strong_momentum_vwap(kis: KisAPI, code: str) -> bool:
     except Exception:
         pass
 
-    candles = _get_intraday_1min(kis, code, count=max(MOM_SLOW * 3, 60))
-    if not candles:
-        return False
-
-    try:
-        last_candle = candles[-1]
-        last_price = float(last_candle.get("close") or last_candle.get("trade_price") or last_candle.get("price") or 0.0)
-    except Exception:
-        return False
-    if last_price <= 0:
+    acc = _refresh_intraday_momentum(kis, code)
+    if acc is None or not acc.n_bars:
         return False
 
-    vwap_val = _compute_vwap_from_1min(candles)
-    if vwap_val is None or vwap_val <= 0:
+    last_price = acc.last_close
+    vwap_val = acc.vwap
+    if last_price <= 0 or vwap_val is None or vwap_val <= 0:
         return False
 
-    mom = _compute_intraday_momentum(candles)
+    mom = acc.momentum_pct
     strong = (last_price > vwap_val) and (mom >= MOM_TH_PCT)
     if strong:
         logger.info(
@@ -991,16 +1376,16 @@ def get_20d_return_pct(kis: KisAPI, code: str) -> Optional[float]:
 
     for attempt in range(1, MAX_RETRY + 1):
         try:
-            candles = _get_daily_candles_cached(kis, code, count=21)
-            if not candles or len(candles) < 21:
+            series = _get_daily_series_cached(kis, code, count=21)
+            if len(series) < 21:
                 raise DataShortError("need at least 21 candles")
 
-            if any(('close' not in c) or (c['close'] is None) for c in candles):
+            if series.tail(21).has_missing_close():
                 logger.error("[20D_RETURN_FAIL] %s: 캔들 close 결측", code)
                 raise DataEmptyError("close missing")
 
-            old = float(candles[-21]['close'])
-            nowp = float(candles[-1]['close'])
+            old = float(series.close[-21])
+            nowp = float(series.close[-1])
             return ((nowp - old) / old) * 100.0
 
         except NetTemporaryError as e:
@@ -1031,50 +1416,28 @@ def is_strong_momentum(kis: KisAPI, code: str) -> bool:
     """
     return is_strong_momentum_vwap(kis, code)
 
-def _percentile_rank(values: List[float], value: float, higher_is_better: bool = True) -> float:
-    if not values:
-        return 0.0
-    vals = [float(v) for v in values if v is not None]
-    if not vals:
-        return 0.0
-
-    if higher_is_better:
-        count = sum(1 for v in vals if v <= value)
-    else:
-        count = sum(1 for v in vals if v >= value)
-    return (count / len(vals)) * 100.0
-
 def _has_bullish_trend_structure(kis: KisAPI, code: str) -> Tuple[bool, Dict[str, float]]:
     """
     보유 지속 여부 판단용: 5/10/20일선 정배열 + 20일선 상승 + 종가>20일선 체크.
     """
-    candles = _get_daily_candles_cached(kis, code, count=25)
-    if not candles or len(candles) < 21:
+    series = _get_daily_series_cached(kis, code, count=25)
+    if len(series) < 21:
         raise DataShortError("not enough candles")
 
     today = datetime.now(KST).strftime("%Y%m%d")
-    completed = list(candles)
-    if completed and str(completed[-1].get("date")) == today:
-        completed = completed[:-1]
+    completed = series.completed(today)
 
     if len(completed) < 21:
         raise DataShortError("insufficient completed candles")
 
-    closes: List[float] = []
-    for c in completed:
-        close = c.get("close")
-        if close is None:
-            raise DataEmptyError("close missing")
-        closes.append(float(close))
-
-    if len(closes) < 21:
-        raise DataShortError("need at least 21 closes")
+    if completed.has_missing_close():
+        raise DataEmptyError("close missing")
 
-    ma5 = sum(closes[-5:]) / 5.0
-    ma10 = sum(closes[-10:]) / 10.0
-    ma20 = sum(closes[-20:]) / 20.0
-    prev_ma20 = sum(closes[-21:-1]) / 20.0
-    last_close = closes[-1]
+    ma5 = completed.ma_last(5)
+    ma10 = completed.ma_last(10)
+    ma20 = completed.ma_last(20)
+    prev_ma20 = completed.ma_last(20, offset=1)
+    last_close = float(completed.close[-1])
 
     aligned = last_close > ma20 and ma5 > ma10 > ma20 and ma20 > prev_ma20
     return aligned, {
@@ -1160,6 +1523,13 @@ def _notional_to_qty(
     return max(0, int(notional // int(price)))
 # === ATR, 상태 초기화 ===
 def _get_atr(kis: KisAPI, code: str, window: int = 14) -> Optional[float]:
+    # 일봉 캐시의 CandleSeries ATR 재사용(추가 API 호출 없음) → 실패 시 KisAPI.get_atr
+    try:
+        series = _get_daily_series_cached(kis, code, count=window + 2)
+        if len(series) >= window + 1:
+            return series.atr(window)
+    except Exception:
+        pass
     if hasattr(kis, "get_atr"):
         try:
             return kis.get_atr(code, window=window)
@@ -1177,30 +1547,30 @@ def _init_position_state(kis: KisAPI, holding: Dict[str, Any], code: str, entry_
     rng_eff = (atr * 1.5) if (atr and atr > 0) else max(1.0, entry_price * 0.01)
     t1 = entry_price + 0.5 * rng_eff
     t2 = entry_price + 1.0 * rng_eff
-    holding[code] = {
-        'qty': int(qty),
-        'buy_price': float(entry_price),
-        'entry_time': datetime.now(KST).isoformat(),
-        'high': float(entry_price),
-        'tp1': float(t1),
-        'tp2': float(t2),
-        'sold_p1': False,
-        'sold_p2': False,
-        'trail_pct': TRAIL_PCT,
-        'atr': float(atr) if atr else None,
-        'stop_abs': float(entry_price - ATR_STOP * atr) if atr else float(entry_price * (1 - FAST_STOP)),
-        'k_value': k_value,
-        'target_price_src': float(target_price) if target_price is not None else None,
-        'bear_s1_done': False,
-        'bear_s2_done': False,
+    holding[code] = Position(
+        qty=int(qty),
+        buy_price=float(entry_price),
+        entry_time=datetime.now(KST).isoformat(),
+        high=float(entry_price),
+        tp1=float(t1),
+        tp2=float(t2),
+        sold_p1=False,
+        sold_p2=False,
+        trail_pct=TRAIL_PCT,
+        atr=float(atr) if atr else None,
+        stop_abs=float(entry_price - ATR_STOP * atr) if atr else float(entry_price * (1 - FAST_STOP)),
+        k_value=k_value,
+        target_price_src=float(target_price) if target_price is not None else None,
+        bear_s1_done=False,
+        bear_s2_done=False,
         # 눌림목 3단계 진입 관련 기본값 (신규 매수 직후 overwrite 가능)
-        'entry_stage': 1,
-        'max_price_after_entry': float(entry_price),
-        'planned_total_qty': int(qty),
-        'stage1_qty': int(qty),
-        'stage2_qty': 0,
-        'stage3_qty': 0,
-    }
+        entry_stage=1,
+        max_price_after_entry=float(entry_price),
+        planned_total_qty=int(qty),
+        stage1_qty=int(qty),
+        stage2_qty=0,
+        stage3_qty=0,
+    )
 
 def _init_position_state_from_balance(kis: KisAPI, holding: Dict[str, Any], code: str, avg_price: float, qty: int) -> None:
     if qty <= 0 or code in holding:
@@ -1213,37 +1583,37 @@ def _init_position_state_from_balance(kis: KisAPI, holding: Dict[str, Any], code
     rng_eff = (atr * 1.5) if (atr and atr > 0) else max(1.0, avg_price * 0.01)
     t1 = avg_price + 0.5 * rng_eff
     t2 = avg_price + 1.0 * rng_eff
-    holding[code] = {
-        'qty': int(qty),
-        'buy_price': float(avg_price),
-        'entry_time': (datetime.now(KST) - timedelta(minutes=10)).isoformat(),
-        'high': float(avg_price),
-        'tp1': float(t1),
-        'tp2': float(t2),
-        'sold_p1': False,
-        'sold_p2': False,
-        'trail_pct': TRAIL_PCT,
-        'atr': float(atr) if atr else None,
-        'stop_abs': float(avg_price - ATR_STOP * atr) if atr else float(avg_price * (1 - FAST_STOP)),
-        'k_value': None,
-        'target_price_src': None,
-        'bear_s1_done': False,
-        'bear_s2_done': False,
+    holding[code] = Position(
+        qty=int(qty),
+        buy_price=float(avg_price),
+        entry_time=(datetime.now(KST) - timedelta(minutes=10)).isoformat(),
+        high=float(avg_price),
+        tp1=float(t1),
+        tp2=float(t2),
+        sold_p1=False,
+        sold_p2=False,
+        trail_pct=TRAIL_PCT,
+        atr=float(atr) if atr else None,
+        stop_abs=float(avg_price - ATR_STOP * atr) if atr else float(avg_price * (1 - FAST_STOP)),
+        k_value=None,
+        target_price_src=None,
+        bear_s1_done=False,
+        bear_s2_done=False,
         # 기존 보유분은 추가 진입(stage 3 완료 상태)으로 간주
-        'entry_stage': 3,
-        'max_price_after_entry': float(avg_price),
-        'planned_total_qty': int(qty),
-        'stage1_qty': int(qty),
-        'stage2_qty': 0,
-        'stage3_qty': 0,
-    }
+        entry_stage=3,
+        max_price_after_entry=float(avg_price),
+        planned_total_qty=int(qty),
+        stage1_qty=int(qty),
+        stage2_qty=0,
+        stage3_qty=0,
+    )
 
 
 def _maybe_scale_in_dips(
     kis: KisAPI,
     holding: Dict[str, Any],
     code: str,
-    target: Dict[str, Any],
+    target: Target,
     now_str: str,
     regime_mode: str,
 ) -> None:
@@ -1285,7 +1655,7 @@ def _maybe_scale_in_dips(
 
     # VWAP 가드: 과도한 추세 붕괴 구간에서는 추가 진입하지 않음
     try:
-        vwap_val = kis.get_vwap_today(code)
+        vwap_val = _get_vwap_for_guard(kis, code)
     except Exception:
         vwap_val = None
     if vwap_val is None or vwap_val <= 0:
@@ -1301,7 +1671,7 @@ def _maybe_scale_in_dips(
     # 계획 수량 계산
     planned_total_qty = int(
         pos.get("planned_total_qty")
-        or _to_int(target.get("매수수량") or target.get("qty"), 0)
+        or int(target.qty)
     )
     if planned_total_qty <= 0:
         return
@@ -1393,7 +1763,7 @@ def _maybe_scale_in_dips(
         ensure_fill_has_name(
             odno=odno,
             code=code,
-            name=str(target.get("name") or target.get("종목명") or ""),
+            name=str(target.name or ""),
             qty=int(add_qty),
             price=float(cur_price),
         )
@@ -1411,7 +1781,7 @@ def _maybe_scale_in_dips(
             {
                 "datetime": now_str,
                 "code": code,
-                "name": target.get("name") or target.get("종목명"),
+                "name": target.name,
                 "qty": int(add_qty),
                 "K": pos.get("k_value"),
                 "target_price": pos.get("target_price_src"),
@@ -1449,6 +1819,12 @@ def _sell_once(kis: KisAPI, code: str, qty: int, prefer_market=True) -> Tuple[Op
     return cur_price, result
 
 def ensure_fill_has_name(odno: str, code: str, name: str, qty: int = 0, price: float = 0.0) -> None:
+    # 'fills' 싱크 스레드에서 실행 → 같은 날 append_fill 행이 먼저 기록된 뒤 이름 보정
+    event_writer.submit_call(
+        "fills", lambda: _ensure_fill_has_name_sync(odno, code, name, qty, price)
+    )
+
+def _ensure_fill_has_name_sync(odno: str, code: str, name: str, qty: int = 0, price: float = 0.0) -> None:
     try:
         fills_dir = Path("fills")
         fills_dir.mkdir(exist_ok=True)
@@ -1489,8 +1865,8 @@ def ensure_fill_has_name(odno: str, code: str, name: str, qty: int = 0, price: f
         logger.warning(f"[ENSURE_FILL_FAIL] odno={odno} code={code} ex={e}")
 
 # === 앵커: 목표가 계산 함수 ===
-def compute_entry_target(kis: KisAPI, stk: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
-    code = str(stk.get("code") or stk.get("stock_code") or stk.get("pdno") or "")
+def compute_entry_target(kis: KisAPI, stk: Target) -> Tuple[Optional[float], Optional[float]]:
+    code = stk.code
     if not code:
         return None, None
 
@@ -1539,20 +1915,172 @@ def compute_entry_target(kis: KisAPI, stk: Dict[str, Any]) -> Tuple[Optional[flo
             pass
 
     if prev_high is None or prev_low is None:
-        prev_high = _to_float(stk.get("prev_high"))
-        prev_low  = _to_float(stk.get("prev_low"))
+        prev_high = _to_float(stk.prev_high)
+        prev_low  = _to_float(stk.prev_low)
         if prev_high is None or prev_low is None:
             logger.warning(f"[TARGET/prev_candle_fail] {code} 전일 캔들/백업 모두 부재")
             return None, None
 
     rng = max(0.0, float(prev_high) - float(prev_low))
-    k_used = float(stk.get("best_k") or stk.get("K") or stk.get("k") or 0.5)
+    k_used = float(stk.best_k or 0.5)
     raw_target = float(today_open) + rng * k_used
 
     eff_target_price = float(_round_to_tick(raw_target, mode="up"))
     return float(eff_target_price), float(k_used)
 
+# 지정가 매수 주문관리자(프로세스 1개) — 최초 주문 시 생성
+_ORDER_MANAGER: Optional[OrderManager] = None
+_DEFERRED_FINALS: List[Dict[str, Any]] = []  # claim 실패로 반영이 이월된 종료 주문
+
+
+def _get_order_manager(kis: KisAPI) -> OrderManager:
+    global _ORDER_MANAGER
+    if _ORDER_MANAGER is None:
+        _ORDER_MANAGER = OrderManager(
+            kis,
+            tick_size=_krx_tick,
+            round_to_tick=_round_to_tick,
+            poll_sec=ORDER_POLL_SEC,
+            chase_after_sec=ORDER_CHASE_AFTER_SEC,
+            chase_ticks=ORDER_CHASE_TICKS,
+            max_slippage_pct=ORDER_MAX_SLIPPAGE_PCT,
+            max_chase_steps=ORDER_CHASE_MAX_STEPS,
+            max_age_sec=ORDER_MAX_AGE_SEC,
+            market_fallback=ORDER_MARKET_FALLBACK,
+        )
+    return _ORDER_MANAGER
+
+
+def _sync_managed_orders(holding: Dict[str, Any], traded: Dict[str, Any], ctx: Optional["LoopContext"] = None) -> None:
+    """
+    종료된 관리 주문을 보유상태/거래로그에 반영(메인 스레드).
+    - 진입 시 holding/traded에는 요청수량(req_qty)으로 선반영 → 실제 체결수량과의 차이만큼 보정
+    - 전량 미체결이면 선반영한 보유항목 제거
+    - BUY 로그는 제출 시점에 호출측이 이미 남김 → 여기서는 BUY_FILL 보정 레코드만 기록
+      (report_ceo는 건수에 넣지 않고 qty_delta만 매수수량에 반영)
+    - unverified(체결조회 불가): 체결로 간주하지 않음 → 선반영 보유 제거 후 잔고 동기화가 실제 수량으로 재등록
+    - ctx(async 런타임): 종목 claim을 얻은 주문만 반영, 나머지는 다음 호출로 이월
+    """
+    global _DEFERRED_FINALS
+    if _ORDER_MANAGER is None:
+        return
+    finals = _DEFERRED_FINALS + _ORDER_MANAGER.drain_final()
+    _DEFERRED_FINALS = []
+    if finals:
+        LOOP_SCHED.trigger("balance")  # 체결 확정 → 다음 잔고 동기화 즉시
+    for o in finals:
+        code = o["code"]
+        if ctx is not None and not ctx.claim(code):
+            _DEFERRED_FINALS.append(o)  # 같은 종목을 청산/진입 중 → 다음 호출에서 반영
+            continue
+        try:
+            _apply_managed_final(o, holding, traded)
+        finally:
+            if ctx is not None:
+                ctx.release(code)
+
+
+def _apply_managed_final(o: Dict[str, Any], holding: Dict[str, Any], traded: Dict[str, Any]) -> None:
+    """종료된 관리 주문 1건 → BUY_FILL 보정 로그 + holding/traded 수량 보정(호출측이 claim 보유)."""
+    code = o["code"]
+    req_qty = int(o.get("req_qty") or o.get("qty") or 0)
+    if o["state"] == "unverified":
+        _apply_unverified_final(o, req_qty, holding, traded)
+        return
+    filled = int(o.get("filled_qty") or 0)
+    delta = filled - req_qty
+    fill_price = o.get("avg_price")
+    base = o.get("base_price") or 0
+    slippage = ((fill_price - base) / base * 100.0) if (fill_price and base) else None
+    log_trade({
+        "datetime": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
+        "code": code,
+        "side": "BUY_FILL",
+        "order_price": base,
+        "fill_price": fill_price,
+        "slippage_pct": round(slippage, 2) if slippage is not None else None,
+        "qty": filled,
+        "qty_delta": delta,
+        "order_qty": req_qty,
+        "placed_qty": o.get("qty"),
+        "result": o.get("response"),
+        "status": "filled" if o["state"] == "filled" else ("partial" if filled > 0 else o["state"]),
+        "fail_reason": None if filled > 0 else (o.get("note") or o["state"]),
+        "order_id": o.get("order_id"),
+        "chase_steps": o.get("chase_steps"),
+        "final_price": o.get("price"),
+    })
+    if slippage is not None and abs(slippage) > SLIPPAGE_LIMIT_PCT:
+        logger.warning(f"[슬리피지 경고] {code} slippage {slippage:.2f}% > 임계값({SLIPPAGE_LIMIT_PCT}%)")
+    pos = holding.get(code)
+    if delta == 0 or pos is None:
+        return
+    new_qty = _to_int(pos.get("qty"), 0) + delta
+    if new_qty <= 0:
+        logger.info(f"[ORDER-SYNC] {code} 미체결 종료({o['state']}) → 선반영 보유 제거")
+        holding.pop(code, None)
+    else:
+        logger.info(f"[ORDER-SYNC] {code} 체결 {filled}/{req_qty} → 보유수량 {pos.get('qty')}→{new_qty}")
+        pos["qty"] = int(new_qty)
+        holding[code] = pos
+    if code in traded:
+        traded[code]["qty"] = max(0, _to_int(traded[code].get("qty"), 0) + delta)
+
+
+def _apply_unverified_final(o: Dict[str, Any], req_qty: int, holding: Dict[str, Any], traded: Dict[str, Any]) -> None:
+    """체결 확인 불가로 종료된 주문: 수량 미상 BUY_FILL 기록 + 선반영 보유 제거(실제 수량은 _phase_balance가 확정)."""
+    code = o["code"]
+    log_trade({
+        "datetime": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
+        "code": code,
+        "side": "BUY_FILL",
+        "order_price": o.get("base_price"),
+        "fill_price": None,
+        "qty": None,
+        "qty_delta": -req_qty,  # 미확인 수량은 매수수량에서 제외
+        "order_qty": req_qty,
+        "placed_qty": o.get("qty"),
+        "result": o.get("response"),
+        "status": "unverified",
+        "fail_reason": o.get("note") or "unverified",
+        "order_id": o.get("order_id"),
+        "chase_steps": o.get("chase_steps"),
+        "final_price": o.get("price"),
+    })
+    logger.warning(f"[ORDER-SYNC] {code} 체결 확인 불가({o.get('note')}) → 선반영 보유 제거, 잔고 동기화로 확정")
+    holding.pop(code, None)
+    LOOP_SCHED.forget_key("exit", code)
+    if code in traded:
+        traded[code]["qty"] = 0
+        traded[code]["unverified"] = True
+
+
 def place_buy_with_fallback(kis: KisAPI, code: str, qty: int, limit_price: int) -> Dict[str, Any]:
+    """
+    매수 주문(지정가 우선, 실패시 시장가 Fallback)
+    - ORDER_MANAGER_ENABLE: 지정가 접수만 하고 즉시 반환. 체결 폴링/정정 추격/잔량 취소는
+      OrderManager 워커가 수행하고, 결과는 다음 루프 패스에서 _sync_managed_orders()가 반영
+    - 접수 실패 또는 비활성 시: 기존 동기 경로(_place_buy_with_fallback_sync)
+    """
+    order_price = _round_to_tick(limit_price, mode="up") if (limit_price and limit_price > 0) else 0
+    if ORDER_MANAGER_ENABLE and order_price > 0 and hasattr(kis, "inquire_daily_ccld"):
+        try:
+            order, resp = _get_order_manager(kis).submit_buy(code, int(qty), int(order_price))
+        except Exception as e:
+            logger.error("[BUY-LIMIT-FAIL] %s qty=%s limit=%s err=%s", code, qty, order_price, e)
+            order, resp = None, None
+        if order is not None:
+            logger.info("[BUY-LIMIT] %s qty=%s limit=%s -> %s (order_id=%s)", code, qty, order_price, resp, order.order_id)
+            out = dict(resp)
+            out["order_id"] = order.order_id
+            out["order_state"] = order.state
+            return out
+        logger.warning("[BUY-LIMIT] %s 지정가 접수 실패(%s) → 시장가로 진행", code, resp)
+        return _place_buy_with_fallback_sync(kis, code, qty, 0)
+    return _place_buy_with_fallback_sync(kis, code, qty, limit_price)
+
+
+def _place_buy_with_fallback_sync(kis: KisAPI, code: str, qty: int, limit_price: int) -> Dict[str, Any]:
     """
     매수 주문(지정가 우선, 실패시 시장가 Fallback) + 체결가/슬리피지/네트워크 장애/실패 상세 로깅
     """
@@ -1690,6 +2218,11 @@ TRAIL_PCT_BULL = float(_cfg("TRAIL_PCT_BULL"))
 TRAIL_PCT_BEAR = float(_cfg("TRAIL_PCT_BEAR"))
 TP_PROFIT_PCT_BASE = DEFAULT_PROFIT_PCT
 TP_PROFIT_PCT_BULL = float(_cfg("TP_PROFIT_PCT_BULL"))
+# _adaptive_exit 약세장 1/2차 익절선(%) — 상승/중립장은 DEFAULT_PROFIT_PCT 기준 상향
+TP1_PCT_BEAR = 2.0
+TP2_PCT_BEAR = 4.0
+# 레짐별 1차 익절선 중 최저(_exit_near_levels 근접 판정용)
+TP1_PCT_MIN = min(TP1_PCT_BEAR, DEFAULT_PROFIT_PCT)
 
 # === [ANCHOR: REGIME STATE] 코스닥 레짐 상태 ===
 REGIME_STATE: Dict[str, Any] = {
@@ -1705,7 +2238,9 @@ REGIME_STATE: Dict[str, Any] = {
     "pct_change": None,          # 등락률(%)
     "stage": 0,
     "R20": None,
-    "D1": None
+    "D1": None,
+    "last_price": None,         # 직전 판정 시 지수(또는 ETF) 가격 — 변동 없으면 재판정 생략
+    "last_eval_day": None,
 }
 
 # === [ANCHOR: REGIME TABLES] 레짐별 자본 스케일 / 최대 보유 종목 수 / 챔피언 비중 ===
@@ -1815,6 +2350,19 @@ def _update_market_regime(kis: KisAPI) -> Dict[str, Any]:
     REGIME_STATE["prev_close"] = snap.get("prev_close")
     REGIME_STATE["pct_change"] = snap.get("pct_change")
 
+    # 지수 가격이 직전 판정과 같으면 R20/D1(일봉 조회) 재계산 생략
+    price = snap.get("price")
+    today = now.strftime("%Y%m%d")
+    if (
+        price is not None
+        and price == REGIME_STATE.get("last_price")
+        and REGIME_STATE.get("last_eval_day") == today
+        and REGIME_STATE.get("R20") is not None
+    ):
+        return REGIME_STATE
+    REGIME_STATE["last_price"] = price
+    REGIME_STATE["last_eval_day"] = today
+
     # R20 / D1 계산 (기본: KOSDAQ ETF 일봉)
     R20 = None
     D1 = None
@@ -2054,8 +2602,8 @@ def _adaptive_exit(
 
     elif regime_mode == "bear":
         # 약세장: 보수적으로
-        tp1 = 2.0
-        tp2 = 4.0
+        tp1 = TP1_PCT_BEAR
+        tp2 = TP2_PCT_BEAR
         trail_down_frac = 0.01
     else:
         tp1 = base_tp1
@@ -2127,447 +2675,633 @@ def _adaptive_exit(
     return reason, exec_px, result, sold_qty
 
 
-def main():
-    kis = KisAPI()
+# === [ANCHOR: WARMUP] 장 시작 전 워밍업 ===
+def _seconds_until(now_kst: datetime, t: dtime) -> float:
+    target = now_kst.replace(hour=t.hour, minute=t.minute, second=0, microsecond=0)
+    return (target - now_kst).total_seconds()
 
-    rebalance_date = get_rebalance_anchor_date()
-    logger.info(f"[ℹ️ 리밸런싱 기준일(KST)]: {rebalance_date} (anchor={REBALANCE_ANCHOR}, ref={WEEKLY_ANCHOR_REF})")
-    logger.info(
-        f"[⏱️ 커트오프(KST)] SELL_FORCE_TIME={SELL_FORCE_TIME.strftime('%H:%M')} / 전체잔고매도={SELL_ALL_BALANCES_AT_CUTOFF} / "
-        f"패스(커트오프/마감)={FORCE_SELL_PASSES_CUTOFF}/{FORCE_SELL_PASSES_CLOSE}"
-    )
-    logger.info(f"[💰 DAILY_CAPITAL] {DAILY_CAPITAL:,}원")
-    logger.info(f"[🛡️ SLIPPAGE_ENTER_GUARD_PCT] {SLIPPAGE_ENTER_GUARD_PCT:.2f}%")
 
-    # 상태 복구
-    holding, traded = load_state()
-    logger.info(f"[상태복구] holding: {list(holding.keys())}, traded: {list(traded.keys())}")
+def _run_warmup(
+    kis: KisAPI,
+    codes: List[str],
+    deadline: datetime,
+) -> Dict[str, Any]:
+    """
+    첫 장중 루프가 필요로 하는 데이터를 장 시작 전에 미리 준비하고 검증한다.
+    - 토큰 잔여시간 점검(커트오프 이후까지 유효하도록 사전 재발급) + HTTP keep-alive 연결 선점
+    - 코드별 일봉 CandleSeries/ATR/MA/눌림목 셋업 캐시 적재, (시장구분, 코드포맷) 사전 확정
+    - 레짐 스냅샷 1회 계산
+    deadline(KST)을 넘기면 남은 종목은 건너뛰고 보고한다. (시초가는 09:00 이후에만 확정되므로 제외)
+    """
+    t0 = time.time()
+    report: Dict[str, Any] = {"ok": [], "fail": {}, "skipped": [], "code_fmt": 0}
+
+    now_kst = datetime.now(KST)
+    min_valid = max(0.0, _seconds_until(now_kst, SELL_FORCE_TIME)) + 1800.0
+    report["token_ok"] = bool(kis.ensure_token_fresh(min_valid))
+    report["connections"] = kis.warm_connections(2)
+
+    today = now_kst.strftime("%Y%m%d")
+    for idx, code in enumerate(codes):
+        if datetime.now(KST) >= deadline:
+            report["skipped"] = list(codes[idx:])
+            break
+        try:
+            series = _get_daily_series_cached(kis, code, count=max(PULLBACK_LOOKBACK, 60))
+            if len(series) < 21:
+                report["fail"][code] = f"short_candles:{len(series)}"
+                continue
+            completed = series.completed(today)
+            completed.sma(5); completed.sma(10); completed.sma(20)
+            completed.peak(60); completed.down_streaks()
+            series.atr(14)
+            _evaluate_pullback_setup(kis, code)
+            if kis.resolve_code_format(code):
+                report["code_fmt"] += 1
+            report["ok"].append(code)
+        except Exception as e:
+            report["fail"][code] = str(e)
+        time.sleep(RATE_SLEEP_SEC * 0.2)
 
-    # === [NEW] 주간 리밸런싱 강제/중복 방지 ===
-    targets: List[Dict[str, Any]] = []
-    if REBALANCE_ANCHOR == "weekly":
-        if should_weekly_rebalance_now():
-            targets = fetch_rebalancing_targets(rebalance_date)
-            # 중복 실행 방지를 위해 즉시 스탬프(필요 시 FORCE로 재실행 가능)
-            stamp_weekly_done()
-            logger.info(f"[REBALANCE] 이번 주 리밸런싱 실행 기록 저장({_this_iso_week_key()})")
-        else:
-            logger.info("[REBALANCE] 이번 주 이미 실행됨 → 신규 리밸런싱 생략 (보유 관리만)")
-    else:
-        # today/monthly 등 다른 앵커 모드는 기존 방식으로 바로 호출
-        targets = fetch_rebalancing_targets(rebalance_date)
+    try:
+        _update_market_regime(kis)
+        report["regime_ok"] = True
+    except Exception as e:
+        report["regime_ok"] = False
+        logger.warning(f"[WARMUP] 레짐 스냅샷 실패: {e}")
 
-    # === [NEW] 예산 가드: 예수금이 0/부족이면 신규 매수만 스킵 ===
-    effective_cash = _get_effective_ord_cash(kis)
-    if effective_cash <= 0:
-        can_buy = False
-        logger.warning("[BUDGET] 유효 예산 0 → 신규 매수 스킵(보유 관리만 수행)")
-    else:
-        can_buy = True
+    report["elapsed_sec"] = round(time.time() - t0, 2)
+    report["ready_at"] = datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+    for code, why in report["fail"].items():
+        logger.warning(f"[WARMUP-FAIL] {code}: {why}")
     logger.info(
-        f"[BUDGET] today effective cash = {effective_cash:,} KRW "
-        f"(env DAILY_CAPITAL={DAILY_CAPITAL:,})"
+        f"[WARMUP-READY] ready_at={report['ready_at']} elapsed={report['elapsed_sec']}s "
+        f"ok={len(report['ok'])}/{len(codes)} fail={len(report['fail'])} skipped={len(report['skipped'])} "
+        f"code_fmt={report['code_fmt']} token_ok={report['token_ok']} conns={report['connections']} "
+        f"regime_ok={report['regime_ok']}"
     )
-
-    # 리밸런싱 대상 후처리: qty 없고 weight만 있으면 DAILY_CAPITAL로 수량 계산
-    processed_targets: Dict[str, Any] = {}
-    for t in targets:
-        code = t.get("stock_code") or t.get("code")
-        if not code:
-            continue
-        name = t.get("name") or t.get("종목명")
-        k_best = t.get("best_k") or t.get("K") or t.get("k")
-        target_price = _to_float(t.get("목표가") or t.get("target_price"))
-        qty = _to_int(t.get("매수수량") or t.get("qty"), 0)
-        weight = t.get("weight")
-        strategy = t.get("strategy") or "전월 rolling K 최적화"
-        avg_return_pct = _to_float(t.get("avg_return_pct") or t.get("수익률(%)"), 0.0)
-        win_rate_pct = _to_float(t.get("win_rate_pct") or t.get("승률(%)"), 0.0)
-        mdd_pct = _to_float(t.get("mdd_pct") or t.get("MDD(%)"), 0.0)
-        trades = _to_int(t.get("trades"), 0)
-        sharpe_m = _to_float(t.get("sharpe_m"), 0.0)
-        cumret_pct = _to_float(t.get("cumulative_return_pct") or t.get("수익률(%)"), 0.0)
-
-        if qty <= 0 and weight is not None:
-            ref_px = _to_float(t.get("close")) or _to_float(t.get("prev_close"))
-            try:
-                qty = _weight_to_qty(kis, code, float(weight), DAILY_CAPITAL, ref_price=ref_px)
-            except Exception as e:
-                logger.warning("[REBALANCE] weight→qty 변환 실패 %s: %s", code, e)
-                qty = 0
-
-        processed_targets[code] = {
-            "code": code,
-            "name": name,
-            "best_k": k_best,
-            "target_price": target_price,
-            "qty": qty,
-            "strategy": strategy,
-            "avg_return_pct": avg_return_pct,
-            "win_rate_pct": win_rate_pct,
-            "mdd_pct": mdd_pct,
-            "trades": trades,
-            "sharpe_m": sharpe_m,
-            "cumulative_return_pct": cumret_pct,
-            "prev_open": t.get("prev_open"),
-            "prev_high": t.get("prev_high"),
-            "prev_low": t.get("prev_low"),
-            "prev_close": t.get("prev_close"),
-            "prev_volume": t.get("prev_volume"),
-        }
-
-    filtered_targets: Dict[str, Any] = {}
-    for code, info in processed_targets.items():
-        trades = _to_int(info.get("trades"), 0)
-        win_rate = _to_float(info.get("win_rate_pct"), 0.0)
-        mdd = abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0)
-        sharpe = _to_float(info.get("sharpe_m"), 0.0)
-
-        if (
-            trades < CHAMPION_MIN_TRADES
-            or win_rate < CHAMPION_MIN_WINRATE
-            or mdd > CHAMPION_MAX_MDD
-            or sharpe < CHAMPION_MIN_SHARPE
-        ):
-            logger.info(
-                f"[CHAMPION_FILTER_SKIP] {code}: trades={trades}, win={win_rate:.1f}%, mdd={mdd:.1f}%, sharpe={sharpe:.2f}"
-            )
-            continue
-
-        filtered_targets[code] = info
-
-    processed_targets = filtered_targets
-
-    # 챔피언 등급화 (A/B/C) → 실제 매수 후보는 A급만 사용
-    graded_targets: Dict[str, Any] = {}
-    grade_counts = {"A": 0, "B": 0, "C": 0}
-    for code, info in processed_targets.items():
-        grade = _classify_champion_grade(info)
-        info["champion_grade"] = grade
-        graded_targets[code] = info
-        grade_counts[grade] = grade_counts.get(grade, 0) + 1
-
-    logger.info(
-        "[CHAMPION-GRADE] A:%d / B:%d / C:%d (A급만 실제 매수)",
-        grade_counts.get("A", 0),
-        grade_counts.get("B", 0),
-        grade_counts.get("C", 0),
-    )
-
-    processed_targets = {code: info for code, info in graded_targets.items() if info.get("champion_grade") == "A"}
-    non_a = [code for code, info in graded_targets.items() if info.get("champion_grade") != "A"]
-    if non_a:
-        logger.info(
-            "[CHAMPION-HOLD] B/C급 %d종목은 관찰만 하고 매수 제외: %s",
-            len(non_a),
-            ",".join(non_a),
-        )
-
-    if processed_targets:
-        cumrets = [
-            _to_float(info.get("cumulative_return_pct"), 0.0) or 0.0 for info in processed_targets.values()
-        ]
-        win_rates = [_to_float(info.get("win_rate_pct"), 0.0) or 0.0 for info in processed_targets.values()]
-        sharpes = [_to_float(info.get("sharpe_m"), 0.0) or 0.0 for info in processed_targets.values()]
-        mdds = [abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0) for info in processed_targets.values()]
-
-        for code, info in processed_targets.items():
-            cum = _to_float(info.get("cumulative_return_pct"), 0.0) or 0.0
-            win = _to_float(info.get("win_rate_pct"), 0.0) or 0.0
-            sharpe = _to_float(info.get("sharpe_m"), 0.0) or 0.0
-            mdd_val = abs(_to_float(info.get("mdd_pct"), 0.0) or 0.0)
-
-            score = (
-                _percentile_rank(cumrets, cum) * 0.35
-                + _percentile_rank(win_rates, win) * 0.25
-                + _percentile_rank(sharpes, sharpe) * 0.25
-                + _percentile_rank(mdds, mdd_val, higher_is_better=False) * 0.15
-            )
-
-            info["composite_score"] = round(score, 4)
-            processed_targets[code] = info
-    else:
-        logger.warning("[CHAMPION_FILTER] 조건 충족 종목 없음 → 챔피언 루프 스킵")
-
-    # === [NEW] Regime + 모멘텀 기반 상위 1~2종목 자동 선택 ===
-    # - rolling K 리밸런싱 결과 중에서 최근 모멘텀/수익률이 가장 강한 소수 종목만 실매매 대상으로 사용
-    # - 레짐(mode)에 따라 신규 편입 허용 종목 수를 1~2개로 자동 조절
-    #   * bull / neutral: 최대 2개
-    #   * bear: 최대 1개 (방어적 운용)
-    # - intraday 진입은 기존 VWAP 가드(is_vwap_ok_for_entry)로 필터링됨
-    selected_targets: Dict[str, Any] = {}
+    return report
 
 
+def _prefetch_rebalance_candidate(kis: KisAPI, code: str) -> None:
+    """리밸런싱 스트림으로 먼저 도착한 후보의 일봉 시리즈/ATR/눌림목 셋업을 워밍업과 같은 캐시에 선적재."""
     try:
-        # 가능하면 당일 레짐을 한번 계산해서 사용
-        regime_snapshot = _update_market_regime(kis)
-        mode = (regime_snapshot or {}).get("mode") or "neutral"
-        stage = int((regime_snapshot or {}).get("stage") or 0)
-        R20 = regime_snapshot.get("R20")
-        D1 = regime_snapshot.get("D1")
-
-        # 🔹 로그/조건식에서 쓰는 등락률(%): 새 레짐에서는 D1을 그대로 사용
-        pct_change = float(D1 or 0.0)
+        series = _get_daily_series_cached(kis, code, count=max(PULLBACK_LOOKBACK, 60))
+        series.atr(14)
+        _evaluate_pullback_setup(kis, code)
     except Exception as e:
-        logger.warning("[REBALANCE] 레짐 스냅샷 계산 실패, neutral-0로 대체: %s", e)
-        mode = "neutral"
-        stage = 0
-        R20 = None
-        D1 = None
-        pct_change = 0.0
-
-    regime_key = (mode, stage)
-    cap_scale = REGIME_CAPITAL_SCALE.get(regime_key, REGIME_CAPITAL_SCALE.get(("neutral", 0), 0.5))
-
-    # 레짐 + 예수금 기반 실제 사용 자본 계산
-        # 레짐 + 예수금 기반 실제 사용 자본 계산 (0/실패 시 DAILY_CAPITAL fallback)
-    ord_cash = _get_effective_ord_cash(kis)
-
-    capital_base = int(max(0, int(ord_cash * CAP_CAP)))
-    capital_active = int(min(capital_base * cap_scale, DAILY_CAPITAL))
-    logger.info(
-        f"[REGIME-CAP] mode={mode} stage={stage} R20={R20 if R20 is not None else 'N/A'} "
-        f"D1={D1 if D1 is not None else 'N/A'} "
-        f"ord_cash(effective)={ord_cash:,} base={capital_base:,} active={capital_active:,} "
-        f"scale={cap_scale:.2f}"
-    )
-
-
+        logger.debug(f"[REBALANCE-PREFETCH] {code} 선적재 실패: {e}")
 
-    # 레짐별 최대 보유 종목 수
-    n_active = REGIME_MAX_ACTIVE.get(regime_key, REGIME_MAX_ACTIVE.get(("neutral", 0), 3))
 
-    scored: List[Tuple[str, float, bool]] = []
+def _fetch_targets_with_prefetch(kis: KisAPI, rebalance_date: str) -> List[Dict[str, Any]]:
+    """fetch_rebalancing_targets + 스트림 도착 후보 선적재(백그라운드 스레드, 전체 결과 대기와 병행)."""
+    prefetched: set = set()
+    pool = ThreadPoolExecutor(max_workers=max(1, REBALANCE_PREFETCH_WORKERS), thread_name_prefix="rebal-prefetch")
 
-    for code, info in processed_targets.items():
-        score = _to_float(info.get("composite_score"), 0.0) or 0.0
+    def _on_candidate(item: Dict[str, Any]) -> None:
+        code = str(item.get("code") or item.get("stock_code") or "")
+        if code and code not in prefetched:
+            prefetched.add(code)
+            pool.submit(_prefetch_rebalance_candidate, kis, code)
 
-        # 단기 모멘텀 강세 여부 (is_strong_momentum)로 버킷 구분
-        try:
-            strong = is_strong_momentum(kis, code)
-        except Exception as e:
-            logger.warning("[REBALANCE] 모멘텀 판별 실패 %s: %s", code, e)
-            strong = False
+    try:
+        return fetch_rebalancing_targets(rebalance_date, on_candidate=_on_candidate)
+    finally:
+        # 선적재는 최적화일 뿐 → 남은 작업을 기다리지 않고 진행
+        pool.shutdown(wait=False)
+        if prefetched:
+            logger.info(f"[REBALANCE-PREFETCH] 스트림 후보 {len(prefetched)}종목 선적재 요청")
+
+
+def _seconds_until_next_session(now_kst: datetime) -> float:
+    """다음 평일 세션 준비 시각(워밍업 시작 또는 개장)까지 남은 초."""
+    start = WARMUP_START if WARMUP_ENABLE else MARKET_OPEN_TIME
+    nxt = now_kst.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+    if nxt <= now_kst:
+        nxt += timedelta(days=1)
+    while nxt.weekday() >= 5:
+        nxt += timedelta(days=1)
+    return (nxt - now_kst).total_seconds()
+
+
+# === [ANCHOR: LOOP_SCHED] 메인 루프 작업별 주기 ===
+LOOP_SCHED = LoopScheduler(tick_sec=SCHED_TICK_SEC, idle_sec=SCHED_IDLE_SEC)
+LOOP_SCHED.add("regime", REGIME_CHECK_SEC)
+LOOP_SCHED.add("balance", BALANCE_SYNC_SEC)
+LOOP_SCHED.add("entries", ENTRY_CHECK_SEC)
+LOOP_SCHED.add("pullback", PULLBACK_SCAN_SEC)
+
+# === [ANCHOR: LOOP_PROF] 루프 단계별 계측 ===
+LOOP_PROF = LoopProfiler(
+    ring_size=LOOP_TIMING_RING,
+    out_dir=LOG_DIR,
+    slow_sec=LOOP_SLOW_SEC,
+    summary_sec=LOOP_TIMING_LOG_SEC,
+    sample_mode=LOOP_PROFILE,
+    sample_interval_ms=LOOP_PROFILE_SAMPLE_MS,
+    write_file=LOOP_TIMING_FILE,
+    call_counter=request_count,
+)
+
+
+def _apply_shed_level(old: int, new: int) -> None:
+    """워치독 단계 변경 → 분봉/모멘텀 갱신 간격 확대/복원(3단계)."""
+    mult = SHED_TTL_MULT if new >= LEVEL_WIDEN_TTL else 1.0
+    MINUTE_BARS.refresh_sec = MOM_REFRESH_SEC * mult
+    if (old >= LEVEL_WIDEN_TTL) != (new >= LEVEL_WIDEN_TTL):
+        logger.info(f"[WATCHDOG] 분봉 갱신 간격 {MINUTE_BARS.refresh_sec:.0f}s")
+
+
+# === [ANCHOR: WATCHDOG] 루프 지연 예산 / 단계적 부하 차단 ===
+WATCHDOG = LatencyWatchdog(
+    budget_sec=LOOP_BUDGET_SEC,
+    escalate_after=SHED_ESCALATE_PASSES,
+    recover_after=SHED_RECOVER_PASSES,
+    recover_ratio=SHED_RECOVER_RATIO,
+    on_change=_apply_shed_level,
+    enabled=WATCHDOG_ENABLE,
+)
+
+
+def _after_order(holding: Dict[str, Any], traded: Dict[str, Any]) -> None:
+    """주문 직후 공통 처리: 상태 저장 + 다음 패스 잔고 동기화 예약 + 주문 간 간격."""
+    save_state(holding, traded)
+    LOOP_SCHED.trigger("balance")
+    time.sleep(RATE_SLEEP_SEC)
+
+
+def _exit_near_levels(code: str, pos: Dict[str, Any]) -> bool:
+    """
+    최근 시세(캐시, I/O 없음) 기준으로 손절/1차 익절/트레일링/ATR 스톱 선에 EXIT_NEAR_PCT 이내인지.
+    시세를 아직 모르면 근접으로 간주(매 틱 평가).
+    """
+    px = _to_float(_LAST_PRICE_CACHE.peek(code))
+    bp = _to_float(pos.get("buy_price"), 0.0) or 0.0
+    if not px or px <= 0 or bp <= 0:
+        return True
+    pnl = (px - bp) / bp * 100.0
+    if pnl <= -(abs(DEFAULT_LOSS_PCT) - EXIT_NEAR_PCT):
+        return True
+    if pnl >= TP1_PCT_MIN - EXIT_NEAR_PCT:
+        return True
+    high = _to_float(pos.get("high"), bp) or bp
+    if high >= bp * (1 + TP1_PCT_MIN / 100.0):
+        return True  # 트레일링 스탑 활성 구간
+    stop_abs = _to_float(pos.get("stop_abs"))
+    if stop_abs and px <= stop_abs * (1 + EXIT_NEAR_PCT / 100.0):
+        return True
+    return False
 
-        scored.append((code, score, strong))
 
-    # 모멘텀 strong 버킷 우선, 그 다음 나머지 중에서 점수 순으로 채우기
-    strong_bucket = [x for x in scored if x[2]]
-    weak_bucket = [x for x in scored if not x[2]]
+def _exit_due(code: str, pos: Dict[str, Any]) -> bool:
+    """청산 평가 주기 도래 여부: 근접 종목은 매 틱(SCHED_TICK_SEC), 그 외 EXIT_CHECK_SEC."""
+    near = _exit_near_levels(code, pos)
+    return LOOP_SCHED.due_key("exit", code, SCHED_TICK_SEC if near else EXIT_CHECK_SEC, urgent=near)
 
-    strong_bucket.sort(key=lambda x: x[1], reverse=True)
-    weak_bucket.sort(key=lambda x: x[1], reverse=True)
 
-    picked: List[str] = []
+class LoopContext:
+    """
+    한 세션(장중) 동안 단계(phase) 함수들이 공유하는 상태 묶음.
+    - sync 런타임: 메인 루프가 매 패스 refresh 후 단계들을 순서대로 호출(preempt=True → 루프 중간 긴급 청산 선점)
+    - async 런타임: 단계별 태스크가 스레드 풀에서 동시에 실행 → 종목 단위 claim/release로 같은 종목 동시 주문 방지
+    """
 
-    # 모멘텀 강한 버킷을 우선 사용하되, 전체 보유 종목 수는 레짐별 n_active로 제한
-    for code, score, _ in strong_bucket:
-        if len(picked) >= n_active:
-            break
-        picked.append(code)
+    __slots__ = (
+        "holding", "traded", "code_to_target", "pullback_watch", "can_buy",
+        "regime", "ord_psbl_map", "name_map", "is_open", "now_str",
+        "preempt", "stop", "_claimed", "_claim_lock",
+    )
 
-    for code, score, _ in weak_bucket:
-        if len(picked) >= n_active:
+    def __init__(
+        self,
+        holding: Dict[str, Any],
+        traded: Dict[str, Any],
+        code_to_target: Dict[str, Target],
+        pullback_watch: Dict[str, Any],
+        can_buy: bool,
+        regime: Dict[str, Any],
+    ):
+        self.holding = holding
+        self.traded = traded
+        self.code_to_target = code_to_target
+        self.pullback_watch = pullback_watch
+        self.can_buy = can_buy
+        self.regime = regime
+        self.ord_psbl_map: Dict[str, int] = {}
+        self.name_map: Dict[str, str] = {}
+        self.is_open = False
+        self.now_str = ""
+        self.preempt = True
+        self.stop = threading.Event()
+        self._claimed: set = set()
+        self._claim_lock = threading.Lock()
+
+    def refresh(self, kis: KisAPI) -> None:
+        self.is_open = kis.is_market_open()
+        self.now_str = datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+
+    def claim(self, code: str) -> bool:
+        """종목 단위 배타 처리권 획득(이미 다른 작업이 처리 중이면 False)."""
+        with self._claim_lock:
+            if code in self._claimed:
+                return False
+            self._claimed.add(code)
+            return True
+
+    def release(self, code: str) -> None:
+        with self._claim_lock:
+            self._claimed.discard(code)
+
+
+def _run_urgent_exits(kis: KisAPI, ctx: LoopContext) -> int:
+    """청산 근접 종목 중 주기가 도래한 것만 즉시 평가 — 진입/스캔 같은 일반 작업 중간에 선점 실행."""
+    holding = ctx.holding
+    n = 0
+    for code in list(holding.keys()):
+        if ctx.stop.is_set():
             break
-        picked.append(code)
-
-    # === [NEW] 레짐별 챔피언 비중 & Target Notional 계산 ===
-    regime_weights = REGIME_WEIGHTS.get(regime_key, REGIME_WEIGHTS.get(("neutral", 0), [1.0]))
-    # 선택된 종목 수만큼 비중 슬라이스
-    weights_for_picked: List[float] = list(regime_weights[: len(picked)])
-
-    for idx, code in enumerate(picked):
-        if code not in processed_targets:
+        pos = holding.get(code)
+        if not pos or not _exit_near_levels(code, pos):
             continue
-        w = weights_for_picked[idx] if idx < len(weights_for_picked) else 0.0
-        t = processed_targets[code]
-        t["regime_weight"] = float(w)
-        t["capital_active"] = int(capital_active)
-        target_notional = int(round(capital_active * w))
-        t["target_notional"] = target_notional
+        if not LOOP_SCHED.due_key("exit", code, SCHED_TICK_SEC, urgent=True):
+            continue
+        if not ctx.claim(code):
+            continue  # 다른 작업이 같은 종목을 처리 중
+        LOOP_SCHED.done_key("exit", code)
+        LOOP_PROF.symbol(code)
+        target = ctx.code_to_target.get(code)
+        try:
+            _manage_holding_exit(
+                kis, code, holding, ctx.traded, ctx.regime, ctx.ord_psbl_map, ctx.now_str,
+                strategy=(target.strategy or "전월 rolling K 최적화") if target else "기존보유 능동관리",
+                name=target.name if target else None,
+            )
+        except Exception as e:
+            logger.error(f"[URGENT-EXIT-FAIL] {code}: {e}")
+        finally:
+            ctx.release(code)
+        n += 1
+    return n
 
-        ref_px = _to_float(t.get("close")) or _to_float(t.get("prev_close"))
-        planned_qty = _notional_to_qty(kis, code, target_notional, ref_price=ref_px)
-        t["qty"] = int(planned_qty)
-        t["매수수량"] = int(planned_qty)
-        processed_targets[code] = t
 
-    for code in picked:
-        if code in processed_targets:
-            selected_targets[code] = processed_targets[code]
+def _manage_holding_exit(
+    kis: KisAPI,
+    code: str,
+    holding: Dict[str, Any],
+    traded: Dict[str, Any],
+    regime: Dict[str, Any],
+    ord_psbl_map: Dict[str, int],
+    now_str: str,
+    strategy: str = "기존보유 능동관리",
+    name: Optional[str] = None,
+) -> None:
+    """보유 1종목 능동관리: 약세 단계 축소 → 트리거 청산(_adaptive_exit) → 모멘텀 보유 판단."""
+    # 약세 단계 축소(비타겟)
+    if regime["mode"] == "bear":
+        sellable_here = ord_psbl_map.get(code, 0)
+        if sellable_here > 0:
+            if (
+                regime["bear_stage"] >= 1
+                and not holding[code].get("bear_s1_done")
+            ):
+                cut_qty = max(
+                    1, int(holding[code]["qty"] * REG_PARTIAL_S1)
+                )
+                logger.info(
+                    f"[REGIME-REDUCE-S1/비타겟] {code} 약세1단계 {REG_PARTIAL_S1 * 100:.0f}% 축소 → {cut_qty}"
+                )
+                exec_px, result = _sell_once(
+                    kis, code, cut_qty, prefer_market=True
+                )
+                holding[code]["qty"] -= int(cut_qty)
+                holding[code]["bear_s1_done"] = True
+                log_trade(
+                    {
+                        "datetime": now_str,
+                        "code": code,
+                        "name": name,
+                        "qty": int(cut_qty),
+                        "K": holding[code].get("k_value"),
+                        "target_price": holding[code].get(
+                            "target_price_src"
+                        ),
+                        "strategy": strategy,
+                        "side": "SELL",
+                        "price": exec_px,
+                        "amount": int((exec_px or 0))
+                        * int(cut_qty),
+                        "result": result,
+                        "reason": "시장약세 1단계 축소(비타겟)",
+                    }
+                )
+                _after_order(holding, traded)
+
+            if (
+                regime["bear_stage"] >= 2
+                and not holding[code].get("bear_s2_done")
+            ):
+                cut_qty = max(
+                    1, int(holding[code]["qty"] * REG_PARTIAL_S2)
+                )
+                logger.info(
+                    f"[REGIME-REDUCE-S2/비타겟] {code} 약세2단계 {REG_PARTIAL_S2 * 100:.0f}% 축소 → {cut_qty}"
+                )
+                exec_px, result = _sell_once(
+                    kis, code, cut_qty, prefer_market=True
+                )
+                holding[code]["qty"] -= int(cut_qty)
+                holding[code]["bear_s2_done"] = True
+                log_trade(
+                    {
+                        "datetime": now_str,
+                        "code": code,
+                        "name": name,
+                        "qty": int(cut_qty),
+                        "K": holding[code].get("k_value"),
+                        "target_price": holding[code].get(
+                            "target_price_src"
+                        ),
+                        "strategy": strategy,
+                        "side": "SELL",
+                        "price": exec_px,
+                        "amount": int((exec_px or 0))
+                        * int(cut_qty),
+                        "result": result,
+                        "reason": "시장약세 2단계 축소(비타겟)",
+                    }
+                )
+                _after_order(holding, traded)
 
-    logger.info(
-        "[REGIME-CHAMPIONS] mode=%s stage=%s n_active=%s picked=%s capital_active=%s",
-        mode,
-        stage,
-        n_active,
-        picked,
-        f"{capital_active:,}",
-    )
+    # 트리거 기반 청산 평가/집행
+    sellable_here = ord_psbl_map.get(code, 0)
+    if sellable_here <= 0:
+        logger.info(
+            f"[SKIP-기존보유] {code}: 매도가능수량=0 (대기/체결중/락)"
+        )
+        return
 
-    logger.info(
-        "[REBALANCE] 레짐=%s pct=%.2f%%, 후보 %d개 중 상위 %d종목만 선택: %s",
-        mode,
-        pct_change,
-        len(processed_targets),
-        len(selected_targets),
-        ",".join(selected_targets.keys()),
+    reason, exec_price, result, sold_qty = _adaptive_exit(
+        kis, code, holding[code], regime_mode=regime["mode"]
     )
+    if reason:
+        trade_common = {
+            "datetime": now_str,
+            "code": code,
+            "name": name,
+            "qty": int(sold_qty or 0),
+            "K": holding[code].get("k_value"),
+            "target_price": holding[code].get("target_price_src"),
+            "strategy": strategy,
+        }
+        _bp = (
+            float(holding[code].get("buy_price", 0.0))
+            if code in holding
+            else 0.0
+        )
+        _pnl_pct = (
+            (
+                (float(exec_price) - _bp)
+                / _bp
+            )
+            * 100.0
+            if (exec_price and _bp > 0)
+            else None
+        )
+        _profit = (
+            (
+                (float(exec_price) - _bp)
+                * int(sold_qty)
+            )
+            if (exec_price and _bp > 0 and sold_qty)
+            else None
+        )
 
-    code_to_target: Dict[str, Any] = selected_targets
+        log_trade(
+            {
+                **trade_common,
+                "side": "SELL",
+                "price": exec_price,
+                "amount": int((exec_price or 0))
+                * int(sold_qty or 0),
+                "result": result,
+                "reason": reason,
+                "pnl_pct": (
+                    _pnl_pct if _pnl_pct is not None else None
+                ),
+                "profit": (
+                    int(round(_profit))
+                    if _profit is not None
+                    else None
+                ),
+            }
+        )
 
-    # 눌림목 스캔용 코스닥 시총 상위 리스트 (챔피언과 별도로 관리)
-    pullback_watch: Dict[str, Dict[str, Any]] = {}
-    if USE_PULLBACK_ENTRY:
+        _after_order(holding, traded)
+    else:
         try:
-            pb_weight = max(0.0, min(PULLBACK_UNIT_WEIGHT, 1.0))
-            base_notional = int(round(capital_active * pb_weight))
-            pb_df = get_kosdaq_top_n(date_str=rebalance_date, n=PULLBACK_TOPN)
-            for _, row in pb_df.iterrows():
-                code = str(row.get("Code") or row.get("code") or "").zfill(6)
-                if not code:
-                    continue
-                pullback_watch[code] = {
-                    "code": code,
-                    "name": row.get("Name") or row.get("name"),
-                    "notional": base_notional,
-                }
-            logger.info(
-                f"[PULLBACK-WATCH] 코스닥 시총 Top{PULLBACK_TOPN} {len(pullback_watch)}종목 스캔 준비"
-            )
+            if is_strong_momentum(kis, code):
+                logger.info(
+                    f"[모멘텀 강세] {code}: 강한 상승추세, 능동관리 매도 보류"
+                )
+                return
         except Exception as e:
-            logger.warning(f"[PULLBACK-WATCH-FAIL] 시총 상위 로드 실패: {e}")
-
-    loop_sleep_sec = 2.5  # 메인 루프 대기 시간(초)
+            logger.warning(
+                f"[SELL_GUARD_FAIL] {code} 모멘텀 평가 실패: {e}"
+            )
 
     try:
-        while True:
-            # === 코스닥 레짐 업데이트 ===
-            regime = _update_market_regime(kis)
-            pct_txt = f"{regime.get('pct_change'):.2f}%" if regime.get("pct_change") is not None else "N/A"
-            logger.info(f"[REGIME] mode={regime['mode']} stage={regime['bear_stage']} pct={pct_txt}")
+        momentum_intact, trend_ctx = _has_bullish_trend_structure(kis, code)
+    except NetTemporaryError:
+        logger.warning(
+            f"[20D_TREND_TEMP_SKIP] {code}: 네트워크 일시 실패 → 이번 루프 스킵"
+        )
+        return
+    except DataEmptyError:
+        logger.warning(
+            f"[DATA_EMPTY] {code}: 0캔들 → 다음 루프에서 재확인"
+        )
+        return
+    except DataShortError:
+        logger.error(
+            f"[DATA_SHORT] {code}: 21개 미만 → 이번 루프 판단 스킵"
+        )
+        return
 
-            # 장 상태
-            try:
-                is_open = kis.is_market_open()
-            except Exception:
-                is_open = True
-            now_dt_kst = datetime.now(KST)
-            now_str = now_dt_kst.strftime("%Y-%m-%d %H:%M:%S")
-            logger.info(f"[⏰ 장상태] {'OPEN' if is_open else 'CLOSED'} / KST={now_str}")
+    if momentum_intact:
+        logger.info(
+            (
+                f"[모멘텀 보유] {code}: 5/10/20 정배열 & 20일선 상승 & 종가>20일선 유지 "
+                f"(close={trend_ctx.get('last_close'):.2f}, ma5={trend_ctx.get('ma5'):.2f}, "
+                f"ma10={trend_ctx.get('ma10'):.2f}, ma20={trend_ctx.get('ma20'):.2f}→{trend_ctx.get('ma20_prev'):.2f})"
+            )
+        )
+        return
 
-            # 잔고 동기화 & 보유분 능동관리 부트스트랩
-            ord_psbl_map: Dict[str, int] = {}
-            name_map: Dict[str, str] = {}
-            try:
-                balances = _fetch_balances(kis)
-                logger.info(f"[보유잔고 API 결과 종목수] {len(balances)}개")
-                for stock in balances:
-                    code_b = stock.get("pdno")
-                    name_b = stock.get("prdt_name")
-                    name_map[code_b] = name_b
-                    logger.debug(
-                        " [잔고] 종목:%s, 코드:%s, 보유:%s, 매도가능:%s",
-                        name_b,
-                        code_b,
-                        stock.get("hldg_qty"),
-                        stock.get("ord_psbl_qty"),
-                    )
 
-                current_holding = {
-                    b["pdno"]: _to_int(b.get("hldg_qty", 0))
-                    for b in balances
-                    if _to_int(b.get("hldg_qty", 0)) > 0
-                }
-                ord_psbl_map = {
-                    b["pdno"]: _to_int(b.get("ord_psbl_qty", 0))
-                    for b in balances
-                }
+def _phase_regime(kis: KisAPI, ctx: LoopContext) -> None:
+    ctx.regime = _update_market_regime(kis)
+    regime = ctx.regime
+    pct_txt = f"{regime.get('pct_change'):.2f}%" if regime.get("pct_change") is not None else "N/A"
+    logger.info(f"[REGIME] mode={regime['mode']} stage={regime['bear_stage']} pct={pct_txt}")
 
-                # 신규 보유분을 능동관리 대상으로 자동 초기화
-                for b in balances:
-                    code_b = str(b.get("pdno", "")).strip()
-                    qty_b = _to_int(b.get("hldg_qty", 0))
-                    avg_b = _to_float(
-                        b.get("pchs_avg_pric") or b.get("avg_price") or 0.0,
-                        0.0,
-                    )
 
-                    if (
-                        qty_b > 0
-                        and code_b
-                        and code_b not in holding
-                        and (avg_b is not None)
-                        and avg_b > 0
-                    ):
+def _phase_balance(kis: KisAPI, ctx: LoopContext) -> None:
+    """잔고 동기화: 신규 보유분 능동관리 초기화, 실제 잔고에서 사라진 항목 정리, 매도가능 수량 갱신."""
+    holding = ctx.holding
+    ord_psbl_map, name_map = ctx.ord_psbl_map, ctx.name_map
+    try:
+        balances = _fetch_balances(kis)
+        logger.info(f"[보유잔고 API 결과 종목수] {len(balances)}개")
+        for stock in balances:
+            code_b = stock.get("pdno")
+            name_b = stock.get("prdt_name")
+            name_map[code_b] = name_b
+            logger.debug(
+                " [잔고] 종목:%s, 코드:%s, 보유:%s, 매도가능:%s",
+                name_b,
+                code_b,
+                stock.get("hldg_qty"),
+                stock.get("ord_psbl_qty"),
+            )
+
+        current_holding = {
+            b["pdno"]: _to_int(b.get("hldg_qty", 0))
+            for b in balances
+            if _to_int(b.get("hldg_qty", 0)) > 0
+        }
+        ord_psbl_map = {
+            b["pdno"]: _to_int(b.get("ord_psbl_qty", 0))
+            for b in balances
+        }
+
+        # 신규 보유분을 능동관리 대상으로 자동 초기화
+        for b in balances:
+            code_b = str(b.get("pdno", "")).strip()
+            qty_b = _to_int(b.get("hldg_qty", 0))
+            avg_b = _to_float(
+                b.get("pchs_avg_pric") or b.get("avg_price") or 0.0,
+                0.0,
+            )
+
+            if (
+                qty_b > 0
+                and code_b
+                and code_b not in holding
+                and (avg_b is not None)
+                and avg_b > 0
+            ):
+                if not ctx.claim(code_b):
+                    continue  # 다른 작업이 처리 중 → 다음 잔고 동기화에서 초기화
+                try:
+                    if code_b not in holding:
                         _init_position_state_from_balance(
                             kis, holding, code_b, float(avg_b), int(qty_b)
                         )
                         logger.info(
                             f"[잔고초기화] code={code_b} qty={qty_b} avg={avg_b}"
                         )
+                finally:
+                    ctx.release(code_b)
 
-                # 실제 잔고에서 사라진 보유항목은 정리
-                for code in list(holding.keys()):
-                    if code not in current_holding or current_holding[code] == 0:
-                        logger.info(
-                            f"[보유종목 해제] {code} : 실제잔고 없음 → holding 제거"
-                        )
-                        holding.pop(code, None)
-
-            except Exception as e:
-                logger.error(f"[잔고조회 오류]{e}")
-
-            # 장 마감 시: 캔들/ATR/모멘텀/매매 로직 스킵
-            if not is_open:
-                logger.info(
-                    "[마감상태] 캔들/ATR/모멘텀/매매 로직 스킵 → 잔고만 동기화 후 대기"
-                )
-                save_state(holding, traded)
-                time.sleep(60.0)
+        # 실제 잔고에서 사라진 보유항목은 정리(체결 대기 중인 관리 주문 종목은 유지)
+        pending_codes = set(_ORDER_MANAGER.active_codes()) if _ORDER_MANAGER is not None else set()
+        for code in list(holding.keys()):
+            if code in pending_codes:
                 continue
-
-            # ====== 매수/매도(전략) LOOP — 오늘의 타겟 ======
-            for code, target in code_to_target.items():
-                prev_volume = _to_float(target.get("prev_volume"))
-                prev_open = _to_float(target.get("prev_open"))
-                prev_close = _to_float(target.get("prev_close"))
-                logger.debug(
-                    f"[prev_volume 체크] {code} 거래량:{prev_volume}, 전일시가:{prev_open}, 전일종가:{prev_close}"
-                )
-
-                planned_total_qty = _to_int(target.get("매수수량") or target.get("qty"), 0)
-                if planned_total_qty <= 0:
-                    logger.info(f"[SKIP] {code}: 매수수량 없음/0")
-                    continue
-
-                # 눌림목 3단계 진입(40/35/25%)을 위한 스테이지별 목표 수량
-                stage1_qty = max(1, int(planned_total_qty * ENTRY_LADDERS[0]))
-                stage2_qty = max(0, int(planned_total_qty * ENTRY_LADDERS[1]))
-                stage3_qty = max(0, int(planned_total_qty - stage1_qty - stage2_qty))
-
-                # 1차 진입 시 실제 매수 수량은 stage1(40%)만 사용
-                qty = stage1_qty
-
-                grade = target.get("champion_grade") or "C"
-                if grade != "A":
+            if code not in current_holding or current_holding[code] == 0:
+                if not ctx.claim(code):
+                    continue  # 청산/주문 반영 중 → 다음 잔고 동기화에서 정리
+                try:
                     logger.info(
-                        f"[CHAMPION-SKIP] {code}: grade={grade} → 매수 루프에서 제외"
+                        f"[보유종목 해제] {code} : 실제잔고 없음 → holding 제거"
                     )
-                    continue
+                    holding.pop(code, None)
+                    LOOP_SCHED.forget_key("exit", code)
+                finally:
+                    ctx.release(code)
 
-                k_value = target.get("best_k") or target.get("K") or target.get("k")
-                _ = None if k_value is None else _to_float(k_value)
+    except Exception as e:
+        logger.error(f"[잔고조회 오류]{e}")
+    ctx.ord_psbl_map = ord_psbl_map
 
-                eff_target_price, k_used = compute_entry_target(kis, target)
-                strategy = target.get("strategy") or "전월 rolling K 최적화"
-                name = target.get("name") or target.get("종목명") or name_map.get(code)
 
-                try:
-                    current_price = _safe_get_price(kis, code)
-                    logger.info(f"[📈 현재가] {code}: {current_price}")
+def _phase_champion(kis: KisAPI, ctx: LoopContext) -> None:
+    """챔피언(오늘의 타겟) 진입 평가 + 타겟 보유분 관리(추가매수/약세 축소/청산)."""
+    holding, traded, regime = ctx.holding, ctx.traded, ctx.regime
+    code_to_target, ord_psbl_map, name_map = ctx.code_to_target, ctx.ord_psbl_map, ctx.name_map
+    now_str, is_open, can_buy = ctx.now_str, ctx.is_open, ctx.can_buy
+
+    # 미진입 종목은 ENTRY_CHECK_SEC 주기로 진입 평가, 보유 종목은 청산 주기(_exit_due)로만 관리
+    entries_due = LOOP_SCHED.due("entries")
+    claimed: Optional[str] = None
+    try:
+        for code, target in code_to_target.items():
+            if ctx.stop.is_set():
+                break
+            if claimed:
+                ctx.release(claimed)
+                claimed = None
+            LOOP_PROF.symbol(code)
+            entry_pending = code not in holding and code not in traded
+            if entry_pending:
+                if not entries_due:
+                    continue
+                if ctx.preempt and is_open and LOOP_SCHED.urgent_due():
+                    with LOOP_PROF.phase("urgent_exits"):
+                        _run_urgent_exits(kis, ctx)
+                if not ctx.claim(code):
+                    continue  # 주문 동기화/잔고 정리가 같은 종목을 처리 중
+                claimed = code
+            else:
+                if code not in holding:
+                    continue  # 당일 진입 후 청산 완료/미체결 종료 → 재진입 없음
+                if not _exit_due(code, holding[code]):
+                    continue
+                if not ctx.claim(code):
+                    continue  # 다른 작업(긴급 청산)이 처리 중
+                claimed = code
+                LOOP_SCHED.done_key("exit", code)
+
+            prev_volume = _to_float(target.prev_volume)
+            prev_open = _to_float(target.prev_open)
+            prev_close = _to_float(target.prev_close)
+            logger.debug(
+                f"[prev_volume 체크] {code} 거래량:{prev_volume}, 전일시가:{prev_open}, 전일종가:{prev_close}"
+            )
+
+            planned_total_qty = int(target.qty)
+            if planned_total_qty <= 0 and entry_pending:
+                logger.info(f"[SKIP] {code}: 매수수량 없음/0")
+                continue
+
+            # 눌림목 3단계 진입(40/35/25%)을 위한 스테이지별 목표 수량
+            stage1_qty = max(1, int(planned_total_qty * ENTRY_LADDERS[0]))
+            stage2_qty = max(0, int(planned_total_qty * ENTRY_LADDERS[1]))
+            stage3_qty = max(0, int(planned_total_qty - stage1_qty - stage2_qty))
+
+            # 1차 진입 시 실제 매수 수량은 stage1(40%)만 사용
+            qty = stage1_qty
+
+            grade = target.champion_grade or "C"
+            if grade != "A" and entry_pending:
+                logger.info(
+                    f"[CHAMPION-SKIP] {code}: grade={grade} → 매수 루프에서 제외"
+                )
+                continue
 
-                    pullback_info: Dict[str, Any] = {}
+            k_value = target.best_k
+
+            eff_target_price, k_used = compute_entry_target(kis, target)
+            strategy = target.strategy or "전월 rolling K 최적화"
+            name = target.name or name_map.get(code)
+
+            try:
+                current_price = _safe_get_price(kis, code)
+                logger.info(f"[📈 현재가] {code}: {current_price}")
+
+                pullback_info: Dict[str, Any] = {}
+                # 진입 타점 평가는 미진입 종목만(보유 종목은 아래 청산 관리로 바로 진행)
+                if entry_pending:
                     try:
                         pullback_info = _detect_pullback_reversal(
                             kis=kis,
@@ -2591,7 +3325,7 @@ def main():
                         kis, code, float(current_price) if current_price else None
                     )
                     intraday_ctx = _compute_intraday_entry_context(
-                        kis, code, prev_high=target.get("prev_high")
+                        kis, code, prev_high=target.prev_high
                     )
 
                     if is_bad_entry(code, daily_ctx, intraday_ctx, REGIME_STATE):
@@ -2604,410 +3338,131 @@ def main():
                         code,
                         daily_ctx,
                         intraday_ctx,
-                        prev_high=target.get("prev_high"),
+                        prev_high=target.prev_high,
                     ):
                         logger.info(
                             f"[WAIT] {code}: A급이나 GOOD 타점 미충족 → 눌림 대기"
                         )
                         continue
 
-                    # --- 매수 --- (돌파 진입 + 슬리피지 가드 + 예산 가드)
-                    if is_open and code not in holding and code not in traded:
-                        if not can_buy:
-                            logger.info(
-                                f"[BUDGET_SKIP] {code}: 예산 없음 → 신규 매수 스킵"
-                            )
-                            continue
-
-                        trigger_price = eff_target_price
-                        if pullback_info.get("reversal_price"):
-                            if trigger_price is None:
-                                trigger_price = float(pullback_info.get("reversal_price"))
-                            else:
-                                trigger_price = max(
-                                    float(trigger_price),
-                                    float(pullback_info.get("reversal_price")),
-                                )
-
-                        enter_cond = (
-                            current_price is not None
-                            and trigger_price is not None
-                            and int(current_price) >= int(trigger_price)
+                # --- 매수 --- (돌파 진입 + 슬리피지 가드 + 예산 가드)
+                if is_open and code not in holding and code not in traded:
+                    if not can_buy:
+                        logger.info(
+                            f"[BUDGET_SKIP] {code}: 예산 없음 → 신규 매수 스킵"
                         )
+                        continue
 
-                        if enter_cond:
-                            guard_ok = True
-
-                            # 1) 진입 슬리피지 가드
-                            if (
-                                eff_target_price
-                                and eff_target_price > 0
-                                and current_price is not None
-                            ):
-                                slip_pct = (
-                                    (
-                                        float(current_price)
-                                        - float(eff_target_price)
-                                    )
-                                    / float(eff_target_price)
-                                ) * 100.0
-                                if slip_pct > SLIPPAGE_ENTER_GUARD_PCT:
-                                    guard_ok = False
-                                    logger.info(
-                                        f"[ENTER-GUARD] {code} 진입슬리피지 {slip_pct:.2f}% > "
-                                        f"{SLIPPAGE_ENTER_GUARD_PCT:.2f}% → 진입 스킵"
-                                    )
-
-                            # 2) VWAP 가드
-                            if guard_ok and current_price is not None:
-                                vwap_val = kis.get_vwap_today(code)
-                                if vwap_val is None:
-                                    logger.info(
-                                        f"[VWAP-SKIP] {code}: VWAP 데이터 없음 → VWAP 가드 생략"
-                                    )
-                                else:
-                                    if not vwap_guard(
-                                        float(current_price),
-                                        float(vwap_val),
-                                        VWAP_TOL,
-                                    ):
-                                        guard_ok = False
-                                        logger.info(
-                                            f"[VWAP-GUARD] {code}: 현재가({current_price}) < VWAP*(1 - {VWAP_TOL:.4f}) "
-                                            f"→ 진입 스킵 (VWAP={vwap_val:.2f})"
-                                        )
-                            if not guard_ok:
-                                continue
-
-                            result = place_buy_with_fallback(
-                                kis, code, qty, limit_price=int(eff_target_price)
-                            )
-                            try:
-                                if isinstance(result, dict) and result.get("rt_cd") == "0":
-                                    out = result.get("output") or {}
-                                    odno = (
-                                        out.get("ODNO")
-                                        or out.get("ord_no")
-                                        or out.get("order_no")
-                                        or ""
-                                    )
-                                    ensure_fill_has_name(
-                                        odno=odno,
-                                        code=code,
-                                        name=name or "",
-                                        qty=qty,
-                                        price=current_price or 0.0,
-                                    )
-                            except Exception as e:
-                                logger.warning(
-                                    f"[BUY_FILL_NAME_FAIL] code={code} ex={e}"
-                                )
-
-                            _init_position_state(
-                                kis,
-                                holding,
-                                code,
-                                float(current_price),
-                                int(qty),
-                                (k_value if k_value is not None else k_used),
-                                eff_target_price,
-                            )
-
-                            # 눌림목 3단계 진입용 상태값 세팅
-                            try:
-                                pos = holding.get(code, {})
-                                pos["entry_stage"] = 1
-                                pos["max_price_after_entry"] = float(current_price)
-                                pos["planned_total_qty"] = int(planned_total_qty)
-                                pos["stage1_qty"] = int(stage1_qty)
-                                pos["stage2_qty"] = int(stage2_qty)
-                                pos["stage3_qty"] = int(stage3_qty)
-                                if pullback_info.get("peak_price"):
-                                    pos["pullback_peak_price"] = float(pullback_info.get("peak_price"))
-                                if pullback_info.get("reversal_price"):
-                                    pos["pullback_reversal_price"] = float(pullback_info.get("reversal_price"))
-                                holding[code] = pos
-                            except Exception as e:
-                                logger.warning(f"[INIT-SCALEIN-STATE-FAIL] {code}: {e}")
-
-                            traded[code] = {
-                                "buy_time": now_str,
-                                "qty": int(qty),
-                                "price": float(current_price),
-                            }
-                            logger.info(
-                                f"[✅ 매수주문] {code}, qty={qty}, price={current_price}, result={result}"
-                            )
-
-                            log_trade(
-                                {
-                                    **trade_common_buy,
-                                    "side": "BUY",
-                                    "price": current_price,
-                                    "amount": int(current_price) * int(qty),
-                                    "result": result,
-                                }
-                            )
-                            save_state(holding, traded)
-                            time.sleep(RATE_SLEEP_SEC)
+                    trigger_price = eff_target_price
+                    if pullback_info.get("reversal_price"):
+                        if trigger_price is None:
+                            trigger_price = float(pullback_info.get("reversal_price"))
                         else:
-                            logger.info(
-                                f"[SKIP] {code}: 현재가({current_price}) < 목표가({eff_target_price}), 미매수"
-                            )
-                            continue
-
-                    # --- 실전형 청산 (타겟 보유포지션) ---
-                    if is_open and code in holding:
-                        # (눌림목 3단계 진입) 추가 매수 평가
-                        try:
-                            _maybe_scale_in_dips(
-                                kis=kis,
-                                holding=holding,
-                                code=code,
-                                target=target,
-                                now_str=now_str,
-                                regime_mode=regime["mode"],
+                            trigger_price = max(
+                                float(trigger_price),
+                                float(pullback_info.get("reversal_price")),
                             )
-                        except Exception as e:
-                            logger.warning(f"[SCALE-IN-EVAL-FAIL] {code}: {e}")
-
-                        # (약세 레짐) 단계적 축소
-                        if regime["mode"] == "bear":
-                            sellable_here = ord_psbl_map.get(code, 0)
-                            if sellable_here > 0:
-                                if (
-                                    regime["bear_stage"] >= 1
-                                    and not holding[code].get("bear_s1_done")
-                                ):
-                                    cut_qty = max(
-                                        1, int(holding[code]["qty"] * REG_PARTIAL_S1)
-                                    )
-                                    logger.info(
-                                        f"[REGIME-REDUCE-S1] {code} 약세1단계 {REG_PARTIAL_S1 * 100:.0f}% 축소 → {cut_qty}"
-                                    )
-                                    exec_px, result = _sell_once(
-                                        kis, code, cut_qty, prefer_market=True
-                                    )
-                                    holding[code]["qty"] -= int(cut_qty)
-                                    holding[code]["bear_s1_done"] = True
-                                    log_trade(
-                                        {
-                                            "datetime": now_str,
-                                            "code": code,
-                                            "name": name,
-                                            "qty": int(cut_qty),
-                                            "K": k_value
-                                            if k_value is not None
-                                            else k_used,
-                                            "target_price": eff_target_price,
-                                            "strategy": strategy,
-                                            "side": "SELL",
-                                            "price": exec_px,
-                                            "amount": int((exec_px or 0))
-                                            * int(cut_qty),
-                                            "result": result,
-                                            "reason": "시장약세 1단계 축소",
-                                        }
-                                    )
-                                    save_state(holding, traded)
-                                    time.sleep(RATE_SLEEP_SEC)
 
-                                if (
-                                    regime["bear_stage"] >= 2
-                                    and not holding[code].get("bear_s2_done")
-                                ):
-                                    cut_qty = max(
-                                        1, int(holding[code]["qty"] * REG_PARTIAL_S2)
-                                    )
-                                    logger.info(
-                                        f"[REGIME-REDUCE-S2] {code} 약세2단계 {REG_PARTIAL_S2 * 100:.0f}% 축소 → {cut_qty}"
-                                    )
-                                    exec_px, result = _sell_once(
-                                        kis, code, cut_qty, prefer_market=True
-                                    )
-                                    holding[code]["qty"] -= int(cut_qty)
-                                    holding[code]["bear_s2_done"] = True
-                                    log_trade(
-                                        {
-                                            "datetime": now_str,
-                                            "code": code,
-                                            "name": name,
-                                            "qty": int(cut_qty),
-                                            "K": k_value
-                                            if k_value is not None
-                                            else k_used,
-                                            "target_price": eff_target_price,
-                                            "strategy": strategy,
-                                            "side": "SELL",
-                                            "price": exec_px,
-                                            "amount": int((exec_px or 0))
-                                            * int(cut_qty),
-                                            "result": result,
-                                            "reason": "시장약세 2단계 축소",
-                                        }
-                                    )
-                                    save_state(holding, traded)
-                                    time.sleep(RATE_SLEEP_SEC)
+                    enter_cond = (
+                        current_price is not None
+                        and trigger_price is not None
+                        and int(current_price) >= int(trigger_price)
+                    )
 
-                        # 먼저 트리거 기반 청산 평가/집행
-                        sellable_here = ord_psbl_map.get(code, 0)
-                        if sellable_here <= 0:
-                            logger.info(
-                                f"[SKIP] {code}: 매도가능수량=0 (대기/체결중/락) → 매도 보류"
-                            )
-                        else:
-                            reason, exec_price, result, sold_qty = _adaptive_exit(
-                                kis, code, holding[code], regime_mode=regime["mode"]
-                            )
-                            if reason:
-                                trade_common_sell = {
-                                    "datetime": now_str,
-                                    "code": code,
-                                    "name": name,
-                                    "qty": int(sold_qty or 0),
-                                    "K": k_value
-                                    if k_value is not None
-                                    else k_used,
-                                    "target_price": eff_target_price,
-                                    "strategy": strategy,
-                                }
-                                _bp = (
-                                    float(holding[code].get("buy_price", 0.0))
-                                    if code in holding
-                                    else 0.0
-                                )
-                                _pnl_pct = (
-                                    (
-                                        (float(exec_price) - _bp)
-                                        / _bp
-                                    )
-                                    * 100.0
-                                    if (exec_price and _bp > 0)
-                                    else None
+                    if enter_cond:
+                        guard_ok = True
+
+                        # 1) 진입 슬리피지 가드
+                        if (
+                            eff_target_price
+                            and eff_target_price > 0
+                            and current_price is not None
+                        ):
+                            slip_pct = (
+                                (
+                                    float(current_price)
+                                    - float(eff_target_price)
                                 )
-                                _profit = (
-                                    (
-                                        (float(exec_price) - _bp)
-                                        * int(sold_qty)
-                                    )
-                                    if (exec_price and _bp > 0 and sold_qty)
-                                    else None
+                                / float(eff_target_price)
+                            ) * 100.0
+                            if slip_pct > SLIPPAGE_ENTER_GUARD_PCT:
+                                guard_ok = False
+                                logger.info(
+                                    f"[ENTER-GUARD] {code} 진입슬리피지 {slip_pct:.2f}% > "
+                                    f"{SLIPPAGE_ENTER_GUARD_PCT:.2f}% → 진입 스킵"
                                 )
-                                log_trade(
-                                    {
-                                        **trade_common_sell,
-                                        "side": "SELL",
-                                        "price": exec_price,
-                                        "amount": int((exec_price or 0))
-                                        * int(sold_qty or 0),
-                                        "result": result,
-                                        "pnl_pct": (
-                                            _pnl_pct if _pnl_pct is not None else None
-                                        ),
-                                        "profit": (
-                                            int(round(_profit))
-                                            if _profit is not None
-                                            else None
-                                        ),
-                                        "reason": reason,
-                                    }
+
+                        # 2) VWAP 가드
+                        if guard_ok and current_price is not None:
+                            vwap_val = _get_vwap_for_guard(kis, code)
+                            if vwap_val is None:
+                                logger.info(
+                                    f"[VWAP-SKIP] {code}: VWAP 데이터 없음 → VWAP 가드 생략"
                                 )
-                                save_state(holding, traded)
-                                time.sleep(RATE_SLEEP_SEC)
                             else:
-                                try:
-                                    if is_strong_momentum(kis, code):
-                                        logger.info(
-                                            f"[SELL_GUARD] {code} 모멘텀 강세 → 트리거 부재, 매도 보류"
-                                        )
-                                except Exception as e:
-                                    logger.warning(
-                                        f"[SELL_GUARD_FAIL] {code} 모멘텀 평가 실패: {e}"
+                                if not vwap_guard(
+                                    float(current_price),
+                                    float(vwap_val),
+                                    VWAP_TOL,
+                                ):
+                                    guard_ok = False
+                                    logger.info(
+                                        f"[VWAP-GUARD] {code}: 현재가({current_price}) < VWAP*(1 - {VWAP_TOL:.4f}) "
+                                        f"→ 진입 스킵 (VWAP={vwap_val:.2f})"
                                     )
-
-                except Exception as e:
-                    logger.error(f"[❌ 주문/조회 실패] {code} : {e}")
-                    continue
-
-            # ====== 눌림목 전용 매수 (챔피언과 독립적으로 Top-N 시총 리스트 스캔) ======
-            if USE_PULLBACK_ENTRY and is_open and pullback_watch:
-                for code, info in pullback_watch.items():
-                    if code in code_to_target:
-                        continue  # 챔피언 루프와 별도로만 처리
-                    if code in holding or code in traded:
-                        continue
-                    if not can_buy:
-                        logger.info(
-                            f"[PULLBACK-BUDGET-SKIP] {code}: 예산 없음 → 눌림목 신규 매수 스킵"
-                        )
-                        continue
-
-                    try:
-                        current_price = _safe_get_price(kis, code)
-                    except Exception:
-                        current_price = None
-                    if current_price is None or current_price <= 0:
-                        continue
-
-                    try:
-                        pullback_info = _detect_pullback_reversal(
-                            kis=kis,
-                            code=code,
-                            current_price=float(current_price),
-                        )
-                    except Exception as e:
-                        logger.warning(f"[PULLBACK-DETECT-FAIL] {code}: {e}")
-                        continue
-                    if not pullback_info.get("setup"):
-                        logger.info(
-                            f"[PULLBACK-SKIP] {code}: 신고가 눌림 패턴 미충족 → reason={pullback_info.get('reason')}"
-                        )
-                        continue
-                    if not pullback_info.get("reversing"):
-                        rev_px = pullback_info.get("reversal_price")
-                        logger.info(
-                            f"[PULLBACK-WAIT] {code}: 현재가({current_price}) < 반등확인선({rev_px}) → 눌림목 대기"
-                        )
-                        continue
-
-                    trigger_price = float(pullback_info.get("reversal_price") or current_price)
-                    notional = int(info.get("notional") or 0)
-                    if notional <= 0:
-                        logger.info(
-                            f"[PULLBACK-SKIP] {code}: notional=0 → 매수 스킵"
-                        )
-                        continue
-
-                    qty = _notional_to_qty(kis, code, notional, ref_price=current_price)
-                    if qty <= 0:
-                        logger.info(f"[PULLBACK-SKIP] {code}: 수량 0 → 매수 스킵")
-                        continue
-
-                    vwap_val = kis.get_vwap_today(code)
-                    if vwap_val is not None and vwap_val > 0:
-                        if not vwap_guard(float(current_price), float(vwap_val), VWAP_TOL):
-                            logger.info(
-                                f"[PULLBACK-VWAP-GUARD] {code}: 현재가({current_price}) < VWAP*(1 - {VWAP_TOL:.4f}) "
-                                f"→ 눌림목 진입 스킵 (VWAP={vwap_val:.2f})"
-                            )
+                        if not guard_ok:
                             continue
 
-                    if int(current_price) >= int(trigger_price):
                         result = place_buy_with_fallback(
-                            kis, code, int(qty), limit_price=int(trigger_price)
+                            kis, code, qty, limit_price=int(eff_target_price)
                         )
                         try:
-                            _init_position_state(
-                                kis,
-                                holding,
-                                code,
-                                float(current_price),
-                                int(qty),
-                                None,
-                                trigger_price,
+                            if isinstance(result, dict) and result.get("rt_cd") == "0":
+                                out = result.get("output") or {}
+                                odno = (
+                                    out.get("ODNO")
+                                    or out.get("ord_no")
+                                    or out.get("order_no")
+                                    or ""
+                                )
+                                ensure_fill_has_name(
+                                    odno=odno,
+                                    code=code,
+                                    name=name or "",
+                                    qty=qty,
+                                    price=current_price or 0.0,
+                                )
+                        except Exception as e:
+                            logger.warning(
+                                f"[BUY_FILL_NAME_FAIL] code={code} ex={e}"
                             )
+
+                        _init_position_state(
+                            kis,
+                            holding,
+                            code,
+                            float(current_price),
+                            int(qty),
+                            (k_value if k_value is not None else k_used),
+                            eff_target_price,
+                        )
+
+                        # 눌림목 3단계 진입용 상태값 세팅
+                        try:
+                            pos = holding.get(code, {})
+                            pos["entry_stage"] = 1
+                            pos["max_price_after_entry"] = float(current_price)
+                            pos["planned_total_qty"] = int(planned_total_qty)
+                            pos["stage1_qty"] = int(stage1_qty)
+                            pos["stage2_qty"] = int(stage2_qty)
+                            pos["stage3_qty"] = int(stage3_qty)
+                            if pullback_info.get("peak_price"):
+                                pos["pullback_peak_price"] = float(pullback_info.get("peak_price"))
+                            if pullback_info.get("reversal_price"):
+                                pos["pullback_reversal_price"] = float(pullback_info.get("reversal_price"))
+                            holding[code] = pos
                         except Exception as e:
-                            logger.warning(f"[PULLBACK-INIT-FAIL] {code}: {e}")
+                            logger.warning(f"[INIT-SCALEIN-STATE-FAIL] {code}: {e}")
 
                         traded[code] = {
                             "buy_time": now_str,
@@ -3015,34 +3470,43 @@ def main():
                             "price": float(current_price),
                         }
                         logger.info(
-                            f"[✅ 눌림목 매수] {code}, qty={qty}, price={current_price}, trigger={trigger_price}, result={result}"
+                            f"[✅ 매수주문] {code}, qty={qty}, price={current_price}, result={result}"
                         )
 
                         log_trade(
                             {
-                                "datetime": now_str,
-                                "code": code,
-                                "name": info.get("name"),
-                                "qty": int(qty),
-                                "K": None,
-                                "target_price": trigger_price,
-                                "strategy": f"코스닥 Top{PULLBACK_TOPN} 눌림목",
+                                **trade_common_buy,
                                 "side": "BUY",
-                                "price": float(current_price),
-                                "amount": int(float(current_price) * int(qty)),
+                                "price": current_price,
+                                "amount": int(current_price) * int(qty),
                                 "result": result,
                             }
                         )
-                        save_state(holding, traded)
-                        time.sleep(RATE_SLEEP_SEC)
+                        _after_order(holding, traded)
+                    else:
+                        logger.info(
+                            f"[SKIP] {code}: 현재가({current_price}) < 목표가({eff_target_price}), 미매수"
+                        )
+                        continue
 
-            # ====== (A) 비타겟 보유분도 장중 능동관리 ======
-            if is_open:
-                for code in list(holding.keys()):
-                    if code in code_to_target:
-                        continue  # 위 루프에서 이미 처리
+                # --- 실전형 청산 (타겟 보유포지션) ---
+                if is_open and code in holding:
+                    # (눌림목 3단계 진입) 추가 매수 평가 — 워치독 2단계 이상이면 SHED_SCALE_IN_SEC 주기로만
+                    if WATCHDOG.allows("scale_in") or LOOP_SCHED.due_key("scale_in", code, SHED_SCALE_IN_SEC):
+                        LOOP_SCHED.done_key("scale_in", code)
+                        try:
+                            _maybe_scale_in_dips(
+                                kis=kis,
+                                holding=holding,
+                                code=code,
+                                target=target,
+                                now_str=now_str,
+                                regime_mode=regime["mode"],
+                            )
+                        except Exception as e:
+                            logger.warning(f"[SCALE-IN-EVAL-FAIL] {code}: {e}")
 
-                    # 약세 단계 축소(비타겟)
+                    # (약세 레짐) 단계적 축소
                     if regime["mode"] == "bear":
                         sellable_here = ord_psbl_map.get(code, 0)
                         if sellable_here > 0:
@@ -3054,7 +3518,7 @@ def main():
                                     1, int(holding[code]["qty"] * REG_PARTIAL_S1)
                                 )
                                 logger.info(
-                                    f"[REGIME-REDUCE-S1/비타겟] {code} 약세1단계 {REG_PARTIAL_S1 * 100:.0f}% 축소 → {cut_qty}"
+                                    f"[REGIME-REDUCE-S1] {code} 약세1단계 {REG_PARTIAL_S1 * 100:.0f}% 축소 → {cut_qty}"
                                 )
                                 exec_px, result = _sell_once(
                                     kis, code, cut_qty, prefer_market=True
@@ -3065,23 +3529,22 @@ def main():
                                     {
                                         "datetime": now_str,
                                         "code": code,
-                                        "name": None,
+                                        "name": name,
                                         "qty": int(cut_qty),
-                                        "K": holding[code].get("k_value"),
-                                        "target_price": holding[code].get(
-                                            "target_price_src"
-                                        ),
-                                        "strategy": "기존보유 능동관리",
+                                        "K": k_value
+                                        if k_value is not None
+                                        else k_used,
+                                        "target_price": eff_target_price,
+                                        "strategy": strategy,
                                         "side": "SELL",
                                         "price": exec_px,
                                         "amount": int((exec_px or 0))
                                         * int(cut_qty),
                                         "result": result,
-                                        "reason": "시장약세 1단계 축소(비타겟)",
+                                        "reason": "시장약세 1단계 축소",
                                     }
                                 )
-                                save_state(holding, traded)
-                                time.sleep(RATE_SLEEP_SEC)
+                                _after_order(holding, traded)
 
                             if (
                                 regime["bear_stage"] >= 2
@@ -3091,7 +3554,7 @@ def main():
                                     1, int(holding[code]["qty"] * REG_PARTIAL_S2)
                                 )
                                 logger.info(
-                                    f"[REGIME-REDUCE-S2/비타겟] {code} 약세2단계 {REG_PARTIAL_S2 * 100:.0f}% 축소 → {cut_qty}"
+                                    f"[REGIME-REDUCE-S2] {code} 약세2단계 {REG_PARTIAL_S2 * 100:.0f}% 축소 → {cut_qty}"
                                 )
                                 exec_px, result = _sell_once(
                                     kis, code, cut_qty, prefer_market=True
@@ -3102,151 +3565,763 @@ def main():
                                     {
                                         "datetime": now_str,
                                         "code": code,
-                                        "name": None,
+                                        "name": name,
                                         "qty": int(cut_qty),
-                                        "K": holding[code].get("k_value"),
-                                        "target_price": holding[code].get(
-                                            "target_price_src"
-                                        ),
-                                        "strategy": "기존보유 능동관리",
+                                        "K": k_value
+                                        if k_value is not None
+                                        else k_used,
+                                        "target_price": eff_target_price,
+                                        "strategy": strategy,
                                         "side": "SELL",
                                         "price": exec_px,
                                         "amount": int((exec_px or 0))
                                         * int(cut_qty),
                                         "result": result,
-                                        "reason": "시장약세 2단계 축소(비타겟)",
+                                        "reason": "시장약세 2단계 축소",
                                     }
                                 )
-                                save_state(holding, traded)
-                                time.sleep(RATE_SLEEP_SEC)
+                                _after_order(holding, traded)
 
-                    # 트리거 기반 청산 평가/집행
+                    # 먼저 트리거 기반 청산 평가/집행
                     sellable_here = ord_psbl_map.get(code, 0)
                     if sellable_here <= 0:
                         logger.info(
-                            f"[SKIP-기존보유] {code}: 매도가능수량=0 (대기/체결중/락)"
+                            f"[SKIP] {code}: 매도가능수량=0 (대기/체결중/락) → 매도 보류"
                         )
-                        continue
-
-                    reason, exec_price, result, sold_qty = _adaptive_exit(
-                        kis, code, holding[code], regime_mode=regime["mode"]
-                    )
-                    if reason:
-                        trade_common = {
-                            "datetime": now_str,
-                            "code": code,
-                            "name": None,
-                            "qty": int(sold_qty or 0),
-                            "K": holding[code].get("k_value"),
-                            "target_price": holding[code].get("target_price_src"),
-                            "strategy": "기존보유 능동관리",
-                        }
-                        _bp = (
-                            float(holding[code].get("buy_price", 0.0))
-                            if code in holding
-                            else 0.0
+                    else:
+                        reason, exec_price, result, sold_qty = _adaptive_exit(
+                            kis, code, holding[code], regime_mode=regime["mode"]
                         )
-                        _pnl_pct = (
-                            (
-                                (float(exec_price) - _bp)
-                                / _bp
+                        if reason:
+                            trade_common_sell = {
+                                "datetime": now_str,
+                                "code": code,
+                                "name": name,
+                                "qty": int(sold_qty or 0),
+                                "K": k_value
+                                if k_value is not None
+                                else k_used,
+                                "target_price": eff_target_price,
+                                "strategy": strategy,
+                            }
+                            _bp = (
+                                float(holding[code].get("buy_price", 0.0))
+                                if code in holding
+                                else 0.0
                             )
-                            * 100.0
-                            if (exec_price and _bp > 0)
-                            else None
-                        )
-                        _profit = (
-                            (
-                                (float(exec_price) - _bp)
-                                * int(sold_qty)
+                            _pnl_pct = (
+                                (
+                                    (float(exec_price) - _bp)
+                                    / _bp
+                                )
+                                * 100.0
+                                if (exec_price and _bp > 0)
+                                else None
                             )
-                            if (exec_price and _bp > 0 and sold_qty)
-                            else None
-                        )
-
-                        log_trade(
-                            {
-                                **trade_common,
-                                "side": "SELL",
-                                "price": exec_price,
-                                "amount": int((exec_price or 0))
-                                * int(sold_qty or 0),
-                                "result": result,
-                                "reason": reason,
-                                "pnl_pct": (
-                                    _pnl_pct if _pnl_pct is not None else None
-                                ),
-                                "profit": (
-                                    int(round(_profit))
-                                    if _profit is not None
-                                    else None
-                                ),
-                            }
-                        )
-
-                        save_state(holding, traded)
-                        time.sleep(RATE_SLEEP_SEC)
-                    else:
-                        try:
-                            if is_strong_momentum(kis, code):
-                                logger.info(
-                                    f"[모멘텀 강세] {code}: 강한 상승추세, 능동관리 매도 보류"
+                            _profit = (
+                                (
+                                    (float(exec_price) - _bp)
+                                    * int(sold_qty)
                                 )
-                                continue
-                        except Exception as e:
-                            logger.warning(
-                                f"[SELL_GUARD_FAIL] {code} 모멘텀 평가 실패: {e}"
+                                if (exec_price and _bp > 0 and sold_qty)
+                                else None
                             )
-
-                    try:
-                        momentum_intact, trend_ctx = _has_bullish_trend_structure(kis, code)
-                    except NetTemporaryError:
-                        logger.warning(
-                            f"[20D_TREND_TEMP_SKIP] {code}: 네트워크 일시 실패 → 이번 루프 스킵"
-                        )
-                        continue
-                    except DataEmptyError:
-                        logger.warning(
-                            f"[DATA_EMPTY] {code}: 0캔들 → 다음 루프에서 재확인"
-                        )
-                        continue
-                    except DataShortError:
-                        logger.error(
-                            f"[DATA_SHORT] {code}: 21개 미만 → 이번 루프 판단 스킵"
-                        )
-                        continue
-
-                    if momentum_intact:
-                        logger.info(
-                            (
-                                f"[모멘텀 보유] {code}: 5/10/20 정배열 & 20일선 상승 & 종가>20일선 유지 "
-                                f"(close={trend_ctx.get('last_close'):.2f}, ma5={trend_ctx.get('ma5'):.2f}, "
-                                f"ma10={trend_ctx.get('ma10'):.2f}, ma20={trend_ctx.get('ma20'):.2f}→{trend_ctx.get('ma20_prev'):.2f})"
+                            log_trade(
+                                {
+                                    **trade_common_sell,
+                                    "side": "SELL",
+                                    "price": exec_price,
+                                    "amount": int((exec_price or 0))
+                                    * int(sold_qty or 0),
+                                    "result": result,
+                                    "pnl_pct": (
+                                        _pnl_pct if _pnl_pct is not None else None
+                                    ),
+                                    "profit": (
+                                        int(round(_profit))
+                                        if _profit is not None
+                                        else None
+                                    ),
+                                    "reason": reason,
+                                }
                             )
-                        )
-                        continue
+                            _after_order(holding, traded)
+                        else:
+                            try:
+                                if is_strong_momentum(kis, code):
+                                    logger.info(
+                                        f"[SELL_GUARD] {code} 모멘텀 강세 → 트리거 부재, 매도 보류"
+                                    )
+                            except Exception as e:
+                                logger.warning(
+                                    f"[SELL_GUARD_FAIL] {code} 모멘텀 평가 실패: {e}"
+                                )
 
-            # --- 장중 커트오프(KST): 14:40 도달 시 "전량매도 없이" 리포트 생성 후 정상 종료 ---
-            if is_open and now_dt_kst.time() >= SELL_FORCE_TIME:
-                logger.info(
-                    f"[⏰ 커트오프] {SELL_FORCE_TIME.strftime('%H:%M')} 도달: 전량 매도 없이 리포트 생성 후 종료"
-                )
+            except Exception as e:
+                logger.error(f"[❌ 주문/조회 실패] {code} : {e}")
+                continue
+    finally:
+        if claimed:
+            ctx.release(claimed)
+    if entries_due:
+        LOOP_SCHED.done("entries")
 
-                save_state(holding, traded)
 
-                try:
-                    _report = ceo_report(datetime.now(KST), period="daily")
-                    logger.info(
-                        f"[📄 CEO Report 생성 완료] title={_report.get('title')}"
-                    )
-                except Exception as e:
-                    logger.error(f"[CEO Report 생성 실패] {e}")
+def _phase_pullback(kis: KisAPI, ctx: LoopContext) -> None:
+    """눌림목 전용 매수: 감시 목록(전 종목 스크리닝 shortlist 또는 시총 Top-N) 중 셋업 충족 종목만 시세 확인 후 진입."""
+    holding, traded = ctx.holding, ctx.traded
+    code_to_target, pullback_watch = ctx.code_to_target, ctx.pullback_watch
 
-                logger.info("[✅ 커트오프 완료: 루프 정상 종료]")
+    claimed: Optional[str] = None
+    try:
+        for code, info in pullback_watch.items():
+            if ctx.stop.is_set():
                 break
+            if claimed:
+                ctx.release(claimed)
+                claimed = None
+            if ctx.preempt and LOOP_SCHED.urgent_due():
+                with LOOP_PROF.phase("urgent_exits"):
+                    _run_urgent_exits(kis, ctx)
+            if code in code_to_target:
+                continue  # 챔피언 루프와 별도로만 처리
+            LOOP_PROF.symbol(code)
+            if not ctx.claim(code):
+                continue  # 다른 작업(주문 동기화/잔고 정리/청산)이 같은 종목을 처리 중
+            claimed = code
+            if code in holding or code in traded:
+                continue
+            _pullback_entry_one(kis, ctx, code, info)
+    finally:
+        if claimed:
+            ctx.release(claimed)
+
+
+def _pullback_entry_one(kis: KisAPI, ctx: LoopContext, code: str, info: Dict[str, Any]) -> None:
+    """눌림목 1종목: 셋업(필요 시 재평가) → 반등 확인 → VWAP 가드 → 매수(호출측이 claim 보유)."""
+    holding, traded = ctx.holding, ctx.traded
+    now_str, can_buy = ctx.now_str, ctx.can_buy
+    if info.get("pb_setup") is None:
+        # 사전 평가 실패 종목만 장중 재평가(성공 시 당일 고정, PULLBACK_SETUP_RETRY_MAX회 실패 시 당일 제외)
+        try:
+            _apply_pullback_setup(info, _evaluate_pullback_setup(kis, code))
+        except Exception as e:
+            logger.warning(f"[PULLBACK-DETECT-FAIL] {code}: {e}")
+            _mark_pullback_setup_fail(info, f"exception: {e}")
+            return
+    if not info.get("pb_setup"):
+        return  # 셋업 미충족 → 시세 조회 없이 스킵
+    if not can_buy:
+        logger.info(
+            f"[PULLBACK-BUDGET-SKIP] {code}: 예산 없음 → 눌림목 신규 매수 스킵"
+        )
+        return
+
+    try:
+        current_price = _safe_get_price(kis, code)
+    except Exception:
+        current_price = None
+    if current_price is None or current_price <= 0:
+        return
 
-            save_state(holding, traded)
-            time.sleep(loop_sleep_sec)
+    pullback_info = {
+        "setup": True,
+        "reversal_price": info.get("pb_reversal_price"),
+        "peak_price": info.get("pb_peak_price"),
+        "reversing": _is_pullback_reversing(
+            info.get("pb_reversal_price"), float(current_price)
+        ),
+    }
+    if not pullback_info.get("reversing"):
+        rev_px = pullback_info.get("reversal_price")
+        logger.info(
+            f"[PULLBACK-WAIT] {code}: 현재가({current_price}) < 반등확인선({rev_px}) → 눌림목 대기"
+        )
+        return
+
+    trigger_price = float(pullback_info.get("reversal_price") or current_price)
+    notional = int(info.get("notional") or 0)
+    if notional <= 0:
+        logger.info(
+            f"[PULLBACK-SKIP] {code}: notional=0 → 매수 스킵"
+        )
+        return
+
+    qty = _notional_to_qty(kis, code, notional, ref_price=current_price)
+    if qty <= 0:
+        logger.info(f"[PULLBACK-SKIP] {code}: 수량 0 → 매수 스킵")
+        return
+
+    vwap_val = _get_vwap_for_guard(kis, code)
+    if vwap_val is not None and vwap_val > 0:
+        if not vwap_guard(float(current_price), float(vwap_val), VWAP_TOL):
+            logger.info(
+                f"[PULLBACK-VWAP-GUARD] {code}: 현재가({current_price}) < VWAP*(1 - {VWAP_TOL:.4f}) "
+                f"→ 눌림목 진입 스킵 (VWAP={vwap_val:.2f})"
+            )
+            return
+
+    if int(current_price) >= int(trigger_price):
+        result = place_buy_with_fallback(
+            kis, code, int(qty), limit_price=int(trigger_price)
+        )
+        try:
+            _init_position_state(
+                kis,
+                holding,
+                code,
+                float(current_price),
+                int(qty),
+                None,
+                trigger_price,
+            )
+        except Exception as e:
+            logger.warning(f"[PULLBACK-INIT-FAIL] {code}: {e}")
+
+        traded[code] = {
+            "buy_time": now_str,
+            "qty": int(qty),
+            "price": float(current_price),
+        }
+        logger.info(
+            f"[✅ 눌림목 매수] {code}, qty={qty}, price={current_price}, trigger={trigger_price}, result={result}"
+        )
+
+        log_trade(
+            {
+                "datetime": now_str,
+                "code": code,
+                "name": info.get("name"),
+                "qty": int(qty),
+                "K": None,
+                "target_price": trigger_price,
+                "strategy": f"코스닥 Top{PULLBACK_TOPN} 눌림목",
+                "side": "BUY",
+                "price": float(current_price),
+                "amount": int(float(current_price) * int(qty)),
+                "result": result,
+            }
+        )
+        _after_order(holding, traded)
+
+
+def _phase_holdings(kis: KisAPI, ctx: LoopContext) -> None:
+    """비타겟 보유분 장중 능동관리(청산 주기가 도래한 종목만)."""
+    holding = ctx.holding
+    for code in list(holding.keys()):
+        if ctx.stop.is_set():
+            break
+        if code in ctx.code_to_target:
+            continue  # 챔피언 단계에서 처리
+        if code not in holding:
+            continue
+        if not _exit_due(code, holding[code]):
+            continue  # 청산 근접 아님 → EXIT_CHECK_SEC 주기로만 평가
+        if not ctx.claim(code):
+            continue
+        LOOP_SCHED.done_key("exit", code)
+        LOOP_PROF.symbol(code)
+        try:
+            _manage_holding_exit(kis, code, holding, ctx.traded, ctx.regime, ctx.ord_psbl_map, ctx.now_str)
+        except Exception as e:
+            logger.error(f"[HOLDING-EXIT-FAIL] {code}: {e}")
+        finally:
+            ctx.release(code)
+
+
+def _cutoff_and_report(holding: Dict[str, Any], traded: Dict[str, Any]) -> None:
+    """커트오프: 미체결 잔량 취소 → 최종 상태 저장 → 기록기 flush → CEO 리포트."""
+    logger.info(
+        f"[⏰ 커트오프] {SELL_FORCE_TIME.strftime('%H:%M')} 도달: 전량 매도 없이 리포트 생성 후 종료"
+    )
+
+    # 미체결 잔량 취소 후 최종 체결 상태 반영
+    if _ORDER_MANAGER is not None:
+        _ORDER_MANAGER.shutdown(cancel_open=True)
+        _sync_managed_orders(holding, traded)
+    save_state(holding, traded)
+    # 리포트가 거래로그 파일을 읽으므로 대기 중인 기록을 먼저 모두 반영
+    event_writer.shutdown()
+    cache.log_stats(logger)
+    cache.export_stats()
+    LOOP_PROF.maybe_log_summary(force=True)
+    logger.info(f"[WATCHDOG] {WATCHDOG.snapshot()}")
+
+    try:
+        _report = ceo_report(datetime.now(KST), period="daily")
+        logger.info(
+            f"[📄 CEO Report 생성 완료] title={_report.get('title')}"
+        )
+    except Exception as e:
+        logger.error(f"[CEO Report 생성 실패] {e}")
+
+    logger.info("[✅ 커트오프 완료: 루프 정상 종료]")
+
+
+def _run_async_session(kis: KisAPI, ctx: LoopContext) -> bool:
+    """
+    장중 세션을 작업별 독립 태스크로 실행(TRADER_RUNTIME=async). 커트오프 도달로 끝났으면 True,
+    장 마감 등으로 끝났으면 False(메인 루프의 마감 처리로 복귀).
+    """
+    ctx.preempt = False  # 긴급 청산은 별도 태스크가 담당 → 단계 중간 선점 불필요
+    ctx.stop.clear()
+    ctx.refresh(kis)
+
+    def _task(name: str, fn: Any, gated: bool = False) -> Any:
+        def run() -> None:
+            ctx.refresh(kis)
+            if not ctx.is_open:
+                return
+            if gated:
+                LOOP_SCHED.done(name)
+            with LOOP_PROF.phase(name):
+                fn(kis, ctx)
+        return run
+
+    def _exits(kis_: KisAPI, ctx_: LoopContext) -> None:
+        _run_urgent_exits(kis_, ctx_)
+        _phase_holdings(kis_, ctx_)
+
+    def _housekeeping() -> None:
+        save_state(ctx.holding, ctx.traded)
+        LOOP_PROF.maybe_log_summary()
+        if CACHE_STATS_LOG_SEC > 0 and LOOP_SCHED.due("cache_stats"):
+            LOOP_SCHED.done("cache_stats")
+            cache.log_stats(logger)
+        if CACHE_STATS_EXPORT_SEC > 0 and LOOP_SCHED.due("cache_export"):
+            LOOP_SCHED.done("cache_export")
+            cache.export_stats()
+
+    def _stop_at() -> bool:
+        now = datetime.now(KST)
+        return (not kis.is_market_open()) or now.time() >= SELL_FORCE_TIME
+
+    LOOP_SCHED.add("cache_stats", CACHE_STATS_LOG_SEC)
+    LOOP_SCHED.add("cache_export", CACHE_STATS_EXPORT_SEC)
+    specs = [
+        TaskSpec("orders", lambda: _sync_managed_orders(ctx.holding, ctx.traded, ctx), ORDER_POLL_SEC),
+        TaskSpec("regime", _task("regime", _phase_regime, gated=True), SCHED_TICK_SEC, gate=lambda: LOOP_SCHED.due("regime")),
+        TaskSpec("balance", _task("balance", _phase_balance, gated=True), SCHED_TICK_SEC, gate=lambda: LOOP_SCHED.due("balance")),
+        TaskSpec("exits", _task("exits", _exits), SCHED_TICK_SEC),
+        TaskSpec("champion", _task("champion", _phase_champion), SCHED_TICK_SEC),
+        TaskSpec("housekeeping", _housekeeping, SCHED_IDLE_SEC),
+    ]
+    if USE_PULLBACK_ENTRY and ctx.pullback_watch:
+        specs.append(
+            TaskSpec(
+                "pullback", _task("pullback", _phase_pullback, gated=True), SCHED_TICK_SEC,
+                gate=lambda: WATCHDOG.allows("pullback") and LOOP_SCHED.due("pullback"),
+            )
+        )
+    runtime = AsyncRuntime(
+        specs,
+        stop_at=_stop_at,
+        stop_event=ctx.stop,
+        max_workers=ASYNC_MAX_WORKERS,
+        log_sec=ASYNC_TIMING_LOG_SEC,
+        check_sec=SCHED_TICK_SEC,
+        # 보호 작업(청산) 1회 소요시간을 지연 예산과 비교 → 부하 차단 단계 조정
+        on_run=lambda name, sec: WATCHDOG.observe(sec) if name == "exits" else None,
+    )
+    cutoff = runtime.run()
+    _sync_managed_orders(ctx.holding, ctx.traded)
+    save_state(ctx.holding, ctx.traded)
+    ctx.preempt = True
+    ctx.stop.clear()
+    now = datetime.now(KST)
+    return cutoff and kis.is_market_open() and now.time() >= SELL_FORCE_TIME
+
+
+def main():
+    kis = KisAPI()
+
+    rebalance_date = get_rebalance_anchor_date()
+    logger.info(f"[ℹ️ 리밸런싱 기준일(KST)]: {rebalance_date} (anchor={REBALANCE_ANCHOR}, ref={WEEKLY_ANCHOR_REF})")
+    logger.info(
+        f"[⏱️ 커트오프(KST)] SELL_FORCE_TIME={SELL_FORCE_TIME.strftime('%H:%M')} / 전체잔고매도={SELL_ALL_BALANCES_AT_CUTOFF} / "
+        f"패스(커트오프/마감)={FORCE_SELL_PASSES_CUTOFF}/{FORCE_SELL_PASSES_CLOSE}"
+    )
+    logger.info(f"[💰 DAILY_CAPITAL] {DAILY_CAPITAL:,}원")
+    logger.info(f"[🛡️ SLIPPAGE_ENTER_GUARD_PCT] {SLIPPAGE_ENTER_GUARD_PCT:.2f}%")
+
+    # 상태 복구
+    holding, traded = load_state()
+    logger.info(f"[상태복구] holding: {list(holding.keys())}, traded: {list(traded.keys())}")
+
+    # === [NEW] 주간 리밸런싱 강제/중복 방지 ===
+    targets: List[Dict[str, Any]] = []
+    if REBALANCE_ANCHOR == "weekly":
+        if should_weekly_rebalance_now():
+            targets = _fetch_targets_with_prefetch(kis, rebalance_date)
+            # 중복 실행 방지를 위해 즉시 스탬프(필요 시 FORCE로 재실행 가능)
+            stamp_weekly_done()
+            logger.info(f"[REBALANCE] 이번 주 리밸런싱 실행 기록 저장({_this_iso_week_key()})")
+        else:
+            logger.info("[REBALANCE] 이번 주 이미 실행됨 → 신규 리밸런싱 생략 (보유 관리만)")
+    else:
+        # today/monthly 등 다른 앵커 모드는 기존 방식으로 바로 호출
+        targets = _fetch_targets_with_prefetch(kis, rebalance_date)
+
+    # === [NEW] 예산 가드: 예수금이 0/부족이면 신규 매수만 스킵 ===
+    effective_cash = _get_effective_ord_cash(kis)
+    if effective_cash <= 0:
+        can_buy = False
+        logger.warning("[BUDGET] 유효 예산 0 → 신규 매수 스킵(보유 관리만 수행)")
+    else:
+        can_buy = True
+    logger.info(
+        f"[BUDGET] today effective cash = {effective_cash:,} KRW "
+        f"(env DAILY_CAPITAL={DAILY_CAPITAL:,})"
+    )
+
+    # 리밸런싱 대상 후처리: qty 없고 weight만 있으면 DAILY_CAPITAL로 수량 계산
+    processed_targets: Dict[str, Target] = {}
+    for t in targets:
+        # 한/영 별칭 키(종목명/name, 목표가/target_price, 매수수량/qty, K/k …)는 여기서 1회만 해석
+        tgt = Target.from_raw(t)
+        if tgt is None:
+            continue
+        code = tgt.code
+        weight = t.get("weight")
+
+        if tgt.qty <= 0 and weight is not None:
+            ref_px = _to_float(t.get("close")) or _to_float(t.get("prev_close"))
+            try:
+                tgt.qty = _weight_to_qty(kis, code, float(weight), DAILY_CAPITAL, ref_price=ref_px)
+            except Exception as e:
+                logger.warning("[REBALANCE] weight→qty 변환 실패 %s: %s", code, e)
+                tgt.qty = 0
+
+        processed_targets[code] = tgt
+
+    # 최소 조건 필터 → 등급화(A/B/C) → A급 종합점수(백분위 가중)를 한 번에 계산(champion_select.py)
+    selection = select_champions(
+        processed_targets,
+        a_rules=CHAMPION_A_RULES,
+        min_trades=CHAMPION_MIN_TRADES,
+        min_winrate=CHAMPION_MIN_WINRATE,
+        max_mdd=CHAMPION_MAX_MDD,
+        min_sharpe=CHAMPION_MIN_SHARPE,
+    )
+    for code in selection.skipped:
+        row = selection.table.loc[code]
+        logger.info(
+            f"[CHAMPION_FILTER_SKIP] {code}: trades={int(row['trades'])}, win={row['win_rate']:.1f}%, "
+            f"mdd={row['mdd']:.1f}%, sharpe={row['sharpe']:.2f}"
+        )
+
+    grade_counts = selection.grade_counts
+    logger.info(
+        "[CHAMPION-GRADE] A:%d / B:%d / C:%d (A급만 실제 매수)",
+        grade_counts.get("A", 0),
+        grade_counts.get("B", 0),
+        grade_counts.get("C", 0),
+    )
+
+    processed_targets = selection.targets
+    non_a = selection.non_a
+    if non_a:
+        logger.info(
+            "[CHAMPION-HOLD] B/C급 %d종목은 관찰만 하고 매수 제외: %s",
+            len(non_a),
+            ",".join(non_a),
+        )
+
+    if not processed_targets:
+        logger.warning("[CHAMPION_FILTER] 조건 충족 종목 없음 → 챔피언 루프 스킵")
+
+    # === [NEW] Regime + 모멘텀 기반 상위 1~2종목 자동 선택 ===
+    # - rolling K 리밸런싱 결과 중에서 최근 모멘텀/수익률이 가장 강한 소수 종목만 실매매 대상으로 사용
+    # - 레짐(mode)에 따라 신규 편입 허용 종목 수를 1~2개로 자동 조절
+    #   * bull / neutral: 최대 2개
+    #   * bear: 최대 1개 (방어적 운용)
+    # - intraday 진입은 기존 VWAP 가드(is_vwap_ok_for_entry)로 필터링됨
+    selected_targets: Dict[str, Target] = {}
+
+
+    try:
+        # 가능하면 당일 레짐을 한번 계산해서 사용
+        regime_snapshot = _update_market_regime(kis)
+        mode = (regime_snapshot or {}).get("mode") or "neutral"
+        stage = int((regime_snapshot or {}).get("stage") or 0)
+        R20 = regime_snapshot.get("R20")
+        D1 = regime_snapshot.get("D1")
+
+        # 🔹 로그/조건식에서 쓰는 등락률(%): 새 레짐에서는 D1을 그대로 사용
+        pct_change = float(D1 or 0.0)
+    except Exception as e:
+        logger.warning("[REBALANCE] 레짐 스냅샷 계산 실패, neutral-0로 대체: %s", e)
+        mode = "neutral"
+        stage = 0
+        R20 = None
+        D1 = None
+        pct_change = 0.0
+
+    regime_key = (mode, stage)
+    cap_scale = REGIME_CAPITAL_SCALE.get(regime_key, REGIME_CAPITAL_SCALE.get(("neutral", 0), 0.5))
+
+    # 레짐 + 예수금 기반 실제 사용 자본 계산
+        # 레짐 + 예수금 기반 실제 사용 자본 계산 (0/실패 시 DAILY_CAPITAL fallback)
+    ord_cash = _get_effective_ord_cash(kis)
+
+    capital_base = int(max(0, int(ord_cash * CAP_CAP)))
+    capital_active = int(min(capital_base * cap_scale, DAILY_CAPITAL))
+    logger.info(
+        f"[REGIME-CAP] mode={mode} stage={stage} R20={R20 if R20 is not None else 'N/A'} "
+        f"D1={D1 if D1 is not None else 'N/A'} "
+        f"ord_cash(effective)={ord_cash:,} base={capital_base:,} active={capital_active:,} "
+        f"scale={cap_scale:.2f}"
+    )
+
+
+
+    # 레짐별 최대 보유 종목 수
+    n_active = REGIME_MAX_ACTIVE.get(regime_key, REGIME_MAX_ACTIVE.get(("neutral", 0), 3))
+
+    scored: List[Tuple[str, float, bool]] = []
+
+    for code, info in processed_targets.items():
+        score = _to_float(info.get("composite_score"), 0.0) or 0.0
+
+        # 단기 모멘텀 강세 여부 (is_strong_momentum)로 버킷 구분
+        try:
+            strong = is_strong_momentum(kis, code)
+        except Exception as e:
+            logger.warning("[REBALANCE] 모멘텀 판별 실패 %s: %s", code, e)
+            strong = False
+
+        scored.append((code, score, strong))
+
+    # 모멘텀 strong 버킷 우선, 그 다음 나머지 중에서 점수 순으로 채우기
+    strong_bucket = [x for x in scored if x[2]]
+    weak_bucket = [x for x in scored if not x[2]]
+
+    strong_bucket.sort(key=lambda x: x[1], reverse=True)
+    weak_bucket.sort(key=lambda x: x[1], reverse=True)
+
+    picked: List[str] = []
+
+    # 모멘텀 강한 버킷을 우선 사용하되, 전체 보유 종목 수는 레짐별 n_active로 제한
+    for code, score, _ in strong_bucket:
+        if len(picked) >= n_active:
+            break
+        picked.append(code)
+
+    for code, score, _ in weak_bucket:
+        if len(picked) >= n_active:
+            break
+        picked.append(code)
+
+    # === [NEW] 레짐별 챔피언 비중 & Target Notional 계산 ===
+    regime_weights = REGIME_WEIGHTS.get(regime_key, REGIME_WEIGHTS.get(("neutral", 0), [1.0]))
+    # 선택된 종목 수만큼 비중 슬라이스
+    weights_for_picked: List[float] = list(regime_weights[: len(picked)])
+
+    for idx, code in enumerate(picked):
+        if code not in processed_targets:
+            continue
+        w = weights_for_picked[idx] if idx < len(weights_for_picked) else 0.0
+        t = processed_targets[code]
+        t.regime_weight = float(w)
+        t.capital_active = int(capital_active)
+        target_notional = int(round(capital_active * w))
+        t.target_notional = target_notional
+
+        ref_px = _to_float(t.get("close")) or _to_float(t.prev_close)
+        planned_qty = _notional_to_qty(kis, code, target_notional, ref_price=ref_px)
+        t.qty = int(planned_qty)  # 매수수량 별칭도 같은 필드
+
+    for code in picked:
+        if code in processed_targets:
+            selected_targets[code] = processed_targets[code]
+
+    logger.info(
+        "[REGIME-CHAMPIONS] mode=%s stage=%s n_active=%s picked=%s capital_active=%s",
+        mode,
+        stage,
+        n_active,
+        picked,
+        f"{capital_active:,}",
+    )
+
+    logger.info(
+        "[REBALANCE] 레짐=%s pct=%.2f%%, 후보 %d개 중 상위 %d종목만 선택: %s",
+        mode,
+        pct_change,
+        len(processed_targets),
+        len(selected_targets),
+        ",".join(selected_targets.keys()),
+    )
+
+    code_to_target: Dict[str, Target] = selected_targets
+
+    # 눌림목 스캔용 코스닥 시총 상위 리스트 (챔피언과 별도로 관리)
+    pullback_watch: Dict[str, Dict[str, Any]] = {}
+    if USE_PULLBACK_ENTRY:
+        pb_weight = max(0.0, min(PULLBACK_UNIT_WEIGHT, 1.0))
+        base_notional = int(round(capital_active * pb_weight))
+        use_topn = PULLBACK_UNIVERSE != "kosdaq"
+        if not use_topn:
+            # 전 종목 로컬 패널 스크리닝 → shortlist만 장중 감시(스크리닝 예외 시에만 시총 Top-N으로 폴백,
+            # 셋업 0건은 정상 결과 → 당일 눌림목 감시 없음)
+            try:
+                pullback_watch = _screen_pullback_universe(base_notional)
+            except Exception as e:
+                logger.warning(f"[PULLBACK-SCREEN-FAIL] 전 종목 스크리닝 실패 → Top{PULLBACK_TOPN} 폴백: {e}")
+                pullback_watch = {}
+                use_topn = True
+            else:
+                if not pullback_watch:
+                    logger.info("[PULLBACK-SCREEN] 셋업 충족 종목 없음 → 당일 눌림목 감시 없음")
+        if use_topn:
+            try:
+                pb_df = get_universe().top_n(
+                    rebalance_date, n=PULLBACK_TOPN, allow_fetch=_universe_fetch_allowed()
+                )
+                for _, row in pb_df.iterrows():
+                    code = str(row.get("Code") or row.get("code") or "").zfill(6)
+                    if not code:
+                        continue
+                    pullback_watch[code] = {
+                        "code": code,
+                        "name": row.get("Name") or row.get("name"),
+                        "notional": base_notional,
+                    }
+                logger.info(
+                    f"[PULLBACK-WATCH] 코스닥 시총 Top{PULLBACK_TOPN} {len(pullback_watch)}종목 스캔 준비"
+                )
+            except Exception as e:
+                logger.warning(f"[PULLBACK-WATCH-FAIL] 시총 상위 로드 실패: {e}")
+            # 셋업(완성 일봉 기준)은 당일 고정 → 장 시작 전 1회 평가, 장중에는 충족 종목만 시세 폴링
+            if pullback_watch:
+                try:
+                    _precompute_pullback_setups(kis, pullback_watch)
+                except Exception as e:
+                    logger.warning(f"[PULLBACK-PRECOMPUTE-FAIL] {e}")
+
+    last_cache_stats_at = time.time()
+    last_cache_export_at = 0.0
+    warmup_done = False
+    # 단계 함수들이 공유하는 세션 상태(잔고 동기화 결과는 BALANCE_SYNC_SEC 주기로만 갱신 → 패스 간 유지)
+    ctx = LoopContext(holding, traded, code_to_target, pullback_watch, can_buy, REGIME_STATE)
+    logger.info(f"[RUNTIME] TRADER_RUNTIME={TRADER_RUNTIME}")
+
+    try:
+        while True:
+            LOOP_PROF.begin()
+            if CACHE_STATS_LOG_SEC > 0 and time.time() - last_cache_stats_at >= CACHE_STATS_LOG_SEC:
+                cache.log_stats(logger)
+                last_cache_stats_at = time.time()
+            if CACHE_STATS_EXPORT_SEC > 0 and time.time() - last_cache_export_at >= CACHE_STATS_EXPORT_SEC:
+                cache.export_stats()
+                last_cache_export_at = time.time()
+
+            # 지난 패스 이후 종료된 관리 주문(체결/부분체결/취소) 반영
+            with LOOP_PROF.phase("orders"):
+                _sync_managed_orders(holding, traded)
+
+            # === 코스닥 레짐 업데이트 (REGIME_CHECK_SEC 주기, 지수 가격 변동 시에만 재판정) ===
+            if LOOP_SCHED.due("regime"):
+                LOOP_SCHED.done("regime")
+                with LOOP_PROF.phase("regime"):
+                    _phase_regime(kis, ctx)
+
+            # 장 상태
+            try:
+                is_open = kis.is_market_open()
+            except Exception:
+                is_open = True
+            now_dt_kst = datetime.now(KST)
+            now_str = now_dt_kst.strftime("%Y-%m-%d %H:%M:%S")
+            ctx.is_open, ctx.now_str = is_open, now_str
+            logger.info(f"[⏰ 장상태] {'OPEN' if is_open else 'CLOSED'} / KST={now_str}")
+
+            # 잔고 동기화 & 보유분 능동관리 부트스트랩 (BALANCE_SYNC_SEC 주기, 주문 직후 즉시)
+            if LOOP_SCHED.due("balance"):
+                LOOP_SCHED.done("balance")
+                with LOOP_PROF.phase("balance"):
+                    _phase_balance(kis, ctx)
+
+            # 장 마감 시: 캔들/ATR/모멘텀/매매 로직 스킵
+            if not is_open:
+                logger.info(
+                    "[마감상태] 캔들/ATR/모멘텀/매매 로직 스킵 → 잔고만 동기화 후 대기"
+                )
+                save_state(holding, traded)
+                pre_open = now_dt_kst.weekday() < 5 and now_dt_kst.time() < MARKET_OPEN_TIME
+                # 장후/주말: 다음 세션 준비 시각까지 대기(상한 CLOSED_MAX_SLEEP_SEC)
+                wait_sec = 60.0 if pre_open else min(
+                    CLOSED_MAX_SLEEP_SEC, max(60.0, _seconds_until_next_session(now_dt_kst))
+                )
+                if WARMUP_ENABLE and pre_open:
+                    if not warmup_done and WARMUP_START <= now_dt_kst.time() < WARMUP_END:
+                        warm_codes = list(dict.fromkeys(
+                            list(code_to_target.keys())
+                            + list(holding.keys())
+                            + [c for c, v in pullback_watch.items() if v.get("pb_setup")]
+                        ))
+                        try:
+                            _run_warmup(
+                                kis,
+                                warm_codes,
+                                deadline=now_dt_kst.replace(
+                                    hour=WARMUP_END.hour, minute=WARMUP_END.minute, second=0, microsecond=0
+                                ),
+                            )
+                        except Exception as e:
+                            logger.warning(f"[WARMUP-FAIL] 워밍업 예외: {e}")
+                        warmup_done = True
+                    now_dt_kst = datetime.now(KST)
+                    if warmup_done:
+                        # 워밍업 이후에는 개장 시각까지 정확히 대기 → 첫 판단이 개장 직후 수행되도록
+                        wait_sec = max(0.0, _seconds_until(now_dt_kst, MARKET_OPEN_TIME)) + 0.05
+                    else:
+                        to_warmup = _seconds_until(now_dt_kst, WARMUP_START)
+                        to_open = _seconds_until(now_dt_kst, MARKET_OPEN_TIME)
+                        nxt = to_warmup if to_warmup > 0 else to_open
+                        wait_sec = min(60.0, max(0.05, nxt + 0.05))
+                time.sleep(wait_sec)
+                continue
+
+            # async 런타임: 장중에는 작업별 독립 태스크로 실행 → 커트오프/마감 시 복귀
+            if TRADER_RUNTIME == "async" and now_dt_kst.time() < SELL_FORCE_TIME:
+                if _run_async_session(kis, ctx):
+                    _cutoff_and_report(holding, traded)
+                    break
+                continue
+
+            # 청산 근접 보유 종목을 먼저(긴급) 평가 → 이후 진입/스캔 등 일반 작업
+            if is_open:
+                with LOOP_PROF.phase("urgent_exits"):
+                    _run_urgent_exits(kis, ctx)
+
+            # ====== 매수/매도(전략) — 오늘의 타겟 ======
+            with LOOP_PROF.phase("champion"):
+                _phase_champion(kis, ctx)
+
+            # ====== 눌림목 전용 매수 (챔피언과 독립적으로 Top-N 시총 리스트 스캔, PULLBACK_SCAN_SEC 주기) ======
+            if USE_PULLBACK_ENTRY and is_open and pullback_watch and WATCHDOG.allows("pullback") and LOOP_SCHED.due("pullback"):
+                LOOP_SCHED.done("pullback")
+                with LOOP_PROF.phase("pullback"):
+                    _phase_pullback(kis, ctx)
+
+            # ====== (A) 비타겟 보유분도 장중 능동관리 ======
+            if is_open:
+                with LOOP_PROF.phase("holdings"):
+                    _phase_holdings(kis, ctx)
+
+            # --- 장중 커트오프(KST): 14:40 도달 시 "전량매도 없이" 리포트 생성 후 정상 종료 ---
+            if is_open and now_dt_kst.time() >= SELL_FORCE_TIME:
+                _cutoff_and_report(holding, traded)
+                break
+
+            with LOOP_PROF.phase("save_state"):
+                save_state(holding, traded)
+            rec = LOOP_PROF.end()
+            if rec is not None:
+                WATCHDOG.observe(rec["ms"] / 1000.0)
+            # 다음 도래 작업까지만 대기(청산 근접 종목이 있으면 SCHED_TICK_SEC)
+            LOOP_SCHED.sleep()
 
     except KeyboardInterrupt:
         logger.info("[🛑 수동 종료]")
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+watchdog.py — 루프 지연(latency) 예산 감시 + 단계적 부하 차단(load shedding)
+
+역할
+- observe(latency_sec): 패스(또는 보호 작업 주기) 소요시간을 예산(budget_sec)과 비교
+- 예산 초과가 escalate_after회 연속이면 차단 단계를 1 올림, 예산×recover_ratio 이하가 recover_after회 연속이면 1 내림
+    0 normal          : 전부 수행
+    1 skip_pullback   : 눌림목 스캔 중단
+    2 reduce_scale_in : + 추가매수(스케일인) 평가 주기 축소
+    3 widen_ttl       : + 분봉/모멘텀 갱신 TTL 확대(on_change 콜백에서 적용)
+- allows(feature): 호출부가 기능 수행 여부를 묻는 단일 진입점(pullback / scale_in)
+  3단계는 묻는 기능이 없음 — on_change 콜백이 분봉 갱신 간격만 늘림
+  (시세 캐시 TTL은 청산 평가가 쓰므로, 일봉 캐시는 날짜 단위라 늘리지 않음)
+- 단계 변경 시 [WATCHDOG] 로그 + on_change(old, new) 콜백
+
+주의
+- 청산/손절 평가는 어떤 단계에서도 차단하지 않습니다(allows()에 해당 기능 없음 → 호출부가 묻지 않음).
+- 스레드 안전(Lock). 시간 측정은 호출부 책임입니다(loop_profiler / runtime_async 통계 재사용).
+"""
+from __future__ import annotations
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LEVEL_NORMAL = 0
+LEVEL_SKIP_PULLBACK = 1
+LEVEL_REDUCE_SCALE_IN = 2
+LEVEL_WIDEN_TTL = 3
+
+LEVEL_NAMES = {
+    LEVEL_NORMAL: "normal",
+    LEVEL_SKIP_PULLBACK: "skip_pullback",
+    LEVEL_REDUCE_SCALE_IN: "reduce_scale_in",
+    LEVEL_WIDEN_TTL: "widen_ttl",
+}
+
+# 기능 → 이 단계 이상이면 차단(축소)
+_FEATURE_SHED_AT = {
+    "pullback": LEVEL_SKIP_PULLBACK,
+    "scale_in": LEVEL_REDUCE_SCALE_IN,
+}
+
+
+class LatencyWatchdog:
+    def __init__(
+        self,
+        budget_sec: float,
+        escalate_after: int = 2,
+        recover_after: int = 5,
+        recover_ratio: float = 0.7,
+        ewma_alpha: float = 0.3,
+        max_level: int = LEVEL_WIDEN_TTL,
+        on_change: Optional[Callable[[int, int], None]] = None,
+        enabled: bool = True,
+    ):
+        self.budget_sec = float(budget_sec)
+        self.escalate_after = max(1, int(escalate_after))
+        self.recover_after = max(1, int(recover_after))
+        self.recover_ratio = float(recover_ratio)
+        self.alpha = float(ewma_alpha)
+        self.max_level = max(LEVEL_NORMAL, min(LEVEL_WIDEN_TTL, int(max_level)))
+        self.on_change = on_change
+        self.enabled = bool(enabled) and self.budget_sec > 0
+        self.level = LEVEL_NORMAL
+        self.ewma: Optional[float] = None
+        self.last: Optional[float] = None
+        self._over = 0
+        self._under = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"observed": 0, "breaches": 0, "escalations": 0, "recoveries": 0}
+
+    def observe(self, latency_sec: float) -> int:
+        """지연 1건 반영 → (변경되었을 수 있는) 현재 단계 반환."""
+        if not self.enabled:
+            return self.level
+        lat = max(0.0, float(latency_sec))
+        change = None
+        with self._lock:
+            self.stats["observed"] += 1
+            self.last = lat
+            self.ewma = lat if self.ewma is None else self.alpha * lat + (1 - self.alpha) * self.ewma
+            if lat > self.budget_sec:
+                self.stats["breaches"] += 1
+                self._over += 1
+                self._under = 0
+                if self._over >= self.escalate_after and self.level < self.max_level:
+                    change = (self.level, self.level + 1)
+                    self.level += 1
+                    self._over = 0
+                    self.stats["escalations"] += 1
+            elif lat <= self.budget_sec * self.recover_ratio:
+                self._under += 1
+                self._over = 0
+                if self._under >= self.recover_after and self.level > LEVEL_NORMAL:
+                    change = (self.level, self.level - 1)
+                    self.level -= 1
+                    self._under = 0
+                    self.stats["recoveries"] += 1
+            else:
+                # 예산 이내지만 회복 기준 미달 → 현 단계 유지
+                self._over = 0
+                self._under = 0
+        if change is not None:
+            old, new = change
+            log = logger.warning if new > old else logger.info
+            log(
+                f"[WATCHDOG] shed level {old}({LEVEL_NAMES[old]}) → {new}({LEVEL_NAMES[new]}) "
+                f"latency={lat:.2f}s ewma={self.ewma:.2f}s budget={self.budget_sec:.2f}s"
+            )
+            if self.on_change is not None:
+                try:
+                    self.on_change(old, new)
+                except Exception as e:
+                    logger.warning(f"[WATCHDOG] on_change 실패: {e}")
+        return self.level
+
+    def allows(self, feature: str) -> bool:
+        shed_at = _FEATURE_SHED_AT.get(feature)
+        return shed_at is None or self.level < shed_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "level": self.level,
+            "name": LEVEL_NAMES[self.level],
+            "budget_sec": self.budget_sec,
+            "last_sec": self.last,
+            "ewma_sec": round(self.ewma, 3) if self.ewma is not None else None,
+            **self.stats,
+        }